@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de alertas de prazo - Sistema BRIX
+Regras por transição de marco: se o marco base foi atingido e o marco seguinte
+não aconteceu dentro do prazo, o container entra em alerta. Os prazos ficam em
+um índice ordenado; a cada rerun só as entradas que venceram desde a última
+avaliação são processadas (busca binária + fatia). O motor é do processo e
+guarda um índice por versão dos dados, então sessões em versões diferentes
+não forçam a reconstrução umas das outras.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analise_transito import converter_datas
+from dados_padrao import FORMATO_DATA
+
+# Regras padrão: prazo (dias) entre o marco base e o marco esperado
+REGRAS_PADRAO = [
+    {'nome': 'ETA vencido sem chegada', 'marco_base': 'PREVISAO CHEGADA PORTO DESTINO',
+     'marco_esperado': 'CHEGADA PORTO DESTINO', 'prazo_dias': 0, 'severidade': 'alta'},
+    {'nome': 'Embarque atrasado', 'marco_base': 'CARREGAMENTO',
+     'marco_esperado': 'EMBARQUE NAVIO', 'prazo_dias': 7, 'severidade': 'media'},
+    {'nome': 'Saída do navio atrasada', 'marco_base': 'EMBARQUE NAVIO',
+     'marco_esperado': 'SAIDA NAVIO', 'prazo_dias': 5, 'severidade': 'media'},
+    {'nome': 'Liberação demorada no porto', 'marco_base': 'CHEGADA PORTO DESTINO',
+     'marco_esperado': 'LIBERAÇAO PORTO DESTINO', 'prazo_dias': 5, 'severidade': 'alta'},
+    {'nome': 'Parado entre liberação e Ciudad del Este', 'marco_base': 'LIBERAÇAO PORTO DESTINO',
+     'marco_esperado': 'CHEGADA CIUDAD DEL ESTE PY', 'prazo_dias': 3, 'severidade': 'alta'},
+    {'nome': 'Descarregamento pendente', 'marco_base': 'CHEGADA CIUDAD DEL ESTE PY',
+     'marco_esperado': 'DESCARREGAMENTO', 'prazo_dias': 3, 'severidade': 'media'},
+]
+
+# Versões dos dados com índice mantido em memória (sessões ainda não atualizadas)
+VERSOES_EM_CACHE = 4
+
+# Processos encerrados não geram alertas
+STATUS_ENCERRADOS = ['🎉 PROCESSO FINALIZADO COM SUCESSO', '❌ PROCESSO CANCELADO']
+
+COLUNAS_RESULTADO = ['CLIENTE', 'CONTAINER', 'ALERTA', 'SEVERIDADE', 'MARCO BASE', 'PRAZO', 'DIAS EM ATRASO']
+
+
+def carregar_regras(prazos=None):
+    """Regras padrão com prazos sobrescritos por nome (dict ou JSON em BRIX_PRAZOS_ALERTA)"""
+    if prazos is None:
+        prazos = json.loads(os.getenv("BRIX_PRAZOS_ALERTA", "{}") or "{}")
+    return [dict(regra, prazo_dias=int(prazos.get(regra['nome'], regra['prazo_dias']))) for regra in REGRAS_PADRAO]
+
+
+class MotorAlertas:
+    """Índices ordenados de prazos pendentes, um por versão dos dados (construído uma vez)"""
+
+    def __init__(self, regras=None):
+        self.regras = regras if regras is not None else carregar_regras()
+        self._lock = threading.Lock()
+        self._versoes = OrderedDict()  # versão -> {'indice', 'vencidos', 'posicao', 'resultado', 'chave'}
+
+    def _assinatura(self, df):
+        colunas = sorted({r['marco_base'] for r in self.regras} | {r['marco_esperado'] for r in self.regras})
+        colunas = [c for c in ['CLIENTE', 'CONTAINER', 'STATUS_FINAL'] + colunas if c in df.columns]
+        hashes = pd.util.hash_pandas_object(df[colunas], index=False)
+        return hashlib.blake2b(hashes.values.tobytes(), digest_size=16).hexdigest()
+
+    def _construir(self, df):
+        """Monta o índice (prazo, regra, cliente, container) ordenado pelo prazo"""
+        marcos = sorted({r['marco_base'] for r in self.regras} | {r['marco_esperado'] for r in self.regras})
+        datas = converter_datas(df, marcos)
+        if 'STATUS_FINAL' in df.columns:
+            ativos = ~df['STATUS_FINAL'].isin(STATUS_ENCERRADOS).to_numpy()
+        else:
+            ativos = np.ones(len(df), dtype=bool)
+
+        partes = []
+        for i, regra in enumerate(self.regras):
+            base = datas[regra['marco_base']]
+            pendentes = (base.notna() & datas[regra['marco_esperado']].isna()).to_numpy() & ativos
+            prazos = base[pendentes] + pd.Timedelta(days=regra['prazo_dias'])
+            partes.append(pd.DataFrame({
+                'CLIENTE': df['CLIENTE'].to_numpy()[pendentes],
+                'CONTAINER': df['CONTAINER'].to_numpy()[pendentes],
+                'REGRA': i,
+                'BASE_DATA': base[pendentes].to_numpy(),
+                'PRAZO_DATA': prazos.to_numpy(),
+            }))
+        indice = pd.concat(partes, ignore_index=True).sort_values('PRAZO_DATA', kind='stable', ignore_index=True)
+        return indice
+
+    def _formatar(self, fatia):
+        """Converte uma fatia do índice em linhas de alerta legíveis (feito uma vez por entrada)"""
+        regras = fatia['REGRA'].to_numpy()
+        return pd.DataFrame({
+            'CLIENTE': fatia['CLIENTE'],
+            'CONTAINER': fatia['CONTAINER'],
+            'ALERTA': np.array([r['nome'] for r in self.regras], dtype=object)[regras],
+            'SEVERIDADE': np.array([r['severidade'] for r in self.regras], dtype=object)[regras],
+            'MARCO BASE': fatia['BASE_DATA'].dt.strftime(FORMATO_DATA),
+            'PRAZO': fatia['PRAZO_DATA'].dt.strftime(FORMATO_DATA),
+            'PRAZO_DATA': fatia['PRAZO_DATA'],
+        })
+
+    def avaliar(self, df, agora=None, versao=None):
+        """Alertas vencidos até 'agora' (versao opcional evita recalcular a assinatura dos dados)"""
+        agora = pd.Timestamp(agora or datetime.now())
+        versao = versao if versao is not None else self._assinatura(df)
+        with self._lock:
+            estado = self._versoes.get(versao)
+            if estado is None:
+                indice = self._construir(df)
+                estado = {'indice': indice, 'vencidos': self._formatar(indice.iloc[0:0]), 'posicao': 0,
+                          'resultado': None, 'chave': None}
+                self._versoes[versao] = estado
+                while len(self._versoes) > VERSOES_EM_CACHE:
+                    self._versoes.popitem(last=False)
+            self._versoes.move_to_end(versao)
+
+            # Busca binária: tudo antes da posição já venceu
+            indice = estado['indice']
+            posicao = int(np.searchsorted(indice['PRAZO_DATA'].to_numpy(), agora.to_datetime64(), side='right'))
+            if posicao > estado['posicao']:
+                novos = self._formatar(indice.iloc[estado['posicao']:posicao])
+                estado['vencidos'] = pd.concat([estado['vencidos'], novos], ignore_index=True)
+            elif posicao < estado['posicao']:
+                estado['vencidos'] = self._formatar(indice.iloc[:posicao])
+            estado['posicao'] = posicao
+
+            # Mesmo conjunto vencido no mesmo dia: resultado reaproveitado
+            chave = (posicao, agora.normalize())
+            if chave == estado['chave']:
+                return estado['resultado']
+
+            vencidos = estado['vencidos']
+            resultado = vencidos[COLUNAS_RESULTADO[:-1]].copy()
+            resultado['DIAS EM ATRASO'] = ((agora - vencidos['PRAZO_DATA']) // pd.Timedelta(days=1)).astype(int)
+            resultado = resultado.sort_values('DIAS EM ATRASO', ascending=False, ignore_index=True)
+            estado['resultado'] = resultado
+            estado['chave'] = chave
+            return resultado
+
+
+def agrupar_por_cliente(alertas):
+    """Alertas agrupados por cliente, clientes com mais alertas primeiro"""
+    if alertas.empty:
+        return {}
+    contagem = alertas['CLIENTE'].value_counts()
+    grupos = dict(tuple(alertas.groupby('CLIENTE', sort=False)))
+    return {cliente: grupos[cliente].reset_index(drop=True) for cliente in contagem.index}
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Feed de alterações do Sistema BRIX - Aplicação do delta nas sessões abertas
+O seq do write-ahead log é a versão dos dados. Cada sessão guarda a versão que
+já conhece e, periodicamente, aplica só as entradas posteriores a ela sobre os
+seus próprios clientes/usuários/DataFrame, sem recarregar tudo.
+"""
+
+import pandas as pd
+
+from persistencia import CHAVE_TRACKING
+
+
+def _localizar(df, idx, container, chave=None):
+    """Posição do tracking pelo índice, conferindo a chave (fallback: busca pela chave).
+    Entradas sem chave só valem se o índice ainda apontar para o mesmo container."""
+    valido = idx is not None and idx in df.index
+    if chave is None:
+        return idx if valido and str(df.at[idx, 'CONTAINER']) == container else None
+    if valido and [str(df.at[idx, c]) for c in CHAVE_TRACKING] == list(chave):
+        return idx
+    mascara = pd.Series(True, index=df.index)
+    for coluna, valor in zip(CHAVE_TRACKING, chave):
+        mascara &= df[coluna].astype(str) == valor
+    encontrados = df.index[mascara]
+    return encontrados[0] if len(encontrados) else None
+
+
+def _aplicar_tracking(df, entrada):
+    operacao = entrada['op']
+    if operacao == 'tracking_edit':
+        i = _localizar(df, entrada['idx'], entrada['container'], entrada.get('chave'))
+        if i is not None:
+            for coluna, valor in entrada['valores'].items():
+                if coluna not in df.columns:
+                    df[coluna] = ''
+                df.at[i, coluna] = valor
+        return df
+    if operacao == 'tracking_edit_lote':
+        for edicao in entrada['edicoes']:
+            df = _aplicar_tracking(df, dict(edicao, op='tracking_edit'))
+        return df
+    if operacao == 'tracking_del':
+        i = _localizar(df, entrada['idx'], entrada['container'], entrada.get('chave'))
+        return df.drop(i).reset_index(drop=True) if i is not None else df
+    if operacao == 'tracking_del_cliente':
+        return df[df['CLIENTE'] != entrada['cliente']].reset_index(drop=True)
+    if operacao == 'tracking_renomear_cliente':
+        df.loc[df['CLIENTE'] == entrada['de'], 'CLIENTE'] = entrada['para']
+        return df
+    if operacao == 'tracking_arquivar':
+        from arquivo_historico import chaves_tracking
+        arquivados = {tuple(chave) for chave in entrada['chaves']}
+        mantidos = [tuple(chave) not in arquivados for chave in chaves_tracking(df)]
+        return df[mantidos].reset_index(drop=True)
+    return df
+
+
+def aplicar_alteracoes(clientes, usuarios, df, entradas):
+    """Aplica as entradas do WAL ao estado da sessão; retorna o novo DataFrame.
+
+    Inclusões consecutivas são concatenadas de uma vez só.
+    """
+    df = df.copy()
+    novos = []
+    for entrada in entradas:
+        operacao = entrada['op']
+        if operacao == 'tracking_add':
+            novos.append(entrada['registro'])
+            continue
+        if operacao == 'tracking_add_lote':
+            novos.extend(entrada['registros'])
+            continue
+        if novos:
+            df = pd.concat([df, pd.DataFrame(novos)], ignore_index=True).fillna('')
+            novos = []
+
+        if operacao == 'cliente_set':
+            clientes[entrada['chave']] = entrada['dados']
+        elif operacao == 'cliente_del':
+            clientes.pop(entrada['chave'], None)
+        elif operacao == 'usuario_set':
+            usuarios[entrada['chave']] = entrada['dados']
+        elif operacao == 'usuario_del':
+            usuarios.pop(entrada['chave'], None)
+        else:
+            df = _aplicar_tracking(df, entrada)
+
+    if novos:
+        df = pd.concat([df, pd.DataFrame(novos)], ignore_index=True).fillna('')
+    return df
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análise de lead time do trânsito - Sistema BRIX
+Durações de cada etapa da cadeia de marcos, calculadas de forma vetorizada,
+distribuições (mediana, p90) por cliente e canal e precisão da previsão (ETA).
+"""
+
+import hashlib
+import threading
+
+import pandas as pd
+
+from dados_padrao import MARCOS_TRANSITO, FORMATO_DATA
+
+COLUNA_PREVISAO = 'PREVISAO CHEGADA PORTO DESTINO'
+COLUNA_CHEGADA = 'CHEGADA PORTO DESTINO'
+COLUNA_TOTAL = 'LEAD TIME TOTAL'
+COLUNA_ERRO_ETA = 'ERRO ETA'  # Dias entre previsão e chegada (positivo = atraso)
+
+# Etapas consecutivas da cadeia (início, fim)
+ETAPAS = list(zip(MARCOS_TRANSITO[:-1], MARCOS_TRANSITO[1:]))
+NOMES_ETAPAS = [f"{inicio} → {fim}" for inicio, fim in ETAPAS]
+
+COLUNAS_DATA = MARCOS_TRANSITO + [COLUNA_PREVISAO]
+COLUNAS_GRUPO = ['CLIENTE', 'CANAL RFB']
+
+UM_DIA = pd.Timedelta(days=1)
+
+
+def converter_datas(df, colunas=COLUNAS_DATA):
+    """Converte colunas 'DD/MM/AAAA' em datetime (vazio/inválido -> NaT)"""
+    datas = {}
+    for coluna in colunas:
+        if coluna in df.columns:
+            datas[coluna] = pd.to_datetime(df[coluna], format=FORMATO_DATA, errors='coerce')
+        else:
+            datas[coluna] = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    return pd.DataFrame(datas, index=df.index)
+
+
+def calcular_etapas(df):
+    """Duração em dias de cada etapa, lead time total e erro do ETA (vetorizado)"""
+    datas = converter_datas(df)
+    resultado = {}
+    for (inicio, fim), nome in zip(ETAPAS, NOMES_ETAPAS):
+        dias = (datas[fim] - datas[inicio]) / UM_DIA
+        resultado[nome] = dias.where(dias >= 0)  # Datas fora de ordem = erro de digitação
+
+    total = (datas[MARCOS_TRANSITO[-1]] - datas[MARCOS_TRANSITO[0]]) / UM_DIA
+    resultado[COLUNA_TOTAL] = total.where(total >= 0)
+    resultado[COLUNA_ERRO_ETA] = (datas[COLUNA_CHEGADA] - datas[COLUNA_PREVISAO]) / UM_DIA
+    return pd.DataFrame(resultado, index=df.index)
+
+
+def distribuicao(etapas, chaves=None, colunas=None):
+    """Contagem, mediana e p90 (dias) de cada etapa, opcionalmente por grupo"""
+    chaves = list(chaves or [])
+    colunas = colunas or NOMES_ETAPAS + [COLUNA_TOTAL]
+    dados = etapas.groupby(chaves, sort=True)[colunas] if chaves else etapas[colunas]
+    contagem, mediana, p90 = dados.count(), dados.median(), dados.quantile(0.9)
+    if chaves:
+        contagem, mediana, p90 = contagem.stack(), mediana.stack(), p90.stack()
+
+    resultado = pd.DataFrame({'n': contagem, 'mediana': mediana, 'p90': p90})
+    resultado = resultado.rename_axis(chaves + ['ETAPA'])
+    return resultado[resultado['n'] > 0].reset_index()
+
+
+def pivotar(distribuicao_df, chave, metrica='mediana'):
+    """Tabela grupo x etapa de uma métrica, com as etapas na ordem da cadeia"""
+    tabela = distribuicao_df.pivot(index=chave, columns='ETAPA', values=metrica)
+    ordem = [c for c in NOMES_ETAPAS + [COLUNA_TOTAL] if c in tabela.columns]
+    return tabela[ordem]
+
+
+def precisao_eta(etapas, chaves=None):
+    """Precisão da previsão de chegada: atraso médio, erro absoluto (mediana/p90) e % no prazo"""
+    chaves = list(chaves or [])
+    validos = etapas[etapas[COLUNA_ERRO_ETA].notna()]
+    base = pd.DataFrame({
+        'erro': validos[COLUNA_ERRO_ETA],
+        'erro_abs': validos[COLUNA_ERRO_ETA].abs(),
+        'no_prazo': (validos[COLUNA_ERRO_ETA] <= 0).astype(float),
+    })
+    for chave in chaves:
+        base[chave] = validos[chave]
+
+    agrupado = base.groupby(chaves) if chaves else base.groupby(lambda _: 'TODOS')
+    resultado = pd.DataFrame({
+        'n': agrupado['erro'].count(),
+        'atraso_medio': agrupado['erro'].mean(),
+        'mediana_erro_abs': agrupado['erro_abs'].median(),
+        'p90_erro_abs': agrupado['erro_abs'].quantile(0.9),
+        'pct_no_prazo': agrupado['no_prazo'].mean() * 100,
+    })
+    return resultado.reset_index(drop=not chaves)
+
+
+class MotorLeadTime:
+    """Cache incremental das etapas, indexado pelo conteúdo de cada linha.
+
+    Apenas linhas novas ou alteradas (hash diferente) têm as datas convertidas
+    novamente; o resumo agregado é reaproveitado enquanto os dados não mudam.
+    """
+
+    # Limite de entradas órfãs (linhas alteradas/excluídas) antes de limpar o cache
+    LIMITE_ORFAOS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = None
+        self._assinatura = None
+        self._resumo = None
+
+    @staticmethod
+    def _hashes(df):
+        colunas = [c for c in COLUNAS_DATA + COLUNAS_GRUPO if c in df.columns]
+        return pd.util.hash_pandas_object(df[colunas], index=False)
+
+    def etapas(self, df, hashes=None):
+        """Etapas de todas as linhas, recalculando só as que mudaram"""
+        if hashes is None:
+            hashes = self._hashes(df)
+        with self._lock:
+            novas = ~hashes.duplicated()
+            if self._cache is not None:
+                novas &= ~hashes.isin(self._cache.index)
+            if novas.any():
+                calculadas = calcular_etapas(df[novas.values])
+                calculadas.index = hashes[novas].values
+                self._cache = calculadas if self._cache is None else pd.concat([self._cache, calculadas])
+
+            if self._cache is None:
+                resultado = calcular_etapas(df.iloc[0:0])
+            else:
+                if len(self._cache) > len(hashes) + self.LIMITE_ORFAOS:
+                    self._cache = self._cache[self._cache.index.isin(hashes.values)]
+                resultado = self._cache.reindex(hashes.values)
+
+        resultado.index = df.index
+        for coluna in COLUNAS_GRUPO:
+            resultado[coluna] = df[coluna].fillna('') if coluna in df.columns else ''
+        return resultado
+
+    def resumo(self, df):
+        """Distribuições e precisão do ETA (reaproveitadas enquanto os dados não mudam)"""
+        hashes = self._hashes(df)
+        assinatura = hashlib.blake2b(hashes.values.tobytes(), digest_size=16).hexdigest()
+        with self._lock:
+            if assinatura == self._assinatura:
+                return self._resumo
+
+        etapas = self.etapas(df, hashes)
+        resumo = {
+            'etapas': etapas,
+            'geral': distribuicao(etapas),
+            'por_cliente': distribuicao(etapas, ['CLIENTE']),
+            'por_canal': distribuicao(etapas, ['CANAL RFB']),
+            'eta_geral': precisao_eta(etapas),
+            'eta_por_cliente': precisao_eta(etapas, ['CLIENTE']),
+        }
+        with self._lock:
+            self._assinatura = assinatura
+            self._resumo = resumo
+        return resumo
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API de consulta de trackings (somente leitura) - Sistema BRIX
+Servidor HTTP/JSON independente do Streamlit, para parceiros e ERP. Lê a mesma
+base local do app (snapshot + WAL), mantém índices em memória por container e
+por cliente e autentica com os usuários do sistema (HTTP Basic), aplicando o
+mesmo escopo de clientes da interface. Respostas levam ETag calculado só sobre
+os trackings devolvidos (If-None-Match -> 304) e a versão dos dados no
+cabeçalho X-Brix-Versao.
+
+Endpoints:
+  GET  /api/v1/containers/<CONTAINER>          trackings de um container
+  GET  /api/v1/containers?ids=C1,C2,...         consulta em lote
+  POST /api/v1/containers/lote  {"containers": [...]}
+  GET  /api/v1/clientes/<CLIENTE>/trackings     trackings de um cliente
+  GET  /api/v1/status                           versão dos dados (sem autenticação)
+
+Uso: python api_tracking.py [--porta 8502] [--host 0.0.0.0]
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from dados_padrao import COLUNAS_TRACKING
+from persistencia import ArmazenamentoLocal, ARQUIVO_SNAPSHOT, ARQUIVO_WAL
+
+DIRETORIO_DADOS_LOCAIS = os.getenv("BRIX_DADOS_DIR", str(Path(__file__).parent / ".brix_dados"))
+
+# Intervalo mínimo (segundos) entre verificações de alteração na base local
+INTERVALO_VERIFICACAO = 1.0
+
+# Máximo de containers por consulta em lote
+LIMITE_LOTE = 500
+
+PREFIXO = '/api/v1'
+
+
+def normalizar_container(container):
+    return str(container or '').strip().upper()
+
+
+def clientes_permitidos(usuario_info):
+    """Clientes visíveis para o usuário (None = todos), como em filtrar_dados_por_cliente"""
+    if usuario_info["tipo"] == "admin":
+        return None
+    if "clientes_vinculados" in usuario_info:
+        return set(usuario_info["clientes_vinculados"])
+    if "cliente_vinculado" in usuario_info:
+        return {usuario_info["cliente_vinculado"]}
+    return set()
+
+
+class IndiceTrackings:
+    """Índices em memória da base local, recarregados quando os arquivos mudam"""
+
+    def __init__(self, diretorio=DIRETORIO_DADOS_LOCAIS):
+        self.diretorio = Path(diretorio)
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._verificado_em = 0.0
+        self.versao = 0
+        self.usuarios = {}
+        self.por_container = {}
+        self.por_cliente = {}
+
+    def _assinatura_arquivos(self):
+        assinatura = []
+        for nome in (ARQUIVO_SNAPSHOT, ARQUIVO_WAL):
+            try:
+                info = (self.diretorio / nome).stat()
+                assinatura.append((info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                assinatura.append(None)
+        return tuple(assinatura)
+
+    def atualizar(self):
+        """Recarrega os índices se o snapshot ou o WAL mudaram (no máximo uma verificação por intervalo)"""
+        agora = time.monotonic()
+        with self._lock:
+            if agora - self._verificado_em < INTERVALO_VERIFICACAO:
+                return
+            self._verificado_em = agora
+            assinatura = self._assinatura_arquivos()
+            if assinatura == self._assinatura:
+                return
+
+            estado = ArmazenamentoLocal(self.diretorio, somente_leitura=True).carregar() or {'usuarios': {}, 'trackings': [], 'seq': 0}
+            por_container, por_cliente = {}, {}
+            for registro in estado['trackings']:
+                linha = {coluna: registro.get(coluna) or '' for coluna in COLUNAS_TRACKING}
+                por_container.setdefault(normalizar_container(linha['CONTAINER']), []).append(linha)
+                por_cliente.setdefault(linha['CLIENTE'], []).append(linha)
+
+            self.usuarios = {str(user_id).strip().lower(): dados for user_id, dados in estado['usuarios'].items()}
+            self.por_container = por_container
+            self.por_cliente = por_cliente
+            self.versao = estado['seq']
+            self._assinatura = assinatura
+
+    def autenticar(self, usuario, senha):
+        """Mesma regra do login do app: usuário sem diferenciar maiúsculas, senha exata, ativo"""
+        user_data = self.usuarios.get(str(usuario).strip().lower())
+        if user_data and str(user_data["senha"]) == str(senha).strip() and user_data["ativo"]:
+            return user_data
+        return None
+
+    def container(self, container, permitidos):
+        linhas = self.por_container.get(normalizar_container(container), [])
+        return [l for l in linhas if permitidos is None or l['CLIENTE'] in permitidos]
+
+    def cliente(self, cliente):
+        return self.por_cliente.get(cliente, [])
+
+
+def criar_servidor(host='127.0.0.1', porta=8502, indice=None):
+    """Cria o servidor HTTP da API (chamar serve_forever() para atender)"""
+    indice = indice or IndiceTrackings()
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "BrixAPI/1.0"
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, status, corpo, cabecalhos=None):
+            dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            for nome, valor in (cabecalhos or {}).items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _responder_com_etag(self, corpo):
+            """ETag só dos trackings devolvidos: escritas em outros processos não invalidam o cache do cliente"""
+            versao = str(indice.versao)
+            dados = json.dumps(corpo, ensure_ascii=False, sort_keys=True).encode('utf-8')
+            etag = '"%s"' % hashlib.blake2b(dados, digest_size=12).hexdigest()
+            if etag in [e.strip() for e in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('X-Brix-Versao', versao)
+                self.end_headers()
+                return
+            self._responder(200, corpo, {'ETag': etag, 'X-Brix-Versao': versao, 'Cache-Control': 'private, no-cache'})
+
+        def _usuario(self):
+            """Usuário autenticado (HTTP Basic) ou None (já respondeu 401)"""
+            autorizacao = self.headers.get('Authorization', '')
+            if autorizacao.startswith('Basic '):
+                try:
+                    usuario, _, senha = base64.b64decode(autorizacao[6:]).decode('utf-8').partition(':')
+                    user_data = indice.autenticar(usuario, senha)
+                    if user_data:
+                        return user_data
+                except ValueError:
+                    pass
+            self._responder(401, {'erro': 'Usuário ou senha inválidos'}, {'WWW-Authenticate': 'Basic realm="BRIX"'})
+            return None
+
+        def _lote(self, containers, permitidos):
+            if len(containers) > LIMITE_LOTE:
+                return self._responder(400, {'erro': f'Máximo de {LIMITE_LOTE} containers por consulta'})
+            encontrados, nao_encontrados = {}, []
+            for container in containers:
+                linhas = indice.container(container, permitidos)
+                if linhas:
+                    encontrados[normalizar_container(container)] = linhas
+                else:
+                    nao_encontrados.append(container)
+            self._responder_com_etag({
+                'encontrados': encontrados,
+                'nao_encontrados': nao_encontrados,
+            })
+
+        def do_GET(self):
+            indice.atualizar()
+            url = urlsplit(self.path)
+            partes = [unquote(p) for p in url.path[len(PREFIXO):].strip('/').split('/')] if url.path.startswith(PREFIXO) else []
+
+            if partes == ['status']:
+                return self._responder(200, {'versao': indice.versao, 'containers': len(indice.por_container)})
+
+            if not partes or partes[0] not in ('containers', 'clientes'):
+                return self._responder(404, {'erro': 'Rota não encontrada'})
+
+            usuario_info = self._usuario()
+            if usuario_info is None:
+                return
+            permitidos = clientes_permitidos(usuario_info)
+
+            if partes == ['containers']:
+                ids = [c for valor in parse_qs(url.query).get('ids', []) for c in valor.split(',') if c.strip()]
+                return self._lote(ids, permitidos)
+
+            if len(partes) == 2 and partes[0] == 'containers':
+                linhas = indice.container(partes[1], permitidos)
+                if not linhas:
+                    return self._responder(404, {'erro': 'Container não encontrado'})
+                return self._responder_com_etag({'container': normalizar_container(partes[1]), 'trackings': linhas})
+
+            if len(partes) == 3 and partes[0] == 'clientes' and partes[2] == 'trackings':
+                if permitidos is not None and partes[1] not in permitidos:
+                    return self._responder(403, {'erro': 'Acesso negado a este cliente'})
+                return self._responder_com_etag({'cliente': partes[1], 'trackings': indice.cliente(partes[1])})
+
+            self._responder(404, {'erro': 'Rota não encontrada'})
+
+        def do_POST(self):
+            indice.atualizar()
+            if urlsplit(self.path).path.rstrip('/') != f'{PREFIXO}/containers/lote':
+                return self._responder(404, {'erro': 'Rota não encontrada'})
+
+            usuario_info = self._usuario()
+            if usuario_info is None:
+                return
+            try:
+                tamanho = int(self.headers.get('Content-Length', 0))
+                corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                containers = [str(c) for c in corpo.get('containers', [])]
+            except (ValueError, AttributeError, TypeError):
+                return self._responder(400, {'erro': 'JSON inválido: esperado {"containers": [...]}'})
+            self._lote(containers, clientes_permitidos(usuario_info))
+
+    servidor = ThreadingHTTPServer((host, porta), Handler)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API de consulta de trackings do Sistema BRIX")
+    parser.add_argument('--host', default='127.0.0.1', help="Endereço de escuta")
+    parser.add_argument('--porta', type=int, default=8502, help="Porta HTTP")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.host, args.porta)
+    print(f"🚢 API BRIX em http://{args.host}:{servidor.server_address[1]}{PREFIXO} (dados: {DIRETORIO_DADOS_LOCAIS})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
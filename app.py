@@ -7,19 +7,46 @@ Escritório de contabilidade - Brasil
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import json
-import base64
+import copy
 import os
 from pathlib import Path
 
+# Apenas módulos leves no topo: pandas e plotly são importados sob demanda
+# (após o login), mantendo a tela de login rápida em conexões lentas
+from dados_padrao import (
+    DADOS_EMPRESA, STATUS_FINAIS, COLUNAS_TRACKING,
+    CLIENTES_PADRAO, USUARIOS_PADRAO, TRACKINGS_PADRAO
+)
+from persistencia import ArmazenamentoLocal, BaseLocalEmUso, chave_tracking
+from cadastros import RegistroClientes, RegistroUsuarios
+from migracoes import VERSAO_ESQUEMA, migrar_estado, versao_dos_dados
+
 # 🔐 CONFIGURAÇÃO DO TOKEN GITHUB (APENAS VOCÊ PRECISA ALTERAR)
 # Cole seu token GitHub aqui - será usado automaticamente em qualquer computador
 GITHUB_TOKEN_CONFIGURADO = os.getenv("BRIX_TOKEN", "")
 
+# Endereço da API do GitHub (pode apontar para o github_falso.py em testes)
+GITHUB_API_URL_BASE = os.getenv("BRIX_GITHUB_API", "https://api.github.com")
+
+# 💽 Persistência local (snapshot + WAL) - sobrevive a reinícios do processo
+DIRETORIO_DADOS_LOCAIS = os.getenv("BRIX_DADOS_DIR", str(Path(__file__).parent / ".brix_dados"))
+
+# 🗄️ Processos finalizados/cancelados há mais de N dias vão para o arquivo histórico
+IDADE_ARQUIVO_DIAS = int(os.getenv("BRIX_IDADE_ARQUIVO_DIAS", "90"))
+
+# 🔄 Intervalo (segundos) da verificação de alterações nas sessões abertas (0 = desligado)
+INTERVALO_ATUALIZACAO = int(os.getenv("BRIX_INTERVALO_ATUALIZACAO", "5"))
+
+# 📑 Diretório padrão onde os pacotes de relatórios mensais são salvos
+DIRETORIO_RELATORIOS = os.getenv("BRIX_RELATORIOS_DIR", str(Path(DIRETORIO_DADOS_LOCAIS) / "relatorios_mensais"))
+
+# 💤 Sessões sem uso há mais de N minutos entram em espera e liberam a memória (0 = desligado)
+SESSAO_OCIOSA_MINUTOS = int(os.getenv("BRIX_SESSAO_OCIOSA_MIN", "30"))
+
+# 📄 Linhas por página nas listagens de clientes e usuários
+ITENS_POR_PAGINA_ADMIN = int(os.getenv("BRIX_ITENS_POR_PAGINA", "25"))
+
 # Configuração da página
 st.set_page_config(
     page_title="🚢 Sistema BRIX - Tracking Marítimo e Rodoviário",
@@ -184,252 +211,383 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Dados da empresa
-DADOS_EMPRESA = {
-    'nome': 'BRIX LOGÍSTICA',
-    'endereco': 'Av Ranieri Mazzilli, nº 755, Centro Civíco',
-    'cidade': 'Foz do Iguaçu - PR',
-    'telefone': '(45) 99115 0734',
-    'email': 'fabio@brixcontabilidade.com.br',
-    'cnpj': '31.247.532/0001-51'
-}
-
-# ADICIONAR AQUI:
-STATUS_FINAIS = [
-    "",
-    "🎉 PROCESSO FINALIZADO COM SUCESSO",
-    "⚠️ FINALIZADO COM PENDÊNCIAS", 
-    "❌ PROCESSO CANCELADO",
-    "🔄 EM PROCESSAMENTO",
-    "📋 AGUARDANDO DOCUMENTAÇÃO"
-]
+@st.cache_resource
+def obter_coordenador_github():
+    """Acesso ao GitHub compartilhado pelas sessões (requisições únicas + cota da API)"""
+    from coordenador_github import CoordenadorGitHub
+    return CoordenadorGitHub(GITHUB_API_URL_BASE)
 
 def testar_token_github(token):
     """Testa se o token GitHub é válido"""
     try:
-        import requests
-        test_response = requests.get(
-            "https://api.github.com/user", 
-            headers={'Authorization': f'token {token}'},
-            timeout=10
-        )
-        return test_response.status_code == 200
+        return obter_coordenador_github().validar_token(token)
     except Exception:
         return False
 
-def inicializar_sistema():
-    """Inicializa o sistema com dados padrão se necessário"""
+@st.cache_resource
+def obter_armazenamento_local():
+    """Armazenamento local compartilhado por todas as sessões do processo"""
+    return ArmazenamentoLocal(DIRETORIO_DADOS_LOCAIS)
+
+@st.cache_resource
+def obter_arquivo_historico():
+    """Arquivo histórico (partições mensais compactadas) compartilhado pelo processo"""
+    from arquivo_historico import ArquivoHistorico
+    return ArquivoHistorico(Path(DIRETORIO_DADOS_LOCAIS) / "arquivo")
+
+def arquivar_finalizados():
+    """Move processos encerrados antigos do df_tracking para o arquivo histórico"""
+    from arquivo_historico import selecionar_arquivaveis, chaves_tracking
     
-    # Configurar token automaticamente se disponível
-    if 'github_token' not in st.session_state and GITHUB_TOKEN_CONFIGURADO:
-        if testar_token_github(GITHUB_TOKEN_CONFIGURADO):
-            st.session_state.github_token = GITHUB_TOKEN_CONFIGURADO
-            st.session_state.github_token_configurado = True
+    df_tracking = st.session_state.df_tracking
+    arquivaveis = selecionar_arquivaveis(df_tracking, IDADE_ARQUIVO_DIAS)
+    if not arquivaveis.any():
+        return 0
+    
+    # Grava o arquivo antes de remover do conjunto ativo (repetir é seguro: sem duplicatas)
+    try:
+        quantidade = obter_arquivo_historico().arquivar(df_tracking[arquivaveis])
+    except OSError as e:
+        st.warning(f"⚠️ Falha ao gravar arquivo histórico: {str(e)}")
+        return 0
+    
+    registrar_mutacao('tracking_arquivar', chaves=chaves_tracking(df_tracking[arquivaveis]))
+    st.session_state.df_tracking = df_tracking[~arquivaveis].reset_index(drop=True)
+    return quantidade
+
+@st.cache_resource
+def obter_kpis_diarios():
+    """KPIs diários materializados por um job incremental (thread do processo)"""
+    from kpis import KpisDiarios
+    armazenamento = obter_armazenamento_local()
+    
+    def trackings_atuais():
+        estado = armazenamento.carregar()
+        return montar_df_tracking(estado['trackings'] if estado else [], estado['colunas'] if estado else COLUNAS_TRACKING)
+    
+    kpis = KpisDiarios(Path(DIRETORIO_DADOS_LOCAIS) / "kpis", fonte=trackings_atuais)
+    kpis.iniciar_agendador()
+    return kpis
+
+@st.cache_resource
+def obter_gerador_relatorios():
+    """Pool de processos que gera as planilhas mensais por cliente (cache em disco pelo conteúdo)"""
+    from relatorios import GeradorRelatorios
+    return GeradorRelatorios(Path(DIRETORIO_DADOS_LOCAIS) / "relatorios")
+
+@st.cache_resource
+def obter_registro_sessoes():
+    """Uso e memória de todas as sessões do processo (diagnóstico do admin)"""
+    from memoria_sessoes import RegistroSessoes
+    return RegistroSessoes(SESSAO_OCIOSA_MINUTOS * 60)
+
+def id_sessao():
+    """Identificador da sessão Streamlit atual"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else 'local'
+
+def sessao_ativa(id_sessao):
+    """A sessão ainda está aberta no servidor?"""
+    from streamlit import runtime
+    return not runtime.exists() or runtime.get_instance().is_active_session(id_sessao)
+
+def registrar_atividade():
+    """Marca a sessão como em uso (chamado em cada interação, inclusive nos fragmentos)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    
+    # Execução completa disparada pelo feed de alterações: só um fragmento
+    # reexecutado depois dela (fragment_ids_this_run) é interação do usuário
+    ctx = get_script_run_ctx()
+    if st.session_state.get('execucao_automatica') and not (ctx and ctx.fragment_ids_this_run):
+        return
+    obter_registro_sessoes().registrar_uso(id_sessao(), (st.session_state.get('usuario_info') or {}).get('nome'))
+
+def medir_sessao(forcar=False, em_espera=None):
+    """Publica no registro o tamanho aproximado de cada chave do session_state desta sessão"""
+    from memoria_sessoes import medir_estado
+    registro = obter_registro_sessoes()
+    if forcar or registro.precisa_medir(id_sessao()):
+        registro.atualizar_medicao(id_sessao(), medir_estado(st.session_state), em_espera)
+
+def colocar_em_espera():
+    """Libera caches, objetos grandes e flags de modais da sessão ociosa (recarregados em retomar_sessao)"""
+    from memoria_sessoes import chaves_para_espera
+    
+    for chave in chaves_para_espera(st.session_state):
+        del st.session_state[chave]
+    st.session_state.sessao_em_espera = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    medir_sessao(forcar=True, em_espera=True)
+
+def retomar_sessao():
+    """Recarrega da base local o que colocar_em_espera() liberou"""
+    estado = obter_armazenamento_local().carregar()
+    if estado is None:
+        # Base local apagada: a sessão recomeça do zero
+        st.session_state.clear()
+        return
+    
+    st.session_state.clientes_db = RegistroClientes(estado['clientes'])
+    st.session_state.usuarios_db = RegistroUsuarios(estado['usuarios'])
+    if st.session_state.get('logado'):
+        st.session_state.df_tracking = montar_df_tracking(estado['trackings'], estado['colunas'])
+    else:
+        st.session_state.trackings_pendentes = (estado['trackings'], estado['colunas'])
+    st.session_state.versao_dados = estado['seq']
+    st.session_state.seqs_proprios = set()
+    
+    del st.session_state.sessao_em_espera
+    registrar_atividade()
+
+@st.cache_resource
+def obter_central_notificacoes():
+    """Central de resumos por e-mail (None se o SMTP não estiver configurado)"""
+    from notificacoes import criar_central_do_ambiente
+    return criar_central_do_ambiente(DIRETORIO_DADOS_LOCAIS)
+
+def notificar_transicoes(registro_anterior, novos_valores):
+    """Registra as mudanças de marcos do tracking para o próximo resumo do cliente"""
+    central = obter_central_notificacoes()
+    if central is None:
+        return
+    from notificacoes import detectar_transicoes, destinatarios
+    
+    transicoes = detectar_transicoes(registro_anterior, novos_valores)
+    if transicoes:
+        cliente = novos_valores.get('CLIENTE') or registro_anterior.get('CLIENTE')
+        central.registrar(
+            cliente,
+            novos_valores.get('CONTAINER') or registro_anterior.get('CONTAINER'),
+            transicoes,
+            destinatarios(cliente, st.session_state.clientes_db, st.session_state.usuarios_db),
+            usuario=(st.session_state.usuario_info or {}).get('nome')
+        )
+
+@st.cache_resource
+def obter_log_auditoria():
+    """Log de auditoria (segmentos append-only) compartilhado pelo processo"""
+    from auditoria import LogAuditoria
+    return LogAuditoria(Path(DIRETORIO_DADOS_LOCAIS) / "auditoria")
+
+def auditar(anterior, novo):
+    """Registra no log de auditoria as mudanças de campo de um tracking (gravação em segundo plano).
+    
+    O tracking é identificado por cliente, container e carregamento depois da
+    alteração (na exclusão, os do registro excluído).
+    """
+    # 'novo' pode trazer só os campos editados: o restante continua como estava
+    if novo:
+        novo = {**(anterior or {}), **novo}
+    try:
+        obter_log_auditoria().registrar(chave_tracking(novo or anterior), anterior, novo, usuario=st.session_state.get('usuario_id'))
+    except OSError as e:
+        st.warning(f"⚠️ Falha ao gravar auditoria: {str(e)}")
+
+def clientes_do_usuario(usuario_info):
+    """Clientes visíveis para o usuário (None = todos)"""
+    if usuario_info["tipo"] == "admin":
+        return None
+    if hasattr(usuario_info, 'clientes'):
+        return usuario_info.clientes
+    if "clientes_vinculados" in usuario_info:
+        return list(usuario_info["clientes_vinculados"])
+    if "cliente_vinculado" in usuario_info:
+        return [usuario_info["cliente_vinculado"]]
+    return []
+
+def registrar_mutacao(operacao, **dados):
+    """Grava a mutação no write-ahead log local"""
+    if 'dados' in dados and hasattr(dados['dados'], 'para_dict'):
+        dados['dados'] = dados['dados'].para_dict()
+    try:
+        seq = obter_armazenamento_local().registrar(operacao, **dados)
+        if operacao.startswith('usuario_'):
+            invalidar_indice_usuarios()
+    except OSError as e:
+        st.warning(f"⚠️ Falha ao gravar dados locais: {str(e)}")
+        return
+    
+    # Mutação desta sessão já está aplicada: o feed não deve reaplicá-la
+    if seq == st.session_state.get('versao_dados', 0) + 1:
+        st.session_state.versao_dados = seq
+    else:
+        st.session_state.setdefault('seqs_proprios', set()).add(seq)
+
+def versao_dos_trackings():
+    """Versão dos dados da sessão: seq conhecido + mutações próprias aplicadas fora de ordem"""
+    return (st.session_state.get('versao_dados'), tuple(sorted(st.session_state.get('seqs_proprios', ()))))
+
+def cache_da_versao(nome, construir):
+    """Resultado de construir() guardado na sessão até a próxima mudança nos dados"""
+    df = st.session_state.df_tracking
+    chave = (id(df), len(df), st.session_state.get('versao_dados'), len(st.session_state.get('seqs_proprios', ())))
+    caches = st.session_state.setdefault('caches_da_versao', {})
+    if nome not in caches or caches[nome][0] != chave:
+        caches[nome] = (chave, construir())
+    return caches[nome][1]
+
+def colunas_normalizadas():
+    """Colunas de busca normalizadas do DataFrame da sessão"""
+    from filtros import normalizar_colunas
+    return cache_da_versao('colunas_normalizadas', lambda: normalizar_colunas(st.session_state.df_tracking))
+
+def indice_ordenado():
+    """Índice ordenado (datas convertidas e postos) das colunas usadas em períodos e ordenação"""
+    from filtros import IndiceOrdenado
+    return cache_da_versao('indice_ordenado', lambda: IndiceOrdenado(st.session_state.df_tracking))
+
+def indice_clientes():
+    """Índice de busca de clientes (cadastro + trackings), montado uma vez por versão dos dados"""
+    def construir():
+        from busca_clientes import IndiceClientes
+        nomes = {razao: [dados.get('nome_fantasia', '')] for razao, dados in st.session_state.clientes_db.items()}
+        for cliente in st.session_state.df_tracking['CLIENTE'].dropna().unique():
+            nomes.setdefault(str(cliente), [])
+        return IndiceClientes(nomes)
+    return cache_da_versao('indice_clientes', construir)
+
+def buscar_clientes(texto):
+    """Clientes compatíveis com o texto digitado, do mais para o menos parecido"""
+    return [cliente for cliente, _ in indice_clientes().buscar(texto)]
+
+def sincronizar_alteracoes():
+    """Aplica à sessão as alterações feitas por outras sessões desde a versão conhecida"""
+    if 'versao_dados' not in st.session_state or 'df_tracking' not in st.session_state:
+        return False
+    
+    armazenamento = obter_armazenamento_local()
+    entradas = armazenamento.alteracoes_desde(st.session_state.versao_dados)
+    if not entradas:
+        if entradas is not None:
+            return False
+        
+        # Delta indisponível (estado substituído): recarrega o estado local completo
+        estado = armazenamento.carregar()
+        st.session_state.clientes_db = RegistroClientes(estado['clientes'])
+        st.session_state.usuarios_db = RegistroUsuarios(estado['usuarios'])
+        st.session_state.df_tracking = montar_df_tracking(estado['trackings'], estado['colunas'])
+        st.session_state.versao_dados = estado['seq']
+        st.session_state.seqs_proprios = set()
+        invalidar_indice_usuarios()
+        return True
+    
+    from alteracoes import aplicar_alteracoes
+    
+    proprios = st.session_state.setdefault('seqs_proprios', set())
+    externas = [e for e in entradas if e['seq'] not in proprios]
+    proprios.difference_update(e['seq'] for e in entradas)
+    st.session_state.versao_dados = entradas[-1]['seq']
+    if not externas:
+        return False
+    
+    st.session_state.df_tracking = aplicar_alteracoes(
+        st.session_state.clientes_db,
+        st.session_state.usuarios_db,
+        st.session_state.df_tracking,
+        externas
+    )
+    if any(e['op'].startswith('usuario_') for e in externas):
+        invalidar_indice_usuarios()
+    return True
+
+def rerun_fragmento():
+    """Reexecuta apenas o fragmento atual (ou o app inteiro, fora de um rerun de fragmento)"""
+    from streamlit.errors import StreamlitAPIException
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def controles_listagem(chave, total, opcoes_ordem):
+    """Ordenação e paginação de uma listagem administrativa; retorna (ordem, inicio, fim)"""
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        ordem = st.selectbox("Ordenar por", opcoes_ordem, key=f"ordem_{chave}")
+    with col2:
+        paginas = max(1, -(-total // ITENS_POR_PAGINA_ADMIN))
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=f"pagina_{chave}_{paginas}")
+    inicio = (pagina - 1) * ITENS_POR_PAGINA_ADMIN
+    fim = min(total, inicio + ITENS_POR_PAGINA_ADMIN)
+    if total:
+        st.caption(f"Mostrando {inicio + 1}–{fim} de {total}")
+    return ordem, inicio, fim
+
+def tabela_selecionavel(linhas, chaves, chave):
+    """Tabela compacta com seleção de uma linha; retorna a chave da linha selecionada (ou None)"""
+    import pandas as pd
+    evento = st.dataframe(
+        pd.DataFrame(linhas),
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"tabela_{chave}"
+    )
+    linhas_selecionadas = evento.selection.rows
+    return chaves[linhas_selecionadas[0]] if linhas_selecionadas and linhas_selecionadas[0] < len(chaves) else None
+
+def data_ordenavel(data_texto):
+    """Data DD/MM/AAAA como chave de ordenação (datas inválidas por último)"""
+    try:
+        return datetime.strptime(str(data_texto), "%d/%m/%Y")
+    except ValueError:
+        return datetime.max
+
+def inicializar_sistema():
+    """Inicializa o sistema com dados padrão se necessário (caminho rápido até o login)"""
     
     # Inicializar dados básicos se não existirem
     if 'sistema_inicializado' not in st.session_state:
         
-        # DADOS PADRÃO PARA CLIENTES
-        st.session_state.clientes_db = {
-            "MC CONFECCIONES": {
-                "razao_social": "MC CONFECCIONES",
-                "nome_fantasia": "MC CONFECCIONES",
-                "cnpj": "RUC: 80104097-3",
-                "email": "aristide.nosenzo@mcparaguay.com",
-                "telefone": "4531984037",
-                "endereco": "",
-                "contato": "Aristide Nosenzo",
-                "ativo": True,
-                "data_cadastro": "06/06/2025"
-            },
-            "BENTO COMEX": {
-                "razao_social": "BENTO COMEX",
-                "nome_fantasia": "BENTO COMEX",
-                "cnpj": "RUC",
-                "email": "nicolas@rrclogistica.com",
-                "telefone": "+595 61502286",
-                "endereco": "",
-                "contato": "",
-                "ativo": True,
-                "data_cadastro": "07/06/2025"
-            },
-            "MASPY": {
-                "razao_social": "MASPY S.A.",
-                "nome_fantasia": "MASPY S.A.",
-                "cnpj": "800931254",
-                "email": "leo@kfkprivate.com.br",
-                "telefone": "+595 61502286",
-                "endereco": "CIUDAD DEL ESTE",
-                "contato": "",
-                "ativo": True,
-                "data_cadastro": "12/06/2025"
-            },
-            "TENORA": {
-                "razao_social": "TENORA",
-                "nome_fantasia": "TENORA",
-                "cnpj": "28792545000105",
-                "email": "fiscal@brixcontabilidade.com.br",
-                "telefone": "4531984037",
-                "endereco": "",
-                "contato": "",
-                "ativo": True,
-                "data_cadastro": "08/06/2025"
-            },
-            "PAPERBOX": {
-                "razao_social": "PAPERBOX",
-                "nome_fantasia": "PAPERBOX",
-                "cnpj": "PARAGUAY",
-                "email": "fiscal@brixcontabilidade.com.br",
-                "telefone": "4531984037",
-                "endereco": "",
-                "contato": "",
-                "ativo": True,
-                "data_cadastro": "18/06/2025"
-            }
-        }
+        # Estado local (snapshot + WAL) tem prioridade sobre os dados padrão
+        try:
+            estado_local = obter_armazenamento_local().carregar()
+        except BaseLocalEmUso:
+            st.error("⏳ Base local em manutenção pela linha de comando. Tente novamente em instantes.")
+            st.stop()
         
-        # DADOS PADRÃO PARA USUÁRIOS
-        st.session_state.usuarios_db = {
-            "admin": {
-                "senha": "admin123",
-                "tipo": "admin",
-                "cliente_vinculado": None,
-                "nome": "Administrador BRIX",
-                "email": "admin@brixlogistica.com.br",
-                "ativo": True,
-                "data_criacao": "01/06/2025"
-            },
-            "aristide": {
-                "senha": "1234",
-                "tipo": "cliente",
-                "cliente_vinculado": "MC CONFECCIONES",
-                "nome": "Aristide Nosenzo",
-                "email": "aristide.nosenzo@mcparaguay.com",
-                "ativo": True,
-                "data_criacao": "06/06/2025"
-            },
-            "rodrigo": {
-                "senha": "1234",
-                "tipo": "cliente",
-                "cliente_vinculado": "MC CONFECCIONES",
-                "nome": "RODRIGO CALDAS",
-                "email": "rodrigo@stillosrc2.com.br",
-                "ativo": True,
-                "data_criacao": "06/06/2025"
-            },
-            "nicolas": {
-                "senha": "1234",
-                "tipo": "operador",
-                "cliente_vinculado": "BENTO COMEX",
-                "nome": "NICOLAS M MARTINEZ",
-                "email": "nicolas@rrclogistica.com",
-                "ativo": True,
-                "data_criacao": "07/06/2025"
-            },
-            "operador_brix": {
-                "senha": "op123",
-                "tipo": "operador",
-                "clientes_vinculados": ["MC CONFECCIONES", "BENTO COMEX"],  # Múltiplos clientes
-                "nome": "Operador BRIX",
-                "email": "operador@brixlogistica.com.br",
-                "ativo": True,
-                "data_criacao": "07/06/2025"
-           },
-           "maspy": {
-               "senha": "1234",
-               "tipo": "cliente",
-               "cliente_vinculado": "MASPY",
-               "nome": "LEONARDO WALDRICH",
-               "email": "leo@kfkprivate.com.br",
-               "ativo": True,
-               "data_criacao": "16/06/2025"
-           },
-           "giovana": {
-               "senha": "1234",
-               "tipo": "cliente",
-               "cliente_vinculado": "MC CONFECCIONES",
-               "nome": "GIOVANA CAMARGO",
-               "email": "giovana@lcinter.com.br",
-               "ativo": True,
-               "data_criacao": "09/06/2025"
-           },
-           "tenora": {
-               "senha": "1234",
-               "tipo": "cliente",
-               "cliente_vinculado": "TENORA",
-               "nome": "TENORA",
-               "email": "tenora@tenora.com.br",
-               "ativo": True,
-               "data_criacao": "09/06/2025"
-           },
-           "paperbox": {
-               "senha": "1234",
-               "tipo": "cliente",
-               "cliente_vinculado": "PAPERBOX",
-               "nome": "PAPERBOX",
-               "email": "fiscal@brixcontabilidade.com.br",
-               "ativo": True,
-               "data_criacao": "18/06/2025"
-           }
-       }
-        
-        # DADOS PADRÃO PARA TRACKINGS
-        st.session_state.df_tracking = pd.DataFrame([
-            {
-                'CLIENTE': 'EMPRESA ABC LTDA',
-                'CONTAINER': 'TCLU1234567',
-                'CARREGAMENTO': '15/05/2025',
-                'EMBARQUE NAVIO': '18/05/2025',
-                'SAIDA NAVIO': '20/05/2025',
-                'PREVISAO CHEGADA PORTO DESTINO': '25/05/2025',    # ✅ Correto
-                'CHEGADA PORTO DESTINO': '24/05/2025',             # ✅ Correto
-                'CANAL RFB': 'VERDE',
-                'LIBERAÇAO PORTO DESTINO': '24/05/2025',
-                'CHEGADA CIUDAD DEL ESTE PY': '26/05/2025',
-                'DESCARREGAMENTO': '28/05/2025',
-                'STATUS_FINAL': ''  # ✅ ADICIONAR ESTA LINHA
-            },
-            {
-                'CLIENTE': 'EMPRESA ABC LTDA',
-                'CONTAINER': 'ABCU7777777',
-                'CARREGAMENTO': '22/05/2025',
-                'EMBARQUE NAVIO': '25/05/2025',
-                'SAIDA NAVIO': '27/05/2025',
-                'PREVISAO CHEGADA PORTO DESTINO': '02/06/2025',
-                'CHEGADA PORTO DESTINO': '',
-                'CANAL RFB': '',
-                'LIBERAÇAO PORTO DESTINO': '',
-                'CHEGADA CIUDAD DEL ESTE PY': '',
-                'DESCARREGAMENTO': '',
-                'STATUS_FINAL': ''  # ✅ ADICIONAR ESTA LINHA
-            },
-            {
-                'CLIENTE': 'COMERCIAL XYZ S.A.',
-                'CONTAINER': 'MSKU9876543',
-                'CARREGAMENTO': '20/05/2025',
-                'EMBARQUE NAVIO': '23/05/2025',
-                'SAIDA NAVIO': '25/05/2025',
-                'PREVISAO CHEGADA PORTO DESTINO': '30/05/2025',
-                'CHEGADA PORTO DESTINO': '29/05/2025',
-                'CANAL RFB': 'VERMELHO',
-                'LIBERAÇAO PORTO DESTINO': '',
-                'CHEGADA CIUDAD DE LESTE PY': '',
-                'DESCARREGAMENTO': '',
-                'STATUS_FINAL': ''  # ✅ ADICIONAR ESTA LINHA
-            }
-        ])
-
-        # Garantir que todas as colunas necessárias existam
-        colunas_necessarias = [
-            'CLIENTE', 'CONTAINER', 'CARREGAMENTO', 'EMBARQUE NAVIO',
-            'SAIDA NAVIO', 'PREVISAO CHEGADA PORTO DESTINO', 'CHEGADA PORTO DESTINO',
-            'CANAL RFB', 'LIBERAÇAO PORTO DESTINO', 'CHEGADA CIUDAD DEL ESTE PY',
-            'DESCARREGAMENTO', 'STATUS_FINAL'
-        ]
+        # Dados de um esquema anterior: migra uma vez e grava já no esquema atual
+        if estado_local and versao_dos_dados(estado_local) < VERSAO_ESQUEMA:
+            estado_local, _, _ = migrar_estado(estado_local)
+            estado_local['seq'] = obter_armazenamento_local().substituir_estado(
+                estado_local['clientes'],
+                estado_local['usuarios'],
+                estado_local['trackings'],
+                estado_local['colunas'],
+                versao_esquema=VERSAO_ESQUEMA
+            )
+        
+        if estado_local:
+            st.session_state.clientes_db = RegistroClientes(estado_local['clientes'])
+            st.session_state.usuarios_db = RegistroUsuarios(estado_local['usuarios'])
+            trackings, colunas = estado_local['trackings'], estado_local['colunas']
+            st.session_state.versao_dados = estado_local['seq']
+            st.session_state.dados_restaurados_local = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        
+        else:
+            # Dados padrão (módulo pré-compilado, carregado uma vez por processo)
+            st.session_state.clientes_db = RegistroClientes(copy.deepcopy(CLIENTES_PADRAO))
+            st.session_state.usuarios_db = RegistroUsuarios(copy.deepcopy(USUARIOS_PADRAO))
+            seed, _, _ = migrar_estado({'trackings': copy.deepcopy(TRACKINGS_PADRAO)})
+            trackings, colunas = seed['trackings'], seed['colunas']
+            
+            # Base inicial do armazenamento local
+            armazenamento = obter_armazenamento_local()
+            st.session_state.versao_dados = armazenamento.substituir_estado(
+                st.session_state.clientes_db.para_dict(),
+                st.session_state.usuarios_db.para_dict(),
+                trackings,
+                colunas,
+                versao_esquema=VERSAO_ESQUEMA
+            )
+            # Dados padrão = base da primeira mesclagem com o GitHub: edições feitas
+            # antes da primeira sincronização são mescladas, não descartadas
+            if armazenamento.sincronizacao() is None:
+                from sincronizacao import normalizar_estado
+                armazenamento.registrar_sincronizacao(None, normalizar_estado(armazenamento.carregar()))
         
-        for coluna in colunas_necessarias:
-            if coluna not in st.session_state.df_tracking.columns:
-                st.session_state.df_tracking[coluna] = ''
+        # DataFrame de trackings só é montado após o login
+        st.session_state.trackings_pendentes = (trackings, colunas)
         
         # Outras variáveis de controle
         st.session_state.logado = False
@@ -440,15 +598,63 @@ def inicializar_sistema():
         # Marcar que dados foram inicializados
         st.session_state.dados_inicializados = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
 
+def carregar_dados_sessao():
+    """Carrega o que só é necessário após o login (token GitHub e DataFrame de trackings)"""
+    
+    # Configurar token automaticamente se disponível
+    if 'github_token' not in st.session_state and GITHUB_TOKEN_CONFIGURADO:
+        if testar_token_github(GITHUB_TOKEN_CONFIGURADO):
+            st.session_state.github_token = GITHUB_TOKEN_CONFIGURADO
+            st.session_state.github_token_configurado = True
+    
+    if 'df_tracking' not in st.session_state:
+        trackings, colunas = st.session_state.pop('trackings_pendentes')
+        st.session_state.df_tracking = montar_df_tracking(trackings, colunas)
+        arquivar_finalizados()
+        
+        # Job dos KPIs diários (uma thread por processo, iniciada no primeiro login)
+        obter_kpis_diarios()
+
+def montar_df_tracking(trackings, colunas=None):
+    """DataFrame de trackings com todas as colunas necessárias (campos ausentes = '').
+    
+    Dados já migrados (migracoes.py) só passam pela conferência das colunas.
+    """
+    import pandas as pd
+    
+    df_tracking = pd.DataFrame(trackings, columns=colunas or None)
+    
+    # Garantir que todas as colunas necessárias existam
+    for coluna in COLUNAS_TRACKING:
+        if coluna not in df_tracking.columns:
+            df_tracking[coluna] = ''
+    
+    return df_tracking.fillna('')
+
+def indice_usuarios():
+    """Índice de login: usuário normalizado -> id do usuário"""
+    if 'indice_usuarios' not in st.session_state:
+        st.session_state.indice_usuarios = {
+            str(user_id).strip().lower(): user_id for user_id in st.session_state.usuarios_db
+        }
+    return st.session_state.indice_usuarios
+
+def invalidar_indice_usuarios():
+    """Descarta o índice de login após mudanças em usuários"""
+    st.session_state.pop('indice_usuarios', None)
+
 def verificar_login(usuario, senha):
     """Verifica credenciais do usuário"""
-    usuario_normalizado = usuario.strip().lower()
-    senha_normalizada = senha.strip()
+    usuario_normalizado = str(usuario).strip().lower()
+    senha_normalizada = str(senha).strip()
+    
+    user_id = indice_usuarios().get(usuario_normalizado)
+    if user_id is None:
+        return None
     
-    for user_id, user_data in st.session_state.usuarios_db.items():
-        if user_id.lower() == usuario_normalizado:
-            if user_data["senha"] == senha_normalizada and user_data["ativo"]:
-                return user_data
+    user_data = st.session_state.usuarios_db.get(user_id)
+    if user_data and str(user_data["senha"]) == senha_normalizada and user_data["ativo"]:
+        return user_data
     
     return None
 
@@ -497,43 +703,53 @@ def gerar_senha_temporaria():
     import string
     return ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
 
+def cliente_github():
+    """Cliente da API de conteúdo do GitHub com o token da sessão (via coordenador do processo)"""
+    return obter_coordenador_github().cliente(st.session_state.github_token)
+
+def aplicar_estado_sincronizado(dados, sha, base=None, seq_base=None):
+    """Integra o estado do GitHub à base local (ver integrar_remoto) e carrega o resultado na sessão"""
+    from sincronizacao import integrar_remoto
+    
+    # Backup de um esquema anterior é migrado antes de entrar na sessão;
+    # mutações locais ainda não enviadas são mescladas, não sobrescritas
+    migrado, df_tracking, conflitos = integrar_remoto(obter_armazenamento_local(), dados, sha, base, seq_base)
+    
+    st.session_state.clientes_db = RegistroClientes(copy.deepcopy(migrado['clientes']))
+    st.session_state.usuarios_db = RegistroUsuarios(copy.deepcopy(migrado['usuarios']))
+    invalidar_indice_usuarios()
+    st.session_state.df_tracking = df_tracking
+    st.session_state.versao_dados = migrado['seq']
+    arquivar_finalizados()
+    return conflitos
+
 def executar_sistema_github():
     """Executa sincronização e backup automático do GitHub"""
     if 'github_token' not in st.session_state:
         return
         
-    GITHUB_TOKEN = st.session_state.github_token
-    GITHUB_REPO = "fabiomadalozzo/brix-backup"
-    GITHUB_FILE = "backup_brix.json"
-    GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_FILE}"
-    
     # SINCRONIZAÇÃO AUTOMÁTICA (primeira vez)
-    if 'backup_sincronizado' not in st.session_state:
+    if not st.session_state.get('backup_sincronizado'):
         try:
             with st.spinner("🔄 Sincronizando dados..."):
-                import requests
-                import base64
-                
-                headers = {
-                    'Authorization': f'token {GITHUB_TOKEN}',
-                    'Accept': 'application/vnd.github.v3+json'
-                }
-                
-                response = requests.get(GITHUB_API_URL, headers=headers, timeout=10)
+                # Sessões abrindo juntas compartilham a mesma leitura do GitHub
+                coordenador = obter_coordenador_github()
+                backup_data, sha = coordenador.ler(st.session_state.github_token)
                 
-                if response.status_code == 200:
-                    file_data = response.json()
-                    content_base64 = file_data['content']
-                    content_decoded = base64.b64decode(content_base64).decode('utf-8')
-                    backup_data = json.loads(content_decoded)
-                    
-                    # Carregar dados do GitHub
-                    st.session_state.clientes_db = backup_data['clientes']
-                    st.session_state.usuarios_db = backup_data['usuarios']
-                    st.session_state.df_tracking = pd.DataFrame(backup_data['trackings'])
+                # Mesmo SHA da última sincronização: a base local já tem esse conteúdo.
+                # Com a cota baixa a leitura vem do cache e pode ser antiga: não é
+                # integrada enquanto houver alterações locais esperando o backup adiado
+                armazenamento = obter_armazenamento_local()
+                registro = armazenamento.sincronizacao()
+                adiado = coordenador.economizando(st.session_state.github_token) and armazenamento.pendente_de_backup()
+                if backup_data is not None and (registro is None or registro['sha'] != sha) and not adiado:
+                    conflitos = aplicar_estado_sincronizado(backup_data, sha)
+                    sincronizar_arquivo_github()
                     st.session_state.dados_restaurados = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
                     
                     st.success("✅ Dados sincronizados do GitHub!")
+                    if conflitos:
+                        st.warning(f"⚠️ {len(conflitos)} conflito(s) com alterações locais ainda não enviadas: mantida a edição local")
                 
                 st.session_state.backup_sincronizado = True
                 st.rerun()
@@ -542,130 +758,191 @@ def executar_sistema_github():
             st.session_state.backup_sincronizado = True
             st.warning(f"⚠️ Erro na sincronização: {str(e)}")
     
-    # BACKUP AUTOMÁTICO (só admin)
+    # BACKUP AUTOMÁTICO (só admin): a cada nova versão local ainda não enviada
     if st.session_state.usuario_info and st.session_state.usuario_info.get("tipo") == "admin":
-        dados_atuais = {
-            'clientes': len(st.session_state.clientes_db),
-            'usuarios': len(st.session_state.usuarios_db),
-            'trackings': len(st.session_state.df_tracking)
-        }
+        armazenamento = obter_armazenamento_local()
+        versao = armazenamento.seq
+        pendente = armazenamento.pendente_de_backup() and st.session_state.get('versao_backup_tentado') != versao
         
-        if 'dados_anteriores' not in st.session_state:
-            st.session_state.dados_anteriores = dados_atuais
-        
-        if dados_atuais != st.session_state.dados_anteriores:
+        if pendente or st.session_state.get('backup_adiado'):
+            st.session_state.versao_backup_tentado = versao
             executar_backup_github()
-            st.session_state.dados_anteriores = dados_atuais
+
+def sincronizar_arquivo_github():
+    """Troca com o GitHub as partições do arquivo histórico (arquivamento de uma instância vale para todas)"""
+    from coordenador_github import OrcamentoEsgotado
+    try:
+        cliente = obter_coordenador_github().cliente_arquivo(st.session_state.github_token)
+        obter_arquivo_historico().sincronizar_github(cliente)
+    except OrcamentoEsgotado as e:
+        st.session_state.backup_adiado = True
+        st.warning(f"⏳ Backup adiado. {e}")
+        return False
+    except Exception as e:
+        st.error(f"❌ Erro no backup do arquivo histórico: {str(e)}")
+        return False
+    return True
 
 def executar_backup_github():
-    """Executa backup no GitHub"""
+    """Executa backup no GitHub (estado da base local, mesclado com o remoto se ele mudou)"""
     if 'github_token' not in st.session_state:
         return False
         
     try:
-        import requests
-        import base64
-        
-        GITHUB_TOKEN = st.session_state.github_token
-        GITHUB_REPO = "fabiomadalozzo/brix-backup"
-        GITHUB_FILE = "backup_brix.json"
-        GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_FILE}"
-        
-        backup_data = {
-            'clientes': st.session_state.clientes_db,
-            'usuarios': st.session_state.usuarios_db,
-            'trackings': st.session_state.df_tracking.to_dict('records'),
-            'metadata': {
-                'data_backup': datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-                'versao': '3.0-TOKEN-PERMANENTE'
-            }
-        }
-        
-        json_content = json.dumps(backup_data, ensure_ascii=False, indent=2)
-        content_base64 = base64.b64encode(json_content.encode('utf-8')).decode('utf-8')
+        from sincronizacao import ConflitoGitHub, enviar_com_mesclagem, normalizar_estado
+        from coordenador_github import OrcamentoEsgotado
         
-        headers = {
-            'Authorization': f'token {GITHUB_TOKEN}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
+        armazenamento = obter_armazenamento_local()
+        registro = armazenamento.sincronizacao() or {}
+        local = armazenamento.carregar()
+        if local is None:
+            return False
+        estado_local = normalizar_estado(local)
         
-        get_response = requests.get(GITHUB_API_URL, headers=headers)
+        # Arquivo histórico antes do backup principal: trackings arquivados só
+        # saem do GitHub depois de estarem nas partições de lá
+        if not sincronizar_arquivo_github():
+            return False
         
-        github_data = {
-            'message': f'Backup BRIX - {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}',
-            'content': content_base64
-        }
+        # Só grava se o GitHub ainda estiver na versão da última sincronização;
+        # caso contrário mescla (base x local x remoto) e tenta novamente
+        try:
+            estado, sha, conflitos = enviar_com_mesclagem(
+                cliente_github(),
+                estado_local,
+                registro.get('base'),
+                registro.get('sha')
+            )
+        except ConflitoGitHub as e:
+            st.error(f"❌ Erro no backup: {str(e)}")
+            return False
+        except OrcamentoEsgotado as e:
+            # Nada se perde: as alterações estão na base local e o backup é refeito depois
+            st.session_state.backup_adiado = True
+            st.warning(f"⏳ Backup adiado. {e}")
+            return False
+        st.session_state.backup_adiado = False
         
-        if get_response.status_code == 200:
-            github_data['sha'] = get_response.json()['sha']
+        if estado != estado_local:
+            # Mutações feitas durante o envio continuam na base local (mescladas)
+            aplicar_estado_sincronizado(estado, sha, base=estado_local, seq_base=local['seq'])
+            st.info("🔀 Alterações de outra instância foram mescladas")
+        else:
+            armazenamento.registrar_sincronizacao(sha, estado, local['seq'])
         
-        response = requests.put(GITHUB_API_URL, json=github_data, headers=headers)
+        if conflitos:
+            st.warning(f"⚠️ {len(conflitos)} conflito(s) de edição simultânea: mantida a edição desta instância")
         
-        if response.status_code in [200, 201]:
-            st.session_state.ultimo_backup = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            st.success("✅ Backup realizado!")
-            return True
-        else:
-            st.error("❌ Erro no backup")
-            return False
+        st.session_state.ultimo_backup = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        st.success("✅ Backup realizado!")
+        return True
             
     except Exception as e:
         st.error(f"❌ Erro no backup: {str(e)}")
         return False
 
-def sidebar_backup_system():
-    """Sistema de backup na sidebar"""
-    with st.sidebar:
-        st.markdown("---")
-        st.subheader("💾 Sistema BRIX")
+@st.fragment
+def painel_sistema_brix():
+    """Painel do sistema na sidebar (fragmento: cliques aqui não reexecutam o dashboard)"""
+    registrar_atividade()
+    st.markdown("---")
+    st.subheader("💾 Sistema BRIX")
+    
+    # Estatísticas
+    st.write(f"🏢 Clientes: {len(st.session_state.clientes_db)}")
+    st.write(f"👥 Usuários: {len(st.session_state.usuarios_db)}")
+    st.write(f"📦 Trackings: {len(st.session_state.df_tracking)}")
+    
+    # Status do GitHub
+    if 'github_token_configurado' in st.session_state:
+        st.success("🔐 **GitHub:** Configurado")
+        st.success("🤖 **Automação:** Ativa")
         
-        # Estatísticas
-        st.write(f"🏢 Clientes: {len(st.session_state.clientes_db)}")
-        st.write(f"👥 Usuários: {len(st.session_state.usuarios_db)}")
-        st.write(f"📦 Trackings: {len(st.session_state.df_tracking)}")
+        coordenador = obter_coordenador_github()
+        cota = coordenador.orcamento(st.session_state.github_token).resumo()
+        if cota['restantes'] is not None:
+            renovacao = datetime.fromtimestamp(cota['reinicio']).strftime('%H:%M') if cota['reinicio'] else '-'
+            st.caption(f"📶 API GitHub: {cota['restantes']}/{cota['limite']} requisições (renova às {renovacao})")
+        if coordenador.economizando(st.session_state.github_token):
+            st.warning("📴 Cota da API baixa: usando os últimos dados sincronizados")
         
-        # Status do GitHub
-        if 'github_token_configurado' in st.session_state:
-            st.success("🔐 **GitHub:** Configurado")
-            st.success("🤖 **Automação:** Ativa")
+        # Executar sistema GitHub
+        executar_sistema_github()
+        
+        # Controles para admin
+        if st.session_state.usuario_info and st.session_state.usuario_info.get("tipo") == "admin":
+            st.markdown("---")
+            st.subheader("⚙️ Controles Admin")
             
-            # Executar sistema GitHub
-            executar_sistema_github()
+            col1, col2 = st.columns(2)
             
-            # Controles para admin
-            if st.session_state.usuario_info and st.session_state.usuario_info.get("tipo") == "admin":
-                st.markdown("---")
-                st.subheader("⚙️ Controles Admin")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("📤 Backup"):
-                        executar_backup_github()
-                
-                with col2:
-                    if st.button("🔄 Sincronizar"):
-                        st.session_state.backup_sincronizado = False
-                        st.rerun()
-                
-                if 'ultimo_backup' in st.session_state:
-                    st.info(f"💾 Último backup: {st.session_state.ultimo_backup}")
+            with col1:
+                if st.button("📤 Backup"):
+                    executar_backup_github()
             
-            else:
-                st.markdown("---")
-                st.info("📊 Dados sempre atualizados")
-                
-                if st.button("🔄 Atualizar"):
+            with col2:
+                if st.button("🔄 Sincronizar"):
                     st.session_state.backup_sincronizado = False
                     st.rerun()
+            
+            if 'ultimo_backup' in st.session_state:
+                st.info(f"💾 Último backup: {st.session_state.ultimo_backup}")
         
         else:
-            st.warning("⚠️ **GitHub não configurado**")
-            st.info("Sistema funcionando localmente")
+            st.markdown("---")
+            st.info("📊 Dados sempre atualizados")
+            
+            if st.button("🔄 Atualizar"):
+                st.session_state.backup_sincronizado = False
+                st.rerun()
+    
+    else:
+        st.warning("⚠️ **GitHub não configurado**")
+        st.info("Sistema funcionando localmente")
+    
+    # Arquivo histórico e notificações (admin)
+    if st.session_state.usuario_info and st.session_state.usuario_info.get("tipo") == "admin":
+        central = obter_central_notificacoes()
+        if central is not None:
+            st.write(f"✉️ Notificações: {central.pendentes} pendente(s), {central.fila.enviados} enviada(s)")
+            if central.fila.ultimo_erro or central.ultimo_erro:
+                st.caption(f"⚠️ Último erro de envio: {central.ultimo_erro or central.fila.ultimo_erro}")
+            if central.pendentes and st.button("📨 Enviar resumos agora"):
+                st.success(f"✅ {central.despachar(forcar=True)} resumo(s) na fila de envio")
         
-        # Status
-        if 'dados_restaurados' in st.session_state:
-            st.write(f"🕐 Última sync: {st.session_state.dados_restaurados}")
+        if st.button("🗄️ Arquivar finalizados"):
+            quantidade = arquivar_finalizados()
+            if quantidade:
+                st.success(f"✅ {quantidade} processo(s) arquivado(s)!")
+                st.rerun()
+            else:
+                st.info(f"Nenhum processo encerrado há mais de {IDADE_ARQUIVO_DIAS} dias")
+    
+    # Status
+    if 'dados_restaurados' in st.session_state:
+        st.write(f"🕐 Última sync: {st.session_state.dados_restaurados}")
+    elif 'dados_restaurados_local' in st.session_state:
+        st.write(f"💽 Dados locais: {st.session_state.dados_restaurados_local}")
+
+def sidebar_backup_system():
+    """Sistema de backup na sidebar"""
+    with st.sidebar:
+        painel_sistema_brix()
+
+def tela_em_espera():
+    """Tela da sessão ociosa: os dados só voltam para a memória quando o usuário retorna"""
+    st.markdown("""
+    <div class="main-header">
+        <h1>🚢 BRIX LOGÍSTICA</h1>
+        <h3>Sistema de Tracking de Trânsito</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.info(f"💤 Sessão em espera por inatividade desde {st.session_state.sessao_em_espera}.")
+    if st.button("▶️ Continuar", type="primary", use_container_width=True):
+        with st.spinner("Recarregando dados..."):
+            retomar_sessao()
+        st.rerun()
 
 def tela_login():
     """Tela de login"""
@@ -700,19 +977,12 @@ def tela_login():
     
     if st.button("🚀 Entrar", type="primary", use_container_width=True):
         if usuario and senha:
-            usuario_limpo = str(usuario).strip().lower()
-            senha_limpa = str(senha).strip()
-            
-            user_encontrado = None
-            for user_id, user_data in st.session_state.usuarios_db.items():
-                if str(user_id).lower() == usuario_limpo:
-                    if str(user_data["senha"]) == senha_limpa and user_data["ativo"]:
-                        user_encontrado = user_data
-                        break
+            user_encontrado = verificar_login(usuario, senha)
             
             if user_encontrado:
                 st.session_state.logado = True
                 st.session_state.usuario_info = user_encontrado
+                st.session_state.usuario_id = indice_usuarios().get(str(usuario).strip().lower())
                 st.success(f"✅ Bem-vindo, {user_encontrado['nome']}!")
                 st.rerun()
             else:
@@ -736,251 +1006,355 @@ def tela_login():
         - Horário: Seg-Sex 8h-18h
         """)
     
-def pagina_clientes():
-    """Página para gerenciar clientes"""
-    st.header("🏢 Gerenciamento de Clientes")
+@st.fragment
+def fragmento_lista_clientes():
+    """Lista de clientes com edição, ativação e exclusão (fragmento)"""
+    registrar_atividade()
+    st.subheader("🏢 Clientes Cadastrados")
     
-    tab1, tab2, tab3 = st.tabs(["📋 Lista de Clientes", "➕ Novo Cliente", "📊 Estatísticas"])
+    busca = st.text_input("🔎 Buscar cliente", placeholder="Razão social ou nome fantasia...", key="busca_lista_clientes")
+    clientes = st.session_state.clientes_db
+    razoes = [c for c in buscar_clientes(busca) if c in clientes] if busca else list(clientes)
     
-    with tab1:
-        st.subheader("🏢 Clientes Cadastrados")
+    if not clientes:
+        st.info("📋 Nenhum cliente cadastrado ainda.")
+    elif not razoes:
+        st.info("🔍 Nenhum cliente encontrado.")
+    else:
+        ordenacoes = {
+            "Razão Social": lambda r: r.lower(),
+            "Nome Fantasia": lambda r: str(clientes[r].get('nome_fantasia', '')).lower(),
+            "Cadastro (recentes)": lambda r: -data_ordenavel(clientes[r].get('data_cadastro')).toordinal(),
+            "Status": lambda r: (not clientes[r].get('ativo'), r.lower()),
+        }
+        opcoes_ordem = (["Relevância"] if busca else []) + list(ordenacoes)
+        ordem, inicio, fim = controles_listagem("clientes", len(razoes), opcoes_ordem)
+        if ordem in ordenacoes:
+            razoes = sorted(razoes, key=ordenacoes[ordem])
+        pagina = razoes[inicio:fim]
         
-        if not st.session_state.clientes_db:
-            st.info("📋 Nenhum cliente cadastrado ainda.")
+        linhas = [{
+            'STATUS': "✅" if clientes[r]["ativo"] else "❌",
+            'NOME FANTASIA': clientes[r].get('nome_fantasia', ''),
+            'RAZÃO SOCIAL': r,
+            'CNPJ': clientes[r].get('cnpj', ''),
+            'EMAIL': clientes[r].get('email', ''),
+            'CADASTRO': clientes[r].get('data_cadastro', ''),
+        } for r in pagina]
+        razao_social = tabela_selecionavel(linhas, pagina, "clientes")
+        
+        # Detalhes e ações só para o cliente selecionado
+        if razao_social is None:
+            st.caption("👆 Selecione um cliente na tabela para ver detalhes e ações")
         else:
-            for razao_social, dados in st.session_state.clientes_db.items():
-                status_emoji = "✅" if dados["ativo"] else "❌"
-                
-                col1, col2, col3, col4 = st.columns([4, 1, 1, 1])
-                
-                with col1:
-                    st.markdown(f"""
-                    <div class="card cliente-card">
-                        <h4>🏢 {dados['nome_fantasia']} {status_emoji}</h4>
-                        <p><strong>Razão Social:</strong> {dados['razao_social']}</p>
-                        <p><strong>CNPJ:</strong> {dados['cnpj']}</p>
-                        <p><strong>Email:</strong> {dados['email']}</p>
-                        <p><strong>Telefone:</strong> {dados['telefone']}</p>
-                        <p><strong>Contato:</strong> {dados['contato']}</p>
-                        <p><strong>Cadastrado:</strong> {dados['data_cadastro']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                with col2:
-                    if st.button(f"✏️ Editar", key=f"edit_cliente_{razao_social}"):
-                        st.session_state.editando_cliente = razao_social
-                        st.rerun()
-                
-                with col3:
-                    status_btn = "🔓 Ativar" if not dados["ativo"] else "🔒 Desativar"
-                    if st.button(status_btn, key=f"toggle_cliente_{razao_social}"):
-                        st.session_state.clientes_db[razao_social]["ativo"] = not dados["ativo"]
-                        st.success(f"✅ Cliente {razao_social} {'ativado' if not dados['ativo'] else 'desativado'}!")
-                        st.rerun()
-                
-                with col4:
-                    if st.button(f"🗑️ Excluir", key=f"del_cliente_{razao_social}"):
-                        st.session_state.excluindo_cliente = razao_social
-        
-        # Modal de confirmação para exclusão
-        if 'excluindo_cliente' in st.session_state:
-            st.error(f"⚠️ Tem certeza que deseja excluir o cliente '{st.session_state.excluindo_cliente}'?")
-            st.warning("🚨 Isso também excluirá todos os trackings e usuários vinculados!")
-            col1, col2 = st.columns(2)
+            dados = clientes[razao_social]
+            status_emoji = "✅" if dados["ativo"] else "❌"
+            
+            col1, col2, col3, col4 = st.columns([4, 1, 1, 1])
+            
             with col1:
-                if st.button("✅ Sim, excluir"):
-                    razao_social = st.session_state.excluindo_cliente
-                    
-                    # Excluir cliente
-                    del st.session_state.clientes_db[razao_social]
-                    
-                    # Excluir trackings do cliente
-                    st.session_state.df_tracking = st.session_state.df_tracking[
-                        st.session_state.df_tracking['CLIENTE'] != razao_social
-                    ].reset_index(drop=True)
-                    
-                    # Excluir usuários vinculados
-                    usuarios_para_excluir = [
-                        user_id for user_id, user_data in st.session_state.usuarios_db.items()
-                        if user_data.get('cliente_vinculado') == razao_social
-                    ]
-                    for user_id in usuarios_para_excluir:
-                        del st.session_state.usuarios
-                        del st.session_state.excluindo_cliente
-                    st.success("🗑️ Cliente e dados relacionados excluídos!")
-                    st.rerun()
+                st.markdown(f"""
+                <div class="card cliente-card">
+                    <h4>🏢 {dados['nome_fantasia']} {status_emoji}</h4>
+                    <p><strong>Razão Social:</strong> {dados['razao_social']}</p>
+                    <p><strong>CNPJ:</strong> {dados['cnpj']}</p>
+                    <p><strong>Email:</strong> {dados['email']}</p>
+                    <p><strong>Telefone:</strong> {dados['telefone']}</p>
+                    <p><strong>Contato:</strong> {dados['contato']}</p>
+                    <p><strong>Cadastrado:</strong> {dados['data_cadastro']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+            
             with col2:
-                if st.button("❌ Cancelar"):
-                    del st.session_state.excluindo_cliente
-                    st.rerun()
-        
-        # Formulário de edição
-        if 'editando_cliente' in st.session_state:
-            razao_social = st.session_state.editando_cliente
-            dados = st.session_state.clientes_db[razao_social]
+                if st.button(f"✏️ Editar", key=f"edit_cliente_{razao_social}"):
+                    st.session_state.editando_cliente = razao_social
+                    rerun_fragmento()
             
-            st.markdown("---")
-            st.subheader(f"✏️ Editando: {dados['nome_fantasia']}")
+            with col3:
+                status_btn = "🔓 Ativar" if not dados["ativo"] else "🔒 Desativar"
+                if st.button(status_btn, key=f"toggle_cliente_{razao_social}"):
+                    st.session_state.clientes_db[razao_social]["ativo"] = not dados["ativo"]
+                    registrar_mutacao('cliente_set', chave=razao_social, dados=st.session_state.clientes_db[razao_social])
+                    st.success(f"✅ Cliente {razao_social} {'ativado' if not dados['ativo'] else 'desativado'}!")
+                    st.rerun()
             
-            with st.form("editar_cliente"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    nova_razao = st.text_input("Razão Social:", value=dados['razao_social'])
-                    novo_fantasia = st.text_input("Nome Fantasia:", value=dados['nome_fantasia'])
-                    novo_cnpj = st.text_input("CNPJ:", value=dados['cnpj'])
-                    novo_email = st.text_input("Email:", value=dados['email'])
+            with col4:
+                if st.button(f"🗑️ Excluir", key=f"del_cliente_{razao_social}"):
+                    st.session_state.excluindo_cliente = razao_social
+    
+    # Modal de confirmação para exclusão
+    if 'excluindo_cliente' in st.session_state:
+        st.error(f"⚠️ Tem certeza que deseja excluir o cliente '{st.session_state.excluindo_cliente}'?")
+        st.warning("🚨 Isso também excluirá todos os trackings e usuários vinculados!")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Sim, excluir"):
+                razao_social = st.session_state.excluindo_cliente
                 
-                with col2:
-                    novo_telefone = st.text_input("Telefone:", value=dados['telefone'])
-                    novo_endereco = st.text_input("Endereço:", value=dados['endereco'])
-                    novo_contato = st.text_input("Contato:", value=dados['contato'])
-                    novo_ativo = st.checkbox("Ativo", value=dados['ativo'])
+                # Excluir cliente
+                del st.session_state.clientes_db[razao_social]
+                registrar_mutacao('cliente_del', chave=razao_social)
                 
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.form_submit_button("💾 Salvar Alterações", type="primary"):
-                        # Se mudou a razão social, precisa atualizar referências
-                        if nova_razao != razao_social:
-                            # Atualizar trackings
-                            st.session_state.df_tracking.loc[
-                                st.session_state.df_tracking['CLIENTE'] == razao_social, 'CLIENTE'
-                            ] = nova_razao
-                            
-                            # Atualizar usuários vinculados
-                            for user_data in st.session_state.usuarios_db.values():
-                                if user_data.get('cliente_vinculado') == razao_social:
-                                    user_data['cliente_vinculado'] = nova_razao
-                            
-                            # Remover cliente antigo e adicionar novo
-                            del st.session_state.clientes_db[razao_social]
-                        
-                        # Atualizar dados do cliente
-                        st.session_state.clientes_db[nova_razao] = {
-                            'razao_social': nova_razao,
-                            'nome_fantasia': novo_fantasia,
-                            'cnpj': novo_cnpj,
-                            'email': novo_email,
-                            'telefone': novo_telefone,
-                            'endereco': novo_endereco,
-                            'contato': novo_contato,
-                            'ativo': novo_ativo,
-                            'data_cadastro': dados['data_cadastro']
-                        }
-                        
-                        del st.session_state.editando_cliente
-                        st.success("✅ Cliente atualizado!")
-                        st.rerun()
+                # Excluir trackings do cliente
+                for registro_excluido in st.session_state.df_tracking[st.session_state.df_tracking['CLIENTE'] == razao_social].to_dict('records'):
+                    auditar(registro_excluido, {})
+                st.session_state.df_tracking = st.session_state.df_tracking[
+                    st.session_state.df_tracking['CLIENTE'] != razao_social
+                ].reset_index(drop=True)
+                registrar_mutacao('tracking_del_cliente', cliente=razao_social)
                 
-                with col2:
-                    if st.form_submit_button("❌ Cancelar"):
-                        del st.session_state.editando_cliente
-                        st.rerun()
-    
-    with tab2:
-        st.subheader("➕ Cadastrar Novo Cliente")
+                # Excluir usuários vinculados
+                usuarios_para_excluir = [
+                    user_id for user_id in st.session_state.usuarios_db.por_cliente(razao_social)
+                    if st.session_state.usuarios_db[user_id].get('cliente_vinculado') == razao_social
+                ]
+                for user_id in usuarios_para_excluir:
+                    del st.session_state.usuarios_db[user_id]
+                    registrar_mutacao('usuario_del', chave=user_id)
+                del st.session_state.excluindo_cliente
+                st.success("🗑️ Cliente e dados relacionados excluídos!")
+                st.rerun()
+        with col2:
+            if st.button("❌ Cancelar"):
+                del st.session_state.excluindo_cliente
+                rerun_fragmento()
+    
+    # Formulário de edição
+    if 'editando_cliente' in st.session_state:
+        razao_social = st.session_state.editando_cliente
+        dados = st.session_state.clientes_db[razao_social]
+        
+        st.markdown("---")
+        st.subheader(f"✏️ Editando: {dados['nome_fantasia']}")
         
-        with st.form("novo_cliente"):
+        with st.form("editar_cliente"):
             col1, col2 = st.columns(2)
             
             with col1:
-                razao_social = st.text_input("Razão Social *:", placeholder="ex: NOVA EMPRESA LTDA")
-                nome_fantasia = st.text_input("Nome Fantasia *:", placeholder="ex: Nova Empresa")
-                cnpj = st.text_input("CNPJ:", placeholder="ex: 12.345.678/0001-90")
-                email = st.text_input("Email *:", placeholder="contato@novaempresa.com.br")
+                nova_razao = st.text_input("Razão Social:", value=dados['razao_social'])
+                novo_fantasia = st.text_input("Nome Fantasia:", value=dados['nome_fantasia'])
+                novo_cnpj = st.text_input("CNPJ:", value=dados['cnpj'])
+                novo_email = st.text_input("Email:", value=dados['email'])
             
             with col2:
-                telefone = st.text_input("Telefone:", placeholder="(11) 1234-5678")
-                endereco = st.text_input("Endereço:", placeholder="Rua A, 123 - Cidade/UF")
-                contato = st.text_input("Pessoa de Contato:", placeholder="João Silva")
-                criar_usuario = st.checkbox("🤖 Criar usuário automaticamente")
+                novo_telefone = st.text_input("Telefone:", value=dados['telefone'])
+                novo_endereco = st.text_input("Endereço:", value=dados['endereco'])
+                novo_contato = st.text_input("Contato:", value=dados['contato'])
+                novo_ativo = st.checkbox("Ativo", value=dados['ativo'])
             
-            if st.form_submit_button("🏢 Cadastrar Cliente", type="primary"):
-                # Validações
-                erros = []
-                if not razao_social:
-                    erros.append("❌ Razão Social é obrigatória")
-                if not nome_fantasia:
-                    erros.append("❌ Nome Fantasia é obrigatório")
-                if not email:
-                    erros.append("❌ Email é obrigatório")
-                if razao_social in st.session_state.clientes_db:
-                    erros.append("❌ Cliente já cadastrado")
-                
-                if erros:
-                    for erro in erros:
-                        st.error(erro)
-                else:
-                    # Cadastrar cliente
-                    st.session_state.clientes_db[razao_social] = {
-                        'razao_social': razao_social,
-                        'nome_fantasia': nome_fantasia,
-                        'cnpj': cnpj,
-                        'email': email,
-                        'telefone': telefone,
-                        'endereco': endereco,
-                        'contato': contato,
-                        'ativo': True,
-                        'data_cadastro': datetime.now().strftime("%d/%m/%Y")
-                    }
-                    
-                    mensagem_sucesso = f"✅ Cliente '{nome_fantasia}' cadastrado com sucesso!"
-                    
-                    # Criar usuário se solicitado
-                    if criar_usuario:
-                        usuario_auto = gerar_usuario_automatico(razao_social)
-                        senha_auto = gerar_senha_temporaria()
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.form_submit_button("💾 Salvar Alterações", type="primary"):
+                    # Se mudou a razão social, precisa atualizar referências
+                    if nova_razao != razao_social:
+                        # Atualizar trackings
+                        for registro_cliente in st.session_state.df_tracking[st.session_state.df_tracking['CLIENTE'] == razao_social].to_dict('records'):
+                            auditar(registro_cliente, {**registro_cliente, 'CLIENTE': nova_razao})
+                        st.session_state.df_tracking.loc[
+                            st.session_state.df_tracking['CLIENTE'] == razao_social, 'CLIENTE'
+                        ] = nova_razao
+                        registrar_mutacao('tracking_renomear_cliente', de=razao_social, para=nova_razao)
                         
-                        if usuario_auto not in st.session_state.usuarios_db:
-                            st.session_state.usuarios_db[usuario_auto] = {
-                                "senha": senha_auto,
-                                "tipo": "cliente",
-                                "cliente_vinculado": razao_social,
-                                "nome": nome_fantasia,
-                                "email": email,
-                                "ativo": True,
-                                "data_criacao": datetime.now().strftime("%d/%m/%Y")
-                            }
-                            
-                            mensagem_sucesso += f"\n\n🤖 **Usuário criado automaticamente:**\n- **Usuário:** {usuario_auto}\n- **Senha:** {senha_auto}"
+                        # Atualizar usuários vinculados
+                        for user_id in st.session_state.usuarios_db.por_cliente(razao_social):
+                            user_data = st.session_state.usuarios_db[user_id]
+                            user_data.trocar_cliente(razao_social, nova_razao)
+                            registrar_mutacao('usuario_set', chave=user_id, dados=user_data)
+                        
+                        # Remover cliente antigo e adicionar novo
+                        del st.session_state.clientes_db[razao_social]
+                        registrar_mutacao('cliente_del', chave=razao_social)
+                    
+                    # Atualizar dados do cliente
+                    st.session_state.clientes_db[nova_razao] = {
+                        'razao_social': nova_razao,
+                        'nome_fantasia': novo_fantasia,
+                        'cnpj': novo_cnpj,
+                        'email': novo_email,
+                        'telefone': novo_telefone,
+                        'endereco': novo_endereco,
+                        'contato': novo_contato,
+                        'ativo': novo_ativo,
+                        'data_cadastro': dados['data_cadastro']
+                    }
+                    registrar_mutacao('cliente_set', chave=nova_razao, dados=st.session_state.clientes_db[nova_razao])
                     
-                    st.success(mensagem_sucesso)
+                    del st.session_state.editando_cliente
+                    st.success("✅ Cliente atualizado!")
                     st.rerun()
+            
+            with col2:
+                if st.form_submit_button("❌ Cancelar"):
+                    del st.session_state.editando_cliente
+                    rerun_fragmento()
+
+@st.fragment
+def fragmento_novo_cliente():
+    """Formulário de novo cliente (fragmento)"""
+    registrar_atividade()
+    st.subheader("➕ Cadastrar Novo Cliente")
     
-    with tab3:
-        st.subheader("📊 Estatísticas de Clientes")
-        
-        total_clientes = len(st.session_state.clientes_db)
-        clientes_ativos = sum(1 for c in st.session_state.clientes_db.values() if c["ativo"])
-        
-        col1, col2, col3, col4 = st.columns(4)
+    with st.form("novo_cliente"):
+        col1, col2 = st.columns(2)
         
         with col1:
-            st.metric("🏢 Total", total_clientes)
+            razao_social = st.text_input("Razão Social *:", placeholder="ex: NOVA EMPRESA LTDA")
+            nome_fantasia = st.text_input("Nome Fantasia *:", placeholder="ex: Nova Empresa")
+            cnpj = st.text_input("CNPJ:", placeholder="ex: 12.345.678/0001-90")
+            email = st.text_input("Email *:", placeholder="contato@novaempresa.com.br")
+        
         with col2:
-            st.metric("✅ Ativos", clientes_ativos)
-        with col3:
-            # Contar trackings por cliente
-            if not st.session_state.df_tracking.empty:
-                clientes_com_tracking = st.session_state.df_tracking['CLIENTE'].nunique()
-                st.metric("📦 Com Trackings", clientes_com_tracking)
+            telefone = st.text_input("Telefone:", placeholder="(11) 1234-5678")
+            endereco = st.text_input("Endereço:", placeholder="Rua A, 123 - Cidade/UF")
+            contato = st.text_input("Pessoa de Contato:", placeholder="João Silva")
+            criar_usuario = st.checkbox("🤖 Criar usuário automaticamente")
+        
+        if st.form_submit_button("🏢 Cadastrar Cliente", type="primary"):
+            # Validações
+            erros = []
+            if not razao_social:
+                erros.append("❌ Razão Social é obrigatória")
+            if not nome_fantasia:
+                erros.append("❌ Nome Fantasia é obrigatório")
+            if not email:
+                erros.append("❌ Email é obrigatório")
+            if razao_social in st.session_state.clientes_db:
+                erros.append("❌ Cliente já cadastrado")
+            
+            if erros:
+                for erro in erros:
+                    st.error(erro)
             else:
-                st.metric("📦 Com Trackings", 0)
-        with col4:
-            # Contar usuários vinculados
-            usuarios_vinculados = sum(1 for u in st.session_state.usuarios_db.values() if u.get("cliente_vinculado"))
-            st.metric("👤 Com Usuários", usuarios_vinculados)
+                # Cadastrar cliente
+                st.session_state.clientes_db[razao_social] = {
+                    'razao_social': razao_social,
+                    'nome_fantasia': nome_fantasia,
+                    'cnpj': cnpj,
+                    'email': email,
+                    'telefone': telefone,
+                    'endereco': endereco,
+                    'contato': contato,
+                    'ativo': True,
+                    'data_cadastro': datetime.now().strftime("%d/%m/%Y")
+                }
+                registrar_mutacao('cliente_set', chave=razao_social, dados=st.session_state.clientes_db[razao_social])
+                
+                mensagem_sucesso = f"✅ Cliente '{nome_fantasia}' cadastrado com sucesso!"
+                
+                # Criar usuário se solicitado
+                if criar_usuario:
+                    usuario_auto = gerar_usuario_automatico(razao_social)
+                    senha_auto = gerar_senha_temporaria()
+                    
+                    if usuario_auto not in st.session_state.usuarios_db:
+                        st.session_state.usuarios_db[usuario_auto] = {
+                            "senha": senha_auto,
+                            "tipo": "cliente",
+                            "cliente_vinculado": razao_social,
+                            "nome": nome_fantasia,
+                            "email": email,
+                            "ativo": True,
+                            "data_criacao": datetime.now().strftime("%d/%m/%Y")
+                        }
+                        registrar_mutacao('usuario_set', chave=usuario_auto, dados=st.session_state.usuarios_db[usuario_auto])
+                        
+                        mensagem_sucesso += f"\n\n🤖 **Usuário criado automaticamente:**\n- **Usuário:** {usuario_auto}\n- **Senha:** {senha_auto}"
+                
+                st.success(mensagem_sucesso)
+                st.rerun()
 
-def pagina_usuarios():
-    """Página para gerenciar usuários"""
-    st.header("👥 Gerenciamento de Usuários")
+def pagina_clientes():
+    """Página para gerenciar clientes"""
+    st.header("🏢 Gerenciamento de Clientes")
+    
+    # Abas com execução sob demanda: só a aba aberta é calculada
+    tab1, tab2, tab3 = st.tabs(["📋 Lista de Clientes", "➕ Novo Cliente", "📊 Estatísticas"], key="abas_clientes", on_change="rerun")
+    
+    if tab1.open:
+        with tab1:
+            fragmento_lista_clientes()
+    
+    if tab2.open:
+        with tab2:
+            fragmento_novo_cliente()
+    
+    if tab3.open:
+        with tab3:
+            estatisticas_clientes()
+
+def estatisticas_clientes():
+    """Métricas de clientes (calculadas só com a aba de estatísticas aberta)"""
+    st.subheader("📊 Estatísticas de Clientes")
+    
+    total_clientes = st.session_state.clientes_db.total
+    clientes_ativos = st.session_state.clientes_db.ativos
+    
+    col1, col2, col3, col4 = st.columns(4)
     
-    tab1, tab2, tab3 = st.tabs(["📋 Lista de Usuários", "➕ Novo Usuário", "📊 Estatísticas"])
+    with col1:
+        st.metric("🏢 Total", total_clientes)
+    with col2:
+        st.metric("✅ Ativos", clientes_ativos)
+    with col3:
+        # Contar trackings por cliente
+        if not st.session_state.df_tracking.empty:
+            clientes_com_tracking = st.session_state.df_tracking['CLIENTE'].nunique()
+            st.metric("📦 Com Trackings", clientes_com_tracking)
+        else:
+            st.metric("📦 Com Trackings", 0)
+    with col4:
+        # Contar usuários vinculados
+        usuarios_vinculados = st.session_state.usuarios_db.vinculados
+        st.metric("👤 Com Usuários", usuarios_vinculados)
+
+@st.fragment
+def fragmento_lista_usuarios():
+    """Lista de usuários com edição, ativação e exclusão (fragmento)"""
+    registrar_atividade()
+    st.subheader("👤 Usuários Cadastrados")
+    
+    busca = st.text_input("🔎 Buscar usuário", placeholder="Usuário, nome ou cliente vinculado...", key="busca_lista_usuarios")
+    usuarios = st.session_state.usuarios_db
+    ids = list(usuarios)
+    if busca:
+        from busca_clientes import normalizar_nome
+        clientes_encontrados = set(buscar_clientes(busca))
+        termo = normalizar_nome(busca)
+        ids = [
+            usuario_id for usuario_id, dados in usuarios.items()
+            if termo in normalizar_nome(f"{usuario_id} {dados.get('nome', '')}")
+            or clientes_encontrados.intersection(clientes_do_usuario(dados) or [])
+        ]
     
-    with tab1:
-        st.subheader("👤 Usuários Cadastrados")
+    if not ids:
+        st.info("🔍 Nenhum usuário encontrado.")
+    else:
+        ordenacoes = {
+            "Usuário": lambda u: u.lower(),
+            "Nome": lambda u: str(usuarios[u].get('nome', '')).lower(),
+            "Tipo": lambda u: (usuarios[u].get('tipo', ''), u.lower()),
+            "Criação (recentes)": lambda u: -data_ordenavel(usuarios[u].get('data_criacao')).toordinal(),
+            "Status": lambda u: (not usuarios[u].get('ativo'), u.lower()),
+        }
+        ordem, inicio, fim = controles_listagem("usuarios", len(ids), list(ordenacoes))
+        pagina = sorted(ids, key=ordenacoes[ordem])[inicio:fim]
+        
+        linhas = [{
+            'STATUS': "✅" if usuarios[u]["ativo"] else "❌",
+            'USUÁRIO': u,
+            'NOME': usuarios[u].get('nome', ''),
+            'TIPO': str(usuarios[u].get('tipo', '')).title(),
+            'CLIENTE(S)': ', '.join(clientes_do_usuario(usuarios[u]) or []),
+            'EMAIL': usuarios[u].get('email', ''),
+            'CRIADO': usuarios[u].get('data_criacao', ''),
+        } for u in pagina]
+        usuario_id = tabela_selecionavel(linhas, pagina, "usuarios")
         
-        for usuario_id, dados in st.session_state.usuarios_db.items():
+        # Detalhes e ações só para o usuário selecionado
+        if usuario_id is None:
+            st.caption("👆 Selecione um usuário na tabela para ver detalhes e ações")
+        else:
+            dados = usuarios[usuario_id]
             card_class = "usuario-card" if dados["tipo"] == "admin" else "card"
             status_emoji = "✅" if dados["ativo"] else "❌"
             tipo_emoji = "👑" if dados["tipo"] == "admin" else "👤"
@@ -988,7 +1362,8 @@ def pagina_usuarios():
             col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
             
             with col1:
-                cliente_info = f"<p><strong>Cliente:</strong> {dados['cliente_vinculado']}</p>" if dados['cliente_vinculado'] else ""
+                clientes_vinculados = clientes_do_usuario(dados)
+                cliente_info = f"<p><strong>Cliente:</strong> {', '.join(clientes_vinculados)}</p>" if clientes_vinculados and any(clientes_vinculados) else ""
                 st.markdown(f"""
                 <div class="{card_class}">
                     <h4>{tipo_emoji} {dados['nome']} {status_emoji}</h4>
@@ -1003,12 +1378,13 @@ def pagina_usuarios():
             with col2:
                 if st.button(f"✏️ Editar", key=f"edit_user_{usuario_id}"):
                     st.session_state.editando_usuario = usuario_id
-                    st.rerun()
+                    rerun_fragmento()
             
             with col3:
                 status_btn = "🔓 Ativar" if not dados["ativo"] else "🔒 Desativar"
                 if st.button(status_btn, key=f"toggle_user_{usuario_id}"):
                     st.session_state.usuarios_db[usuario_id]["ativo"] = not dados["ativo"]
+                    registrar_mutacao('usuario_set', chave=usuario_id, dados=st.session_state.usuarios_db[usuario_id])
                     st.success(f"✅ Usuário {usuario_id} {'ativado' if not dados['ativo'] else 'desativado'}!")
                     st.rerun()
             
@@ -1016,161 +1392,1128 @@ def pagina_usuarios():
                 if usuario_id != "admin":
                     if st.button(f"🗑️ Excluir", key=f"del_user_{usuario_id}"):
                         st.session_state.excluindo_usuario = usuario_id
+    
+    # Modal de confirmação para exclusão
+    if 'excluindo_usuario' in st.session_state:
+        st.error(f"⚠️ Tem certeza que deseja excluir o usuário '{st.session_state.excluindo_usuario}'?")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Sim, excluir"):
+                del st.session_state.usuarios_db[st.session_state.excluindo_usuario]
+                registrar_mutacao('usuario_del', chave=st.session_state.excluindo_usuario)
+                del st.session_state.excluindo_usuario
+                st.success("🗑️ Usuário excluído!")
+                st.rerun()
+        with col2:
+            if st.button("❌ Cancelar"):
+                del st.session_state.excluindo_usuario
+                rerun_fragmento()
+    
+    # Formulário de edição de usuário
+    if 'editando_usuario' in st.session_state:
+        usuario_id = st.session_state.editando_usuario
+        dados = st.session_state.usuarios_db[usuario_id]
         
-        # Modal de confirmação para exclusão
-        if 'excluindo_usuario' in st.session_state:
-            st.error(f"⚠️ Tem certeza que deseja excluir o usuário '{st.session_state.excluindo_usuario}'?")
+        st.markdown("---")
+        st.subheader(f"✏️ Editando: {dados['nome']}")
+        
+        with st.form("editar_usuario"):
             col1, col2 = st.columns(2)
+            
             with col1:
-                if st.button("✅ Sim, excluir"):
-                    del st.session_state.usuarios_db[st.session_state.excluindo_usuario]
-                    del st.session_state.excluindo_usuario
-                    st.success("🗑️ Usuário excluído!")
-                    st.rerun()
+                novo_nome = st.text_input("Nome:", value=dados['nome'])
+                novo_email = st.text_input("Email:", value=dados['email'])
+                nova_senha = st.text_input("Nova Senha (deixe vazio para manter):", type="password")
+            
             with col2:
-                if st.button("❌ Cancelar"):
-                    del st.session_state.excluindo_usuario
+                vinculo = {}
+                if dados['tipo'] == 'cliente':
+                    clientes_disponiveis = [""] + list(st.session_state.clientes_db.keys())
+                    cliente_atual = (dados.clientes or [""])[0]
+                    cliente_atual_idx = clientes_disponiveis.index(cliente_atual) if cliente_atual in clientes_disponiveis else 0
+                    vinculo['cliente_vinculado'] = st.selectbox("Cliente:", clientes_disponiveis, index=cliente_atual_idx)
+                elif 'clientes_vinculados' in dados:
+                    clientes_disponiveis = list(st.session_state.clientes_db.keys())
+                    vinculo['clientes_vinculados'] = st.multiselect(
+                        "Clientes:", clientes_disponiveis,
+                        default=[c for c in dados.clientes if c in clientes_disponiveis]
+                    )
+                else:
+                    vinculo['cliente_vinculado'] = None
+                    st.info("👑 Usuário administrador - sem restrição de cliente")
+                
+                novo_ativo = st.checkbox("Ativo", value=dados['ativo'])
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.form_submit_button("💾 Salvar Alterações", type="primary"):
+                    st.session_state.usuarios_db[usuario_id].update({
+                        'nome': novo_nome,
+                        'email': novo_email,
+                        **vinculo,
+                        'ativo': novo_ativo
+                    })
+                    
+                    if nova_senha:
+                        st.session_state.usuarios_db[usuario_id]['senha'] = nova_senha
+                    
+                    registrar_mutacao('usuario_set', chave=usuario_id, dados=st.session_state.usuarios_db[usuario_id])
+                    del st.session_state.editando_usuario
+                    st.success("✅ Usuário atualizado!")
                     st.rerun()
+            
+            with col2:
+                if st.form_submit_button("❌ Cancelar"):
+                    del st.session_state.editando_usuario
+                    rerun_fragmento()
+
+@st.fragment
+def fragmento_novo_usuario():
+    """Formulário de novo usuário (fragmento)"""
+    registrar_atividade()
+    st.subheader("➕ Cadastrar Novo Usuário")
+    
+    with st.form("novo_usuario"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            novo_usuario = st.text_input("Nome de Usuário *:", placeholder="ex: novo_usuario")
+            novo_nome = st.text_input("Nome Completo *:", placeholder="ex: João Silva")
+            novo_email = st.text_input("Email *:", placeholder="joao@empresa.com")
+            nova_senha = st.text_input("Senha *:", type="password", placeholder="Senha temporária")
         
-        # Formulário de edição de usuário
-        if 'editando_usuario' in st.session_state:
-            usuario_id = st.session_state.editando_usuario
-            dados = st.session_state.usuarios_db[usuario_id]
+        with col2:
+            tipo_usuario = st.selectbox("Tipo *:", ["cliente", "admin"])
             
-            st.markdown("---")
-            st.subheader(f"✏️ Editando: {dados['nome']}")
+            if tipo_usuario == "cliente":
+                clientes_disponiveis = list(st.session_state.clientes_db.keys())
+                if clientes_disponiveis:
+                    cliente_vinculado = st.selectbox("Cliente *:", [""] + clientes_disponiveis)
+                else:
+                    st.warning("⚠️ Cadastre clientes primeiro!")
+                    cliente_vinculado = ""
+            else:
+                cliente_vinculado = None
+                st.info("👑 Admin tem acesso a todos os dados")
+        
+        if st.form_submit_button("👤 Criar Usuário", type="primary"):
+            # Validações
+            erros = []
+            if not novo_usuario or novo_usuario in st.session_state.usuarios_db:
+                erros.append("❌ Nome de usuário inválido ou já existe")
+            if not novo_nome:
+                erros.append("❌ Nome completo é obrigatório")
+            if not nova_senha:
+                erros.append("❌ Senha é obrigatória")
+            if not novo_email:
+                erros.append("❌ Email é obrigatório")
+            if tipo_usuario == "cliente" and not cliente_vinculado:
+                erros.append("❌ Cliente é obrigatório para usuários tipo cliente")
+            
+            if erros:
+                for erro in erros:
+                    st.error(erro)
+            else:
+                # Criar usuário
+                st.session_state.usuarios_db[novo_usuario] = {
+                    "senha": nova_senha,
+                    "tipo": tipo_usuario,
+                    "cliente_vinculado": cliente_vinculado if tipo_usuario == "cliente" else None,
+                    "nome": novo_nome,
+                    "email": novo_email,
+                    "ativo": True,
+                    "data_criacao": datetime.now().strftime("%d/%m/%Y")
+                }
+                registrar_mutacao('usuario_set', chave=novo_usuario, dados=st.session_state.usuarios_db[novo_usuario])
+                
+                st.success(f"✅ Usuário '{novo_usuario}' criado com sucesso!")
+                
+                # Mostrar dados de acesso
+                st.info(f"""
+                🔐 **Dados de Acesso Criados:**
+                - **Usuário:** {novo_usuario}
+                - **Senha:** {nova_senha}
+                - **Tipo:** {tipo_usuario.title()}
+                {f"- **Cliente:** {cliente_vinculado}" if cliente_vinculado else ""}
+                
+                📧 Envie essas informações para o usuário por email seguro!
+                """)
+                st.rerun()
+
+def pagina_usuarios():
+    """Página para gerenciar usuários"""
+    st.header("👥 Gerenciamento de Usuários")
+    
+    # Abas com execução sob demanda: só a aba aberta é calculada
+    tab1, tab2, tab3 = st.tabs(["📋 Lista de Usuários", "➕ Novo Usuário", "📊 Estatísticas"], key="abas_usuarios", on_change="rerun")
+    
+    if tab1.open:
+        with tab1:
+            fragmento_lista_usuarios()
+    
+    if tab2.open:
+        with tab2:
+            fragmento_novo_usuario()
+    
+    if tab3.open:
+        with tab3:
+            estatisticas_usuarios()
+
+def estatisticas_usuarios():
+    """Métricas de usuários (calculadas só com a aba de estatísticas aberta)"""
+    st.subheader("📊 Estatísticas de Usuários")
+    
+    usuarios = st.session_state.usuarios_db
+    total_usuarios = usuarios.total
+    usuarios_ativos = usuarios.ativos
+    admins = usuarios.admins
+    clientes_usuarios = usuarios.contar('tipo', 'cliente')
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("👥 Total", total_usuarios)
+    with col2:
+        st.metric("✅ Ativos", usuarios_ativos)
+    with col3:
+        st.metric("👑 Admins", admins)
+    with col4:
+        st.metric("👤 Clientes", clientes_usuarios)
+
+@st.cache_resource
+def obter_motor_lead_time():
+    """Motor de lead time compartilhado pelo processo (cache incremental)"""
+    from analise_transito import MotorLeadTime
+    return MotorLeadTime()
+
+@st.cache_resource
+def obter_motor_alertas():
+    """Motor de alertas de prazo compartilhado pelo processo"""
+    from alertas import MotorAlertas
+    return MotorAlertas()
+
+def pagina_analises():
+    """Página de análises de lead time e precisão do ETA (admin)"""
+    import plotly.express as px
+    from analise_transito import COLUNA_TOTAL, pivotar
+    
+    st.header("📈 Análises de Trânsito")
+    
+    if st.session_state.df_tracking.empty:
+        st.info("📋 Nenhum tracking cadastrado ainda.")
+        return
+    
+    resumo = obter_motor_lead_time().resumo(st.session_state.df_tracking)
+    geral = resumo['geral'].set_index('ETAPA')
+    eta = resumo['eta_geral']
+    
+    # Métricas principais
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        if COLUNA_TOTAL in geral.index:
+            st.metric("⏱️ Lead Time (mediana)", f"{geral.loc[COLUNA_TOTAL, 'mediana']:.0f} dias")
+        else:
+            st.metric("⏱️ Lead Time (mediana)", "—")
+    with col2:
+        if COLUNA_TOTAL in geral.index:
+            st.metric("📈 Lead Time (p90)", f"{geral.loc[COLUNA_TOTAL, 'p90']:.0f} dias")
+        else:
+            st.metric("📈 Lead Time (p90)", "—")
+    with col3:
+        st.metric("🎯 Chegadas no Prazo", f"{eta['pct_no_prazo'].iloc[0]:.1f}%" if not eta.empty else "—")
+    with col4:
+        st.metric("📅 Erro ETA (mediana)", f"{eta['mediana_erro_abs'].iloc[0]:.1f} dias" if not eta.empty else "—")
+    
+    # Duração de cada etapa
+    etapas = resumo['geral'][resumo['geral']['ETAPA'] != COLUNA_TOTAL]
+    if not etapas.empty:
+        fig_etapas = px.bar(
+            etapas,
+            x=['mediana', 'p90'],
+            y='ETAPA',
+            orientation='h',
+            barmode='group',
+            title="⏱️ Duração por Etapa (dias)",
+            color_discrete_sequence=['#3498db', '#e74c3c']
+        )
+        fig_etapas.update_layout(height=400, yaxis={'categoryorder': 'array', 'categoryarray': list(etapas['ETAPA'])[::-1]})
+        st.plotly_chart(fig_etapas, use_container_width=True)
+    
+    # Abas com execução sob demanda: linha do tempo, tendências, auditoria e
+    # sessões percorrem muitos dados e só rodam com a aba aberta
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(
+        ["🏢 Por Cliente", "🚦 Por Canal", "🎯 Precisão ETA", "🗓️ Linha do Tempo", "📉 Tendências", "📑 Relatórios", "🕵️ Auditoria", "🧠 Sessões"],
+        key="abas_analises",
+        on_change="rerun"
+    )
+    
+    if tab1.open:
+        with tab1:
+            metrica = st.radio("Métrica:", ['mediana', 'p90', 'n'], horizontal=True, key="analise_metrica_cliente")
+            tabela = pivotar(resumo['por_cliente'], 'CLIENTE', metrica)
+            st.dataframe(tabela, use_container_width=True)
+    
+    if tab2.open:
+        with tab2:
+            metrica = st.radio("Métrica:", ['mediana', 'p90', 'n'], horizontal=True, key="analise_metrica_canal")
+            tabela = pivotar(resumo['por_canal'], 'CANAL RFB', metrica)
+            st.dataframe(tabela.rename(index={'': 'PENDENTE'}), use_container_width=True)
+    
+    if tab3.open:
+        with tab3:
+            st.dataframe(resumo['eta_por_cliente'], use_container_width=True, hide_index=True)
+    
+    if tab4.open:
+        with tab4:
+            fragmento_linha_tempo()
+    
+    if tab5.open:
+        with tab5:
+            fragmento_tendencias()
+    
+    if tab6.open:
+        with tab6:
+            fragmento_relatorios()
+    
+    if tab7.open:
+        with tab7:
+            fragmento_auditoria()
+    
+    if tab8.open:
+        with tab8:
+            fragmento_sessoes()
+
+@st.fragment
+def fragmento_tendencias():
+    """Gráficos de tendência a partir dos KPIs diários já materializados"""
+    import pandas as pd
+    import plotly.express as px
+    from datetime import date, timedelta
+    from kpis import tendencia
+    registrar_atividade()
+    
+    kpis = obter_kpis_diarios()
+    if kpis.ultimo_dia() is None:
+        st.info("⏳ KPIs diários ainda não calculados.")
+        if st.button("📊 Calcular agora", key="calcular_kpis"):
+            with st.spinner("Calculando KPIs diários..."):
+                kpis.materializar(st.session_state.df_tracking)
+            st.rerun(scope="fragment")
+        return
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        periodo = st.date_input(
+            "📅 Período",
+            value=(date.today() - timedelta(days=90), date.today()),
+            format="DD/MM/YYYY",
+            key="tendencias_periodo"
+        )
+    with col2:
+        clientes = sorted(st.session_state.clientes_db.keys())
+        cliente = st.selectbox("🏢 Cliente", ["Todos"] + clientes, key="tendencias_cliente")
+    with col3:
+        frequencias = {"Dia": 'D', "Semana": 'W', "Mês": 'M'}
+        frequencia = st.radio("Agrupar por", list(frequencias), index=1, horizontal=True, key="tendencias_frequencia")
+    
+    if not isinstance(periodo, (list, tuple)) or len(periodo) != 2:
+        st.caption("Selecione a data inicial e a final do período.")
+        return
+    
+    filtro_clientes = None if cliente == "Todos" else [cliente]
+    serie = tendencia(kpis.serie(*periodo, clientes=filtro_clientes), frequencias[frequencia])
+    if serie.empty:
+        st.info("🔍 Nenhum KPI no período selecionado.")
+        return
+    
+    # Tempo médio de liberação: mês atual x anterior
+    hoje = date.today()
+    inicio_mes = hoje.replace(day=1)
+    inicio_anterior = (inicio_mes - timedelta(days=1)).replace(day=1)
+    medias = tendencia(kpis.serie(inicio_anterior, hoje, clientes=filtro_clientes), 'M')['liberacao_media']
+    atual, anterior = (medias.get(pd.Timestamp(mes)) for mes in (inicio_mes, inicio_anterior))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(
+            "🛃 Liberação média (mês)",
+            f"{atual:.1f} dias" if pd.notna(atual) else "—",
+            delta=f"{atual - anterior:+.1f} dias vs mês anterior" if pd.notna(atual) and pd.notna(anterior) else None,
+            delta_color="inverse"
+        )
+    with col2:
+        st.metric("📦 Ativos (média do último período)", f"{serie['ativos'].iloc[-1]:.0f}")
+    with col3:
+        st.metric("✅ Concluídos no período", f"{serie['concluidos'].sum():.0f}")
+    
+    canais = serie[['canal_verde', 'canal_vermelho', 'canal_pendente']].rename(
+        columns={'canal_verde': 'VERDE', 'canal_vermelho': 'VERMELHO', 'canal_pendente': 'PENDENTE'})
+    fig_canais = px.line(canais, title="🚦 Containers ativos por canal (média diária)",
+                         color_discrete_map={'VERDE': '#27ae60', 'VERMELHO': '#e74c3c', 'PENDENTE': '#95a5a6'})
+    fig_canais.update_layout(height=350, xaxis_title=None, yaxis_title=None, legend_title=None)
+    st.plotly_chart(fig_canais, use_container_width=True)
+    
+    tempos = serie[['lead_time_medio', 'liberacao_media']].rename(
+        columns={'lead_time_medio': 'Lead time', 'liberacao_media': 'Liberação'})
+    fig_tempos = px.line(tempos, markers=True, title="⏱️ Tempos médios dos processos concluídos (dias)")
+    fig_tempos.update_layout(height=350, xaxis_title=None, yaxis_title=None, legend_title=None)
+    st.plotly_chart(fig_tempos, use_container_width=True)
+    
+    st.caption(f"KPIs materializados até {kpis.ultimo_dia().strftime('%d/%m/%Y')}"
+               + (f" · ⚠️ último erro do job: {kpis.ultimo_erro}" if kpis.ultimo_erro else ""))
+
+@st.fragment
+def fragmento_relatorios():
+    """Pacote mensal de planilhas por cliente, gerado em segundo plano (pool de processos)"""
+    from datetime import date, timedelta
+    from relatorios import montar_entradas
+    registrar_atividade()
+    
+    clientes = sorted(st.session_state.clientes_db.keys())
+    selecionados = st.multiselect("🏢 Clientes", clientes, default=clientes, key="relatorios_clientes")
+    
+    if st.button("📑 Gerar pacote de relatórios", type="primary", disabled=not selecionados, key="gerar_relatorios"):
+        inicio_historico = date.today() - timedelta(days=365)
+        with st.spinner("Preparando dados..."):
+            arquivados = obter_arquivo_historico().carregar_intervalo(inicio_historico, date.today(), selecionados)
+            kpis = obter_kpis_diarios().serie(inicio_historico, date.today(), clientes=selecionados)
+            entradas = montar_entradas(st.session_state.df_tracking, arquivados, kpis, selecionados)
+        st.session_state.pacote_relatorios = obter_gerador_relatorios().gerar(entradas)
+    
+    pacote = st.session_state.get('pacote_relatorios')
+    if pacote is None:
+        st.caption("Uma planilha por cliente: ativos, finalizados (inclusive arquivados nos últimos 12 meses), "
+                   "canal vermelho, histórico diário do canal vermelho e lead times.")
+        return
+    if not pacote.pronto:
+        fragmento_progresso_relatorios()
+        return
+    
+    erros = pacote.erros()
+    for cliente, erro in erros.items():
+        st.error(f"❌ {cliente}: {erro}")
+    st.success(f"✅ {pacote.total - len(erros)} planilha(s) prontas · pedido de {pacote.criado_em.strftime('%d/%m/%Y %H:%M')}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="📥 Baixar pacote (ZIP)",
+            data=pacote.zip_bytes(),
+            file_name=f"relatorios_brix_{pacote.criado_em.strftime('%Y_%m')}.zip",
+            mime="application/zip",
+            key="baixar_relatorios"
+        )
+    with col2:
+        destino = st.text_input("📁 Salvar em", value=str(Path(DIRETORIO_RELATORIOS) / pacote.criado_em.strftime('%Y-%m')),
+                                key="relatorios_destino")
+        if st.button("💾 Salvar no diretório", key="salvar_relatorios"):
+            try:
+                st.success(f"✅ {pacote.salvar_em(destino)} planilha(s) salvas em {destino}")
+            except OSError as e:
+                st.error(f"❌ Erro ao salvar: {str(e)}")
+
+@st.fragment(run_every=2)
+def fragmento_progresso_relatorios():
+    """Acompanha a geração; ao terminar, reexecuta para mostrar o download"""
+    pacote = st.session_state.pacote_relatorios
+    if pacote.pronto:
+        st.rerun()
+    st.progress(pacote.concluidos / pacote.total, text=f"⏳ Gerando planilhas... {pacote.concluidos}/{pacote.total}")
+
+@st.fragment
+def fragmento_sessoes():
+    """Memória aproximada por sessão e por chave do session_state (todas as sessões do processo)"""
+    import pandas as pd
+    from memoria_sessoes import memoria_processo
+    registrar_atividade()
+    
+    registro = obter_registro_sessoes()
+    registro.remover_encerradas(sessao_ativa)
+    medir_sessao(forcar=True)
+    resumo = registro.resumo()
+    sessoes = resumo['sessoes']
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🖥️ Sessões abertas", len(sessoes), delta=f"{sum(s['em_espera'] for s in sessoes)} em espera", delta_color="off")
+    with col2:
+        st.metric("🧠 Memória das sessões (aprox.)", f"{resumo['total'] / 2**20:.1f} MB")
+    with col3:
+        processo = memoria_processo()
+        st.metric("⚙️ Memória do processo", f"{processo / 2**20:.0f} MB" if processo else "—")
+    
+    st.dataframe(pd.DataFrame([{
+        'Sessão': s['sessao'][:8] + (" (esta)" if s['sessao'] == id_sessao() else ""),
+        'Usuário': s['usuario'] or "—",
+        'Ociosa há (min)': round(s['ociosa_ha'] / 60, 1),
+        'Em espera': "💤" if s['em_espera'] else "",
+        'MB': round(s['bytes'] / 2**20, 2),
+        'Maior chave': max(s['tamanhos'], key=s['tamanhos'].get) if s['tamanhos'] else "—",
+        'Medida há (s)': round(s['medida_ha']) if s['medida_ha'] is not None else None,
+    } for s in sessoes]), use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Por chave (todas as sessões)**")
+        st.dataframe(pd.DataFrame({'Chave': list(resumo['por_chave']), 'MB': [round(v / 2**20, 3) for v in resumo['por_chave'].values()]}),
+                     use_container_width=True, hide_index=True)
+    with col2:
+        opcoes = {f"{s['sessao'][:8]} · {s['usuario'] or '—'}": s for s in sessoes}
+        escolhida = st.selectbox("Por chave da sessão", list(opcoes), key="sessoes_detalhe") if opcoes else None
+        if escolhida:
+            tamanhos = sorted(opcoes[escolhida]['tamanhos'].items(), key=lambda item: item[1], reverse=True)
+            st.dataframe(pd.DataFrame({'Chave': [c for c, _ in tamanhos], 'KB': [round(v / 1024, 1) for _, v in tamanhos]}),
+                         use_container_width=True, hide_index=True)
+    
+    if SESSAO_OCIOSA_MINUTOS:
+        st.caption(f"💤 Sessões sem uso há mais de {SESSAO_OCIOSA_MINUTOS} min entram em espera: caches, DataFrames e "
+                   "cadastros saem da memória e são recarregados da base local quando o usuário volta.")
+    else:
+        st.caption("💤 Espera de sessões ociosas desligada (BRIX_SESSAO_OCIOSA_MIN=0).")
+
+@st.fragment
+def fragmento_linha_tempo():
+    """Linha do tempo dos containers; períodos com muitos containers são agregados no servidor"""
+    from datetime import timedelta
+    from linha_tempo import MAX_CONTAINERS_DETALHE, figura_linha_tempo, montar_segmentos
+    registrar_atividade()
+    
+    segmentos = cache_da_versao('segmentos_linha_tempo', lambda: montar_segmentos(st.session_state.df_tracking))
+    if segmentos.empty:
+        st.info("📋 Nenhum tracking com datas de marcos.")
+        return
+    
+    primeiro, ultimo = segmentos['inicio'].min().date(), segmentos['fim'].max().date()
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        periodo = st.date_input(
+            "📅 Período",
+            value=(max(primeiro, ultimo - timedelta(days=90)), ultimo),
+            min_value=primeiro,
+            max_value=ultimo,
+            format="DD/MM/YYYY",
+            key="linha_tempo_periodo"
+        )
+    with col2:
+        clientes = sorted(segmentos['cliente'].dropna().unique())
+        cliente = st.selectbox("🏢 Cliente", ["Todos"] + clientes, key="linha_tempo_cliente")
+    
+    if not isinstance(periodo, (list, tuple)) or len(periodo) != 2:
+        st.caption("Selecione a data inicial e a final do período.")
+        return
+    if cliente != "Todos":
+        segmentos = segmentos[segmentos['cliente'] == cliente]
+    
+    fig, modo = figura_linha_tempo(segmentos, *periodo)
+    if modo == 'agregado':
+        st.caption(f"📊 Mais de {MAX_CONTAINERS_DETALHE} containers no período: contagem por etapa. "
+                   "Reduza o período ou escolha um cliente para ver cada container.")
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def fragmento_auditoria():
+    """Consultas ao log de auditoria: estado de um container em uma data e alterações por usuário"""
+    import pandas as pd
+    from datetime import date
+    registrar_atividade()
+    
+    log = obter_log_auditoria()
+    if log.falhas:
+        st.warning(f"⚠️ {log.falhas} alteração(ões) não gravada(s) no log de auditoria. Último erro: {log.ultimo_erro}")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        with st.form("form_auditoria_container"):
+            st.markdown("**📦 Container em uma data**")
+            container = st.text_input("Container", placeholder="Número do container...")
+            data = st.date_input("Até a data", value=date.today(), format="DD/MM/YYYY")
+            consultar_container = st.form_submit_button("🔎 Consultar container")
+    
+    with col2:
+        with st.form("form_auditoria_usuario"):
+            st.markdown("**👤 Alterações por usuário**")
+            usuario = st.selectbox("Usuário", list(st.session_state.usuarios_db.keys()))
+            periodo = st.date_input("Período", value=(date.today() - timedelta(days=30), date.today()), format="DD/MM/YYYY")
+            consultar_usuario = st.form_submit_button("🔎 Consultar usuário")
+    
+    if consultar_container and container.strip():
+        container = container.strip().upper()
+        # O mesmo container pode ter vários processos (clientes/carregamentos)
+        trackings = log.trackings_do_container(container, fim=data)
+        if not trackings:
+            st.info("🔍 Nenhuma alteração registrada para este container até a data")
+        for chave in trackings:
+            estado = log.estado_em(chave, data)
+            cliente, _, carregamento = chave
+            st.markdown(f"**Estado de {container} ({cliente or 'sem cliente'}, carregamento {carregamento or '-'}) em {data.strftime('%d/%m/%Y')}:**")
+            st.dataframe(pd.DataFrame({'CAMPO': list(estado), 'VALOR': list(estado.values())}), use_container_width=True, hide_index=True)
+            with st.expander("📜 Histórico completo até a data"):
+                st.dataframe(pd.DataFrame(log.historico(chave, fim=data)), use_container_width=True, hide_index=True)
+    
+    if consultar_usuario and isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+        alteracoes = log.alteracoes_por_usuario(usuario, datetime.combine(periodo[0], datetime.min.time()), periodo[1])
+        if not alteracoes:
+            st.info("🔍 Nenhuma alteração deste usuário no período")
+        else:
+            st.success(f"✅ {len(alteracoes)} alteração(ões)")
+            st.dataframe(pd.DataFrame(alteracoes), use_container_width=True, hide_index=True)
+
+@st.fragment
+def fragmento_trackings(usuario_info):
+    """Filtros, cards, tabela e download (fragmento: digitar um filtro reexecuta só este trecho)"""
+    from datetime import date
+    from analise_transito import COLUNAS_DATA
+    from filtros import COLUNAS_ORDENACAO_TEXTO, aplicar_filtros, contem, entre, igual, pertence
+    registrar_atividade()
+    df_tracking = st.session_state.df_tracking
+    
+    # Filtros
+    st.subheader("🔍 Filtros")
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if usuario_info["tipo"] == "admin":
+            filtro_cliente = st.text_input("Cliente", placeholder="Digite o nome do cliente...")
+        else:
+            filtro_cliente = ""
+    
+    with col2:
+        filtro_container = st.text_input("Container", placeholder="Digite o número do container...")
+    
+    with col3:
+        filtro_canal = st.selectbox("Canal RFB", ['Todos', 'VERDE', 'VERMELHO'])
+    
+    col4, col5, col6 = st.columns(3)
+    
+    with col4:
+        filtro_marco = st.selectbox("📅 Filtrar pela data de", ['Nenhuma'] + COLUNAS_DATA, key="filtro_marco")
+    
+    with col5:
+        filtro_periodo = st.date_input(
+            "Período",
+            value=(date.today(), date.today() + timedelta(days=7)),
+            format="DD/MM/YYYY",
+            disabled=filtro_marco == 'Nenhuma',
+            key="filtro_periodo"
+        )
+    
+    with col6:
+        sentidos = {"↑": True, "↓": False}
+        opcoes_ordenacao = [f"{coluna} {seta}" for coluna in COLUNAS_DATA + COLUNAS_ORDENACAO_TEXTO for seta in sentidos]
+        escolhidas = st.multiselect("↕️ Ordenar por", opcoes_ordenacao, placeholder="Ordem de cadastro", key="ordenar_por")
+    
+    # Aplicar filtros: escopo do usuário + filtros da tela em uma única máscara
+    predicados = []
+    clientes = clientes_do_usuario(usuario_info)
+    if clientes is not None:
+        predicados.append(pertence('CLIENTE', clientes))
+    
+    if filtro_cliente and usuario_info["tipo"] == "admin":
+        encontrados = buscar_clientes(filtro_cliente)
+        predicados.append(pertence('CLIENTE', encontrados))
+        if encontrados:
+            st.caption(f"🔎 Clientes: {', '.join(encontrados[:5])}{' ...' if len(encontrados) > 5 else ''}")
+    
+    if filtro_container:
+        predicados.append(contem('CONTAINER', filtro_container))
+    
+    if filtro_canal != 'Todos':
+        predicados.append(igual('CANAL RFB', filtro_canal))
+    
+    if filtro_marco != 'Nenhuma' and isinstance(filtro_periodo, (list, tuple)) and len(filtro_periodo) == 2:
+        predicados.append(entre(filtro_marco, *filtro_periodo))
+    
+    # Primeira escolha de cada coluna vale (ex.: "ETA ↑" e depois "ETA ↓")
+    ordenacao = {}
+    for opcao in escolhidas:
+        coluna, seta = opcao.rsplit(' ', 1)
+        ordenacao.setdefault(coluna, sentidos[seta])
+    
+    df_filtrado = aplicar_filtros(df_tracking, predicados, colunas_normalizadas(), indice_ordenado(), list(ordenacao.items()))
+    
+    # Tabela principal
+    titulo_tabela = f"📋 Lista de Trackings ({len(df_filtrado)} registros)" if usuario_info["tipo"] == "admin" else f"📋 Seus Trackings ({len(df_filtrado)} registros)"
+    st.subheader(titulo_tabela)
+    
+    if not df_filtrado.empty:
+        # Emojis para identificar status (aplicados na renderização, sem copiar o DataFrame)
+        rotulos_canal = {'VERDE': '🟢 VERDE', 'VERMELHO': '🔴 VERMELHO', '': '⏳ PENDENTE'}
+        
+        # Mostrar dados - Versão Mobile-First
+        st.markdown("### 📊 Dados dos Trackings:")
+
+        # Cards para mobile
+        for idx, row in df_filtrado.iterrows():
+            canal = rotulos_canal.get(row['CANAL RFB'], row['CANAL RFB'])
+            # Definir cores e emoji baseado no status
+            if 'VERDE' in str(canal):
+                card_color = "#e8f5e8"
+                border_color = "#28a745"
+                status_emoji = "🟢"
+            elif 'VERMELHO' in str(canal):
+                card_color = "#f8e8e8"
+                border_color = "#dc3545"
+                status_emoji = "🔴"
+            else:
+                card_color = "#fff8e1"
+                border_color = "#ffc107"
+                status_emoji = "⏳"
             
-            with st.form("editar_usuario"):
+            # Usar container do Streamlit ao invés de HTML puro
+            with st.container():
+                st.markdown(f"""
+                <div style='
+                    background-color: {card_color}; 
+                    border: 2px solid {border_color}; 
+                    border-radius: 10px;
+                    padding: 15px; 
+                    margin: 15px 0; 
+                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                '>
+                    <h3 style='color: #000000; margin: 0 0 15px 0;'>
+                        {status_emoji} 📦 {row['CONTAINER']} - {row['CLIENTE']}
+                    </h3>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                # Usar colunas do Streamlit para os dados
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    novo_nome = st.text_input("Nome:", value=dados['nome'])
-                    novo_email = st.text_input("Email:", value=dados['email'])
-                    nova_senha = st.text_input("Nova Senha (deixe vazio para manter):", type="password")
+                    st.write(f"**📊 Status:** {canal}")
+                    st.write(f"**📅 Carregamento:** {row['CARREGAMENTO'] or 'Não informado'}")
+                    st.write(f"**🚢 Embarque:** {row['EMBARQUE NAVIO'] or 'Não informado'}")
+                    st.write(f"**📍 Previsão Porto Destino:** {row['PREVISAO CHEGADA PORTO DESTINO'] or 'Não informado'}")
                 
                 with col2:
-                    if dados['tipo'] == 'cliente':
-                        clientes_disponiveis = [""] + list(st.session_state.clientes_db.keys())
-                        cliente_atual_idx = clientes_disponiveis.index(dados['cliente_vinculado']) if dados['cliente_vinculado'] in clientes_disponiveis else 0
-                        novo_cliente = st.selectbox("Cliente:", clientes_disponiveis, index=cliente_atual_idx)
+                    st.write(f"**✅ Chegada Porto Destino:** {row['CHEGADA PORTO DESTINO'] or 'Não informado'}")
+                    st.write(f"**🔓 Liberação:** {row['LIBERAÇAO PORTO DESTINO'] or 'Não informado'}")
+                    st.write(f"**🚛 Chegada Ciudad del Este:** {row['CHEGADA CIUDAD DEL ESTE PY'] or 'Não informado'}")
+                    st.write(f"**📦 Descarregamento:** {row['DESCARREGAMENTO'] or 'Não informado'}")
+
+                # ADICIONAR AQUI (depois do col2):
+                # Badge de status final
+                if row['STATUS_FINAL']:
+                    if 'SUCESSO' in row['STATUS_FINAL']:
+                        status_color = "#d4edda"  # Verde claro
+                        status_border = "#28a745"  # Verde
+                    elif 'PENDÊNCIAS' in row['STATUS_FINAL']:
+                        status_color = "#fff3cd"  # Amarelo claro  
+                        status_border = "#ffc107"  # Amarelo
+                    elif 'CANCELADO' in row['STATUS_FINAL']:
+                        status_color = "#f8d7da"  # Vermelho claro
+                        status_border = "#dc3545"  # Vermelho
                     else:
-                        novo_cliente = None
-                        st.info("👑 Usuário administrador - sem restrição de cliente")
-                    
-                    novo_ativo = st.checkbox("Ativo", value=dados['ativo'])
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.form_submit_button("💾 Salvar Alterações", type="primary"):
-                        st.session_state.usuarios_db[usuario_id].update({
-                            'nome': novo_nome,
-                            'email': novo_email,
-                            'cliente_vinculado': novo_cliente,
-                            'ativo': novo_ativo
-                        })
-                        
-                        if nova_senha:
-                            st.session_state.usuarios_db[usuario_id]['senha'] = nova_senha
+                        status_color = "#e2e3e5"  # Cinza
+                        status_border = "#6c757d"  # Cinza
                         
-                        del st.session_state.editando_usuario
-                        st.success("✅ Usuário atualizado!")
-                        st.rerun()
+                    st.markdown(f"""
+                    <div style='background: {status_color}; border: 2px solid {status_border}; 
+                                 padding: 8px; border-radius: 5px; margin: 10px 0; text-align: center;'>
+                        <strong>{row['STATUS_FINAL']}</strong>
+                    </div>
+                    """, unsafe_allow_html=True)
                 
-                with col2:
-                    if st.form_submit_button("❌ Cancelar"):
-                        del st.session_state.editando_usuario
-                        st.rerun()
-    
-    with tab2:
-        st.subheader("➕ Cadastrar Novo Usuário")
+                st.markdown("---")
+
+        # Opção de tabela tradicional
+        st.markdown("### 📊 Dados dos Trackings")
+        st.write(f"**Registros encontrados:** {len(df_filtrado)}")
         
-        with st.form("novo_usuario"):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                novo_usuario = st.text_input("Nome de Usuário *:", placeholder="ex: novo_usuario")
-                novo_nome = st.text_input("Nome Completo *:", placeholder="ex: João Silva")
-                novo_email = st.text_input("Email *:", placeholder="joao@empresa.com")
-                nova_senha = st.text_input("Senha *:", type="password", placeholder="Senha temporária")
+        if not df_filtrado.empty:
+            # Projeção com nomes de colunas mais curtos (com copy-on-write o rename não copia os dados)
+            df_display_simples = df_filtrado.rename(columns={
+                'PREVISAO CHEGADA PORTO DESTINO': 'PREVISAO',
+                'CHEGADA PORTO DESTINO': 'CHEGADA',
+                'LIBERAÇAO PORTO DESTINO': 'LIBERACAO',
+                'CHEGADA CIUDAD DEL ESTE PY': 'CHEGADA PY'
+            })
             
-            with col2:
-                tipo_usuario = st.selectbox("Tipo *:", ["cliente", "admin"])
+            # Exibir com configuração simples
+            st.dataframe(
+                df_display_simples,
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("🔍 Nenhum registro encontrado com os filtros aplicados.")
+
+        # Legenda
+        st.info("🟢 Verde = Liberado | 🔴 Vermelho = Inspeção | ⏳ Pendente = Aguardando")
+        
+        # Download dos dados
+        csv = df_filtrado.to_csv(index=False)
+        nome_arquivo = f"tracking_todos_{datetime.now().strftime('%Y%m%d')}.csv" if usuario_info["tipo"] == "admin" else f"tracking_{usuario_info['nome'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv"
+        label_download = "💾 Baixar Todos os Dados (CSV)" if usuario_info["tipo"] == "admin" else "💾 Baixar Seus Dados (CSV)"
+        
+        st.download_button(
+            label=label_download,
+            data=csv,
+            file_name=nome_arquivo,
+            mime="text/csv"
+        )
+        
+        # Formulário para novo registro (só admin)
+        if usuario_info["tipo"] == "admin":
+            fragmento_novo_tracking()
+            fragmento_atualizar_marcos()
+        
+        # Edição de registros (só admin)
+        if usuario_info["tipo"] == "admin":
+            fragmento_editar_tracking(df_filtrado)
+        
+    else:
+        st.info("🔍 Nenhum registro encontrado com os filtros aplicados.")
+
+@st.fragment
+def fragmento_novo_tracking():
+    """Formulário de novo tracking (fragmento)"""
+    import pandas as pd
+    registrar_atividade()
+    
+    with st.expander("➕ Adicionar Novo Tracking"):
+        if not st.session_state.clientes_db:
+            st.warning("⚠️ Cadastre clientes primeiro! Use o menu 'Clientes' acima.")
+        else:
+            with st.form("novo_tracking"):
+                col1, col2 = st.columns(2)
                 
-                if tipo_usuario == "cliente":
+                with col1:
                     clientes_disponiveis = list(st.session_state.clientes_db.keys())
-                    if clientes_disponiveis:
-                        cliente_vinculado = st.selectbox("Cliente *:", [""] + clientes_disponiveis)
+                    cliente_selecionado = st.selectbox("Cliente *", clientes_disponiveis)
+                    container = st.text_input("Container *", placeholder="ex: TCLU1234567")
+                    carregamento = st.text_input("Carregamento", placeholder="DD/MM/AAAA")
+                    embarque = st.text_input("Embarque Navio", placeholder="DD/MM/AAAA")
+                    saida = st.text_input("Saída Navio", placeholder="DD/MM/AAAA")
+                    previsao = st.text_input("Previsão Chegada Porto Destino", placeholder="DD/MM/AAAA")
+                
+                with col2:
+                    chegada = st.text_input("Chegada Porto Destino", placeholder="DD/MM/AAAA")
+                    canal_rfb = st.selectbox("Canal RFB", ['', 'VERDE', 'VERMELHO'])
+                    liberacao = st.text_input("Liberação Porto Destino", placeholder="DD/MM/AAAA")
+                    chegada_py = st.text_input("Chegada Ciudad del Este PY", placeholder="DD/MM/AAAA")
+                    descarregamento = st.text_input("Descarregamento", placeholder="DD/MM/AAAA")
+                
+                submitted = st.form_submit_button("💾 Salvar Tracking", type="primary")
+                
+                if submitted:
+                    if not cliente_selecionado or not container:
+                        st.error("❌ Cliente e Container são obrigatórios!")
                     else:
-                        st.warning("⚠️ Cadastre clientes primeiro!")
-                        cliente_vinculado = ""
-                else:
-                    cliente_vinculado = None
-                    st.info("👑 Admin tem acesso a todos os dados")
+                        novo_registro = {
+                            'CLIENTE': cliente_selecionado,
+                            'CONTAINER': container,
+                            'CARREGAMENTO': carregamento,
+                            'EMBARQUE NAVIO': embarque,
+                            'SAIDA NAVIO': saida,
+                            'PREVISAO CHEGADA PORTO DESTINO': previsao,
+                            'CHEGADA PORTO DESTINO': chegada,
+                            'CANAL RFB': canal_rfb,
+                            'LIBERAÇAO PORTO DESTINO': liberacao,
+                            'CHEGADA CIUDAD DEL ESTE PY': chegada_py,
+                            'DESCARREGAMENTO': descarregamento,
+                            'STATUS_FINAL': ''
+                        }
+                        
+                        novo_df = pd.DataFrame([novo_registro])
+                        st.session_state.df_tracking = pd.concat([st.session_state.df_tracking, novo_df], ignore_index=True)
+                        registrar_mutacao('tracking_add', registro=novo_registro)
+                        auditar({}, novo_registro)
+                        st.success("✅ Tracking adicionado!")
+                        st.rerun()
+
+@st.fragment
+def fragmento_editar_tracking(df_filtrado):
+    """Edição/exclusão de trackings do resultado filtrado (fragmento)"""
+    registrar_atividade()
+    with st.expander("✏️ Editar/Excluir Tracking"):
+        if not df_filtrado.empty:
+            opcoes_edicao = [f"{row['CLIENTE']} - {row['CONTAINER']}" for _, row in df_filtrado.iterrows()]
+            registro_selecionado = st.selectbox("Selecione o registro para editar:", opcoes_edicao)
             
-            if st.form_submit_button("👤 Criar Usuário", type="primary"):
-                # Validações
-                erros = []
-                if not novo_usuario or novo_usuario in st.session_state.usuarios_db:
-                    erros.append("❌ Nome de usuário inválido ou já existe")
-                if not novo_nome:
-                    erros.append("❌ Nome completo é obrigatório")
-                if not nova_senha:
-                    erros.append("❌ Senha é obrigatória")
-                if not novo_email:
-                    erros.append("❌ Email é obrigatório")
-                if tipo_usuario == "cliente" and not cliente_vinculado:
-                    erros.append("❌ Cliente é obrigatório para usuários tipo cliente")
+            if registro_selecionado:
+                idx_selecionado = df_filtrado.index[df_filtrado.apply(lambda x: f"{x['CLIENTE']} - {x['CONTAINER']}" == registro_selecionado, axis=1)].tolist()[0]
+                registro = st.session_state.df_tracking.loc[idx_selecionado]
+                
+                col1, col2 = st.columns([3, 1])
+                
+                with col1:
+                    st.write(f"**Editando:** {registro['CLIENTE']} - {registro['CONTAINER']}")
                 
-                if erros:
-                    for erro in erros:
-                        st.error(erro)
-                else:
-                    # Criar usuário
-                    st.session_state.usuarios_db[novo_usuario] = {
-                        "senha": nova_senha,
-                        "tipo": tipo_usuario,
-                        "cliente_vinculado": cliente_vinculado if tipo_usuario == "cliente" else None,
-                        "nome": novo_nome,
-                        "email": novo_email,
-                        "ativo": True,
-                        "data_criacao": datetime.now().strftime("%d/%m/%Y")
-                    }
-                    
-                    st.success(f"✅ Usuário '{novo_usuario}' criado com sucesso!")
+                with col2:
+                    if st.button("🗑️ Excluir Registro", type="secondary"):
+                        st.session_state.df_tracking = st.session_state.df_tracking.drop(idx_selecionado).reset_index(drop=True)
+                        registrar_mutacao('tracking_del', idx=int(idx_selecionado), container=str(registro['CONTAINER']),
+                                          chave=list(chave_tracking(registro)))
+                        auditar(registro.to_dict(), {})
+                        st.success("🗑️ Registro excluído!")
+                        st.rerun()
+                
+                # Formulário de edição
+                with st.form("editar_tracking"):
+                    col1, col2 = st.columns(2)
                     
-                    # Mostrar dados de acesso
-                    st.info(f"""
-                    🔐 **Dados de Acesso Criados:**
-                    - **Usuário:** {novo_usuario}
-                    - **Senha:** {nova_senha}
-                    - **Tipo:** {tipo_usuario.title()}
-                    {f"- **Cliente:** {cliente_vinculado}" if cliente_vinculado else ""}
+                    with col1:
+                        clientes_disponiveis = list(st.session_state.clientes_db.keys())
+                        cliente_atual_idx = clientes_disponiveis.index(registro['CLIENTE']) if registro['CLIENTE'] in clientes_disponiveis else 0
+                        edit_cliente = st.selectbox("Cliente", clientes_disponiveis, index=cliente_atual_idx)
+                        edit_container = st.text_input("Container", value=registro.get('CONTAINER', ''))
+                        edit_carregamento = st.text_input("Carregamento", value=registro.get('CARREGAMENTO', ''))
+                        edit_embarque = st.text_input("Embarque Navio", value=registro.get('EMBARQUE NAVIO', ''))
+                        edit_saida = st.text_input("Saída Navio", value=registro.get('SAIDA NAVIO', ''))
+                        edit_previsao = st.text_input("Previsão Chegada Porto Destino", value=registro.get('PREVISAO CHEGADA PORTO DESTINO', ''))
                     
-                    📧 Envie essas informações para o usuário por email seguro!
-                    """)
-                    st.rerun()
-    
-    with tab3:
-        st.subheader("📊 Estatísticas de Usuários")
+                    with col2:
+                        edit_chegada = st.text_input("Chegada Porto Destino", value=registro.get('CHEGADA PORTO DESTINO', ''))
+                        edit_canal = st.selectbox("Canal RFB", ['', 'VERDE', 'VERMELHO'], 
+                                                 index=['', 'VERDE', 'VERMELHO'].index(registro.get('CANAL RFB', '')) if registro.get('CANAL RFB', '') in ['', 'VERDE', 'VERMELHO'] else 0)
+                        edit_liberacao = st.text_input("Liberação Porto Destino", value=registro.get('LIBERAÇAO PORTO DESTINO', ''))
+                        edit_chegada_py = st.text_input("Chegada Ciudad del Este PY", value=registro.get('CHEGADA CIUDAD DEL ESTE PY', ''))
+                        edit_descarregamento = st.text_input("Descarregamento", value=registro.get('DESCARREGAMENTO', ''))
+                        edit_status_final = st.selectbox("Status Final:", STATUS_FINAIS, 
+                                                        index=STATUS_FINAIS.index(registro.get('STATUS_FINAL', '')) if registro.get('STATUS_FINAL', '') in STATUS_FINAIS else 0)
+                        
+                    if st.form_submit_button("💾 Salvar Alterações", type="primary"):
+                        if not edit_cliente or not edit_container:
+                            st.error("❌ Cliente e Container são obrigatórios!")
+                        else:
+                            # Criar dicionário com os novos valores
+                            novos_valores = {
+                                'CLIENTE': edit_cliente,
+                                'CONTAINER': edit_container,
+                                'CARREGAMENTO': edit_carregamento,
+                                'EMBARQUE NAVIO': edit_embarque,
+                                'SAIDA NAVIO': edit_saida,
+                                'PREVISAO CHEGADA PORTO DESTINO': edit_previsao,
+                                'CHEGADA PORTO DESTINO': edit_chegada,
+                                'CANAL RFB': edit_canal,
+                                'LIBERAÇAO PORTO DESTINO': edit_liberacao,
+                                'CHEGADA CIUDAD DEL ESTE PY': edit_chegada_py,
+                                'DESCARREGAMENTO': edit_descarregamento
+                            }
+                            
+                            # Adicionar STATUS_FINAL se existir
+                            if 'edit_status_final' in locals():
+                                novos_valores['STATUS_FINAL'] = edit_status_final
+                            
+                            # Valores anteriores copiados antes da escrita (registro pode ser uma view do df)
+                            anterior = registro.to_dict()
+                            container_anterior = str(registro['CONTAINER'])
+                            for coluna, valor in novos_valores.items():
+                                if coluna in st.session_state.df_tracking.columns:
+                                    st.session_state.df_tracking.loc[idx_selecionado, coluna] = valor
+                            registrar_mutacao(
+                                'tracking_edit',
+                                idx=int(idx_selecionado),
+                                container=container_anterior,
+                                chave=list(chave_tracking(anterior)),
+                                valores={c: v for c, v in novos_valores.items() if c in st.session_state.df_tracking.columns}
+                            )
+                            notificar_transicoes(anterior, novos_valores)
+                            auditar(anterior, novos_valores)
+                            
+                            st.success("✅ Registro atualizado!")
+                            st.rerun()
+
+@st.fragment
+def fragmento_atualizar_marcos():
+    """Atualização de marcos em lote a partir de planilhas de terminais/armadores (fragmento)"""
+    from analise_transito import COLUNAS_DATA
+    from atualizacao_marcos import (PREENCHER, REGRAS_PADRAO, SOBRESCREVER, detectar_mapeamento,
+                                    ler_linhas, montar_plano, mudancas, relatorio_csv)
+    registrar_atividade()
+    
+    with st.expander("📥 Atualizar Marcos por Arquivo"):
+        resultado = st.session_state.pop('resultado_marcos', None)
+        if resultado:
+            st.success(resultado)
         
-        total_usuarios = len(st.session_state.usuarios_db)
-        usuarios_ativos = sum(1 for u in st.session_state.usuarios_db.values() if u["ativo"])
-        admins = sum(1 for u in st.session_state.usuarios_db.values() if u["tipo"] == "admin")
-        clientes_usuarios = sum(1 for u in st.session_state.usuarios_db.values() if u["tipo"] == "cliente")
+        arquivo = st.file_uploader(
+            "Planilha do terminal/armador (CSV ou XLSX)",
+            type=['csv', 'xlsx'],
+            key=f"arquivo_marcos_{st.session_state.get('lote_marcos', 0)}"
+        )
+        if arquivo is None:
+            st.caption("Os containers são casados pelo número (sem espaços/traços). Colunas como ETA, ATA e Release são reconhecidas automaticamente.")
+            return
         
-        col1, col2, col3, col4 = st.columns(4)
+        try:
+            cabecalho, _ = ler_linhas(arquivo, arquivo.name)
+        except Exception as e:
+            st.error(f"❌ Não foi possível ler o arquivo: {str(e)}")
+            return
+        if not cabecalho:
+            st.warning("⚠️ Arquivo vazio")
+            return
+        
+        coluna_container, detectado = detectar_mapeamento(cabecalho)
+        col1, col2 = st.columns(2)
+        with col1:
+            coluna_container = st.selectbox(
+                "Coluna do container", cabecalho,
+                index=cabecalho.index(coluna_container) if coluna_container in cabecalho else 0,
+                key="marcos_coluna_container"
+            )
+        with col2:
+            sobrescrever = st.multiselect(
+                "Sobrescrever datas já preenchidas em", COLUNAS_DATA,
+                default=[coluna for coluna, regra in REGRAS_PADRAO.items() if regra == SOBRESCREVER],
+                key="marcos_sobrescrever"
+            )
+        
+        # Mapeamento coluna do arquivo -> marco (pré-preenchido pelos sinônimos conhecidos)
+        ignorar = "(ignorar)"
+        mapeamento = {}
+        outras = [coluna for coluna in cabecalho if coluna and coluna != coluna_container]
+        colunas_tela = st.columns(min(4, max(1, len(outras))))
+        for i, origem in enumerate(outras):
+            opcoes = [ignorar] + COLUNAS_DATA
+            with colunas_tela[i % len(colunas_tela)]:
+                destino = st.selectbox(
+                    f"{origem} →", opcoes,
+                    index=opcoes.index(detectado[origem]) if origem in detectado else 0,
+                    key=f"marcos_mapa_{origem}"
+                )
+            if destino != ignorar:
+                mapeamento[origem] = destino
         
+        if not mapeamento:
+            st.info("ℹ️ Selecione ao menos uma coluna de data do arquivo")
+            return
+        if len(set(mapeamento.values())) < len(mapeamento):
+            st.warning("⚠️ Mais de uma coluna do arquivo aponta para o mesmo marco: vale a última")
+        
+        regras = {coluna: SOBRESCREVER if coluna in sobrescrever else PREENCHER for coluna in COLUNAS_DATA}
+        _, linhas = ler_linhas(arquivo, arquivo.name)
+        plano = montar_plano(st.session_state.df_tracking, linhas, coluna_container, mapeamento, regras)
+        gravar = mudancas(plano)
+        
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("👥 Total", total_usuarios)
+            st.metric("📄 Linhas lidas", plano['linhas'])
         with col2:
-            st.metric("✅ Ativos", usuarios_ativos)
+            st.metric("✏️ Datas a gravar", len(gravar))
         with col3:
-            st.metric("👑 Admins", admins)
+            st.metric("📦 Trackings afetados", gravar['posicao'].nunique())
         with col4:
-            st.metric("👤 Clientes", clientes_usuarios)
+            st.metric("❓ Não encontrados", len(plano['nao_encontrados']))
+        
+        if plano['encerrados']:
+            st.warning(f"⚠️ {len(plano['encerrados'])} container(s) com processo encerrado (ignorados): {', '.join(plano['encerrados'][:20])}")
+        if plano['ambiguos']:
+            st.warning(f"⚠️ {len(plano['ambiguos'])} container(s) com mais de um tracking em aberto (ignorados): {', '.join(plano['ambiguos'][:20])}")
+        if not plano['invalidos'].empty:
+            st.warning(f"⚠️ {len(plano['invalidos'])} data(s) inválida(s) ignorada(s)")
+        if plano['nao_encontrados']:
+            st.caption(f"Não encontrados: {', '.join(plano['nao_encontrados'][:50])}")
+        
+        if plano['alteracoes'].empty:
+            st.info("✅ Nenhuma mudança: os trackings já estão com as datas do arquivo")
+        else:
+            st.dataframe(plano['alteracoes'].drop(columns='posicao'), use_container_width=True, hide_index=True)
+        
+        st.download_button(
+            "📄 Baixar Relatório de Mudanças (CSV)",
+            relatorio_csv(plano),
+            file_name=f"atualizacao_marcos_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+            mime="text/csv"
+        )
+        
+        if st.button(f"✅ Aplicar {len(gravar)} data(s)", type="primary", disabled=gravar.empty):
+            aplicar_atualizacao_marcos(plano)
+            st.session_state.lote_marcos = st.session_state.get('lote_marcos', 0) + 1
+            st.rerun()
+
+def aplicar_atualizacao_marcos(plano):
+    """Aplica o plano de uma vez: um DataFrame novo, uma entrada no WAL e um único backup"""
+    from atualizacao_marcos import aplicar_plano
+    
+    anterior = st.session_state.df_tracking
+    novo, edicoes = aplicar_plano(anterior, plano)
+    if not edicoes:
+        return
+    st.session_state.df_tracking = novo
+    registrar_mutacao('tracking_edit_lote', edicoes=edicoes)
+    for edicao in edicoes:
+        registro = anterior.loc[edicao['idx']].to_dict()
+        notificar_transicoes(registro, edicao['valores'])
+        auditar(registro, edicao['valores'])
+    
+    mensagem = f"✅ {sum(len(e['valores']) for e in edicoes)} data(s) gravada(s) em {len(edicoes)} tracking(s)"
+    if 'github_token' in st.session_state:
+        if executar_backup_github():
+            mensagem += " • backup realizado"
+    st.session_state.resultado_marcos = mensagem
+
+@st.fragment
+def fragmento_historico(usuario_info):
+    """Busca no arquivo histórico (lê só as partições necessárias)"""
+    from datetime import date
+    registrar_atividade()
+    
+    arquivo = obter_arquivo_historico()
+    particoes = arquivo.particoes()
+    if not particoes:
+        st.info(f"📭 Nenhum processo arquivado. Processos encerrados há mais de {IDADE_ARQUIVO_DIAS} dias são arquivados automaticamente.")
+        return
+    
+    st.caption(f"📦 {len(particoes)} mês(es) arquivado(s): {particoes[0]} a {particoes[-1]}")
+    
+    with st.form("form_historico"):
+        col1, col2 = st.columns(2)
+        with col1:
+            texto = st.text_input("Container ou cliente", placeholder="Digite para buscar no histórico...")
+        with col2:
+            usar_periodo = st.checkbox("Filtrar por período")
+            periodo = st.date_input("Período (último marco)", value=(date.today() - timedelta(days=365), date.today()), format="DD/MM/YYYY")
+        buscar = st.form_submit_button("🔎 Buscar no histórico")
+    
+    if not buscar:
+        return
+    
+    clientes = clientes_do_usuario(usuario_info)
+    if usar_periodo and isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+        resultado = arquivo.carregar_intervalo(periodo[0], periodo[1], clientes)
+        if texto.strip() and not resultado.empty:
+            mascara = (resultado['CONTAINER'].astype(str).str.contains(texto.strip(), case=False, regex=False)
+                       | resultado['CLIENTE'].astype(str).str.contains(texto.strip(), case=False, regex=False))
+            resultado = resultado[mascara]
+    elif texto.strip():
+        resultado = arquivo.buscar(texto, clientes)
+    else:
+        st.warning("⚠️ Informe um container/cliente ou marque o período")
+        return
+    
+    if resultado.empty:
+        st.info("🔍 Nenhum processo encontrado no histórico")
+    else:
+        st.success(f"✅ {len(resultado)} processo(s) encontrado(s)")
+        st.dataframe(resultado, use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO or None)
+def fragmento_atualizacao_ao_vivo():
+    """Verifica periodicamente o feed de alterações; só reexecuta o app se houver novidades"""
+    if sincronizar_alteracoes():
+        # Reexecução por alteração de outra sessão: não conta como uso desta
+        st.session_state.rerun_automatico = True
+        st.rerun()
+    if INTERVALO_ATUALIZACAO:
+        st.caption(f"🟢 Ao vivo · atualizado às {datetime.now().strftime('%H:%M:%S')} · versão {st.session_state.versao_dados}")
+
+@st.fragment(run_every=60)
+def fragmento_ociosidade():
+    """Mede a memória da sessão e a coloca em espera quando fica ociosa (não conta como uso)"""
+    registro = obter_registro_sessoes()
+    if registro.ociosa(id_sessao()):
+        colocar_em_espera()
+        st.rerun()
+    medir_sessao()
 
 def dashboard_principal():
     """Dashboard principal"""
+    import pandas as pd
+    import plotly.express as px
+    
     usuario_info = st.session_state.usuario_info
 
     # Cabeçalho
@@ -1182,8 +2525,11 @@ def dashboard_principal():
     </div>
     """, unsafe_allow_html=True)
     
+    # Alterações de outras sessões (feed incremental)
+    fragmento_atualizacao_ao_vivo()
+    
     # Badge do usuário e menu
-    col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
+    col1, col2, col3, col_analises, col4, col5 = st.columns([3, 1, 1, 1, 1, 1])
     
     with col1:
         if usuario_info["tipo"] == "admin":
@@ -1202,6 +2548,11 @@ def dashboard_principal():
                 st.session_state.pagina_atual = "usuarios"
                 st.rerun()
         
+        with col_analises:
+            if st.button("📈 Análises"):
+                st.session_state.pagina_atual = "analises"
+                st.rerun()
+        
         with col4:
             if st.button("📊 Dashboard"):
                 st.session_state.pagina_atual = "dashboard"
@@ -1221,6 +2572,9 @@ def dashboard_principal():
     elif st.session_state.pagina_atual == "usuarios" and usuario_info["tipo"] == "admin":
         pagina_usuarios()
         return
+    elif st.session_state.pagina_atual == "analises" and usuario_info["tipo"] == "admin":
+        pagina_analises()
+        return
     
     # Dashboard principal
     sidebar_backup_system()
@@ -1271,6 +2625,8 @@ def dashboard_principal():
                                 
                                 novo_df = pd.DataFrame([novo_tracking])
                                 st.session_state.df_tracking = pd.concat([st.session_state.df_tracking, novo_df], ignore_index=True)
+                                registrar_mutacao('tracking_add', registro=novo_tracking)
+                                auditar({}, novo_tracking)
                                 st.success("✅ Primeiro tracking adicionado!")
                                 st.rerun()
                             else:
@@ -1349,297 +2705,12 @@ def dashboard_principal():
                     previsao = row.get('PREVISAO CHEGADA PORTO DESTINO', 'Não informado')
                     st.write(f"{status_emoji} **{row['CONTAINER']}** - Previsão: {previsao}")
     
-    # Filtros
-    st.subheader("🔍 Filtros")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if usuario_info["tipo"] == "admin":
-            filtro_cliente = st.text_input("Cliente", placeholder="Digite o nome do cliente...")
-        else:
-            filtro_cliente = ""
-    
-    with col2:
-        filtro_container = st.text_input("Container", placeholder="Digite o número do container...")
-    
-    with col3:
-        filtro_canal = st.selectbox("Canal RFB", ['Todos', 'VERDE', 'VERMELHO'])
-    
-    # Aplicar filtros
-    df_filtrado = df_usuario.copy()
+    # Filtros, cards e tabela
+    fragmento_trackings(usuario_info)
     
-    if filtro_cliente and usuario_info["tipo"] == "admin":
-        df_filtrado = df_filtrado[df_filtrado['CLIENTE'].str.contains(filtro_cliente, case=False, na=False)]
-    
-    if filtro_container:
-        df_filtrado = df_filtrado[df_filtrado['CONTAINER'].str.contains(filtro_container, case=False, na=False)]
-    
-    if filtro_canal != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['CANAL RFB'] == filtro_canal]
-    
-    # Tabela principal
-    titulo_tabela = f"📋 Lista de Trackings ({len(df_filtrado)} registros)" if usuario_info["tipo"] == "admin" else f"📋 Seus Trackings ({len(df_filtrado)} registros)"
-    st.subheader(titulo_tabela)
-    
-    if not df_filtrado.empty:
-        # Criar DataFrame com emojis para melhor visualização mobile
-        df_display = df_filtrado.copy()
-        
-        # Aplicar emojis para identificar status
-        for idx, row in df_display.iterrows():
-            if row['CANAL RFB'] == 'VERDE':
-                df_display.loc[idx, 'CANAL RFB'] = '🟢 VERDE'
-            elif row['CANAL RFB'] == 'VERMELHO':
-                df_display.loc[idx, 'CANAL RFB'] = '🔴 VERMELHO'
-            elif row['CANAL RFB'] == '':
-                df_display.loc[idx, 'CANAL RFB'] = '⏳ PENDENTE'
-        
-        # Mostrar dados - Versão Mobile-First
-        st.markdown("### 📊 Dados dos Trackings:")
-
-        # Cards para mobile
-        for idx, row in df_display.iterrows():
-            # Definir cores e emoji baseado no status
-            if 'VERDE' in str(row['CANAL RFB']):
-                card_color = "#e8f5e8"
-                border_color = "#28a745"
-                status_emoji = "🟢"
-            elif 'VERMELHO' in str(row['CANAL RFB']):
-                card_color = "#f8e8e8"
-                border_color = "#dc3545"
-                status_emoji = "🔴"
-            else:
-                card_color = "#fff8e1"
-                border_color = "#ffc107"
-                status_emoji = "⏳"
-            
-            # Usar container do Streamlit ao invés de HTML puro
-            with st.container():
-                st.markdown(f"""
-                <div style='
-                    background-color: {card_color}; 
-                    border: 2px solid {border_color}; 
-                    border-radius: 10px;
-                    padding: 15px; 
-                    margin: 15px 0; 
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                '>
-                    <h3 style='color: #000000; margin: 0 0 15px 0;'>
-                        {status_emoji} 📦 {row['CONTAINER']} - {row['CLIENTE']}
-                    </h3>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Usar colunas do Streamlit para os dados
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write(f"**📊 Status:** {row.get('CANAL RFB', 'Pendente')}")
-                    st.write(f"**📅 Carregamento:** {row.get('CARREGAMENTO', 'Não informado')}")
-                    st.write(f"**🚢 Embarque:** {row.get('EMBARQUE NAVIO', 'Não informado')}")
-                    st.write(f"**📍 Previsão Porto Destino:** {row.get('PREVISAO CHEGADA PORTO DESTINO', 'Não informado')}")
-                
-                with col2:
-                    st.write(f"**✅ Chegada Porto Destino:** {row.get('CHEGADA PORTO DESTINO', 'Não informado')}")
-                    st.write(f"**🔓 Liberação:** {row.get('LIBERAÇAO PORTO DESTINO', 'Não informado')}")
-                    st.write(f"**🚛 Chegada Ciudad del Este:** {row.get('CHEGADA CIUDAD DEL ESTE PY', 'Não informado')}")
-                    st.write(f"**📦 Descarregamento:** {row.get('DESCARREGAMENTO', 'Não informado')}")
-
-                # ADICIONAR AQUI (depois do col2):
-                # Badge de status final
-                if row.get('STATUS_FINAL'):
-                    if 'SUCESSO' in row['STATUS_FINAL']:
-                        status_color = "#d4edda"  # Verde claro
-                        status_border = "#28a745"  # Verde
-                    elif 'PENDÊNCIAS' in row['STATUS_FINAL']:
-                        status_color = "#fff3cd"  # Amarelo claro  
-                        status_border = "#ffc107"  # Amarelo
-                    elif 'CANCELADO' in row['STATUS_FINAL']:
-                        status_color = "#f8d7da"  # Vermelho claro
-                        status_border = "#dc3545"  # Vermelho
-                    else:
-                        status_color = "#e2e3e5"  # Cinza
-                        status_border = "#6c757d"  # Cinza
-                        
-                    st.markdown(f"""
-                    <div style='background: {status_color}; border: 2px solid {status_border}; 
-                                 padding: 8px; border-radius: 5px; margin: 10px 0; text-align: center;'>
-                        <strong>{row['STATUS_FINAL']}</strong>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                st.markdown("---")
-
-        # Opção de tabela tradicional
-        st.markdown("### 📊 Dados dos Trackings")
-        st.write(f"**Registros encontrados:** {len(df_filtrado)}")
-        
-        if not df_filtrado.empty:
-            # Criar uma versão simplificada dos dados para exibição
-            df_display_simples = df_filtrado.copy()
-            
-            # Renomear colunas para nomes mais curtos se necessário
-            df_display_simples = df_display_simples.rename(columns={
-                'PREVISAO CHEGADA PORTO DESTINO': 'PREVISAO',
-                'CHEGADA PORTO DESTINO': 'CHEGADA',
-                'LIBERAÇAO PORTO DESTINO': 'LIBERACAO',
-                'CHEGADA CIUDAD DEL ESTE PY': 'CHEGADA PY'
-            })
-            
-            # Exibir com configuração simples
-            st.dataframe(
-                df_display_simples,
-                use_container_width=True,
-                hide_index=True
-            )
-        else:
-            st.info("🔍 Nenhum registro encontrado com os filtros aplicados.")
-
-        # Legenda
-        st.info("🟢 Verde = Liberado | 🔴 Vermelho = Inspeção | ⏳ Pendente = Aguardando")
-        
-        # Download dos dados
-        csv = df_filtrado.to_csv(index=False)
-        nome_arquivo = f"tracking_todos_{datetime.now().strftime('%Y%m%d')}.csv" if usuario_info["tipo"] == "admin" else f"tracking_{usuario_info['nome'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv"
-        label_download = "💾 Baixar Todos os Dados (CSV)" if usuario_info["tipo"] == "admin" else "💾 Baixar Seus Dados (CSV)"
-        
-        st.download_button(
-            label=label_download,
-            data=csv,
-            file_name=nome_arquivo,
-            mime="text/csv"
-        )
-        
-        # Formulário para novo registro (só admin)
-        if usuario_info["tipo"] == "admin":
-            with st.expander("➕ Adicionar Novo Tracking"):
-                if not st.session_state.clientes_db:
-                    st.warning("⚠️ Cadastre clientes primeiro! Use o menu 'Clientes' acima.")
-                else:
-                    with st.form("novo_tracking"):
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            clientes_disponiveis = list(st.session_state.clientes_db.keys())
-                            cliente_selecionado = st.selectbox("Cliente *", clientes_disponiveis)
-                            container = st.text_input("Container *", placeholder="ex: TCLU1234567")
-                            carregamento = st.text_input("Carregamento", placeholder="DD/MM/AAAA")
-                            embarque = st.text_input("Embarque Navio", placeholder="DD/MM/AAAA")
-                            saida = st.text_input("Saída Navio", placeholder="DD/MM/AAAA")
-                            previsao = st.text_input("Previsão Chegada Porto Destino", placeholder="DD/MM/AAAA")
-                        
-                        with col2:
-                            chegada = st.text_input("Chegada Porto Destino", placeholder="DD/MM/AAAA")
-                            canal_rfb = st.selectbox("Canal RFB", ['', 'VERDE', 'VERMELHO'])
-                            liberacao = st.text_input("Liberação Porto Destino", placeholder="DD/MM/AAAA")
-                            chegada_py = st.text_input("Chegada Ciudad del Este PY", placeholder="DD/MM/AAAA")
-                            descarregamento = st.text_input("Descarregamento", placeholder="DD/MM/AAAA")
-                        
-                        submitted = st.form_submit_button("💾 Salvar Tracking", type="primary")
-                        
-                        if submitted:
-                            if not cliente_selecionado or not container:
-                                st.error("❌ Cliente e Container são obrigatórios!")
-                            else:
-                                novo_registro = {
-                                    'CLIENTE': cliente_selecionado,
-                                    'CONTAINER': container,
-                                    'CARREGAMENTO': carregamento,
-                                    'EMBARQUE NAVIO': embarque,
-                                    'SAIDA NAVIO': saida,
-                                    'PREVISAO CHEGADA PORTO DESTINO': previsao,
-                                    'CHEGADA PORTO DESTINO': chegada,
-                                    'CANAL RFB': canal_rfb,
-                                    'LIBERAÇAO PORTO DESTINO': liberacao,
-                                    'CHEGADA CIUDAD DEL ESTE PY': chegada_py,
-                                    'DESCARREGAMENTO': descarregamento
-                                }
-                                
-                                novo_df = pd.DataFrame([novo_registro])
-                                st.session_state.df_tracking = pd.concat([st.session_state.df_tracking, novo_df], ignore_index=True)
-                                st.success("✅ Tracking adicionado!")
-                                st.rerun()
-        
-        # Edição de registros (só admin)
-        if usuario_info["tipo"] == "admin":
-            with st.expander("✏️ Editar/Excluir Tracking"):
-                if not df_filtrado.empty:
-                    opcoes_edicao = [f"{row['CLIENTE']} - {row['CONTAINER']}" for _, row in df_filtrado.iterrows()]
-                    registro_selecionado = st.selectbox("Selecione o registro para editar:", opcoes_edicao)
-                    
-                    if registro_selecionado:
-                        idx_selecionado = df_filtrado.index[df_filtrado.apply(lambda x: f"{x['CLIENTE']} - {x['CONTAINER']}" == registro_selecionado, axis=1)].tolist()[0]
-                        registro = st.session_state.df_tracking.loc[idx_selecionado]
-                        
-                        col1, col2 = st.columns([3, 1])
-                        
-                        with col1:
-                            st.write(f"**Editando:** {registro['CLIENTE']} - {registro['CONTAINER']}")
-                        
-                        with col2:
-                            if st.button("🗑️ Excluir Registro", type="secondary"):
-                                st.session_state.df_tracking = st.session_state.df_tracking.drop(idx_selecionado).reset_index(drop=True)
-                                st.success("🗑️ Registro excluído!")
-                                st.rerun()
-                        
-                        # Formulário de edição
-                        with st.form("editar_tracking"):
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                clientes_disponiveis = list(st.session_state.clientes_db.keys())
-                                cliente_atual_idx = clientes_disponiveis.index(registro['CLIENTE']) if registro['CLIENTE'] in clientes_disponiveis else 0
-                                edit_cliente = st.selectbox("Cliente", clientes_disponiveis, index=cliente_atual_idx)
-                                edit_container = st.text_input("Container", value=registro.get('CONTAINER', ''))
-                                edit_carregamento = st.text_input("Carregamento", value=registro.get('CARREGAMENTO', ''))
-                                edit_embarque = st.text_input("Embarque Navio", value=registro.get('EMBARQUE NAVIO', ''))
-                                edit_saida = st.text_input("Saída Navio", value=registro.get('SAIDA NAVIO', ''))
-                                edit_previsao = st.text_input("Previsão Chegada Porto Destino", value=registro.get('PREVISAO CHEGADA PORTO DESTINO', ''))
-                            
-                            with col2:
-                                edit_chegada = st.text_input("Chegada Porto Destino", value=registro.get('CHEGADA PORTO DESTINO', ''))
-                                edit_canal = st.selectbox("Canal RFB", ['', 'VERDE', 'VERMELHO'], 
-                                                         index=['', 'VERDE', 'VERMELHO'].index(registro.get('CANAL RFB', '')) if registro.get('CANAL RFB', '') in ['', 'VERDE', 'VERMELHO'] else 0)
-                                edit_liberacao = st.text_input("Liberação Porto Destino", value=registro.get('LIBERAÇAO PORTO DESTINO', ''))
-                                edit_chegada_py = st.text_input("Chegada Ciudad del Este PY", value=registro.get('CHEGADA CIUDAD DEL ESTE PY', ''))
-                                edit_descarregamento = st.text_input("Descarregamento", value=registro.get('DESCARREGAMENTO', ''))
-                                edit_status_final = st.selectbox("Status Final:", STATUS_FINAIS, 
-                                                                index=STATUS_FINAIS.index(registro.get('STATUS_FINAL', '')) if registro.get('STATUS_FINAL', '') in STATUS_FINAIS else 0)
-                                
-                            if st.form_submit_button("💾 Salvar Alterações", type="primary"):
-                                if not edit_cliente or not edit_container:
-                                    st.error("❌ Cliente e Container são obrigatórios!")
-                                else:
-                                    # Criar dicionário com os novos valores
-                                    novos_valores = {
-                                        'CLIENTE': edit_cliente,
-                                        'CONTAINER': edit_container,
-                                        'CARREGAMENTO': edit_carregamento,
-                                        'EMBARQUE NAVIO': edit_embarque,
-                                        'SAIDA NAVIO': edit_saida,
-                                        'PREVISAO CHEGADA PORTO DESTINO': edit_previsao,
-                                        'CHEGADA PORTO DESTINO': edit_chegada,
-                                        'CANAL RFB': edit_canal,
-                                        'LIBERAÇAO PORTO DESTINO': edit_liberacao,
-                                        'CHEGADA CIUDAD DEL ESTE PY': edit_chegada_py,
-                                        'DESCARREGAMENTO': edit_descarregamento
-                                    }
-                                    
-                                    # Adicionar STATUS_FINAL se existir
-                                    if 'edit_status_final' in locals():
-                                        novos_valores['STATUS_FINAL'] = edit_status_final
-                                    
-                                    # Atualizar usando o dicionário
-                                    for coluna, valor in novos_valores.items():
-                                        if coluna in st.session_state.df_tracking.columns:
-                                            st.session_state.df_tracking.loc[idx_selecionado, coluna] = valor
-                                    
-                                    st.success("✅ Registro atualizado!")
-                                    st.rerun()
-                                
-        
-    else:
-        st.info("🔍 Nenhum registro encontrado com os filtros aplicados.")
+    # Histórico (carregado só quando o usuário busca)
+    with st.expander("🗄️ Histórico de processos arquivados"):
+        fragmento_historico(usuario_info)
     
     # Alertas
     if not df_usuario.empty:
@@ -1652,21 +2723,50 @@ def dashboard_principal():
                 st.warning(f"⚠️ **Atenção:** Você tem {len(containers_vermelho)} container(s) no Canal Vermelho que precisam de acompanhamento!")
             
             with st.expander("Ver Containers no Canal Vermelho"):
-                for _, row in containers_vermelho.iterrows():
-                    if usuario_info["tipo"] == "admin":
-                        st.write(f"🔴 **{row.get('CLIENTE', 'N/A')}** - Container: {row.get('CONTAINER', 'N/A')} - Previsão: {row.get('PREVISAO CHEGADA PORTO DESTINO', 'Não informado')}")
-                    else:
-                        st.write(f"🔴 **Container:** {row.get('CONTAINER', 'N/A')} - **Previsão:** {row.get('PREVISAO CHEGADA PORTO DESTINO', 'Não informado')}")
+                previsoes = containers_vermelho['PREVISAO CHEGADA PORTO DESTINO'].fillna('Não informado')
+                if usuario_info["tipo"] == "admin":
+                    linhas = "🔴 **" + containers_vermelho['CLIENTE'].astype(str) + "** - Container: " + containers_vermelho['CONTAINER'].astype(str) + " - Previsão: " + previsoes.astype(str)
+                else:
+                    linhas = "🔴 **Container:** " + containers_vermelho['CONTAINER'].astype(str) + " - **Previsão:** " + previsoes.astype(str)
+                st.markdown("  \n".join(linhas))
+        
+        # Alertas de prazo por transição de marco
+        alertas_prazo = filtrar_dados_por_cliente(
+            obter_motor_alertas().avaliar(st.session_state.df_tracking, versao=versao_dos_trackings()),
+            usuario_info
+        )
+        
+        if not alertas_prazo.empty:
+            from alertas import agrupar_por_cliente
+            
+            if usuario_info["tipo"] == "admin":
+                st.warning(f"⏰ **Prazos vencidos:** {len(alertas_prazo)} alerta(s) em {alertas_prazo['CLIENTE'].nunique()} cliente(s)!")
+            else:
+                st.warning(f"⏰ **Prazos vencidos:** Você tem {len(alertas_prazo)} alerta(s) de atraso!")
+            
+            for cliente, alertas_cliente in agrupar_por_cliente(alertas_prazo).items():
+                with st.expander(f"⏰ {cliente} ({len(alertas_cliente)})"):
+                    st.dataframe(alertas_cliente.drop(columns=['CLIENTE']), use_container_width=True, hide_index=True)
 
 def main():
     """Função principal da aplicação"""
     # Sempre inicializar o sistema primeiro
     inicializar_sistema()
     
+    # Sessão ociosa: nada é recarregado até o usuário voltar
+    if st.session_state.get('sessao_em_espera'):
+        tela_em_espera()
+        return
+    st.session_state.execucao_automatica = st.session_state.pop('rerun_automatico', False)
+    registrar_atividade()
+    fragmento_ociosidade()
+    
     # Verificar se está logado
     if not st.session_state.logado:
         tela_login()
     else:
+        carregar_dados_sessao()
+        sincronizar_alteracoes()
         dashboard_principal()
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arquivo histórico do Sistema BRIX - Separação entre dados ativos e finalizados
+Processos finalizados/cancelados há mais de N dias saem do df_tracking e vão para
+partições mensais compactadas (gzip). O histórico só é lido sob demanda, uma
+partição por vez, em buscas por container/cliente ou por intervalo de datas.
+
+As partições também vão para o GitHub (um arquivo por mês, fora do backup
+principal): o tracking que sai do conjunto ativo numa instância continua
+disponível, e pesquisável, nas outras e depois de um reinício sem disco.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from analise_transito import converter_datas
+from dados_padrao import MARCOS_TRANSITO
+
+# Status que encerram um processo
+STATUS_ARQUIVAVEIS = ['🎉 PROCESSO FINALIZADO COM SUCESSO', '❌ PROCESSO CANCELADO']
+
+# Idade mínima (dias desde o último marco) para arquivar
+IDADE_ARQUIVO_DIAS = 90
+
+# Identidade de um tracking no arquivo (containers são reutilizados ao longo dos anos)
+CHAVE_TRACKING = ['CLIENTE', 'CONTAINER', 'CARREGAMENTO']
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# SHA no GitHub e resumo do conteúdo local de cada partição na última sincronização
+ARQUIVO_SINCRONIZACAO = "github.json"
+
+
+def data_referencia(df):
+    """Data do último marco preenchido de cada tracking (NaT se nenhum)"""
+    return converter_datas(df, MARCOS_TRANSITO).max(axis=1)
+
+
+def selecionar_arquivaveis(df, idade_dias=IDADE_ARQUIVO_DIAS, agora=None):
+    """Máscara dos trackings finalizados cujo último marco é mais antigo que idade_dias"""
+    if df.empty or 'STATUS_FINAL' not in df.columns:
+        return pd.Series(False, index=df.index)
+    limite = pd.Timestamp(agora or datetime.now()) - pd.Timedelta(days=idade_dias)
+    finalizados = df['STATUS_FINAL'].isin(STATUS_ARQUIVAVEIS)
+    if not finalizados.any():
+        return finalizados
+    referencia = data_referencia(df)
+    return finalizados & referencia.notna() & (referencia < limite)
+
+
+def chaves_tracking(df):
+    """Lista de chaves [CLIENTE, CONTAINER, CARREGAMENTO] das linhas"""
+    return df.reindex(columns=CHAVE_TRACKING).fillna('').astype(str).values.tolist()
+
+
+def _gravar_json_gz(caminho, dados):
+    temporario = caminho.with_suffix('.tmp')
+    with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, separators=(',', ':'), default=str)
+    with open(temporario, 'rb') as arquivo:
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+
+def _gravar_manifesto(caminho, manifesto):
+    """Manifesto fica em JSON simples (pequeno e lido a cada busca)"""
+    temporario = caminho.with_suffix('.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+
+def _resumo_particao(particao):
+    """Entrada do manifesto: linhas, containers e clientes da partição"""
+    return {
+        'linhas': len(particao),
+        'containers': sorted(particao['CONTAINER'].dropna().astype(str).unique().tolist()),
+        'clientes': sorted(particao['CLIENTE'].dropna().astype(str).unique().tolist()),
+    }
+
+
+def _mesmas_linhas(a, b):
+    """Mesmo conteúdo de partição, independente da ordem das linhas"""
+    def linhas(dados):
+        return sorted(json.dumps(dict(zip(dados['colunas'], linha)), sort_keys=True, default=str) for linha in dados['linhas'])
+    return linhas(a) == linhas(b)
+
+
+class ArquivoHistorico:
+    """Partições mensais (AAAA-MM.json.gz) + manifesto com containers/clientes por partição"""
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self._lock = threading.Lock()
+        self._carregar_particao = lru_cache(maxsize=4)(self._ler_particao)
+
+    @property
+    def caminho_manifesto(self):
+        return self.diretorio / ARQUIVO_MANIFESTO
+
+    def manifesto(self):
+        """Resumo das partições: linhas, containers e clientes de cada mês"""
+        if not self.caminho_manifesto.exists():
+            return {}
+        with open(self.caminho_manifesto, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+    def particoes(self):
+        """Nomes das partições existentes (AAAA-MM), da mais antiga à mais recente"""
+        return sorted(self.manifesto())
+
+    def _caminho_particao(self, nome):
+        return self.diretorio / f"{nome}.json.gz"
+
+    def _ler_particao(self, nome):
+        caminho = self._caminho_particao(nome)
+        if not caminho.exists():
+            return pd.DataFrame()
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        return pd.DataFrame(dados['linhas'], columns=dados['colunas'])
+
+    def carregar_particao(self, nome):
+        """Lê uma partição (as últimas lidas ficam em cache)"""
+        return self._carregar_particao(nome).copy()
+
+    def _gravar_particao(self, nome, particao, manifesto):
+        particao = particao.drop_duplicates(subset=[c for c in CHAVE_TRACKING if c in particao.columns], keep='last')
+        particao = particao.astype(object).where(particao.notna(), None)
+        _gravar_json_gz(self._caminho_particao(nome), {
+            'colunas': list(particao.columns),
+            'linhas': particao.values.tolist(),
+        })
+        manifesto[nome] = _resumo_particao(particao)
+
+    def arquivar(self, df):
+        """Grava as linhas nas partições do mês do último marco; retorna quantidade arquivada"""
+        if df.empty:
+            return 0
+        meses = data_referencia(df).dt.strftime('%Y-%m')
+        with self._lock:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            manifesto = self.manifesto()
+            for nome, linhas in df.groupby(meses.values):
+                existente = self._ler_particao(nome)
+                particao = pd.concat([existente, linhas], ignore_index=True) if not existente.empty else linhas
+                self._gravar_particao(nome, particao, manifesto)
+            _gravar_manifesto(self.caminho_manifesto, manifesto)
+            self._carregar_particao.cache_clear()
+        return len(df)
+
+    def reconstruir_manifesto(self):
+        """Refaz o manifesto lendo todas as partições do diretório; retorna o manifesto"""
+        with self._lock:
+            manifesto = {}
+            for caminho in sorted(self.diretorio.glob('*.json.gz')):
+                nome = caminho.name[:-len('.json.gz')]
+                particao = self._ler_particao(nome)
+                manifesto[nome] = _resumo_particao(particao)
+            if manifesto or self.caminho_manifesto.exists():
+                _gravar_manifesto(self.caminho_manifesto, manifesto)
+            self._carregar_particao.cache_clear()
+        return manifesto
+
+    # ------------------------------------------------------------- GitHub ---
+
+    def _resumo_local(self, nome):
+        caminho = self._caminho_particao(nome)
+        if not caminho.exists():
+            return None
+        return hashlib.blake2b(caminho.read_bytes(), digest_size=16).hexdigest()
+
+    def _conteudo_local(self, nome):
+        with gzip.open(self._caminho_particao(nome), 'rt', encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+    def sincronizar_github(self, cliente, tentativas=3):
+        """Envia as partições alteradas aqui e incorpora as alteradas no GitHub; retorna (enviadas, recebidas).
+
+        cliente: ClienteArquivoGitHub (listar/ler/gravar por partição). O arquivo só
+        cresce, então a mesclagem de uma partição é a união das linhas (por
+        CHAVE_TRACKING, a versão local prevalece).
+        """
+        from sincronizacao import ConflitoGitHub
+
+        with self._lock:
+            caminho_registro = self.diretorio / ARQUIVO_SINCRONIZACAO
+            registro = json.loads(caminho_registro.read_text(encoding='utf-8')) if caminho_registro.exists() else {}
+            manifesto = self.manifesto()
+            remotos = cliente.listar()
+            enviadas = recebidas = 0
+
+            for nome in sorted(set(manifesto) | set(remotos)):
+                for _ in range(tentativas):
+                    anterior = registro.get(nome, {})
+                    sha = remotos.get(nome)
+                    if sha and sha != anterior.get('sha'):
+                        # Alterada no GitHub desde a última sincronização: união com a local
+                        remoto, sha = cliente.ler(nome)
+                        local = self._ler_particao(nome)
+                        linhas = pd.DataFrame(remoto['linhas'], columns=remoto['colunas'])
+                        unida = pd.concat([linhas, local], ignore_index=True) if not local.empty else linhas
+                        self.diretorio.mkdir(parents=True, exist_ok=True)
+                        self._gravar_particao(nome, unida, manifesto)
+                        recebidas += 1
+                        enviar = not _mesmas_linhas(self._conteudo_local(nome), remoto)
+                    else:
+                        enviar = sha is None or self._resumo_local(nome) != anterior.get('resumo')
+                    if enviar:
+                        try:
+                            sha = cliente.gravar(nome, self._conteudo_local(nome), sha)
+                        except ConflitoGitHub:
+                            remotos = cliente.listar()
+                            continue
+                        enviadas += 1
+                    registro[nome] = {'sha': sha, 'resumo': self._resumo_local(nome)}
+                    break
+                else:
+                    raise ConflitoGitHub(f"Partição {nome} do arquivo histórico não sincronizada após {tentativas} tentativas")
+
+            if recebidas:
+                _gravar_manifesto(self.caminho_manifesto, manifesto)
+                self._carregar_particao.cache_clear()
+            if registro:
+                _gravar_manifesto(caminho_registro, registro)
+        return enviadas, recebidas
+
+    def buscar(self, texto='', clientes=None):
+        """Busca por container/cliente lendo só as partições que podem conter o texto"""
+        texto = str(texto or '').strip().upper()
+        resultados = []
+        for nome, info in sorted(self.manifesto().items()):
+            if clientes is not None and not set(info['clientes']) & set(clientes):
+                continue
+            if texto and not any(texto in c.upper() for c in info['containers'] + info['clientes']):
+                continue
+            particao = self.carregar_particao(nome)
+            if clientes is not None:
+                particao = particao[particao['CLIENTE'].isin(clientes)]
+            if texto:
+                mascara = (particao['CONTAINER'].astype(str).str.upper().str.contains(texto, regex=False)
+                           | particao['CLIENTE'].astype(str).str.upper().str.contains(texto, regex=False))
+                particao = particao[mascara]
+            resultados.append(particao)
+        return pd.concat(resultados, ignore_index=True) if resultados else pd.DataFrame()
+
+    def carregar_intervalo(self, inicio, fim, clientes=None):
+        """Trackings cujo último marco está entre inicio e fim (lê só os meses do intervalo)"""
+        inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+        meses = set(pd.period_range(inicio, fim, freq='M').strftime('%Y-%m'))
+        resultados = []
+        for nome in self.particoes():
+            if nome not in meses:
+                continue
+            particao = self.carregar_particao(nome)
+            if clientes is not None:
+                particao = particao[particao['CLIENTE'].isin(clientes)]
+            referencia = data_referencia(particao)
+            resultados.append(particao[(referencia >= inicio) & (referencia <= fim)])
+        return pd.concat(resultados, ignore_index=True) if resultados else pd.DataFrame()
+
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Atualização de marcos em lote - Sistema BRIX
+Planilhas de terminais e armadores (CSV/XLSX) são lidas linha a linha e
+casadas com os trackings por hash join no número do container normalizado
+(maiúsculas, só letras e dígitos). Só as colunas de data mapeadas são
+alteradas, conforme a regra de cada uma: preencher apenas vazios ou
+sobrescrever. O resultado é um plano (relatório de mudanças) aplicado ao
+DataFrame de uma vez, com uma única entrada no WAL.
+"""
+
+import codecs
+import csv
+import re
+import unicodedata
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from analise_transito import COLUNAS_DATA, COLUNA_PREVISAO
+from dados_padrao import FORMATO_DATA
+from persistencia import chave_tracking
+
+# Regras por coluna
+PREENCHER = 'preencher'        # só grava se o tracking ainda não tem a data
+SOBRESCREVER = 'sobrescrever'  # grava sempre que o valor do arquivo for diferente
+
+# ETA muda a cada atualização do armador; marcos realizados só são preenchidos
+REGRAS_PADRAO = {coluna: PREENCHER for coluna in COLUNAS_DATA}
+REGRAS_PADRAO[COLUNA_PREVISAO] = SOBRESCREVER
+
+# Cabeçalhos usuais dos arquivos (normalizados) -> coluna do tracking
+SINONIMOS = {
+    'CONTAINER': ['CONTAINER', 'CONTAINER NO', 'CONTAINER NUMBER', 'CONTENEDOR', 'CNTR', 'CNTR NO', 'EQUIPMENT', 'UNIDADE'],
+    'CARREGAMENTO': ['CARREGAMENTO', 'LOADING', 'LOADING DATE', 'STUFFING', 'ESTUFAGEM', 'GATE IN'],
+    'EMBARQUE NAVIO': ['EMBARQUE NAVIO', 'EMBARQUE', 'LOADED ON BOARD', 'ON BOARD', 'SHIPPED ON BOARD'],
+    'SAIDA NAVIO': ['SAIDA NAVIO', 'SAIDA', 'ATD', 'DEPARTURE', 'VESSEL DEPARTURE', 'ZARPE'],
+    COLUNA_PREVISAO: [COLUNA_PREVISAO, 'PREVISAO', 'PREVISAO CHEGADA', 'ETA', 'ETA POD', 'ESTIMATED ARRIVAL'],
+    'CHEGADA PORTO DESTINO': ['CHEGADA PORTO DESTINO', 'CHEGADA', 'ATA', 'ATA POD', 'ARRIVAL', 'DISCHARGE', 'DESCARGA NAVIO'],
+    'LIBERAÇAO PORTO DESTINO': ['LIBERACAO PORTO DESTINO', 'LIBERACAO', 'RELEASE', 'CUSTOMS RELEASE', 'DESEMBARACO'],
+    'CHEGADA CIUDAD DEL ESTE PY': ['CHEGADA CIUDAD DEL ESTE PY', 'CHEGADA PY', 'CIUDAD DEL ESTE', 'LLEGADA CDE', 'ARRIVAL CDE'],
+    'DESCARREGAMENTO': ['DESCARREGAMENTO', 'UNLOADING', 'DESCONSOLIDACAO', 'DEVOLUCAO VAZIO', 'EMPTY RETURN'],
+}
+
+FORMATOS_DATA = [FORMATO_DATA, '%Y-%m-%d', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M']
+
+COLUNAS_RELATORIO = ['CONTAINER', 'CLIENTE', 'COLUNA', 'ANTERIOR', 'NOVO', 'RESULTADO']
+
+
+def normalizar_container(valor):
+    """'msku 123456-7' -> 'MSKU1234567'"""
+    return re.sub(r'[^A-Z0-9]', '', str(valor or '').upper())
+
+
+def _cabecalho(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).upper()
+    return ' '.join(re.sub(r'[^A-Z0-9]+', ' ', texto).split())
+
+
+def detectar_mapeamento(cabecalho):
+    """(coluna do container no arquivo, {coluna do arquivo: coluna do tracking})"""
+    conhecidos = {_cabecalho(sinonimo): destino for destino, sinonimos in SINONIMOS.items() for sinonimo in sinonimos}
+    coluna_container, mapeamento = None, {}
+    for coluna in cabecalho:
+        destino = conhecidos.get(_cabecalho(coluna))
+        if destino == 'CONTAINER':
+            coluna_container = coluna_container or coluna
+        elif destino and destino not in mapeamento.values():
+            mapeamento[coluna] = destino
+    return coluna_container, mapeamento
+
+
+def normalizar_data(valor):
+    """Data em 'DD/MM/AAAA' ('' se vazio, None se não for uma data)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime(FORMATO_DATA)
+    texto = str(valor).strip()
+    if not texto or texto in ('-', '--'):
+        return ''
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).strftime(FORMATO_DATA)
+        except ValueError:
+            continue
+    return None
+
+
+# ----------------------------------------------------------------- leitura ---
+
+def ler_linhas(arquivo, nome):
+    """(cabeçalho, gerador de dicionários) lendo CSV/XLSX linha a linha (caminho ou arquivo aberto em binário)"""
+    caminho = isinstance(arquivo, str) or hasattr(arquivo, '__fspath__')
+    if not caminho:
+        arquivo.seek(0)
+
+    if str(nome).lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = [str(c).strip() if c is not None else '' for c in next(linhas, [])]
+
+        def gerar():
+            try:
+                for valores in linhas:
+                    if any(v is not None for v in valores):
+                        yield dict(zip(cabecalho, valores))
+            finally:
+                planilha.close()
+        return cabecalho, gerar()
+
+    # CSV de terminais costuma vir com ';' e, quando sai do Excel, em cp1252
+    binario = open(arquivo, 'rb') if caminho else arquivo
+    amostra = binario.read(8192)
+    binario.seek(0)
+    codificacao = 'utf-8-sig'
+    try:
+        amostra.decode(codificacao)
+    except UnicodeDecodeError as e:
+        if e.start < len(amostra) - 4:  # não é só um caractere cortado no fim da amostra
+            codificacao = 'cp1252'
+    try:
+        dialeto = csv.Sniffer().sniff(amostra.decode(codificacao, errors='ignore'), delimiters=';,\t')
+    except csv.Error:
+        dialeto = csv.excel
+    # Decodifica linha a linha sem embrulhar o arquivo (o enviado pelo usuário continua aberto)
+    leitor = csv.reader(codecs.iterdecode(binario, codificacao), dialect=dialeto)
+    cabecalho = [c.strip() for c in next(leitor, [])]
+
+    def gerar():
+        try:
+            for valores in leitor:
+                if any(v.strip() for v in valores):
+                    yield dict(zip(cabecalho, valores))
+        finally:
+            if caminho:
+                binario.close()
+    return cabecalho, gerar()
+
+
+# ------------------------------------------------------------------- plano ---
+
+def indexar_containers(df):
+    """Lado de construção do hash join: container normalizado -> posições no DataFrame"""
+    chaves = df['CONTAINER'].fillna('').astype(str).str.upper().str.replace(r'[^A-Z0-9]', '', regex=True)
+    tabela = {}
+    for posicao, chave in enumerate(chaves.to_numpy(dtype=object)):
+        if chave:
+            tabela.setdefault(chave, []).append(posicao)
+    return tabela
+
+
+def montar_plano(df, linhas, coluna_container, mapeamento, regras=None):
+    """Casa as linhas do arquivo com os trackings e calcula as mudanças.
+
+    Retorna {'alteracoes': DataFrame (COLUNAS_RELATORIO + posicao), 'nao_encontrados',
+    'encerrados', 'ambiguos', 'invalidos', 'linhas', 'repetidos'}. Linhas repetidas
+    do mesmo container: vale a última. Containers com mais de um tracking em aberto
+    ficam de fora (ambíguos); se todos estiverem encerrados, também.
+    """
+    regras = dict(REGRAS_PADRAO, **(regras or {}))
+    tabela = indexar_containers(df)
+    encerrado = (df['STATUS_FINAL'].fillna('') != '').to_numpy() if 'STATUS_FINAL' in df.columns else np.zeros(len(df), bool)
+
+    por_posicao, nao_encontrados, encerrados, ambiguos, invalidos = {}, [], [], [], []
+    lidas = repetidos = 0
+    for numero, linha in enumerate(linhas, start=2):
+        lidas += 1
+        chave = normalizar_container(linha.get(coluna_container))
+        if not chave:
+            continue
+        candidatos = tabela.get(chave)
+        if not candidatos:
+            nao_encontrados.append(chave)
+            continue
+        abertos = [p for p in candidatos if not encerrado[p]]
+        if len(abertos) != 1:
+            (ambiguos if abertos else encerrados).append(chave)
+            continue
+
+        valores = {}
+        for origem, destino in mapeamento.items():
+            data = normalizar_data(linha.get(origem))
+            if data is None:
+                invalidos.append({'LINHA': numero, 'CONTAINER': chave, 'COLUNA': origem, 'VALOR': str(linha.get(origem))})
+            elif data:
+                valores[destino] = data
+        if abertos[0] in por_posicao:
+            repetidos += 1
+        por_posicao.setdefault(abertos[0], {}).update(valores)
+
+    # Comparação vetorizada com os valores atuais (uma linha por célula proposta)
+    posicoes = np.array([p for p, valores in por_posicao.items() for _ in valores], dtype=np.int64)
+    colunas = [c for valores in por_posicao.values() for c in valores]
+    novos = np.array([v for valores in por_posicao.values() for v in valores.values()], dtype=object)
+    alteracoes = pd.DataFrame({
+        'posicao': posicoes,
+        'CONTAINER': df['CONTAINER'].to_numpy(dtype=object)[posicoes] if len(posicoes) else [],
+        'CLIENTE': df['CLIENTE'].to_numpy(dtype=object)[posicoes] if len(posicoes) else [],
+        'COLUNA': colunas,
+        'ANTERIOR': [str(df.iat[p, df.columns.get_loc(c)] or '') if c in df.columns else '' for p, c in zip(posicoes, colunas)],
+        'NOVO': novos,
+    }, columns=['posicao'] + COLUNAS_RELATORIO[:-1])
+    vazio = alteracoes['ANTERIOR'] == ''
+    sobrescreve = alteracoes['COLUNA'].map(regras).eq(SOBRESCREVER)
+    alteracoes['RESULTADO'] = np.select(
+        [alteracoes['ANTERIOR'] == alteracoes['NOVO'], vazio, sobrescreve],
+        ['sem mudança', 'preenchido', 'sobrescrito'],
+        default='mantido (já preenchido)'
+    )
+    alteracoes = alteracoes[alteracoes['RESULTADO'] != 'sem mudança'].reset_index(drop=True)
+
+    return {
+        'alteracoes': alteracoes,
+        'nao_encontrados': sorted(set(nao_encontrados)),
+        'encerrados': sorted(set(encerrados)),
+        'ambiguos': sorted(set(ambiguos)),
+        'invalidos': pd.DataFrame(invalidos, columns=['LINHA', 'CONTAINER', 'COLUNA', 'VALOR']),
+        'linhas': lidas,
+        'repetidos': repetidos,
+    }
+
+
+def mudancas(plano):
+    """Só as células que serão gravadas (preenchidas ou sobrescritas)"""
+    alteracoes = plano['alteracoes']
+    return alteracoes[alteracoes['RESULTADO'].isin(['preenchido', 'sobrescrito'])]
+
+
+def aplicar_plano(df, plano):
+    """(novo DataFrame, edições por tracking) com todas as mudanças aplicadas de uma vez"""
+    gravar = mudancas(plano)
+    if gravar.empty:
+        return df, []
+    largura = gravar.pivot(index='posicao', columns='COLUNA', values='NOVO')
+    novo = df.copy()
+    for coluna in largura.columns:
+        if coluna not in novo.columns:
+            novo[coluna] = ''
+    largura.index = novo.index[largura.index]
+    novo.update(largura)
+
+    edicoes = [{
+        'idx': int(idx),
+        'container': str(df.at[idx, 'CONTAINER']),
+        'chave': list(chave_tracking(df.loc[idx])),
+        'valores': {coluna: valor for coluna, valor in valores.items() if isinstance(valor, str)},
+    } for idx, valores in largura.to_dict('index').items()]
+    return novo, edicoes
+
+
+def relatorio_csv(plano):
+    """Relatório do plano em CSV (mudanças, mantidos e problemas do arquivo)"""
+    linhas = plano['alteracoes'][COLUNAS_RELATORIO]
+    problemas = pd.DataFrame(
+        [{'CONTAINER': c, 'RESULTADO': 'não encontrado'} for c in plano['nao_encontrados']]
+        + [{'CONTAINER': c, 'RESULTADO': 'processo encerrado'} for c in plano['encerrados']]
+        + [{'CONTAINER': c, 'RESULTADO': 'mais de um tracking em aberto'} for c in plano['ambiguos']]
+        + [{'CONTAINER': linha['CONTAINER'], 'COLUNA': linha['COLUNA'], 'NOVO': linha['VALOR'],
+            'RESULTADO': f"data inválida (linha {linha['LINHA']})"} for linha in plano['invalidos'].to_dict('records')],
+        columns=COLUNAS_RELATORIO
+    )
+    return pd.concat([linhas, problemas], ignore_index=True).fillna('').to_csv(index=False)
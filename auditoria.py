@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log de auditoria do Sistema BRIX - Histórico de alterações dos trackings
+Cada mudança de campo vira um registro (momento, tracking, coluna, valor
+antigo, valor novo, usuário) gravado em segmentos append-only. O tracking é
+identificado por cliente, container e carregamento (o número do container é
+reutilizado em outros embarques). Cada segmento tem um índice (período,
+offsets por tracking, por container e por usuário), então as consultas
+"estado do tracking X na data D" e "alterações do usuário U no período" leem
+só as linhas relevantes. A gravação é feita por uma thread própria: o caminho
+de edição apenas enfileira os registros; uma falha de disco é contada e a
+thread continua.
+"""
+
+import json
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Registros por segmento antes de fechá-lo (e gravar o índice em disco)
+REGISTROS_POR_SEGMENTO = 50000
+
+# Índices de segmentos fechados mantidos em memória
+INDICES_EM_CACHE = 16
+
+CAMPOS_REGISTRO = ['momento', 'cliente', 'container', 'carregamento', 'coluna', 'antigo', 'novo', 'usuario']
+
+
+def _id_tracking(chave):
+    return '\t'.join(chave)
+
+
+def _momento(valor):
+    """Momento em texto ISO (ordenável), a partir de datetime/date/str"""
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        return valor
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day, 23, 59, 59)
+    return valor.isoformat(timespec='seconds')
+
+
+def diferencas(anterior, novo):
+    """Pares (coluna, antigo, novo) dos campos que mudaram"""
+    anterior, novo = anterior or {}, novo or {}
+    resultado = []
+    for coluna in list(novo) + [c for c in anterior if c not in novo]:
+        antigo_valor = str(anterior.get(coluna) if anterior.get(coluna) is not None else '')
+        novo_valor = str(novo.get(coluna) if novo.get(coluna) is not None else '')
+        if antigo_valor != novo_valor:
+            resultado.append((coluna, antigo_valor, novo_valor))
+    return resultado
+
+
+def _indice_vazio():
+    return {'inicio': None, 'fim': None, 'registros': 0, 'trackings': {}, 'containers': {}, 'usuarios': {}}
+
+
+def _indexar(indice, offset, registro):
+    momento, container, usuario = registro[0], registro[2], registro[7] or ''
+    indice['inicio'] = momento if indice['inicio'] is None else min(indice['inicio'], momento)
+    indice['fim'] = momento if indice['fim'] is None else max(indice['fim'], momento)
+    indice['registros'] += 1
+    indice['trackings'].setdefault(_id_tracking(registro[1:4]), []).append(offset)
+    indice['containers'].setdefault(container, []).append(offset)
+    indice['usuarios'].setdefault(usuario, []).append(offset)
+
+
+class LogAuditoria:
+    """Segmentos seg-NNNNNN.log (JSON por linha) + seg-NNNNNN.idx.json ao fechar"""
+
+    def __init__(self, diretorio, registros_por_segmento=REGISTROS_POR_SEGMENTO):
+        self.diretorio = Path(diretorio)
+        self.registros_por_segmento = registros_por_segmento
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._indices = OrderedDict()  # Cache dos índices de segmentos fechados
+        self._ativo = None
+        self._indice_ativo = None
+        self._arquivo = None
+        self.falhas = 0           # Registros perdidos por erro de gravação
+        self.ultimo_erro = None
+        self._abrir_segmento_ativo()
+        self._thread = threading.Thread(target=self._gravar_continuamente, name="brix-auditoria", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------ gravação ---
+
+    def registrar(self, chave, anterior, novo, usuario=None, momento=None):
+        """Enfileira as diferenças entre o registro anterior e o novo do tracking 'chave'
+        (cliente, container, carregamento); retorna quantas"""
+        mudancas = diferencas(anterior, novo)
+        if mudancas:
+            momento = _momento(momento or datetime.now())
+            cliente, container, carregamento = (str(v) for v in chave)
+            self._fila.put([[momento, cliente, container, carregamento, coluna, antigo, valor, usuario]
+                            for coluna, antigo, valor in mudancas])
+        return len(mudancas)
+
+    def aguardar(self):
+        """Bloqueia até todos os registros enfileirados estarem gravados"""
+        self._fila.join()
+
+    def _caminho(self, numero, sufixo='.log'):
+        return self.diretorio / f"seg-{numero:06d}{sufixo}"
+
+    def _segmentos(self):
+        return sorted(int(c.name[4:10]) for c in self.diretorio.glob('seg-*.log'))
+
+    def _abrir_segmento_ativo(self):
+        """Último segmento sem índice em disco continua ativo (índice refeito lendo só ele)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        segmentos = self._segmentos()
+        numero = segmentos[-1] if segmentos else 1
+        if segmentos and self._caminho(numero, '.idx.json').exists():
+            numero += 1
+
+        caminho = self._caminho(numero)
+        indice = _indice_vazio()
+        if caminho.exists():
+            valido = 0
+            with open(caminho, 'rb') as arquivo:
+                offset = 0
+                for linha in arquivo:
+                    if not linha.endswith(b'\n'):
+                        break  # Linha incompleta (queda durante a gravação)
+                    try:
+                        _indexar(indice, offset, json.loads(linha))
+                    except ValueError:
+                        break
+                    offset += len(linha)
+                    valido = offset
+            with open(caminho, 'r+b') as arquivo:
+                arquivo.truncate(valido)
+
+        self._ativo = numero
+        self._indice_ativo = indice
+        self._arquivo = open(caminho, 'ab')
+
+    def _fechar_segmento(self):
+        self._arquivo.close()
+        temporario = self._caminho(self._ativo, '.idx.tmp')
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(self._indice_ativo, arquivo, ensure_ascii=False, separators=(',', ':'))
+        temporario.replace(self._caminho(self._ativo, '.idx.json'))
+        self._indices[self._ativo] = self._indice_ativo
+        self._ativo += 1
+        self._indice_ativo = _indice_vazio()
+        self._arquivo = open(self._caminho(self._ativo), 'ab')
+
+    def _gravar_continuamente(self):
+        while True:
+            lotes = [self._fila.get()]
+            while True:
+                try:
+                    lotes.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._lock:
+                    if self._arquivo is None:
+                        self._abrir_segmento_ativo()
+                    for registros in lotes:
+                        for registro in registros:
+                            if self._indice_ativo['registros'] >= self.registros_por_segmento:
+                                self._fechar_segmento()
+                            offset = self._arquivo.tell()
+                            self._arquivo.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+                            _indexar(self._indice_ativo, offset, registro)
+                    self._arquivo.flush()
+            except Exception as e:
+                # Disco cheio, permissão...: o lote é perdido, mas a thread continua.
+                # O segmento é reaberto na próxima gravação (índice refeito do disco)
+                with self._lock:
+                    self.falhas += sum(len(registros) for registros in lotes)
+                    self.ultimo_erro = f"{datetime.now().strftime('%d/%m/%Y %H:%M:%S')} - {e}"
+                    try:
+                        self._arquivo.close()
+                    except Exception:
+                        pass
+                    self._arquivo = None
+            finally:
+                for _ in lotes:
+                    self._fila.task_done()
+
+    # ------------------------------------------------------------ consultas ---
+
+    def _indice(self, numero):
+        if numero == self._ativo:
+            return self._indice_ativo
+        if numero not in self._indices:
+            with open(self._caminho(numero, '.idx.json'), encoding='utf-8') as arquivo:
+                self._indices[numero] = json.load(arquivo)
+            while len(self._indices) > INDICES_EM_CACHE:
+                self._indices.popitem(last=False)
+        self._indices.move_to_end(numero)
+        return self._indices[numero]
+
+    def _ler(self, numero, offsets):
+        registros = []
+        with open(self._caminho(numero), 'rb') as arquivo:
+            for offset in offsets:
+                arquivo.seek(offset)
+                registros.append(dict(zip(CAMPOS_REGISTRO, json.loads(arquivo.readline()))))
+        return registros
+
+    def _consultar(self, chave, valor, inicio=None, fim=None):
+        """Registros com containers/usuarios == valor no período, em ordem de gravação"""
+        inicio, fim = _momento(inicio), _momento(fim)
+        resultado = []
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.flush()
+            for numero in self._segmentos():
+                indice = self._indice(numero)
+                if not indice['registros'] or valor not in indice.get(chave, {}):
+                    continue
+                if (fim and indice['inicio'] > fim) or (inicio and indice['fim'] < inicio):
+                    continue
+                registros = self._ler(numero, list(indice[chave][valor]))
+                resultado.extend(r for r in registros
+                                 if (not inicio or r['momento'] >= inicio) and (not fim or r['momento'] <= fim))
+        return resultado
+
+    def trackings_do_container(self, container, fim=None):
+        """Trackings (cliente, container, carregamento) com alterações registradas para o container"""
+        registros = self._consultar('containers', str(container), fim=fim)
+        return list(dict.fromkeys((r['cliente'], r['container'], r['carregamento']) for r in registros))
+
+    def historico(self, chave, inicio=None, fim=None):
+        """Todas as alterações de um tracking (opcionalmente em um período)"""
+        return self._consultar('trackings', _id_tracking(chave), inicio, fim)
+
+    def estado_em(self, chave, momento):
+        """Valores dos campos do tracking no momento pedido (reaplicando o histórico até ele)"""
+        estado = {}
+        for registro in self._consultar('trackings', _id_tracking(chave), fim=momento):
+            estado[registro['coluna']] = registro['novo']
+        return estado
+
+    def alteracoes_por_usuario(self, usuario, inicio=None, fim=None):
+        """Alterações feitas por um usuário no período"""
+        return self._consultar('usuarios', usuario or '', inicio, fim)
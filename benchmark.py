@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do Sistema BRIX - Tempo de inicialização
+Mede o custo de importação (python -X importtime) e o tempo até a tela de login.
+
+Uso: python benchmark.py [--top 15] [--repeticoes 3]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+DIRETORIO_APP = Path(__file__).resolve().parent
+
+# Cenários de importação (executados em um interpretador novo)
+CENARIOS_IMPORTACAO = {
+    'tela de login (import app)': 'import app',
+    'dashboard (app + pandas + plotly)': 'import app, pandas, plotly.express',
+}
+
+# Renderização da tela de login e do primeiro dashboard, em processo novo
+CODIGO_RENDERIZACAO = '''
+import time
+from streamlit.testing.v1 import AppTest
+t0 = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=120).run()
+t1 = time.perf_counter()
+at.text_input(key="mobile_login_user").input("admin")
+at.text_input(key="mobile_login_pass").input("admin123")
+at.button[0].click().run()
+t2 = time.perf_counter()
+print(f"{t1 - t0:.6f} {t2 - t1:.6f}")
+'''
+
+
+def _ambiente(diretorio_dados):
+    ambiente = dict(os.environ)
+    ambiente['BRIX_DADOS_DIR'] = diretorio_dados
+    ambiente.pop('BRIX_TOKEN', None)  # Benchmark nunca acessa a rede
+    return ambiente
+
+
+def medir_importtime(codigo, diretorio_dados):
+    """Executa o código com -X importtime e retorna (modulo, self_us, cumulativo_us, nivel)"""
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        capture_output=True, text=True, cwd=DIRETORIO_APP, env=_ambiente(diretorio_dados)
+    )
+    modulos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        partes = linha[len('import time:'):].split('|')
+        if len(partes) != 3:
+            continue
+        try:
+            self_us, cumulativo_us = int(partes[0]), int(partes[1])
+        except ValueError:
+            continue  # Cabeçalho
+        nome = partes[2].rstrip()
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        modulos.append((nome.strip(), self_us, cumulativo_us, nivel))
+    return modulos
+
+
+def medir_renderizacao(diretorio_dados):
+    """Retorna (segundos até a tela de login, segundos do login até o dashboard)"""
+    processo = subprocess.run(
+        [sys.executable, '-c', CODIGO_RENDERIZACAO],
+        capture_output=True, text=True, cwd=DIRETORIO_APP, env=_ambiente(diretorio_dados)
+    )
+    ultima_linha = processo.stdout.strip().splitlines()[-1]
+    login, dashboard = ultima_linha.split()
+    return float(login), float(dashboard)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do Sistema BRIX")
+    parser.add_argument('--top', type=int, default=15, help="Módulos mais caros a listar por cenário")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Repetições da renderização")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio_dados:
+        print("=" * 72)
+        print("📦 IMPORTAÇÃO (python -X importtime)")
+        print("=" * 72)
+        for cenario, codigo in CENARIOS_IMPORTACAO.items():
+            modulos = medir_importtime(codigo, diretorio_dados)
+            total_us = sum(m[2] for m in modulos if m[3] == 0)
+            print(f"\n▶ {cenario}: {total_us / 1000:.1f} ms ({len(modulos)} módulos)")
+            print(f"  {'cumulativo (ms)':>16} {'próprio (ms)':>13}  módulo")
+            topo = sorted((m for m in modulos if m[3] <= 1), key=lambda m: m[2], reverse=True)
+            for nome, self_us, cumulativo_us, _ in topo[:args.top]:
+                print(f"  {cumulativo_us / 1000:>16.1f} {self_us / 1000:>13.1f}  {nome}")
+
+        print()
+        print("=" * 72)
+        print("🖥️ RENDERIZAÇÃO (AppTest, processo novo)")
+        print("=" * 72)
+        tempos_login, tempos_dashboard = [], []
+        for _ in range(args.repeticoes):
+            login, dashboard = medir_renderizacao(diretorio_dados)
+            tempos_login.append(login)
+            tempos_dashboard.append(dashboard)
+        print(f"  Tela de login:        mediana {statistics.median(tempos_login) * 1000:8.1f} ms")
+        print(f"  Login -> dashboard:   mediana {statistics.median(tempos_dashboard) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
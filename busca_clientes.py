@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca de clientes do Sistema BRIX - Índice de trigramas tolerante a acentos e erros
+Os nomes (razão social e nome fantasia) são normalizados sem acentos,
+pontuação e sufixos societários ("MASPY S.A." -> "maspy") e quebrados em
+trigramas. A consulta só examina os clientes que compartilham algum trigrama
+com o texto digitado (listas invertidas), então o custo não cresce com o
+total de clientes, e o resultado vem ordenado por similaridade. Como o cliente
+precisa ter uma fração mínima dos trigramas da consulta, basta procurar os
+candidatos nas listas dos trigramas mais raros (filtro de prefixo). Consultas
+com menos de 3 caracteres não formam trigrama interno e são resolvidas com uma
+busca linear por trecho (a lista de clientes é pequena).
+"""
+
+import math
+import re
+import unicodedata
+
+# Tokens ignorados no índice (não ajudam a distinguir clientes)
+SUFIXOS_SOCIETARIOS = {'ltda', 'sa', 'me', 'epp', 'eireli', 'srl', 'cia', 'sac', 'saci'}
+
+# Consultas mais curtas que isto usam a busca linear por trecho
+TAMANHO_MINIMO_TRIGRAMAS = 3
+
+# Fração mínima dos trigramas da consulta presentes no nome para considerar o cliente
+SIMILARIDADE_MINIMA = 0.5
+
+
+def normalizar_nome(texto):
+    """Minúsculas, sem acentos, sem pontuação e sem sufixos societários"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r"[.'`´]", '', texto)  # "S.A." -> "sa", "D'AVILA" -> "davila"
+    tokens = re.sub(r'[^a-z0-9]+', ' ', texto).split()
+    significativos = [t for t in tokens if t not in SUFIXOS_SOCIETARIOS]
+    return ' '.join(significativos or tokens)
+
+
+def trigramas(texto_normalizado):
+    """Trigramas de cada palavra, com bordas marcadas ("  m", " ma", ..., "py ")"""
+    resultado = set()
+    for token in texto_normalizado.split():
+        token = f"  {token} "
+        resultado.update(token[i:i + 3] for i in range(len(token) - 2))
+    return resultado
+
+
+class IndiceClientes:
+    """Listas invertidas trigrama -> clientes, montadas uma vez por versão dos dados"""
+
+    def __init__(self, nomes):
+        """nomes: {cliente: [outros textos que identificam o cliente, ex. nome fantasia]}"""
+        self.clientes = []
+        self._textos = []      # Textos normalizados de cada cliente (razão + apelidos)
+        self._trigramas = []   # Trigramas de cada cliente
+        self._postings = {}
+        for cliente, apelidos in nomes.items():
+            posicao = len(self.clientes)
+            textos = {normalizar_nome(t) for t in [cliente, *(apelidos or [])] if t}
+            grams = set().union(*(trigramas(t) for t in textos)) if textos else set()
+            self.clientes.append(cliente)
+            self._textos.append(textos)
+            self._trigramas.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(posicao)
+
+    def __len__(self):
+        return len(self.clientes)
+
+    def buscar(self, texto, limite=None, similaridade_minima=SIMILARIDADE_MINIMA):
+        """Clientes compatíveis com o texto, do mais para o menos parecido: [(cliente, nota)]"""
+        consulta = normalizar_nome(texto)
+        if consulta and len(consulta) < TAMANHO_MINIMO_TRIGRAMAS:
+            return self._buscar_trecho(consulta, limite)
+        grams = trigramas(consulta)
+        if not grams:
+            return []
+
+        # Quem tem a fração mínima dos trigramas aparece em pelo menos uma destas listas
+        necessarios = max(1, math.ceil(similaridade_minima * len(grams)))
+        raros = sorted(grams, key=lambda g: len(self._postings.get(g, ())))[:len(grams) - necessarios + 1]
+        candidatos = set()
+        for gram in raros:
+            candidatos.update(self._postings.get(gram, ()))
+
+        resultado = []
+        for posicao in candidatos:
+            comuns = len(grams & self._trigramas[posicao])
+            palavras = [f" {t}" for t in self._textos[posicao]]
+            if any(f" {consulta}" in t for t in palavras):
+                nota = 1.0  # Início de palavra do nome
+            elif any(consulta in t for t in palavras):
+                nota = 0.95  # Trecho no meio de uma palavra
+            else:
+                cobertura = comuns / len(grams)
+                if cobertura < similaridade_minima:
+                    continue
+                nota = 0.9 * cobertura
+            # Desempate: nomes mais curtos (mais próximos do digitado) primeiro
+            nota += 0.05 * 2 * comuns / (len(grams) + len(self._trigramas[posicao]))
+            resultado.append((self.clientes[posicao], round(nota, 4)))
+
+        resultado.sort(key=lambda item: (-item[1], item[0]))
+        return resultado[:limite] if limite else resultado
+
+    def _buscar_trecho(self, consulta, limite):
+        """Busca linear por trecho para consultas curtas ("as" encontra "MASPY")"""
+        resultado = []
+        for cliente, textos in zip(self.clientes, self._textos):
+            palavras = [f" {t}" for t in textos]
+            if any(f" {consulta}" in t for t in palavras):
+                nota = 1.0
+            elif any(consulta in t for t in palavras):
+                nota = 0.95
+            else:
+                continue
+            # Desempate: nomes mais curtos primeiro
+            nota += 0.05 / (1 + min(len(t) for t in textos))
+            resultado.append((cliente, round(nota, 4)))
+
+        resultado.sort(key=lambda item: (-item[1], item[0]))
+        return resultado[:limite] if limite else resultado
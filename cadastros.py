@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cadastros do Sistema BRIX - Registro tipado de clientes e usuários
+Cada cliente/usuário é um objeto com __slots__ (sem um dict por registro) que
+continua acessível como dicionário (dados['ativo'], dados.get('email')), então
+o restante do app não muda. O registro mantém índices secundários (tipo,
+ativo, cliente vinculado) atualizados a cada alteração, de modo que os
+totais das estatísticas são contagens O(1). para_dict()/o construtor
+convertem de/para o formato do backup sem perda (campos desconhecidos são
+preservados e campos ausentes continuam ausentes).
+"""
+
+import copy
+from collections.abc import Mapping, MutableMapping
+
+# Marca de campo ausente (diferente de None, que é um valor válido)
+_AUSENTE = object()
+
+
+class _Entidade(MutableMapping):
+    """Base dos registros: campos conhecidos em slots, extras em um dict"""
+
+    __slots__ = ('_registro', '_chave', '_extras')
+    CAMPOS = ()
+
+    def __init__(self, dados=None, **campos):
+        object.__setattr__(self, '_registro', None)
+        object.__setattr__(self, '_chave', None)
+        object.__setattr__(self, '_extras', {})
+        for campo in self.CAMPOS:
+            object.__setattr__(self, campo, _AUSENTE)
+        for campo, valor in {**dict(dados or {}), **campos}.items():
+            self._gravar(campo, valor)
+
+    def _gravar(self, campo, valor):
+        if campo in self.CAMPOS:
+            object.__setattr__(self, campo, valor)
+        else:
+            self._extras[campo] = valor
+
+    def _alterar(self, alteracao):
+        """Aplica a alteração mantendo os índices do registro em dia"""
+        antes = self.valores_indexados()
+        alteracao()
+        if self._registro is not None:
+            self._registro._reindexar(self, antes)
+
+    def valores_indexados(self):
+        """Pares (índice, valor) deste registro nos índices secundários"""
+        return {('ativo', bool(self.get('ativo')))}
+
+    # --------------------------------------------------- interface de dict ---
+
+    def __getitem__(self, campo):
+        if campo in self.CAMPOS:
+            valor = object.__getattribute__(self, campo)
+            if valor is _AUSENTE:
+                raise KeyError(campo)
+            return valor
+        return self._extras[campo]
+
+    def __setitem__(self, campo, valor):
+        self._alterar(lambda: self._gravar(campo, valor))
+
+    def __delitem__(self, campo):
+        if campo not in self:
+            raise KeyError(campo)
+        if campo in self.CAMPOS:
+            self._alterar(lambda: object.__setattr__(self, campo, _AUSENTE))
+        else:
+            self._alterar(lambda: self._extras.pop(campo))
+
+    def __setattr__(self, nome, valor):
+        if nome in self.CAMPOS:
+            self[nome] = valor
+        else:
+            object.__setattr__(self, nome, valor)
+
+    def __iter__(self):
+        for campo in self.CAMPOS:
+            if object.__getattribute__(self, campo) is not _AUSENTE:
+                yield campo
+        yield from self._extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, campo):
+        if campo in self.CAMPOS:
+            return object.__getattribute__(self, campo) is not _AUSENTE
+        return campo in self._extras
+
+    def __copy__(self):
+        return type(self)(self.para_dict())
+
+    def __deepcopy__(self, memo):
+        return type(self)(copy.deepcopy(self.para_dict(), memo))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.para_dict()!r})"
+
+    def para_dict(self):
+        """Formato do backup (dict simples)"""
+        return dict(self.items())
+
+
+class Cliente(_Entidade):
+    __slots__ = ('razao_social', 'nome_fantasia', 'cnpj', 'email', 'telefone',
+                 'endereco', 'contato', 'ativo', 'data_cadastro')
+    CAMPOS = __slots__
+
+
+class Usuario(_Entidade):
+    __slots__ = ('senha', 'tipo', 'cliente_vinculado', 'clientes_vinculados',
+                 'nome', 'email', 'ativo', 'data_criacao')
+    CAMPOS = __slots__
+
+    @property
+    def clientes(self):
+        """Clientes vinculados, venha o vínculo no formato antigo (um) ou novo (lista)"""
+        if 'clientes_vinculados' in self:
+            return [c for c in self['clientes_vinculados'] or [] if c]
+        if self.get('cliente_vinculado'):
+            return [self['cliente_vinculado']]
+        return []
+
+    def trocar_cliente(self, de, para):
+        """Renomeia um cliente vinculado (mantendo o formato do vínculo)"""
+        if 'clientes_vinculados' in self:
+            self['clientes_vinculados'] = [para if c == de else c for c in self['clientes_vinculados'] or []]
+        if self.get('cliente_vinculado') == de:
+            self['cliente_vinculado'] = para
+
+    def valores_indexados(self):
+        clientes = self.clientes
+        return {('ativo', bool(self.get('ativo'))), ('tipo', self.get('tipo')),
+                ('vinculado', bool(clientes))} | {('cliente', c) for c in clientes}
+
+
+class Registro(MutableMapping):
+    """Chave -> registro, com índices secundários e contadores mantidos a cada alteração"""
+
+    ENTIDADE = _Entidade
+
+    def __init__(self, dados=None):
+        self._itens = {}
+        self._indices = {}  # (índice, valor) -> chaves
+        for chave, valor in (dados or {}).items():
+            self[chave] = valor
+
+    def __getitem__(self, chave):
+        return self._itens[chave]
+
+    def __setitem__(self, chave, valor):
+        if isinstance(valor, self.ENTIDADE) and valor._registro is None:
+            entidade = valor
+        else:
+            entidade = self.ENTIDADE(valor)
+        if chave in self._itens:
+            del self[chave]
+        object.__setattr__(entidade, '_registro', self)
+        object.__setattr__(entidade, '_chave', chave)
+        self._itens[chave] = entidade
+        for par in entidade.valores_indexados():
+            self._indices.setdefault(par, {})[chave] = None
+
+    def __delitem__(self, chave):
+        entidade = self._itens.pop(chave)
+        for par in entidade.valores_indexados():
+            self._remover_do_indice(par, chave)
+        object.__setattr__(entidade, '_registro', None)
+        object.__setattr__(entidade, '_chave', None)
+
+    def __iter__(self):
+        return iter(self._itens)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} registros)"
+
+    def _remover_do_indice(self, par, chave):
+        chaves = self._indices.get(par)
+        if chaves is not None:
+            chaves.pop(chave, None)
+            if not chaves:
+                del self._indices[par]
+
+    def _reindexar(self, entidade, antes):
+        chave, depois = entidade._chave, entidade.valores_indexados()
+        for par in antes - depois:
+            self._remover_do_indice(par, chave)
+        for par in depois - antes:
+            self._indices.setdefault(par, {})[chave] = None
+
+    def chaves(self, indice, valor):
+        """Chaves com o valor no índice (em ordem de inclusão)"""
+        return list(self._indices.get((indice, valor), ()))
+
+    def contar(self, indice, valor):
+        """Quantidade de registros com o valor no índice (O(1))"""
+        return len(self._indices.get((indice, valor), ()))
+
+    @property
+    def total(self):
+        return len(self._itens)
+
+    @property
+    def ativos(self):
+        return self.contar('ativo', True)
+
+    def para_dict(self):
+        """Formato do backup: {chave: dict}"""
+        return {chave: entidade.para_dict() for chave, entidade in self._itens.items()}
+
+
+class RegistroClientes(Registro):
+    ENTIDADE = Cliente
+
+
+class RegistroUsuarios(Registro):
+    ENTIDADE = Usuario
+
+    @property
+    def admins(self):
+        return self.contar('tipo', 'admin')
+
+    @property
+    def vinculados(self):
+        """Usuários com ao menos um cliente vinculado"""
+        return self.contar('vinculado', True)
+
+    def por_cliente(self, cliente):
+        """Usuários vinculados ao cliente"""
+        return self.chaves('cliente', cliente)
+
+
+def para_dict(colecao):
+    """Coleção (registro ou dict) no formato do backup"""
+    if isinstance(colecao, Registro):
+        return colecao.para_dict()
+    return {chave: dict(valor) if isinstance(valor, Mapping) else valor for chave, valor in (colecao or {}).items()}
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de carga do Sistema BRIX - Sessões simultâneas contra um GitHub local
+Cada nível de concorrência roda em um processo novo, como uma instância do
+app: o github_falso.py sobe com um backup de N trackings e as sessões
+simuladas (AppTest, uma thread cada) seguem jornadas roteirizadas - login
+pela tela_login(), dashboard, digitação no filtro de container, download do
+CSV e, para o admin, edição de um tracking. Cada rerun é cronometrado.
+O AppTest instala um runtime global a cada execução, então os reruns passam
+um de cada vez por uma fila; a latência medida é espera na fila + execução,
+o que um processo do Streamlit (limitado pelo GIL) também impõe às sessões.
+O relatório traz percentis da latência dos reruns, memória e chamadas ao
+GitHub por sessão e vazão, e a curva de capacidade (p95 por nível).
+
+Uso: python carga.py [--sessoes 1,5,10,20] [--trackings 2000] [--admins 0.2] [--limite-p95 1.0]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+DIRETORIO_APP = Path(__file__).resolve().parent
+
+# Credenciais das jornadas (usuários do dados_padrao)
+USUARIO_ADMIN = ('admin', 'admin123')
+USUARIO_CLIENTE = ('aristide', '1234')
+
+# Texto digitado (um caractere por rerun) no filtro de container
+TEXTO_FILTRO = 'MSKU00'
+
+PERCENTIS = (50, 90, 95, 99)
+
+# Reruns do AppTest não podem se sobrepor no mesmo processo
+_FILA_RERUNS = threading.Lock()
+
+
+def gerar_trackings(quantidade, semente=1):
+    """Trackings sintéticos distribuídos entre os clientes padrão"""
+    from dados_padrao import CLIENTES_PADRAO, COLUNAS_TRACKING, MARCOS_TRANSITO
+
+    aleatorio = random.Random(semente)
+    clientes = list(CLIENTES_PADRAO)
+    inicio = date.today() - timedelta(days=120)
+    trackings = []
+    for numero in range(quantidade):
+        registro = dict.fromkeys(COLUNAS_TRACKING, '')
+        registro['CLIENTE'] = clientes[numero % len(clientes)]
+        registro['CONTAINER'] = f"MSKU{numero:07d}"
+        registro['CANAL RFB'] = aleatorio.choice(['VERDE', 'VERMELHO', ''])
+        data = inicio + timedelta(days=aleatorio.randint(0, 100))
+        for marco in MARCOS_TRANSITO[:aleatorio.randint(1, len(MARCOS_TRANSITO))]:
+            registro[marco] = data.strftime('%d/%m/%Y')
+            data += timedelta(days=aleatorio.randint(1, 10))
+        trackings.append(registro)
+    return trackings
+
+
+def _memoria_mb():
+    """Memória residente do processo (MB)"""
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Pico (Linux: KB)
+
+
+def _percentis(valores):
+    if len(valores) < 2:
+        return {p: (valores[0] if valores else 0.0) for p in PERCENTIS}
+    cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {p: cortes[p - 1] for p in PERCENTIS}
+
+
+# ------------------------------------------------------------- jornadas ---
+
+class SessaoSimulada:
+    """Uma sessão do navegador dirigida pelo AppTest, com cada rerun cronometrado"""
+
+    def __init__(self, usuario, senha):
+        self.usuario = usuario
+        self.senha = senha
+        self.at = None
+        self.tempos = []  # (etapa, segundos)
+        self.erros = []
+
+    def _rerun(self, etapa):
+        inicio = time.perf_counter()
+        with _FILA_RERUNS:
+            self.at.run()
+        self.tempos.append((etapa, time.perf_counter() - inicio))
+        if self.at.exception:
+            raise RuntimeError(f"{etapa}: {self.at.exception[0].message}")
+
+    def _widget(self, elementos, rotulo):
+        encontrados = [e for e in elementos if rotulo in (e.label or '')]
+        if not encontrados:
+            raise RuntimeError(f"elemento '{rotulo}' não encontrado")
+        return encontrados[0]
+
+    def login(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(DIRETORIO_APP / "app.py"), default_timeout=300)
+        self._rerun('tela_login')
+        self.at.text_input(key="mobile_login_user").input(self.usuario)
+        self.at.text_input(key="mobile_login_pass").input(self.senha)
+        self.at.button[0].click()
+        self._rerun('login')
+
+    def dashboard(self):
+        self._rerun('dashboard')
+
+    def digitar_filtro(self):
+        for fim in range(1, len(TEXTO_FILTRO) + 1):
+            self._widget(self.at.text_input, "Container").input(TEXTO_FILTRO[:fim])
+            self._rerun('filtro')
+        self._widget(self.at.text_input, "Container").input('')
+        self._rerun('filtro')
+
+    def baixar_csv(self):
+        self._widget(self.at.download_button, "CSV").click()
+        self._rerun('csv')
+
+    def editar_tracking(self):
+        campo = [t for t in self.at.text_input if t.label == "Chegada Porto Destino"][-1]
+        campo.input(date.today().strftime('%d/%m/%Y'))
+        self._widget(self.at.button, "Salvar Altera").click()
+        self._rerun('edicao')
+
+    def executar(self, admin):
+        try:
+            self.login()
+            self.dashboard()
+            self.digitar_filtro()
+            self.baixar_csv()
+            if admin:
+                self.editar_tracking()
+            self.dashboard()
+        except Exception as e:
+            self.erros.append(f"{self.usuario}: {e}")
+
+
+def executar_nivel(sessoes, trackings, fracao_admins):
+    """Roda 'sessoes' jornadas simultâneas neste processo e retorna as métricas"""
+    from github_falso import ServidorGitHubFalso
+    from sincronizacao import ClienteGitHub, montar_backup
+    from dados_padrao import CLIENTES_PADRAO, USUARIOS_PADRAO
+
+    with ServidorGitHubFalso() as servidor:
+        os.environ['BRIX_TOKEN'] = 'teste-de-carga'
+        os.environ['BRIX_GITHUB_API'] = servidor.url
+        ClienteGitHub('teste-de-carga', url_base=servidor.url).gravar(montar_backup({
+            'clientes': CLIENTES_PADRAO, 'usuarios': USUARIOS_PADRAO, 'trackings': gerar_trackings(trackings),
+        }), None)
+        servidor.requisicoes = dict.fromkeys(servidor.requisicoes, 0)
+
+        import streamlit.testing.v1  # noqa: F401 - importado antes de medir a memória base
+        gc.collect()
+        memoria_base = _memoria_mb()
+
+        admins = max(1, round(sessoes * fracao_admins)) if fracao_admins else 0
+        simuladas = [SessaoSimulada(*(USUARIO_ADMIN if n < admins else USUARIO_CLIENTE)) for n in range(sessoes)]
+        threads = [threading.Thread(target=s.executar, args=(n < admins,)) for n, s in enumerate(simuladas)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        gc.collect()
+        memoria_final = _memoria_mb()  # Sessões ainda vivas (AppTest mantém o session_state)
+        chamadas = sum(servidor.requisicoes.values())
+
+    tempos = [t for s in simuladas for _, t in s.tempos]
+    por_etapa = {}
+    for sessao in simuladas:
+        for etapa, segundos in sessao.tempos:
+            por_etapa.setdefault(etapa, []).append(segundos)
+    return {
+        'sessoes': sessoes,
+        'admins': admins,
+        'reruns': len(tempos),
+        'duracao': duracao,
+        'vazao': len(tempos) / duracao if duracao else 0.0,
+        'percentis': _percentis(tempos),
+        'etapas': {etapa: _percentis(valores)[95] for etapa, valores in por_etapa.items()},
+        'memoria_por_sessao': (memoria_final - memoria_base) / sessoes,
+        'memoria_total': memoria_final,
+        'chamadas_github_por_sessao': chamadas / sessoes,
+        'erros': [e for s in simuladas for e in s.erros],
+    }
+
+
+def medir_nivel(sessoes, trackings, fracao_admins):
+    """Executa um nível em processo novo (caches e memória zerados)"""
+    with tempfile.TemporaryDirectory() as diretorio_dados:
+        ambiente = dict(os.environ)
+        ambiente['BRIX_DADOS_DIR'] = diretorio_dados
+        ambiente['BRIX_INTERVALO_ATUALIZACAO'] = '0'
+        processo = subprocess.run(
+            [sys.executable, __file__, '--nivel', str(sessoes), '--trackings', str(trackings),
+             '--admins', str(fracao_admins)],
+            capture_output=True, text=True, cwd=DIRETORIO_APP, env=ambiente
+        )
+    linhas = processo.stdout.strip().splitlines()
+    if processo.returncode or not linhas:
+        raise RuntimeError(f"nível {sessoes} falhou:\n{processo.stderr[-2000:]}")
+    return json.loads(linhas[-1])
+
+
+def imprimir_relatorio(resultados, limite_p95):
+    print("=" * 96)
+    print("📈 CURVA DE CAPACIDADE (latência dos reruns em ms)")
+    print("=" * 96)
+    print(f"{'sessões':>8} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'reruns/s':>9} "
+          f"{'MB/sessão':>10} {'GitHub/sessão':>14}  erros")
+    pior = max(r['percentis']['95'] for r in resultados) or 1
+    for r in resultados:
+        p = r['percentis']
+        print(f"{r['sessoes']:>8} {p['50'] * 1000:>8.0f} {p['90'] * 1000:>8.0f} {p['95'] * 1000:>8.0f} "
+              f"{p['99'] * 1000:>8.0f} {r['vazao']:>9.1f} {r['memoria_por_sessao']:>10.1f} "
+              f"{r['chamadas_github_por_sessao']:>14.2f}  {len(r['erros'])}")
+
+    print()
+    for r in resultados:
+        barra = '█' * max(1, round(40 * r['percentis']['95'] / pior))
+        marca = '✅' if r['percentis']['95'] <= limite_p95 and not r['erros'] else '❌'
+        print(f"  {r['sessoes']:>4} sessões {marca} {barra} {r['percentis']['95'] * 1000:.0f} ms")
+
+    print()
+    print("⏱️ p95 por etapa (ms), maior nível:")
+    for etapa, segundos in sorted(resultados[-1]['etapas'].items(), key=lambda e: -e[1]):
+        print(f"  {etapa:<12} {segundos * 1000:8.0f}")
+
+    aceitaveis = [r['sessoes'] for r in resultados if r['percentis']['95'] <= limite_p95 and not r['erros']]
+    print()
+    if aceitaveis:
+        print(f"🏁 Capacidade estimada: {max(aceitaveis)} sessões simultâneas com p95 <= {limite_p95 * 1000:.0f} ms")
+    else:
+        print(f"🏁 Nenhum nível ficou com p95 <= {limite_p95 * 1000:.0f} ms")
+    for r in resultados:
+        for erro in r['erros'][:5]:
+            print(f"❌ [{r['sessoes']} sessões] {erro}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do Sistema BRIX (sessões simultâneas)")
+    parser.add_argument('--sessoes', default='1,5,10,20', help="Níveis de concorrência, separados por vírgula")
+    parser.add_argument('--trackings', type=int, default=2000, help="Trackings no backup do GitHub simulado")
+    parser.add_argument('--admins', type=float, default=0.2, help="Fração das sessões com jornada de admin")
+    parser.add_argument('--limite-p95', type=float, default=1.0, help="p95 aceitável de um rerun (segundos)")
+    parser.add_argument('--json', help="Salvar os resultados neste arquivo")
+    parser.add_argument('--nivel', type=int, help=argparse.SUPPRESS)  # Execução interna de um nível
+    args = parser.parse_args()
+
+    if args.nivel:
+        import logging
+        logging.disable(logging.WARNING)  # Avisos do AppTest fora da saída JSON
+        print(json.dumps(executar_nivel(args.nivel, args.trackings, args.admins)))
+        return
+
+    resultados = []
+    for sessoes in sorted(int(n) for n in args.sessoes.split(',') if n.strip()):
+        print(f"▶ {sessoes} sessão(ões) simultânea(s)...", flush=True)
+        resultados.append(medir_nivel(sessoes, args.trackings, args.admins))
+
+    print()
+    imprimir_relatorio(resultados, args.limite_p95)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Linha de comando do Sistema BRIX - Operações em lote sem o Streamlit
+Usa a mesma base local do app (snapshot + WAL). Importação e exportação são
+feitas em fluxo (linha a linha, gravando no WAL em lotes), com memória limitada
+ao tamanho do lote. Comandos que gravam dados recusam rodar enquanto o app
+(ou outro comando) estiver com a base local aberta para escrita; os de
+consulta leem sem travar.
+
+Uso:
+  python cli_brix.py importar trackings.csv [--tipo trackings|clientes|usuarios] [--lote 1000]
+  python cli_brix.py exportar saida.xlsx [--tipo trackings] [--cliente "MC CONFECCIONES"]
+  python cli_brix.py backup [--incremental] [--github]
+  python cli_brix.py restaurar [--seq N | --data "AAAA-MM-DD HH:MM"] [--github]
+  python cli_brix.py listar-backups
+  python cli_brix.py migrar
+  python cli_brix.py reindexar
+  python cli_brix.py kpis [--desde AAAA-MM-DD]
+  python cli_brix.py relatorios saida/ [--cliente "MC CONFECCIONES"] [--meses-historico 12]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dados_padrao import COLUNAS_TRACKING
+from persistencia import (
+    ArmazenamentoLocal, BaseLocalEmUso, aplicar_operacao, estado_para_snapshot, ler_wal, snapshot_para_estado
+)
+
+DIRETORIO_DADOS_LOCAIS = os.getenv("BRIX_DADOS_DIR", str(Path(__file__).parent / ".brix_dados"))
+
+FORMATOS = ['csv', 'xlsx', 'json', 'jsonl']
+TIPOS = ['trackings', 'clientes', 'usuarios']
+
+# Campo usado como chave de clientes/usuários nos arquivos
+CHAVES_ENTIDADE = {'clientes': 'chave', 'usuarios': 'usuario'}
+
+VALORES_VERDADEIROS = {'true', '1', 'sim', 's', 'yes', 'ativo'}
+VALORES_FALSOS = {'false', '0', 'nao', 'não', 'n', 'no', 'inativo'}
+
+
+class Progresso:
+    """Progresso em uma linha do terminal (stderr), atualizado no máximo 5x por segundo"""
+
+    def __init__(self, rotulo, total=None):
+        self.rotulo = rotulo
+        self.total = total
+        self.atual = 0
+        self.inicio = time.perf_counter()
+        self._ultimo = 0.0
+
+    def avancar(self, quantidade=1):
+        self.atual += quantidade
+        agora = time.perf_counter()
+        if agora - self._ultimo >= 0.2:
+            self._ultimo = agora
+            self._mostrar()
+
+    def _mostrar(self, fim=''):
+        total = f"/{self.total}" if self.total else ''
+        taxa = self.atual / max(time.perf_counter() - self.inicio, 1e-9)
+        print(f"\r{self.rotulo}: {self.atual}{total} ({taxa:,.0f}/s){fim}", end='', file=sys.stderr, flush=True)
+
+    def concluir(self):
+        self._mostrar('\n')
+
+
+def detectar_formato(caminho, formato=None):
+    formato = formato or Path(caminho).suffix.lower().lstrip('.')
+    if formato not in FORMATOS:
+        raise SystemExit(f"❌ Formato não suportado: {formato} (use {', '.join(FORMATOS)})")
+    return formato
+
+
+# ----------------------------------------------------------------- leitura ---
+
+def ler_linhas(caminho, formato):
+    """Gera dicionários linha a linha, sem carregar o arquivo inteiro"""
+    if formato == 'csv':
+        with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+            yield from csv.DictReader(arquivo)
+    elif formato == 'xlsx':
+        from openpyxl import load_workbook
+        planilha = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            linhas = planilha.active.iter_rows(values_only=True)
+            cabecalho = [str(c) if c is not None else '' for c in next(linhas, [])]
+            for valores in linhas:
+                if any(v is not None for v in valores):
+                    yield dict(zip(cabecalho, valores))
+        finally:
+            planilha.close()
+    elif formato == 'jsonl':
+        with open(caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                if linha.strip():
+                    yield json.loads(linha)
+    else:
+        # JSON comum precisa ser lido inteiro; para arquivos grandes prefira .jsonl
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        if isinstance(dados, dict):
+            dados = [dict(valor, **{'_chave': chave}) for chave, valor in dados.items()]
+        yield from dados
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor).strip()
+
+
+def _booleano(valor, padrao=True):
+    texto = _texto(valor).lower()
+    if texto in VALORES_VERDADEIROS:
+        return True
+    if texto in VALORES_FALSOS:
+        return False
+    return padrao if valor in (None, '') else bool(valor)
+
+
+def preparar_tracking(linha):
+    """Registro de tracking com todas as colunas (valores em texto)"""
+    registro = {coluna: _texto(linha.get(coluna)) for coluna in COLUNAS_TRACKING}
+    for coluna, valor in linha.items():
+        if coluna and coluna not in registro and not coluna.startswith('_'):
+            registro[coluna] = _texto(valor)
+    return registro
+
+
+def preparar_entidade(tipo, linha):
+    """(chave, dados) de um cliente ou usuário"""
+    dados = {k: v for k, v in linha.items() if k and not k.startswith('_') and k != CHAVES_ENTIDADE[tipo]}
+    chave = _texto(linha.get(CHAVES_ENTIDADE[tipo]) or linha.get('_chave'))
+    if tipo == 'clientes':
+        chave = chave or _texto(dados.get('razao_social'))
+    dados['ativo'] = _booleano(dados.get('ativo'))
+    if tipo == 'usuarios':
+        vinculados = dados.get('clientes_vinculados')
+        if isinstance(vinculados, str):
+            dados['clientes_vinculados'] = [c.strip() for c in vinculados.split(';') if c.strip()]
+        elif not vinculados:
+            dados.pop('clientes_vinculados', None)
+        dados['cliente_vinculado'] = _texto(dados.get('cliente_vinculado')) or None
+    return chave, dados
+
+
+def _chave_tracking(registro):
+    from migracoes import CHAVE_DUPLICATAS
+    return tuple(str(registro.get(campo) or '') for campo in CHAVE_DUPLICATAS)
+
+
+def comando_importar(args, armazenamento):
+    formato = detectar_formato(args.arquivo, args.formato)
+    progresso = Progresso(f"📥 Importando {args.tipo}")
+    lote, ignorados, importados = [], 0, 0
+    existentes = set()
+    if args.tipo == 'trackings':
+        # Chaves já na base: reimportar o mesmo arquivo não duplica processos
+        existentes = {_chave_tracking(r) for r in (armazenamento.carregar() or {'trackings': []})['trackings']}
+
+    def gravar_lote():
+        nonlocal importados
+        if not lote:
+            return
+        from migracoes import migrar_trackings
+        # Mesmo pipeline da carga do app (nomes de colunas, tipos, maiúsculas, duplicatas)
+        df, _ = migrar_trackings(lote)
+        registros = []
+        for registro in df.to_dict('records'):
+            chave = _chave_tracking(registro)
+            if chave in existentes:
+                continue
+            existentes.add(chave)
+            registros.append(registro)
+        if registros:
+            armazenamento.registrar('tracking_add_lote', registros=registros)
+            importados += len(registros)
+        progresso.avancar(len(lote))
+        lote.clear()
+
+    for linha in ler_linhas(args.arquivo, formato):
+        if args.tipo == 'trackings':
+            registro = preparar_tracking(linha)
+            if not registro['CONTAINER'] or not registro['CLIENTE']:
+                ignorados += 1
+                continue
+            lote.append(registro)
+            if len(lote) >= args.lote:
+                gravar_lote()
+        else:
+            chave, dados = preparar_entidade(args.tipo, linha)
+            if not chave:
+                ignorados += 1
+                continue
+            armazenamento.registrar('cliente_set' if args.tipo == 'clientes' else 'usuario_set', chave=chave, dados=dados)
+            importados += 1
+            progresso.avancar()
+    gravar_lote()
+    progresso.concluir()
+    # Um snapshot no fim: o app não precisa reaplicar a importação entrada por entrada
+    armazenamento.compactar()
+
+    print(f"✅ {importados} registro(s) importado(s) - versão {armazenamento.seq}")
+    if progresso.atual > importados:
+        print(f"ℹ️ {progresso.atual - importados} tracking(s) já existente(s) ou repetido(s) no arquivo (mesmo cliente, container e carregamento)")
+    if ignorados:
+        print(f"⚠️ {ignorados} linha(s) ignorada(s) (sem chave/cliente/container)")
+
+
+# ----------------------------------------------------------------- escrita ---
+
+def linhas_exportacao(estado, tipo, cliente=None):
+    """(colunas, gerador de listas de valores) do que será exportado"""
+    if tipo == 'trackings':
+        colunas = estado['colunas'] or list(COLUNAS_TRACKING)
+        registros = (r for r in estado['trackings'] if cliente is None or r.get('CLIENTE') == cliente)
+        total = len(estado['trackings']) if cliente is None else None
+        return colunas, ([r.get(c, '') for c in colunas] for r in registros), total
+
+    entidades = estado[tipo]
+    colunas = [CHAVES_ENTIDADE[tipo]]
+    for dados in entidades.values():
+        colunas.extend(c for c in dados if c not in colunas)
+
+    def valores():
+        for chave, dados in entidades.items():
+            linha = [chave]
+            for coluna in colunas[1:]:
+                valor = dados.get(coluna)
+                linha.append(';'.join(valor) if isinstance(valor, list) else valor)
+            yield linha
+    return colunas, valores(), len(entidades)
+
+
+def comando_exportar(args, armazenamento):
+    formato = detectar_formato(args.arquivo, args.formato)
+    estado = armazenamento.carregar()
+    if estado is None:
+        raise SystemExit("❌ Nenhum dado local encontrado")
+    colunas, linhas, total = linhas_exportacao(estado, args.tipo, args.cliente)
+    progresso = Progresso(f"📤 Exportando {args.tipo}", total)
+
+    if formato == 'csv':
+        with open(args.arquivo, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(colunas)
+            for linha in linhas:
+                escritor.writerow(['' if v is None else v for v in linha])
+                progresso.avancar()
+    elif formato == 'xlsx':
+        from openpyxl import Workbook
+        planilha = Workbook(write_only=True)
+        aba = planilha.create_sheet(args.tipo.capitalize())
+        aba.append(colunas)
+        for linha in linhas:
+            aba.append(linha)
+            progresso.avancar()
+        planilha.save(args.arquivo)
+    else:
+        with open(args.arquivo, 'w', encoding='utf-8') as arquivo:
+            if formato == 'json':
+                arquivo.write('[')
+            for i, linha in enumerate(linhas):
+                registro = json.dumps(dict(zip(colunas, linha)), ensure_ascii=False, default=str)
+                if formato == 'json':
+                    arquivo.write((',\n' if i else '\n') + registro)
+                else:
+                    arquivo.write(registro + '\n')
+                progresso.avancar()
+            if formato == 'json':
+                arquivo.write('\n]\n')
+    progresso.concluir()
+    print(f"✅ {progresso.atual} registro(s) exportado(s) para {args.arquivo}")
+
+
+# ------------------------------------------------------- backup / restauração ---
+
+def diretorio_backups(armazenamento):
+    return armazenamento.diretorio / "backups"
+
+
+def listar_backups(diretorio):
+    """Backups locais em ordem: (tipo, seq_inicial, seq_final, caminho)"""
+    backups = []
+    for caminho in sorted(Path(diretorio).glob('*.gz')):
+        partes = caminho.name.split('.')[0].split('-')
+        if partes[0] == 'completo':
+            backups.append(('completo', int(partes[1]), int(partes[1]), caminho))
+        elif partes[0] == 'incremental':
+            backups.append(('incremental', int(partes[1]), int(partes[2]), caminho))
+    return sorted(backups, key=lambda b: (b[2], b[0] == 'incremental'))
+
+
+def _gravar_gz(caminho, linhas):
+    temporario = caminho.with_suffix('.tmp')
+    with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+        for linha in linhas:
+            arquivo.write(linha)
+    os.replace(temporario, caminho)
+
+
+def backup_local(armazenamento, incremental=False):
+    """Backup completo (estado inteiro) ou incremental (entradas do WAL desde o último backup)"""
+    diretorio = diretorio_backups(armazenamento)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    backups = listar_backups(diretorio)
+    ultimo = backups[-1][2] if backups else None
+    seq_atual = armazenamento.seq
+
+    if incremental and ultimo is not None:
+        if ultimo == seq_atual:
+            print("ℹ️ Nenhuma alteração desde o último backup")
+            return None
+        entradas = [e for e in ler_wal(armazenamento.caminho_wal) if e['seq'] > ultimo]
+        if entradas and entradas[0]['seq'] == ultimo + 1 and entradas[-1]['seq'] == seq_atual:
+            caminho = diretorio / f"incremental-{ultimo + 1:08d}-{seq_atual:08d}.jsonl.gz"
+            _gravar_gz(caminho, (json.dumps(e, ensure_ascii=False, default=str) + '\n' for e in entradas))
+            print(f"✅ Backup incremental: {len(entradas)} alteração(ões) -> {caminho.name}")
+            return caminho
+        print("ℹ️ WAL já compactado desde o último backup: gerando backup completo")
+    elif incremental:
+        print("ℹ️ Nenhum backup anterior: gerando backup completo")
+
+    estado = armazenamento.carregar()
+    if estado is None:
+        raise SystemExit("❌ Nenhum dado local encontrado")
+    caminho = diretorio / f"completo-{estado['seq']:08d}.json.gz"
+    _gravar_gz(caminho, [json.dumps(estado_para_snapshot(estado, estado['seq']), ensure_ascii=False, default=str)])
+    print(f"✅ Backup completo: {len(estado['trackings'])} tracking(s) -> {caminho.name}")
+    return caminho
+
+
+def estado_no_ponto(diretorio, seq=None, data=None):
+    """Reconstrói o estado até o seq/data pedidos: último completo + incrementais seguintes"""
+    backups = listar_backups(diretorio)
+    completos = [b for b in backups if b[0] == 'completo' and (seq is None or b[2] <= seq)]
+    if data is not None:
+        completos = [b for b in completos if _data_backup(b[3]) <= data]
+    if not completos:
+        raise SystemExit("❌ Nenhum backup completo anterior ao ponto pedido")
+
+    _, _, base, caminho = completos[-1]
+    with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+        estado = snapshot_para_estado(json.load(arquivo))
+    atual = base
+
+    for tipo, inicio, fim, caminho in backups:
+        if tipo != 'incremental' or fim <= atual:
+            continue
+        if inicio != atual + 1:
+            break  # Lacuna na cadeia de incrementais
+        parar = False
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                entrada = json.loads(linha)
+                if (seq is not None and entrada['seq'] > seq) or (data is not None and datetime.fromisoformat(entrada['ts']) > data):
+                    parar = True
+                    break
+                aplicar_operacao(estado, entrada)
+                atual = entrada['seq']
+        if parar:
+            break
+    return estado, atual
+
+
+def _data_backup(caminho):
+    with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+        data_snapshot = json.load(arquivo)['data_snapshot']
+    return datetime.strptime(data_snapshot, "%d/%m/%Y %H:%M:%S")
+
+
+def cliente_github():
+    from sincronizacao import ClienteGitHub, GITHUB_API_URL_PADRAO
+    token = os.getenv("BRIX_TOKEN", "")
+    if not token:
+        raise SystemExit("❌ Defina BRIX_TOKEN para acessar o GitHub")
+    return ClienteGitHub(token, url_base=os.getenv("BRIX_GITHUB_API", GITHUB_API_URL_PADRAO))
+
+
+def cliente_arquivo_github():
+    from sincronizacao import ClienteArquivoGitHub, GITHUB_API_URL_PADRAO
+    token = os.getenv("BRIX_TOKEN", "")
+    if not token:
+        raise SystemExit("❌ Defina BRIX_TOKEN para acessar o GitHub")
+    return ClienteArquivoGitHub(token, url_base=os.getenv("BRIX_GITHUB_API", GITHUB_API_URL_PADRAO))
+
+
+def comando_backup(args, armazenamento):
+    if not args.github:
+        backup_local(armazenamento, args.incremental)
+        return
+
+    from sincronizacao import enviar_com_mesclagem, integrar_remoto, normalizar_estado
+    estado = armazenamento.carregar()
+    if estado is None:
+        raise SystemExit("❌ Nenhum dado local encontrado")
+    # Base da mesclagem = conteúdo do GitHub na última sincronização desta base local;
+    # sem ela não há como distinguir edições de outra instância de dados antigos
+    registro = armazenamento.sincronizacao()
+    if registro is None:
+        raise SystemExit("❌ Base local nunca sincronizada com o GitHub: abra o app ou use 'restaurar --github' antes")
+    # Partições do arquivo histórico primeiro: trackings arquivados só saem do backup depois disso
+    from arquivo_historico import ArquivoHistorico
+    enviadas, _ = ArquivoHistorico(armazenamento.diretorio / "arquivo").sincronizar_github(cliente_arquivo_github())
+    if enviadas:
+        print(f"🗄️ Arquivo histórico: {enviadas} partição(ões) enviada(s)")
+    local = normalizar_estado(estado)
+    enviado, sha, conflitos = enviar_com_mesclagem(cliente_github(), local, registro['base'], registro['sha'])
+    if enviado != local:
+        integrar_remoto(armazenamento, enviado, sha, base=local, seq_base=estado['seq'])
+    else:
+        armazenamento.registrar_sincronizacao(sha, enviado, estado['seq'])
+    print(f"✅ Backup no GitHub: {len(enviado['trackings'])} tracking(s)")
+    if conflitos:
+        print(f"⚠️ {len(conflitos)} conflito(s) com outra instância (mantida a base local)")
+
+
+def comando_restaurar(args, armazenamento):
+    if args.github:
+        dados, sha = cliente_github().ler()
+        if dados is None:
+            raise SystemExit("❌ Backup não encontrado no GitHub")
+        estado, origem = dados, "GitHub"
+    else:
+        data = datetime.fromisoformat(args.data) if args.data else None
+        estado, seq = estado_no_ponto(diretorio_backups(armazenamento), args.seq, data)
+        origem = f"backup local (versão {seq})"
+
+    seq_novo = armazenamento.substituir_estado(estado['clientes'], estado['usuarios'], estado['trackings'], estado.get('colunas'))
+    if args.github:
+        from sincronizacao import normalizar_estado
+        armazenamento.registrar_sincronizacao(sha, normalizar_estado(dados), seq_novo)
+    print(f"✅ Restaurado de {origem}: {len(estado['trackings'])} tracking(s), "
+          f"{len(estado['clientes'])} cliente(s), {len(estado['usuarios'])} usuário(s) - nova versão {seq_novo}")
+    if args.github:
+        from arquivo_historico import ArquivoHistorico
+        _, recebidas = ArquivoHistorico(armazenamento.diretorio / "arquivo").sincronizar_github(cliente_arquivo_github())
+        if recebidas:
+            print(f"🗄️ Arquivo histórico: {recebidas} partição(ões) recebida(s)")
+
+
+def comando_listar_backups(args, armazenamento):
+    backups = listar_backups(diretorio_backups(armazenamento))
+    if not backups:
+        print("📭 Nenhum backup local")
+    for tipo, inicio, fim, caminho in backups:
+        versoes = f"{inicio}" if tipo == 'completo' else f"{inicio}..{fim}"
+        print(f"  {'💾' if tipo == 'completo' else '➕'} {tipo:<12} versões {versoes:<14} {caminho.stat().st_size / 1024:8.1f} KB  {caminho.name}")
+
+
+# ------------------------------------------------------- manutenção ---
+
+def comando_migrar(args, armazenamento):
+    """Leva os dados locais ao esquema atual (pipeline de migracoes.py)"""
+    from migracoes import VERSAO_ESQUEMA, migrar_estado, versao_dos_dados
+
+    estado = armazenamento.carregar()
+    if estado is None:
+        raise SystemExit("❌ Nenhum dado local encontrado")
+    versao = versao_dos_dados(estado)
+    if versao >= VERSAO_ESQUEMA and not args.forcar:
+        print(f"✅ Dados já estão no esquema {VERSAO_ESQUEMA}")
+        return
+
+    inicio = time.perf_counter()
+    if args.forcar:
+        estado['versao_esquema'] = 0
+    migrado, _, relatorio = migrar_estado(estado)
+    for destino, descricao, alterados in relatorio:
+        print(f"  🔧 v{destino} {descricao}: {alterados} tracking(s)")
+    armazenamento.substituir_estado(migrado['clientes'], migrado['usuarios'], migrado['trackings'],
+                                    migrado['colunas'], versao_esquema=VERSAO_ESQUEMA)
+    print(f"✅ Migração v{versao} -> v{VERSAO_ESQUEMA} concluída em {time.perf_counter() - inicio:.2f}s "
+          f"({len(estado['trackings'])} -> {len(migrado['trackings'])} tracking(s))")
+
+
+def comando_reindexar(args, armazenamento):
+    """Compacta o WAL em um novo snapshot e refaz o manifesto do arquivo histórico"""
+    inicio = time.perf_counter()
+    armazenamento.compactar()
+    print(f"✅ Snapshot regravado (versão {armazenamento.seq}) em {time.perf_counter() - inicio:.2f}s")
+
+    from arquivo_historico import ArquivoHistorico
+    arquivo = ArquivoHistorico(armazenamento.diretorio / "arquivo")
+    if arquivo.diretorio.exists():
+        manifesto = arquivo.reconstruir_manifesto()
+        print(f"✅ Manifesto do histórico refeito: {len(manifesto)} partição(ões), "
+              f"{sum(p['linhas'] for p in manifesto.values())} tracking(s)")
+
+
+def comando_kpis(args, armazenamento):
+    """Materializa os KPIs diários que faltam (para agendar no cron com o app parado)"""
+    from kpis import KpisDiarios
+
+    estado = armazenamento.carregar()
+    if estado is None:
+        raise SystemExit("❌ Nenhum dado local encontrado")
+    import pandas as pd
+    df = pd.DataFrame(estado['trackings'], columns=estado['colunas'] or None).fillna('')
+    desde = datetime.strptime(args.desde, '%Y-%m-%d').date() if args.desde else None
+
+    inicio = time.perf_counter()
+    kpis = KpisDiarios(armazenamento.diretorio / "kpis")
+    dias = kpis.materializar(df, desde=desde)
+    print(f"✅ {dias} dia(s) de KPIs materializados em {time.perf_counter() - inicio:.2f}s "
+          f"({len(df)} tracking(s), até {kpis.ultimo_dia().strftime('%d/%m/%Y')})")
+
+
+def comando_relatorios(args, armazenamento):
+    """Gera o pacote mensal de planilhas por cliente (pool de processos) e salva no diretório"""
+    import pandas as pd
+    from arquivo_historico import ArquivoHistorico
+    from kpis import KpisDiarios
+    from relatorios import GeradorRelatorios, montar_entradas
+
+    estado = armazenamento.carregar()
+    if estado is None:
+        raise SystemExit("❌ Nenhum dado local encontrado")
+    df = pd.DataFrame(estado['trackings'], columns=estado['colunas'] or None).fillna('')
+    clientes = [args.cliente] if args.cliente else None
+    hoje = pd.Timestamp.today().normalize()
+    inicio_historico = hoje - pd.DateOffset(months=args.meses_historico)
+
+    inicio = time.perf_counter()
+    arquivados = ArquivoHistorico(armazenamento.diretorio / "arquivo").carregar_intervalo(inicio_historico, hoje, clientes)
+    kpis = KpisDiarios(armazenamento.diretorio / "kpis").serie(inicio_historico, hoje, clientes)
+    gerador = GeradorRelatorios(armazenamento.diretorio / "relatorios")
+    try:
+        pacote = gerador.gerar(montar_entradas(df, arquivados, kpis, clientes))
+        while not pacote.pronto:
+            print(f"\r⏳ {pacote.concluidos}/{pacote.total} planilha(s)", end='', flush=True)
+            time.sleep(0.5)
+    finally:
+        gerador.encerrar()
+    print()
+
+    for cliente, erro in pacote.erros().items():
+        print(f"❌ {cliente}: {erro}", file=sys.stderr)
+    salvas = pacote.salvar_em(args.saida)
+    print(f"✅ {salvas} planilha(s) em {args.saida} ({gerador.reaproveitados} do cache) "
+          f"em {time.perf_counter() - inicio:.1f}s")
+
+
+COMANDOS = {
+    'importar': comando_importar,
+    'exportar': comando_exportar,
+    'backup': comando_backup,
+    'restaurar': comando_restaurar,
+    'listar-backups': comando_listar_backups,
+    'migrar': comando_migrar,
+    'reindexar': comando_reindexar,
+    'kpis': comando_kpis,
+    'relatorios': comando_relatorios,
+}
+
+# Comandos que só leem a base local (não mexem no WAL do app em execução)
+COMANDOS_LEITURA = {'exportar', 'listar-backups', 'kpis', 'relatorios'}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Operações em lote do Sistema BRIX (sem Streamlit)")
+    parser.add_argument('--dados', default=DIRETORIO_DADOS_LOCAIS, help="Diretório da base local (BRIX_DADOS_DIR)")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    importar = subparsers.add_parser('importar', help="Importa CSV/XLSX/JSON/JSONL em fluxo")
+    importar.add_argument('arquivo')
+    importar.add_argument('--tipo', choices=TIPOS, default='trackings')
+    importar.add_argument('--formato', choices=FORMATOS, help="Padrão: extensão do arquivo")
+    importar.add_argument('--lote', type=int, default=1000, help="Trackings por entrada no WAL")
+
+    exportar = subparsers.add_parser('exportar', help="Exporta para CSV/XLSX/JSON/JSONL em fluxo")
+    exportar.add_argument('arquivo')
+    exportar.add_argument('--tipo', choices=TIPOS, default='trackings')
+    exportar.add_argument('--formato', choices=FORMATOS, help="Padrão: extensão do arquivo")
+    exportar.add_argument('--cliente', help="Somente trackings deste cliente")
+
+    backup = subparsers.add_parser('backup', help="Backup local completo/incremental ou no GitHub")
+    backup.add_argument('--incremental', action='store_true', help="Só as alterações desde o último backup local")
+    backup.add_argument('--github', action='store_true', help="Envia para o GitHub (BRIX_TOKEN)")
+
+    restaurar = subparsers.add_parser('restaurar', help="Restaura backup local (até um ponto) ou do GitHub")
+    ponto = restaurar.add_mutually_exclusive_group()
+    ponto.add_argument('--seq', type=int, help="Versão máxima a restaurar")
+    ponto.add_argument('--data', help="Data/hora máxima (AAAA-MM-DD HH:MM)")
+    ponto.add_argument('--github', action='store_true', help="Restaura o backup do GitHub")
+
+    subparsers.add_parser('listar-backups', help="Lista os backups locais")
+    migrar = subparsers.add_parser('migrar', help="Atualiza o esquema dos trackings (migracoes.py)")
+    migrar.add_argument('--forcar', action='store_true', help="Reaplica todas as migrações mesmo no esquema atual")
+    subparsers.add_parser('reindexar', help="Compacta o WAL e refaz o manifesto do histórico")
+    kpis = subparsers.add_parser('kpis', help="Materializa os KPIs diários (tendências)")
+    kpis.add_argument('--desde', help="Recalcula a partir desta data (AAAA-MM-DD)")
+    relatorios = subparsers.add_parser('relatorios', help="Gera as planilhas mensais por cliente (XLSX)")
+    relatorios.add_argument('saida', help="Diretório de destino das planilhas")
+    relatorios.add_argument('--cliente', help="Somente este cliente")
+    relatorios.add_argument('--meses-historico', type=int, default=12, help="Meses do arquivo histórico incluídos")
+
+    args = parser.parse_args(argv)
+    somente_leitura = args.comando in COMANDOS_LEITURA or (args.comando == 'backup' and not args.github)
+    try:
+        armazenamento = ArmazenamentoLocal(args.dados, somente_leitura=somente_leitura, feed_alteracoes=False)
+        COMANDOS[args.comando](args, armazenamento)
+    except BaseLocalEmUso as e:
+        raise SystemExit(f"❌ {e}: pare o app antes de gravar pela linha de comando")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coordenador de acesso ao GitHub do Sistema BRIX - Uma requisição por recurso no processo
+Sessões que pedem o mesmo recurso ao mesmo tempo (validação do token, leitura
+do backup) esperam uma única requisição em andamento e recebem o mesmo
+resultado. Leituras recentes são reaproveitadas e as demais usam ETag (um 304
+não conta na cota). Os cabeçalhos X-RateLimit-* de cada resposta alimentam o
+orçamento do token: com poucas requisições restantes as leituras passam a
+servir o último conteúdo em cache e os backups são adiados até a renovação
+(as alterações continuam seguras na base local).
+"""
+
+import hashlib
+import threading
+import time
+
+from sincronizacao import (
+    ClienteArquivoGitHub, ClienteGitHub, GITHUB_API_URL_PADRAO, GITHUB_DIRETORIO_ARQUIVO, GITHUB_FILE, GITHUB_REPO
+)
+
+# Abaixo deste número de requisições restantes as leituras usam só o cache
+RESERVA_LEITURA = 200
+
+# Abaixo deste número os backups são adiados até a renovação da cota
+RESERVA_GRAVACAO = 20
+
+# Segundos em que uma leitura do backup é reaproveitada sem ir ao GitHub
+VALIDADE_LEITURA = 30
+
+# Segundos em que a validação de um token é reaproveitada
+VALIDADE_TOKEN = 600
+
+
+class OrcamentoEsgotado(Exception):
+    """Cota da API do GitHub no fim: a operação foi adiada até a renovação"""
+
+
+def _inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class OrcamentoGitHub:
+    """Cota de requisições de um token, segundo os cabeçalhos X-RateLimit-* mais recentes"""
+
+    def __init__(self):
+        self.limite = None
+        self.restantes = None
+        self.reinicio = None  # Epoch (s) da renovação da cota
+        self._lock = threading.Lock()
+
+    def atualizar(self, headers):
+        restantes = _inteiro(headers.get('X-RateLimit-Remaining'))
+        if restantes is None:
+            return
+        with self._lock:
+            self.restantes = restantes
+            self.limite = _inteiro(headers.get('X-RateLimit-Limit')) or self.limite
+            self.reinicio = _inteiro(headers.get('X-RateLimit-Reset')) or self.reinicio
+
+    def abaixo_de(self, reserva, agora=None):
+        """True se restam 'reserva' requisições ou menos antes da renovação"""
+        with self._lock:
+            if self.restantes is None or self.restantes > reserva:
+                return False
+            # Depois do horário de renovação a cota volta cheia (até a próxima resposta dizer o contrário)
+            return self.reinicio is None or (agora or time.time()) < self.reinicio
+
+    def resumo(self):
+        with self._lock:
+            return {'limite': self.limite, 'restantes': self.restantes, 'reinicio': self.reinicio}
+
+
+class _Voo:
+    """Requisição em andamento, esperada por todas as sessões que pediram o mesmo recurso"""
+
+    __slots__ = ('evento', 'resultado', 'erro')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class _Leitura:
+    __slots__ = ('dados', 'sha', 'etag', 'momento')
+
+    def __init__(self, dados, sha, etag, momento):
+        self.dados, self.sha, self.etag, self.momento = dados, sha, etag, momento
+
+
+class CoordenadorGitHub:
+    """Acesso ao backup compartilhado por todas as sessões do processo"""
+
+    def __init__(self, url_base=GITHUB_API_URL_PADRAO, repo=GITHUB_REPO, arquivo=GITHUB_FILE,
+                 validade_leitura=VALIDADE_LEITURA, validade_token=VALIDADE_TOKEN,
+                 reserva_leitura=RESERVA_LEITURA, reserva_gravacao=RESERVA_GRAVACAO):
+        self.url_base = url_base
+        self.repo = repo
+        self.arquivo = arquivo
+        self.validade_leitura = validade_leitura
+        self.validade_token = validade_token
+        self.reserva_leitura = reserva_leitura
+        self.reserva_gravacao = reserva_gravacao
+        self._lock = threading.Lock()
+        self._voos = {}
+        self._orcamentos = {}  # Por token (resumo SHA-256, o token não fica em chave nenhuma)
+        self._leituras = {}
+        self._tokens = {}      # Resumo do token -> (válido, momento da validação)
+        self.estatisticas = {'requisicoes': 0, 'compartilhadas': 0, 'em_cache': 0, 'nao_modificadas': 0}
+
+    # ------------------------------------------------------------- internos ---
+
+    @staticmethod
+    def _chave(token):
+        return hashlib.sha256(str(token).encode('utf-8')).hexdigest()
+
+    def orcamento(self, token):
+        """Orçamento (cota da API) do token"""
+        with self._lock:
+            return self._orcamentos.setdefault(self._chave(token), OrcamentoGitHub())
+
+    def _cliente_http(self, token):
+        return ClienteGitHub(token, self.repo, self.arquivo, self.url_base, orcamento=self.orcamento(token))
+
+    def _contar(self, nome):
+        with self._lock:
+            self.estatisticas[nome] += 1
+
+    def _unico(self, chave, funcao):
+        """Executa funcao() uma vez para todas as chamadas simultâneas com a mesma chave"""
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+            else:
+                self.estatisticas['compartilhadas'] += 1
+
+        if lider:
+            try:
+                voo.resultado = funcao()
+            except Exception as e:
+                voo.erro = e
+            finally:
+                with self._lock:
+                    del self._voos[chave]
+                voo.evento.set()
+        else:
+            voo.evento.wait()
+
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.resultado
+
+    # ------------------------------------------------------------ operações ---
+
+    def economizando(self, token):
+        """True se a cota está baixa e as leituras estão sendo servidas do cache"""
+        return self.orcamento(token).abaixo_de(self.reserva_leitura)
+
+    def validar_token(self, token):
+        """Token aceito pela API? (validação reaproveitada por VALIDADE_TOKEN segundos)
+
+        Só respostas sobre o token (200/401) ficam em cache. Com a cota esgotada
+        vale a última validação positiva; sem ela, OrcamentoEsgotado.
+        """
+        import requests
+
+        chave = self._chave(token)
+        validacao = self._tokens.get(chave)
+        if validacao and (time.time() - validacao[1] < self.validade_token or self.economizando(token)):
+            self._contar('em_cache')
+            return validacao[0]
+        if self.orcamento(token).abaixo_de(0):
+            if validacao and validacao[0]:
+                return True
+            raise OrcamentoEsgotado(self._mensagem_esgotado(token))
+
+        def validar():
+            self._contar('requisicoes')
+            try:
+                valido = self._cliente_http(token).validar_token()
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in (403, 429):
+                    raise
+                if validacao and validacao[0]:
+                    return True
+                raise OrcamentoEsgotado(self._mensagem_esgotado(token))
+            self._tokens[chave] = (valido, time.time())
+            return valido
+
+        return self._unico(('token', chave), validar)
+
+    def ler(self, token, max_idade=None):
+        """(dados, sha) do backup, compartilhados entre as sessões: não alterar 'dados'.
+
+        Leituras com até max_idade segundos (padrão VALIDADE_LEITURA) são
+        reaproveitadas; com a cota baixa, qualquer leitura em cache serve,
+        exceto quando max_idade=0 (versão atual obrigatória).
+        """
+        max_idade = self.validade_leitura if max_idade is None else max_idade
+        chave = self._chave(token)
+        leitura = self._leituras.get(chave)
+        if leitura is not None and (time.time() - leitura.momento < max_idade
+                                    or (max_idade and self.economizando(token))):
+            self._contar('em_cache')
+            return leitura.dados, leitura.sha
+        if self.orcamento(token).abaixo_de(0):
+            raise OrcamentoEsgotado(self._mensagem_esgotado(token))
+
+        leitura = self._unico(('ler', chave), lambda: self._buscar(token, chave))
+        return leitura.dados, leitura.sha
+
+    def _buscar(self, token, chave):
+        anterior = self._leituras.get(chave)
+        self._contar('requisicoes')
+        resposta = self._cliente_http(token).ler_se_alterado(anterior.etag if anterior else None)
+        if resposta is None:
+            self._contar('nao_modificadas')
+            leitura = _Leitura(anterior.dados, anterior.sha, anterior.etag, time.time())
+        else:
+            leitura = _Leitura(*resposta, time.time())
+        self._leituras[chave] = leitura
+        return leitura
+
+    def gravar(self, token, dados, sha, mensagem=None):
+        """Grava o backup (ver ClienteGitHub.gravar); adiado com OrcamentoEsgotado se a cota acabou"""
+        if self.orcamento(token).abaixo_de(self.reserva_gravacao):
+            raise OrcamentoEsgotado(self._mensagem_esgotado(token))
+        self._contar('requisicoes')
+        novo_sha = self._cliente_http(token).gravar(dados, sha, mensagem)
+        # O que acabou de ser gravado é a leitura mais recente (sem ETag: a próxima confere)
+        self._leituras[self._chave(token)] = _Leitura(dados, novo_sha, None, time.time())
+        return novo_sha
+
+    def _mensagem_esgotado(self, token):
+        reinicio = self.orcamento(token).resumo()['reinicio']
+        quando = time.strftime('%H:%M', time.localtime(reinicio)) if reinicio else "a renovação"
+        return f"Cota da API do GitHub no fim: tente novamente após {quando}"
+
+    def cliente_arquivo(self, token):
+        """Cliente das partições do arquivo histórico (OrcamentoEsgotado se a cota estiver no fim)"""
+        if self.orcamento(token).abaixo_de(self.reserva_gravacao):
+            raise OrcamentoEsgotado(self._mensagem_esgotado(token))
+        return ClienteArquivoGitHub(token, self.repo, GITHUB_DIRETORIO_ARQUIVO, self.url_base, orcamento=self.orcamento(token))
+
+    def cliente(self, token):
+        """Cliente com a interface de ClienteGitHub (para enviar_com_mesclagem)"""
+        return _ClienteCoordenado(self, token)
+
+
+class _ClienteCoordenado:
+    """ler()/gravar() de um token pelo coordenador; ler() busca a versão atual (usado em conflitos)"""
+
+    def __init__(self, coordenador, token):
+        self.coordenador = coordenador
+        self.token = token
+
+    def ler(self):
+        return self.coordenador.ler(self.token, max_idade=0)
+
+    def gravar(self, dados, sha, mensagem=None):
+        return self.coordenador.gravar(self.token, dados, sha, mensagem)
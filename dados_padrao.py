@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dados estáticos e dados padrão (seed) do Sistema BRIX
+Módulo leve, sem dependências: compilado em .pyc e carregado uma vez por processo
+"""
+
+# Dados da empresa
+DADOS_EMPRESA = {
+    'nome': 'BRIX LOGÍSTICA',
+    'endereco': 'Av Ranieri Mazzilli, nº 755, Centro Civíco',
+    'cidade': 'Foz do Iguaçu - PR',
+    'telefone': '(45) 99115 0734',
+    'email': 'fabio@brixcontabilidade.com.br',
+    'cnpj': '31.247.532/0001-51'
+}
+
+# Status finais de um processo
+STATUS_FINAIS = [
+    "",
+    "🎉 PROCESSO FINALIZADO COM SUCESSO",
+    "⚠️ FINALIZADO COM PENDÊNCIAS", 
+    "❌ PROCESSO CANCELADO",
+    "🔄 EM PROCESSAMENTO",
+    "📋 AGUARDANDO DOCUMENTAÇÃO"
+]
+
+# Colunas obrigatórias de um tracking (ordem de exibição)
+COLUNAS_TRACKING = [
+    'CLIENTE', 'CONTAINER', 'CARREGAMENTO', 'EMBARQUE NAVIO',
+    'SAIDA NAVIO', 'PREVISAO CHEGADA PORTO DESTINO', 'CHEGADA PORTO DESTINO',
+    'CANAL RFB', 'LIBERAÇAO PORTO DESTINO', 'CHEGADA CIUDAD DEL ESTE PY',
+    'DESCARREGAMENTO', 'STATUS_FINAL'
+]
+
+# Cadeia de marcos do trânsito (ordem cronológica)
+MARCOS_TRANSITO = [
+    'CARREGAMENTO', 'EMBARQUE NAVIO', 'SAIDA NAVIO', 'CHEGADA PORTO DESTINO',
+    'LIBERAÇAO PORTO DESTINO', 'CHEGADA CIUDAD DEL ESTE PY', 'DESCARREGAMENTO'
+]
+
+# Formato das datas digitadas nos formulários
+FORMATO_DATA = '%d/%m/%Y'
+
+# DADOS PADRÃO PARA CLIENTES
+CLIENTES_PADRAO = {
+    "MC CONFECCIONES": {
+        "razao_social": "MC CONFECCIONES",
+        "nome_fantasia": "MC CONFECCIONES",
+        "cnpj": "RUC: 80104097-3",
+        "email": "aristide.nosenzo@mcparaguay.com",
+        "telefone": "4531984037",
+        "endereco": "",
+        "contato": "Aristide Nosenzo",
+        "ativo": True,
+        "data_cadastro": "06/06/2025"
+    },
+    "BENTO COMEX": {
+        "razao_social": "BENTO COMEX",
+        "nome_fantasia": "BENTO COMEX",
+        "cnpj": "RUC",
+        "email": "nicolas@rrclogistica.com",
+        "telefone": "+595 61502286",
+        "endereco": "",
+        "contato": "",
+        "ativo": True,
+        "data_cadastro": "07/06/2025"
+    },
+    "MASPY": {
+        "razao_social": "MASPY S.A.",
+        "nome_fantasia": "MASPY S.A.",
+        "cnpj": "800931254",
+        "email": "leo@kfkprivate.com.br",
+        "telefone": "+595 61502286",
+        "endereco": "CIUDAD DEL ESTE",
+        "contato": "",
+        "ativo": True,
+        "data_cadastro": "12/06/2025"
+    },
+    "TENORA": {
+        "razao_social": "TENORA",
+        "nome_fantasia": "TENORA",
+        "cnpj": "28792545000105",
+        "email": "fiscal@brixcontabilidade.com.br",
+        "telefone": "4531984037",
+        "endereco": "",
+        "contato": "",
+        "ativo": True,
+        "data_cadastro": "08/06/2025"
+    },
+    "PAPERBOX": {
+        "razao_social": "PAPERBOX",
+        "nome_fantasia": "PAPERBOX",
+        "cnpj": "PARAGUAY",
+        "email": "fiscal@brixcontabilidade.com.br",
+        "telefone": "4531984037",
+        "endereco": "",
+        "contato": "",
+        "ativo": True,
+        "data_cadastro": "18/06/2025"
+    }
+}
+
+# DADOS PADRÃO PARA USUÁRIOS
+USUARIOS_PADRAO = {
+    "admin": {
+        "senha": "admin123",
+        "tipo": "admin",
+        "cliente_vinculado": None,
+        "nome": "Administrador BRIX",
+        "email": "admin@brixlogistica.com.br",
+        "ativo": True,
+        "data_criacao": "01/06/2025"
+    },
+    "aristide": {
+        "senha": "1234",
+        "tipo": "cliente",
+        "cliente_vinculado": "MC CONFECCIONES",
+        "nome": "Aristide Nosenzo",
+        "email": "aristide.nosenzo@mcparaguay.com",
+        "ativo": True,
+        "data_criacao": "06/06/2025"
+    },
+    "rodrigo": {
+        "senha": "1234",
+        "tipo": "cliente",
+        "cliente_vinculado": "MC CONFECCIONES",
+        "nome": "RODRIGO CALDAS",
+        "email": "rodrigo@stillosrc2.com.br",
+        "ativo": True,
+        "data_criacao": "06/06/2025"
+    },
+    "nicolas": {
+        "senha": "1234",
+        "tipo": "operador",
+        "cliente_vinculado": "BENTO COMEX",
+        "nome": "NICOLAS M MARTINEZ",
+        "email": "nicolas@rrclogistica.com",
+        "ativo": True,
+        "data_criacao": "07/06/2025"
+    },
+    "operador_brix": {
+        "senha": "op123",
+        "tipo": "operador",
+        "clientes_vinculados": ["MC CONFECCIONES", "BENTO COMEX"],  # Múltiplos clientes
+        "nome": "Operador BRIX",
+        "email": "operador@brixlogistica.com.br",
+        "ativo": True,
+        "data_criacao": "07/06/2025"
+    },
+    "maspy": {
+        "senha": "1234",
+        "tipo": "cliente",
+        "cliente_vinculado": "MASPY",
+        "nome": "LEONARDO WALDRICH",
+        "email": "leo@kfkprivate.com.br",
+        "ativo": True,
+        "data_criacao": "16/06/2025"
+    },
+    "giovana": {
+        "senha": "1234",
+        "tipo": "cliente",
+        "cliente_vinculado": "MC CONFECCIONES",
+        "nome": "GIOVANA CAMARGO",
+        "email": "giovana@lcinter.com.br",
+        "ativo": True,
+        "data_criacao": "09/06/2025"
+    },
+    "tenora": {
+        "senha": "1234",
+        "tipo": "cliente",
+        "cliente_vinculado": "TENORA",
+        "nome": "TENORA",
+        "email": "tenora@tenora.com.br",
+        "ativo": True,
+        "data_criacao": "09/06/2025"
+    },
+    "paperbox": {
+        "senha": "1234",
+        "tipo": "cliente",
+        "cliente_vinculado": "PAPERBOX",
+        "nome": "PAPERBOX",
+        "email": "fiscal@brixcontabilidade.com.br",
+        "ativo": True,
+        "data_criacao": "18/06/2025"
+    }
+}
+
+# DADOS PADRÃO PARA TRACKINGS
+TRACKINGS_PADRAO = [
+    {
+        'CLIENTE': 'EMPRESA ABC LTDA',
+        'CONTAINER': 'TCLU1234567',
+        'CARREGAMENTO': '15/05/2025',
+        'EMBARQUE NAVIO': '18/05/2025',
+        'SAIDA NAVIO': '20/05/2025',
+        'PREVISAO CHEGADA PORTO DESTINO': '25/05/2025',    # ✅ Correto
+        'CHEGADA PORTO DESTINO': '24/05/2025',             # ✅ Correto
+        'CANAL RFB': 'VERDE',
+        'LIBERAÇAO PORTO DESTINO': '24/05/2025',
+        'CHEGADA CIUDAD DEL ESTE PY': '26/05/2025',
+        'DESCARREGAMENTO': '28/05/2025',
+        'STATUS_FINAL': ''  # ✅ ADICIONAR ESTA LINHA
+    },
+    {
+        'CLIENTE': 'EMPRESA ABC LTDA',
+        'CONTAINER': 'ABCU7777777',
+        'CARREGAMENTO': '22/05/2025',
+        'EMBARQUE NAVIO': '25/05/2025',
+        'SAIDA NAVIO': '27/05/2025',
+        'PREVISAO CHEGADA PORTO DESTINO': '02/06/2025',
+        'CHEGADA PORTO DESTINO': '',
+        'CANAL RFB': '',
+        'LIBERAÇAO PORTO DESTINO': '',
+        'CHEGADA CIUDAD DEL ESTE PY': '',
+        'DESCARREGAMENTO': '',
+        'STATUS_FINAL': ''  # ✅ ADICIONAR ESTA LINHA
+    },
+    {
+        'CLIENTE': 'COMERCIAL XYZ S.A.',
+        'CONTAINER': 'MSKU9876543',
+        'CARREGAMENTO': '20/05/2025',
+        'EMBARQUE NAVIO': '23/05/2025',
+        'SAIDA NAVIO': '25/05/2025',
+        'PREVISAO CHEGADA PORTO DESTINO': '30/05/2025',
+        'CHEGADA PORTO DESTINO': '29/05/2025',
+        'CANAL RFB': 'VERMELHO',
+        'LIBERAÇAO PORTO DESTINO': '',
+        'CHEGADA CIUDAD DE LESTE PY': '',
+        'DESCARREGAMENTO': '',
+        'STATUS_FINAL': ''  # ✅ ADICIONAR ESTA LINHA
+    }
+]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planejador de filtros do Sistema BRIX - Uma máscara só para todos os filtros
+Os filtros ativos (escopo do usuário, cliente, container, canal...) viram uma
+lista de predicados avaliados sobre colunas já normalizadas (minúsculas, sem
+acentos). As máscaras são combinadas antes de materializar o resultado, que é
+criado uma única vez em vez de um DataFrame intermediário por filtro.
+
+Períodos de datas e a ordenação usam um índice ordenado por versão dos dados
+(IndiceOrdenado): as datas 'DD/MM/AAAA' de cada coluna são convertidas uma
+vez, e um período vira duas buscas binárias e uma fatia; ordenar por várias
+colunas é um lexsort sobre os postos inteiros já calculados.
+"""
+
+import unicodedata
+
+import numpy as np
+
+from analise_transito import COLUNAS_DATA, converter_datas
+
+# Colunas com busca por trecho de texto
+COLUNAS_BUSCA = ['CLIENTE', 'CONTAINER']
+
+# Colunas de texto que podem ser usadas na ordenação (além das de data)
+COLUNAS_ORDENACAO_TEXTO = ['CLIENTE', 'CONTAINER', 'CANAL RFB', 'STATUS_FINAL']
+
+# Predicados baratos (comparação vetorizada, busca binária) rodam antes da
+# busca por texto, que só é feita nas linhas que ainda passam
+CUSTO_PREDICADO = {'em': 0, 'igual': 0, 'entre': 0, 'contem': 1}
+
+
+def normalizar_texto(valor):
+    """Minúsculas e sem acentos, para comparação tolerante"""
+    texto = str(valor if valor is not None else '')
+    if texto.isascii():
+        return texto.lower().strip()
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower().strip()
+
+
+def normalizar_colunas(df, colunas=COLUNAS_BUSCA):
+    """Arrays com os valores normalizados das colunas (acentos tratados só onde há)"""
+    normalizadas = {}
+    for coluna in colunas:
+        if coluna not in df.columns:
+            continue
+        valores = df[coluna].fillna('').astype(str).str.lower().str.strip()
+        acentuados = ~valores.str.isascii()
+        if acentuados.any():
+            valores[acentuados] = valores[acentuados].map(normalizar_texto)
+        normalizadas[coluna] = valores.to_numpy(dtype=object)
+    return normalizadas
+
+
+def contem(coluna, texto):
+    """Predicado: coluna contém o trecho (sem diferenciar maiúsculas/acentos)"""
+    return ('contem', coluna, normalizar_texto(texto))
+
+
+def igual(coluna, valor):
+    """Predicado: coluna igual ao valor"""
+    return ('igual', coluna, valor)
+
+
+def pertence(coluna, valores):
+    """Predicado: coluna é um dos valores"""
+    return ('em', coluna, list(valores))
+
+
+def entre(coluna, inicio=None, fim=None):
+    """Predicado: data da coluna no período [inicio, fim] (None = sem limite; datas vazias ficam de fora)"""
+    return ('entre', coluna, (inicio, fim))
+
+
+def _dia(data):
+    import pandas as pd
+    return np.datetime64(pd.Timestamp(data), 'D').astype(np.int64)
+
+
+class IndiceOrdenado:
+    """Índice ordenado das colunas de um DataFrame (montado sob demanda, uma coluna por vez).
+
+    Colunas de data guardam os dias (int) em ordem crescente e as posições das
+    linhas na mesma ordem; toda coluna indexada guarda o posto de cada linha
+    (empates com o mesmo posto, valores vazios por último).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._datas = {}
+        self._postos = {}
+
+    def datas(self, coluna):
+        """(dias ordenados, posições) das linhas com data na coluna"""
+        if coluna not in self._datas:
+            dias = converter_datas(self.df, [coluna])[coluna].to_numpy(dtype='datetime64[D]')
+            posicoes = np.flatnonzero(~np.isnat(dias))
+            valores = dias[posicoes].astype(np.int64)
+            ordem = np.argsort(valores, kind='stable')
+            self._datas[coluna] = (valores[ordem], posicoes[ordem])
+        return self._datas[coluna]
+
+    def postos(self, coluna):
+        """(posto de cada linha na ordem crescente, posto dos vazios) - vazios depois de todos"""
+        if coluna not in self._postos:
+            if coluna in COLUNAS_DATA:
+                valores, posicoes = self.datas(coluna)
+                distintos, postos_presentes = np.unique(valores, return_inverse=True)
+                vazio = len(distintos)
+                postos = np.full(len(self.df), vazio, dtype=np.int64)
+                postos[posicoes] = postos_presentes
+            else:
+                textos = self.df[coluna].fillna('').astype(str).to_numpy(dtype=object)
+                distintos, postos = np.unique(textos, return_inverse=True)
+                vazio = len(distintos)
+                if vazio and distintos[0] == '':
+                    vazio -= 1
+                    postos = np.where(postos == 0, vazio + 1, postos) - 1
+            self._postos[coluna] = (postos, vazio)
+        return self._postos[coluna]
+
+    def posicoes_entre(self, coluna, inicio=None, fim=None):
+        """Posições das linhas com data em [inicio, fim]: busca binária e fatia"""
+        valores, posicoes = self.datas(coluna)
+        primeiro = 0 if inicio is None else np.searchsorted(valores, _dia(inicio), side='left')
+        ultimo = len(valores) if fim is None else np.searchsorted(valores, _dia(fim), side='right')
+        return posicoes[primeiro:ultimo]
+
+    def ordenar(self, posicoes, ordenacao):
+        """Posições reordenadas por [(coluna, crescente)], a primeira coluna com prioridade.
+
+        Empates mantêm a ordem original e vazios ficam por último nos dois sentidos.
+        """
+        chaves = []
+        for coluna, crescente in ordenacao:
+            if coluna not in self.df.columns:
+                continue
+            todos, vazio = self.postos(coluna)
+            postos = todos[posicoes]
+            if not crescente:
+                postos = np.where(postos == vazio, vazio, vazio - 1 - postos)
+            chaves.append(postos)
+        if not chaves:
+            return posicoes
+        return posicoes[np.lexsort(chaves[::-1])]
+
+
+def montar_mascara(df, predicados, normalizadas=None, indice=None):
+    """Máscara booleana com todos os predicados combinados"""
+    mascara = np.ones(len(df), dtype=bool)
+    for tipo, coluna, valor in sorted(predicados, key=lambda p: CUSTO_PREDICADO[p[0]]):
+        if coluna not in df.columns:
+            mascara[:] = False
+        elif tipo == 'entre':
+            indice = indice or IndiceOrdenado(df)
+            no_periodo = np.zeros(len(df), dtype=bool)
+            no_periodo[indice.posicoes_entre(coluna, *valor)] = True
+            mascara &= no_periodo
+        elif tipo == 'igual':
+            mascara &= (df[coluna] == valor).to_numpy()
+        elif tipo == 'em':
+            mascara &= df[coluna].isin(valor).to_numpy()
+        elif tipo == 'contem' and valor:
+            if normalizadas is None or coluna not in normalizadas:
+                normalizadas = dict(normalizadas or {}, **normalizar_colunas(df, [coluna]))
+            posicoes = np.flatnonzero(mascara)
+            valores = normalizadas[coluna][posicoes]
+            encontrados = np.fromiter((valor in v for v in valores), dtype=bool, count=len(valores))
+            mascara[posicoes[~encontrados]] = False
+        if not mascara.any():
+            break
+    return mascara
+
+
+def aplicar_filtros(df, predicados, normalizadas=None, indice=None, ordenacao=None):
+    """DataFrame filtrado e ordenado, materializado uma vez (o próprio df se nada muda)"""
+    if not predicados and not ordenacao:
+        return df
+    mascara = montar_mascara(df, predicados, normalizadas, indice)
+    if not ordenacao:
+        return df if mascara.all() else df[mascara]
+    indice = indice or IndiceOrdenado(df)
+    return df.iloc[indice.ordenar(np.flatnonzero(mascara), ordenacao)]
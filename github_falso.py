@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API de conteúdo do GitHub simulada (local) - Sistema BRIX
+Servidor HTTP em memória com a mesma semântica de SHA do GitHub (PUT com SHA
+desatualizado -> 409), usado para testar backups concorrentes sem rede.
+Responde com ETag (If-None-Match -> 304) e cabeçalhos X-RateLimit-* de uma
+cota simulada, como a API real.
+Com --replicas, simula várias instâncias editando e fazendo backup ao mesmo tempo.
+
+Uso: python github_falso.py [--porta 8765]
+     python github_falso.py --replicas 4 --edicoes 10
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROTA_CONTEUDO = re.compile(r'^/repos/([^/]+/[^/]+)/contents/(.+)$')
+
+
+def sha_blob(conteudo):
+    """SHA do blob no mesmo formato do git"""
+    return hashlib.sha1(b'blob %d\0' % len(conteudo) + conteudo).hexdigest()
+
+
+class ServidorGitHubFalso:
+    """Arquivos em memória servidos em /repos/<dono>/<repo>/contents/<caminho>"""
+
+    def __init__(self, porta=0, atraso_put=0.0, cota=5000, janela_cota=3600):
+        self.atraso_put = atraso_put  # Alarga a janela de corrida entre GET e PUT
+        self.arquivos = {}
+        self.conflitos = 0
+        self.cota = cota
+        self.restantes = cota
+        self.reinicio_cota = int(time.time()) + janela_cota
+        self.requisicoes = {'GET': 0, 'PUT': 0, '304': 0}
+        self._lock = threading.RLock()
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_handler())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def conteudo(self, repo, caminho):
+        """Conteúdo JSON decodificado de um arquivo (ou None)"""
+        with self._lock:
+            arquivo = self.arquivos.get((repo, caminho))
+        return json.loads(arquivo[0]) if arquivo else None
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo, headers=None):
+                dados = json.dumps(corpo).encode('utf-8') if corpo is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                with servidor._lock:
+                    cota = {'X-RateLimit-Limit': servidor.cota, 'X-RateLimit-Remaining': servidor.restantes,
+                            'X-RateLimit-Reset': servidor.reinicio_cota}
+                for nome, valor in {**cota, **(headers or {})}.items():
+                    self.send_header(nome, str(valor))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _consumir(self, metodo):
+                """Desconta uma requisição da cota; False (403) se ela acabou"""
+                with servidor._lock:
+                    servidor.requisicoes[metodo] += 1
+                    if servidor.restantes <= 0:
+                        esgotada = True
+                    else:
+                        servidor.restantes -= 1
+                        esgotada = False
+                if esgotada:
+                    self._responder(403, {'message': 'API rate limit exceeded'})
+                return not esgotada
+
+            def do_GET(self):
+                rota = ROTA_CONTEUDO.match(self.path)
+                with servidor._lock:
+                    arquivo = servidor.arquivos.get(rota.groups()) if rota else None
+                etag = f'"{arquivo[1]}"' if arquivo else None
+                if etag and self.headers.get('If-None-Match') == etag:
+                    # Como no GitHub, a resposta condicional não conta na cota
+                    with servidor._lock:
+                        servidor.requisicoes['304'] += 1
+                    return self._responder(304, None, {'ETag': etag})
+                if not self._consumir('GET'):
+                    return
+                if self.path == '/user':
+                    return self._responder(200, {'login': 'brix-falso'})
+                if arquivo is None:
+                    return self._responder(404, {'message': 'Not Found'})
+                conteudo, sha = arquivo
+                self._responder(200, {
+                    'path': rota.group(2),
+                    'sha': sha,
+                    'encoding': 'base64',
+                    'content': base64.b64encode(conteudo).decode('ascii'),
+                }, {'ETag': etag})
+
+            def do_PUT(self):
+                if not self._consumir('PUT'):
+                    return
+                rota = ROTA_CONTEUDO.match(self.path)
+                if not rota:
+                    return self._responder(404, {'message': 'Not Found'})
+                tamanho = int(self.headers.get('Content-Length', 0))
+                corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                if servidor.atraso_put:
+                    time.sleep(servidor.atraso_put)
+
+                conteudo = base64.b64decode(corpo.get('content', ''))
+                chave = rota.groups()
+                with servidor._lock:
+                    atual = servidor.arquivos.get(chave)
+                    if atual is not None and not corpo.get('sha'):
+                        servidor.conflitos += 1
+                        return self._responder(422, {'message': '"sha" wasn\'t supplied.'})
+                    if atual is not None and corpo['sha'] != atual[1]:
+                        servidor.conflitos += 1
+                        return self._responder(409, {'message': f"{chave[1]} does not match {corpo['sha']}"})
+                    sha = sha_blob(conteudo)
+                    servidor.arquivos[chave] = (conteudo, sha)
+                self._responder(200 if atual else 201, {'content': {'path': chave[1], 'sha': sha}})
+
+        return Handler
+
+
+def simular_replicas(replicas=4, edicoes=10, atraso_put=0.02):
+    """Várias instâncias editando e fazendo backup ao mesmo tempo; confere que nada se perde"""
+    from sincronizacao import ClienteGitHub, GITHUB_REPO, GITHUB_FILE, enviar_com_mesclagem, montar_backup
+
+    with ServidorGitHubFalso(atraso_put=atraso_put) as servidor:
+        semente = {
+            'clientes': {'CLIENTE BASE': {'razao_social': 'CLIENTE BASE', 'contato': ''}},
+            'usuarios': {},
+            'trackings': [],
+        }
+        ClienteGitHub('token', url_base=servidor.url).gravar(montar_backup(semente), None)
+        erros = []
+
+        def replica(numero):
+            cliente = ClienteGitHub('token', url_base=servidor.url)
+            base, sha = cliente.ler()
+            local = {'clientes': dict(base['clientes']), 'usuarios': dict(base['usuarios']),
+                     'trackings': list(base['trackings'])}
+            try:
+                for edicao in range(edicoes):
+                    local['trackings'].append({'CLIENTE': 'CLIENTE BASE', 'CONTAINER': f"R{numero:02d}-{edicao:04d}"})
+                    local['clientes'][f"CLIENTE R{numero}"] = {'razao_social': f"CLIENTE R{numero}", 'edicoes': edicao + 1}
+                    local, sha, _ = enviar_com_mesclagem(cliente, local, base, sha, tentativas=replicas * 4, espera=0.01)
+                    base = local
+            except Exception as e:
+                erros.append(f"réplica {numero}: {e}")
+
+        inicio = time.perf_counter()
+        threads = [threading.Thread(target=replica, args=(n,)) for n in range(replicas)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        final = servidor.conteudo(GITHUB_REPO, GITHUB_FILE)
+        containers = {r['CONTAINER'] for r in final['trackings']}
+        esperados = {f"R{n:02d}-{e:04d}" for n in range(replicas) for e in range(edicoes)}
+        perdidos = esperados - containers
+        clientes_ok = all(final['clientes'].get(f"CLIENTE R{n}", {}).get('edicoes') == edicoes for n in range(replicas))
+
+        print(f"🔁 {replicas} réplicas x {edicoes} backups em {duracao:.2f}s - {servidor.conflitos} conflito(s) de SHA")
+        print(f"📦 Trackings no backup final: {len(containers)}/{len(esperados)} (perdidos: {len(perdidos)})")
+        print(f"🏢 Clientes atualizados por todas as réplicas: {'sim' if clientes_ok else 'NÃO'}")
+        for erro in erros:
+            print(f"❌ {erro}")
+        return not perdidos and clientes_ok and not erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API de conteúdo do GitHub simulada")
+    parser.add_argument('--porta', type=int, default=8765, help="Porta do servidor")
+    parser.add_argument('--replicas', type=int, default=0, help="Simular N réplicas concorrentes e sair")
+    parser.add_argument('--edicoes', type=int, default=10, help="Backups por réplica na simulação")
+    args = parser.parse_args()
+
+    if args.replicas:
+        raise SystemExit(0 if simular_replicas(args.replicas, args.edicoes) else 1)
+
+    servidor = ServidorGitHubFalso(args.porta)
+    print(f"🧪 GitHub falso em {servidor.url} (use BRIX_GITHUB_API={servidor.url})")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KPIs diários do Sistema BRIX - Fotografias por dia e por cliente para tendências
+Um job incremental grava, para cada dia ainda não materializado (e para hoje,
+regravado a cada execução até o dia virar), uma linha por cliente com
+contagens por canal, por último marco atingido e por STATUS_FINAL, além do
+lead time (carregamento -> descarregamento) e do tempo de liberação
+(chegada -> liberação) dos processos concluídos no dia: soma, quantidade, p50
+e p90. As linhas ficam em partições mensais compactadas (AAAA-MM.json.gz) e
+os gráficos de tendência leem só as séries prontas, O(dias), sem reprocessar
+os trackings. Dias passados ficam congelados: o canal e o status valem como
+estavam no dia da fotografia (na reconstrução inicial usam o valor atual).
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analise_transito import converter_datas
+from arquivo_historico import STATUS_ARQUIVAVEIS
+from dados_padrao import MARCOS_TRANSITO
+
+# Dias reconstruídos a partir das datas dos marcos na primeira execução
+DIAS_RECONSTRUCAO = 90
+
+# Intervalo (segundos) entre execuções do job no app
+INTERVALO_MATERIALIZACAO = 3600
+
+CANAIS = {'VERDE': 'canal_verde', 'VERMELHO': 'canal_vermelho'}
+COLUNAS_CANAL = ['canal_verde', 'canal_vermelho', 'canal_pendente']
+COLUNAS_MARCO = [f"marco:{marco}" for marco in MARCOS_TRANSITO]
+COLUNAS_STATUS = ['em_andamento', 'finalizados', 'cancelados']
+COLUNAS_TEMPO = ['concluidos', 'lead_time_soma', 'lead_time_p50', 'lead_time_p90',
+                 'liberados', 'liberacao_soma', 'liberacao_p50', 'liberacao_p90']
+COLUNAS_KPI = ['ativos'] + COLUNAS_CANAL + COLUNAS_MARCO + COLUNAS_STATUS + COLUNAS_TEMPO
+
+# Na agregação por semana/mês: estoques viram média diária, fluxos são somados
+COLUNAS_ESTOQUE = ['ativos'] + COLUNAS_CANAL + COLUNAS_MARCO + COLUNAS_STATUS
+COLUNAS_FLUXO = ['concluidos', 'lead_time_soma', 'liberados', 'liberacao_soma']
+
+UM_DIA = np.timedelta64(1, 'D')
+
+
+def _base(df):
+    """Arrays usados por todos os dias: datas dos marcos, cliente, canal e status"""
+    datas = converter_datas(df, MARCOS_TRANSITO).to_numpy(dtype='datetime64[D]')
+    clientes, codigos = np.unique(df['CLIENTE'].fillna('').astype(str).to_numpy(), return_inverse=True)
+    status = df['STATUS_FINAL'].fillna('').to_numpy() if 'STATUS_FINAL' in df.columns else np.full(len(df), '')
+    canal = df['CANAL RFB'].fillna('').to_numpy() if 'CANAL RFB' in df.columns else np.full(len(df), '')
+    chegada = datas[:, MARCOS_TRANSITO.index('CHEGADA PORTO DESTINO')]
+    liberacao = datas[:, MARCOS_TRANSITO.index('LIBERAÇAO PORTO DESTINO')]
+    return {
+        'datas': datas,
+        'referencia': pd.DataFrame(datas).max(axis=1).to_numpy(dtype='datetime64[D]'),  # Último marco
+        'clientes': clientes,
+        'codigos': codigos,
+        'finalizado': status == STATUS_ARQUIVAVEIS[0],
+        'cancelado': status == STATUS_ARQUIVAVEIS[1],
+        'canal': canal,
+        'lead_time': ((datas[:, -1] - datas[:, 0]) / UM_DIA),
+        'liberacao': ((liberacao - chegada) / UM_DIA),
+        'chegada': chegada,
+        'data_liberacao': liberacao,
+    }
+
+
+def _percentis_por_cliente(codigos, valores, quantidade):
+    """p50 e p90 dos valores de cada cliente (NaN se não houver)"""
+    p50, p90 = np.full(quantidade, np.nan), np.full(quantidade, np.nan)
+    if len(valores):
+        agrupado = pd.Series(valores).groupby(codigos)
+        p50[agrupado.median().index] = agrupado.median().to_numpy()
+        p90[agrupado.quantile(0.9).index] = agrupado.quantile(0.9).to_numpy()
+    return p50, p90
+
+
+def _kpis_do_dia(base, dia, hoje):
+    """Linhas (uma por cliente) do dia, vetorizado sobre todos os trackings"""
+    datas, codigos, quantidade = base['datas'], base['codigos'], len(base['clientes'])
+    contar = lambda mascara: np.bincount(codigos[mascara], minlength=quantidade)  # noqa: E731
+
+    atingidos = datas <= dia  # NaT compara como False
+    iniciado = atingidos[:, 0]
+    # Encerrado no dia: status final gravado e último marco até o dia (hoje vale o status atual)
+    no_dia = np.ones(len(codigos), dtype=bool) if dia >= hoje else base['referencia'] <= dia
+    finalizado = base['finalizado'] & no_dia & iniciado
+    cancelado = base['cancelado'] & no_dia & iniciado
+    ativo = iniciado & ~finalizado & ~cancelado
+
+    # Canal só é conhecido depois da chegada ao porto de destino
+    canal = np.where(base['chegada'] <= dia, base['canal'], '')
+    ultimo = np.where(atingidos.any(axis=1), len(MARCOS_TRANSITO) - 1 - atingidos[:, ::-1].argmax(axis=1), -1)
+
+    colunas = {'ativos': contar(ativo)}
+    for valor, coluna in CANAIS.items():
+        colunas[coluna] = contar(ativo & (canal == valor))
+    colunas['canal_pendente'] = colunas['ativos'] - colunas['canal_verde'] - colunas['canal_vermelho']
+    for indice, coluna in enumerate(COLUNAS_MARCO):
+        colunas[coluna] = contar(ativo & (ultimo == indice))
+    colunas['em_andamento'] = colunas['ativos']
+    colunas['finalizados'] = contar(finalizado)
+    colunas['cancelados'] = contar(cancelado)
+
+    for evento, duracao, prefixo, contagem in ((datas[:, -1], base['lead_time'], 'lead_time', 'concluidos'),
+                                               (base['data_liberacao'], base['liberacao'], 'liberacao', 'liberados')):
+        concluidos = (evento == dia) & (duracao >= 0)
+        colunas[contagem] = contar(concluidos)
+        colunas[f'{prefixo}_soma'] = np.bincount(codigos[concluidos], weights=duracao[concluidos], minlength=quantidade)
+        colunas[f'{prefixo}_p50'], colunas[f'{prefixo}_p90'] = _percentis_por_cliente(
+            codigos[concluidos], duracao[concluidos], quantidade)
+
+    linhas = pd.DataFrame(colunas)[COLUNAS_KPI]
+    linhas.insert(0, 'cliente', base['clientes'])
+    linhas.insert(0, 'dia', str(dia))
+    # Só clientes com alguma atividade no dia (mantém o armazenamento compacto)
+    movimento = linhas[['ativos', 'finalizados', 'cancelados', 'concluidos', 'liberados']].sum(axis=1) > 0
+    return linhas[movimento & (linhas['cliente'] != '')]
+
+
+def calcular_kpis(df, dias, hoje=None):
+    """Linhas de KPI (dia, cliente, ...) dos dias pedidos"""
+    hoje = np.datetime64(hoje or date.today(), 'D')
+    if df.empty or not dias:
+        return pd.DataFrame(columns=['dia', 'cliente'] + COLUNAS_KPI)
+    base = _base(df)
+    return pd.concat([_kpis_do_dia(base, np.datetime64(dia, 'D'), hoje) for dia in dias], ignore_index=True)
+
+
+def _gravar_json_gz(caminho, dados):
+    temporario = caminho.with_suffix('.tmp')
+    with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporario, caminho)
+
+
+class KpisDiarios:
+    """Partições mensais (AAAA-MM.json.gz) com as linhas de KPI de cada dia e cliente"""
+
+    def __init__(self, diretorio, fonte=None, intervalo=INTERVALO_MATERIALIZACAO):
+        self.diretorio = Path(diretorio)
+        self.fonte = fonte  # Função que retorna o DataFrame atual de trackings (para o agendador)
+        self.intervalo = intervalo
+        self.ultima_execucao = None
+        self.ultimo_erro = None
+        self._lock = threading.Lock()
+        self._agendador = None
+        self._carregar_particao = lru_cache(maxsize=24)(self._ler_particao)
+
+    def _caminho(self, mes):
+        return self.diretorio / f"{mes}.json.gz"
+
+    def meses(self):
+        """Partições existentes (AAAA-MM), da mais antiga à mais recente"""
+        return sorted(c.name[:-len('.json.gz')] for c in self.diretorio.glob('*.json.gz'))
+
+    def _ler_particao(self, mes):
+        caminho = self._caminho(mes)
+        if not caminho.exists():
+            return pd.DataFrame(columns=['dia', 'cliente'] + COLUNAS_KPI)
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        return pd.DataFrame(dados['linhas'], columns=dados['colunas'])
+
+    def ultimo_dia(self):
+        """Último dia materializado (date) ou None"""
+        meses = self.meses()
+        if not meses:
+            return None
+        particao = self._carregar_particao(meses[-1])
+        return date.fromisoformat(particao['dia'].max()) if not particao.empty else None
+
+    def materializar(self, df, hoje=None, desde=None):
+        """Grava os dias que faltam (e regrava hoje); retorna quantos dias foram gravados"""
+        hoje = hoje or date.today()
+        with self._lock:
+            ultimo = self.ultimo_dia()
+            if desde is None:
+                desde = ultimo if ultimo is not None else hoje - timedelta(days=DIAS_RECONSTRUCAO)
+            dias = [desde + timedelta(days=n) for n in range((hoje - desde).days + 1)]
+            linhas = calcular_kpis(df, dias, hoje)
+
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            meses = linhas['dia'].str[:7] if not linhas.empty else pd.Series(dtype=str)
+            for mes in sorted({d.strftime('%Y-%m') for d in dias}):
+                novas = linhas[meses == mes]
+                existente = self._ler_particao(mes)
+                inicio_mes = max(desde, date.fromisoformat(f"{mes}-01")).isoformat()
+                particao = pd.concat([existente[existente['dia'] < inicio_mes], novas], ignore_index=True)
+                particao = particao.astype(object).where(particao.notna(), None)
+                _gravar_json_gz(self._caminho(mes), {'colunas': list(particao.columns), 'linhas': particao.values.tolist()})
+            self._carregar_particao.cache_clear()
+            self.ultima_execucao = time.time()
+        return len(dias)
+
+    def serie(self, inicio=None, fim=None, clientes=None):
+        """Linhas de KPI do período (lê só os meses do intervalo)"""
+        inicio = pd.Timestamp(inicio).strftime('%Y-%m-%d') if inicio is not None else '0000-00-00'
+        fim = pd.Timestamp(fim).strftime('%Y-%m-%d') if fim is not None else '9999-99-99'
+        partes = []
+        for mes in self.meses():
+            if not (inicio[:7] <= mes <= fim[:7]):
+                continue
+            particao = self._carregar_particao(mes)
+            particao = particao[(particao['dia'] >= inicio) & (particao['dia'] <= fim)]
+            if clientes is not None:
+                particao = particao[particao['cliente'].isin(clientes)]
+            partes.append(particao)
+        if not partes:
+            return pd.DataFrame(columns=['dia', 'cliente'] + COLUNAS_KPI)
+        resultado = pd.concat(partes, ignore_index=True)
+        resultado['dia'] = pd.to_datetime(resultado['dia'])
+        return resultado
+
+    # ----------------------------------------------------------- agendador ---
+
+    def iniciar_agendador(self):
+        """Executa o job agora e depois a cada 'intervalo' segundos (thread do processo)"""
+        if self._agendador is not None or self.fonte is None:
+            return
+        self._agendador = threading.Thread(target=self._executar_periodicamente, name="brix-kpis", daemon=True)
+        self._agendador.start()
+
+    def _executar_periodicamente(self):
+        while True:
+            try:
+                self.materializar(self.fonte())
+                self.ultimo_erro = None
+            except Exception as e:
+                self.ultimo_erro = str(e)
+            time.sleep(self.intervalo)
+
+
+def tendencia(serie, frequencia='D'):
+    """Série agregada por período (D, W, M) somando os clientes: estoques pela média diária,
+    fluxos somados e lead time/liberação médios (soma / quantidade)"""
+    colunas = ['ativos'] + COLUNAS_CANAL + COLUNAS_MARCO + COLUNAS_STATUS + COLUNAS_FLUXO
+    if serie.empty:
+        return pd.DataFrame(columns=colunas + ['lead_time_medio', 'liberacao_media'])
+    por_dia = serie.groupby('dia')[colunas].sum()
+    por_dia = por_dia.reindex(pd.date_range(por_dia.index.min(), por_dia.index.max(), freq='D'), fill_value=0)
+    regra = {'D': 'D', 'W': 'W-MON', 'M': 'MS'}[frequencia]
+    agrupado = por_dia.resample(regra, label='left', closed='left')
+    resultado = pd.concat([agrupado[COLUNAS_ESTOQUE].mean(), agrupado[COLUNAS_FLUXO].sum()], axis=1)
+    resultado['lead_time_medio'] = resultado['lead_time_soma'] / resultado['concluidos'].replace(0, np.nan)
+    resultado['liberacao_media'] = resultado['liberacao_soma'] / resultado['liberados'].replace(0, np.nan)
+    return resultado
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Linha do tempo dos containers - Sistema BRIX
+Cada container vira uma sequência de segmentos, um por etapa da cadeia de
+marcos (CARREGAMENTO -> ... -> DESCARREGAMENTO); a etapa atual de um processo
+não encerrado fica em aberto até hoje. Com poucos containers no período o
+gráfico é um Gantt (um trace por etapa, não por container); acima do limite
+os segmentos são somados no servidor em caixas etapa x dia (ou x N dias) e
+exibidos como heatmap. O tamanho da figura fica limitado nos dois modos,
+seja o período de 50 ou de 50.000 containers.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from analise_transito import NOMES_ETAPAS, converter_datas
+from dados_padrao import MARCOS_TRANSITO
+
+# Acima deste número de containers no período o gráfico passa a ser agregado
+MAX_CONTAINERS_DETALHE = 150
+
+# Colunas (caixas de tempo) do heatmap agregado
+MAX_COLUNAS = 180
+
+CORES_ETAPAS = ['#3498db', '#9b59b6', '#1abc9c', '#e67e22', '#e74c3c', '#27ae60']
+
+UM_DIA = np.timedelta64(1, 'D')
+
+
+def montar_segmentos(df, hoje=None):
+    """Segmentos (posicao, container, cliente, etapa, inicio, fim, aberto) de todos os containers"""
+    colunas = ['posicao', 'container', 'cliente', 'etapa', 'inicio', 'fim', 'aberto']
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+    hoje = np.datetime64(pd.Timestamp(hoje or pd.Timestamp.today()).normalize(), 'ns')
+    datas = converter_datas(df, MARCOS_TRANSITO).to_numpy(dtype='datetime64[ns]')
+    presentes = ~np.isnat(datas)
+
+    # Último marco atingido (-1 = nenhum): a etapa seguinte a ele está em andamento
+    ultimo = np.where(presentes.any(axis=1), len(MARCOS_TRANSITO) - 1 - presentes[:, ::-1].argmax(axis=1), -1)
+    encerrado = (df['STATUS_FINAL'].fillna('') != '').to_numpy() if 'STATUS_FINAL' in df.columns else False
+
+    partes = []
+    for etapa in range(len(NOMES_ETAPAS)):
+        inicio, fim = datas[:, etapa], datas[:, etapa + 1]
+        completos = np.flatnonzero(presentes[:, etapa] & presentes[:, etapa + 1] & (fim >= inicio))
+        abertos = np.flatnonzero((ultimo == etapa) & ~encerrado & (inicio <= hoje))
+        for posicoes, fins, aberto in ((completos, fim[completos], False), (abertos, hoje, True)):
+            if len(posicoes):
+                partes.append(pd.DataFrame({
+                    'posicao': posicoes,
+                    'etapa': etapa,
+                    'inicio': inicio[posicoes],
+                    'fim': np.broadcast_to(fins, len(posicoes)),
+                    'aberto': aberto,
+                }))
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+
+    segmentos = pd.concat(partes, ignore_index=True)
+    segmentos['container'] = df['CONTAINER'].to_numpy()[segmentos['posicao']]
+    segmentos['cliente'] = df['CLIENTE'].to_numpy()[segmentos['posicao']]
+    return segmentos[colunas]
+
+
+def no_periodo(segmentos, inicio, fim):
+    """Segmentos que cruzam o período [inicio, fim] (datas inclusivas)"""
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    return segmentos[(segmentos['inicio'] <= fim) & (segmentos['fim'] >= inicio)]
+
+
+def figura_linha_tempo(segmentos, inicio, fim, limite=MAX_CONTAINERS_DETALHE):
+    """Figura do período e o modo usado ('detalhe' ou 'agregado')"""
+    visiveis = no_periodo(segmentos, inicio, fim)
+    if visiveis['posicao'].nunique() <= limite:
+        return figura_detalhe(visiveis, inicio, fim), 'detalhe'
+    return figura_agregada(visiveis, inicio, fim), 'agregado'
+
+
+def figura_detalhe(segmentos, inicio, fim):
+    """Gantt: uma barra por etapa de cada container, marcos como pontos (WebGL)"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    ordem = segmentos.sort_values(['inicio', 'posicao']).drop_duplicates('posicao')
+    rotulos = {posicao: f"{container} · {cliente}" for posicao, container, cliente
+               in ordem[['posicao', 'container', 'cliente']].itertuples(index=False)}
+
+    for etapa, nome in enumerate(NOMES_ETAPAS):
+        parte = segmentos[segmentos['etapa'] == etapa]
+        if parte.empty:
+            continue
+        duracao = (parte['fim'] - parte['inicio']).to_numpy() / np.timedelta64(1, 'ms')
+        fig.add_trace(go.Bar(
+            name=nome,
+            orientation='h',
+            y=parte['posicao'].map(rotulos),
+            base=parte['inicio'],
+            x=np.maximum(duracao, 86400000 / 4),  # Etapas de 0 dia continuam visíveis
+            marker_color=CORES_ETAPAS[etapa % len(CORES_ETAPAS)],
+            marker_opacity=np.where(parte['aberto'], 0.45, 0.9),
+            customdata=np.stack([(duracao / 86400000).round(1), np.where(parte['aberto'], 'em andamento', '')], axis=1),
+            hovertemplate=f"%{{y}}<br>{nome}<br>%{{base|%d/%m/%Y}} · %{{customdata[0]}} dia(s) %{{customdata[1]}}<extra></extra>",
+        ))
+
+    marcos = segmentos[~segmentos['aberto']]
+    pontos = pd.concat([segmentos[['posicao', 'inicio']].rename(columns={'inicio': 'data'}),
+                        marcos[['posicao', 'fim']].rename(columns={'fim': 'data'})]).drop_duplicates()
+    fig.add_trace(go.Scattergl(
+        name="Marcos", mode='markers', y=pontos['posicao'].map(rotulos), x=pontos['data'],
+        marker={'size': 5, 'color': '#2c3e50'}, hovertemplate="%{y}<br>%{x|%d/%m/%Y}<extra></extra>",
+    ))
+
+    fig.update_layout(
+        barmode='overlay',
+        height=min(200 + 22 * len(rotulos), 3600),
+        xaxis={'type': 'date', 'range': [pd.Timestamp(inicio), pd.Timestamp(fim) + pd.Timedelta(days=1)]},
+        yaxis={'categoryorder': 'array', 'categoryarray': list(rotulos.values())[::-1]},
+        legend={'orientation': 'h', 'y': -0.15},
+        margin={'l': 10, 'r': 10, 't': 30, 'b': 10},
+        title="🗓️ Linha do tempo por container",
+    )
+    return fig
+
+
+def agregar(segmentos, inicio, fim, max_colunas=MAX_COLUNAS):
+    """Containers em cada etapa por caixa de tempo: (matriz etapas x caixas, início das caixas, dias por caixa)"""
+    segmentos = no_periodo(segmentos, inicio, fim)
+    inicio = np.datetime64(pd.Timestamp(inicio), 'D')
+    dias = int((np.datetime64(pd.Timestamp(fim), 'D') - inicio) / UM_DIA) + 1
+    passo = max(1, math.ceil(dias / max_colunas))
+    colunas = math.ceil(dias / passo)
+
+    comeco = ((segmentos['inicio'].to_numpy(dtype='datetime64[D]') - inicio) / UM_DIA).astype(int)
+    termino = ((segmentos['fim'].to_numpy(dtype='datetime64[D]') - inicio) / UM_DIA).astype(int)
+    primeira = np.clip(comeco, 0, dias - 1) // passo
+    ultima = np.clip(termino, 0, dias - 1) // passo
+
+    # Vetor de diferenças por etapa: +1 na primeira caixa do segmento, -1 depois da última
+    etapas = segmentos['etapa'].to_numpy(dtype=int)
+    diferencas = np.zeros((len(NOMES_ETAPAS), colunas + 1), dtype=np.int64)
+    np.add.at(diferencas, (etapas, primeira), 1)
+    np.add.at(diferencas, (etapas, ultima + 1), -1)
+    contagem = diferencas.cumsum(axis=1)[:, :colunas]
+
+    caixas = inicio + np.arange(colunas) * passo * UM_DIA
+    return contagem, caixas, passo
+
+
+def figura_agregada(segmentos, inicio, fim, max_colunas=MAX_COLUNAS):
+    """Heatmap etapa x tempo com o número de containers em cada etapa"""
+    import plotly.graph_objects as go
+
+    contagem, caixas, passo = agregar(segmentos, inicio, fim, max_colunas)
+    periodo = "dia" if passo == 1 else f"{passo} dias"
+    fig = go.Figure(go.Heatmap(
+        z=contagem,
+        x=caixas.astype('datetime64[ms]').astype(object),
+        y=NOMES_ETAPAS,
+        colorscale='Blues',
+        colorbar={'title': 'containers'},
+        hovertemplate=f"%{{y}}<br>%{{x|%d/%m/%Y}} (+{periodo})<br>%{{z}} container(s)<extra></extra>",
+    ))
+    fig.update_layout(
+        height=420,
+        xaxis={'type': 'date'},
+        yaxis={'autorange': 'reversed'},
+        margin={'l': 10, 'r': 10, 't': 40, 'b': 10},
+        title=f"🗓️ Containers por etapa (caixas de {periodo}, {segmentos['posicao'].nunique()} containers)",
+    )
+    return fig
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memória das sessões do Sistema BRIX - Contabilidade e espera de sessões ociosas
+Cada sessão mede o próprio st.session_state (na sua thread, no máximo uma vez
+por INTERVALO_MEDICAO) e publica o resultado num registro do processo, que o
+admin consulta por sessão, por chave e no total. Os tamanhos são aproximados:
+DataFrames, listas e dicionários grandes são medidos por amostra e objetos
+compartilhados entre sessões entram na conta de cada uma.
+
+Sessões sem uso há mais de N segundos vão para espera: caches derivados,
+objetos grandes e flags de modais saem da sessão e são reconstruídos da base
+local quando o usuário volta.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Reconstruídos sob demanda pelo próprio app (cache_da_versao, indice_usuarios)
+CHAVES_DERIVADAS = ('caches_da_versao', 'indice_usuarios')
+
+# Recarregados da base local ao sair da espera
+CHAVES_GRANDES = ('df_tracking', 'clientes_db', 'usuarios_db', 'trackings_pendentes', 'pacote_relatorios')
+
+# Estado de modais/edições abertas (perde o sentido depois de uma longa ausência)
+PREFIXOS_MODAIS = ('editando_', 'excluindo_')
+
+# Remedir a mesma sessão no máximo uma vez a cada N segundos
+INTERVALO_MEDICAO = 60
+
+# Elementos medidos de cada DataFrame/lista/dicionário antes de extrapolar
+AMOSTRA = 1000
+
+PROFUNDIDADE_MAXIMA = 8
+
+
+def tamanho_aproximado(objeto, vistos=None, profundidade=0):
+    """Bytes aproximados de um objeto e do que ele referencia (amostra nas coleções grandes)"""
+    if vistos is None:
+        vistos = set()
+    if id(objeto) in vistos or profundidade > PROFUNDIDADE_MAXIMA:
+        return 0
+    vistos.add(id(objeto))
+
+    if isinstance(objeto, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(objeto)
+    if hasattr(objeto, 'memory_usage') and hasattr(objeto, 'iloc'):
+        # DataFrame/Series: memória profunda de uma amostra das linhas, extrapolada
+        linhas = len(objeto)
+        if linhas <= AMOSTRA:
+            return int(_soma(objeto.memory_usage(deep=True)))
+        amostra = _soma(objeto.iloc[:AMOSTRA].memory_usage(deep=True, index=False))
+        return int(amostra * linhas / AMOSTRA + _soma(objeto.index.memory_usage()))
+    if hasattr(objeto, 'nbytes') and hasattr(objeto, 'dtype'):
+        return int(objeto.nbytes)
+
+    total = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        total += _amostra(iter(objeto.items()), len(objeto), vistos, profundidade)
+    elif isinstance(objeto, (list, tuple, set, frozenset)):
+        total += _amostra(iter(objeto), len(objeto), vistos, profundidade)
+    else:
+        atributos = list(getattr(objeto, '__dict__', {}).values())
+        for classe in type(objeto).__mro__:
+            atributos += [getattr(objeto, nome) for nome in getattr(classe, '__slots__', ()) if hasattr(objeto, nome)]
+        for valor in atributos:
+            total += tamanho_aproximado(valor, vistos, profundidade + 1)
+    return total
+
+
+def _soma(memoria):
+    return memoria.sum() if hasattr(memoria, 'sum') else memoria
+
+
+def _amostra(elementos, quantidade, vistos, profundidade):
+    medidos, total = 0, 0
+    for elemento in elementos:
+        if medidos == AMOSTRA:
+            break
+        total += tamanho_aproximado(elemento, vistos, profundidade + 1)
+        medidos += 1
+    return int(total * quantidade / medidos) if medidos else 0
+
+
+def medir_estado(estado):
+    """{chave: bytes aproximados} de um st.session_state (ou dict)"""
+    tamanhos = {}
+    for chave in list(estado.keys()):
+        try:
+            tamanhos[str(chave)] = tamanho_aproximado(estado[chave])
+        except (KeyError, RuntimeError):
+            continue
+    return tamanhos
+
+
+def memoria_processo():
+    """RSS do processo em bytes (None fora do Linux)"""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def chaves_para_espera(estado):
+    """Chaves que saem da sessão ao entrar em espera"""
+    return [chave for chave in list(estado.keys())
+            if chave in CHAVES_DERIVADAS or chave in CHAVES_GRANDES
+            or (isinstance(chave, str) and chave.startswith(PREFIXOS_MODAIS))]
+
+
+# ------------------------------------------------------------- registro ---
+
+class RegistroSessoes:
+    """Uso e medições de memória de todas as sessões do processo"""
+
+    def __init__(self, ociosa_apos=1800, intervalo_medicao=INTERVALO_MEDICAO):
+        self.ociosa_apos = ociosa_apos
+        self.intervalo_medicao = intervalo_medicao
+        self._lock = threading.Lock()
+        self._sessoes = {}
+
+    def _sessao(self, id_sessao):
+        agora = time.time()
+        return self._sessoes.setdefault(id_sessao, {
+            'usuario': None, 'ultimo_uso': agora,
+            'em_espera': False, 'medida_em': 0, 'tamanhos': {},
+        })
+
+    def registrar_uso(self, id_sessao, usuario=None):
+        """Interação do usuário (não conta a verificação periódica)"""
+        with self._lock:
+            sessao = self._sessao(id_sessao)
+            sessao['ultimo_uso'] = time.time()
+            sessao['usuario'] = usuario
+            sessao['em_espera'] = False
+
+    def ociosa(self, id_sessao):
+        if not self.ociosa_apos:
+            return False
+        with self._lock:
+            sessao = self._sessoes.get(id_sessao)
+            return sessao is not None and not sessao['em_espera'] and time.time() - sessao['ultimo_uso'] > self.ociosa_apos
+
+    def precisa_medir(self, id_sessao):
+        with self._lock:
+            sessao = self._sessoes.get(id_sessao)
+            return sessao is None or time.time() - sessao['medida_em'] >= self.intervalo_medicao
+
+    def atualizar_medicao(self, id_sessao, tamanhos, em_espera=None):
+        with self._lock:
+            sessao = self._sessao(id_sessao)
+            sessao['tamanhos'] = tamanhos
+            sessao['medida_em'] = time.time()
+            if em_espera is not None:
+                sessao['em_espera'] = em_espera
+
+    def remover_encerradas(self, ativa):
+        """Esquece sessões que o servidor já fechou (ativa(id) -> bool)"""
+        with self._lock:
+            encerradas = [id_sessao for id_sessao in self._sessoes if not ativa(id_sessao)]
+            for id_sessao in encerradas:
+                del self._sessoes[id_sessao]
+        return len(encerradas)
+
+    def resumo(self):
+        """Sessões (da maior para a menor) e totais por chave e geral"""
+        agora = time.time()
+        with self._lock:
+            sessoes = [{
+                'sessao': id_sessao,
+                'usuario': sessao['usuario'],
+                'ociosa_ha': agora - sessao['ultimo_uso'],
+                'medida_ha': agora - sessao['medida_em'] if sessao['medida_em'] else None,
+                'em_espera': sessao['em_espera'],
+                'bytes': sum(sessao['tamanhos'].values()),
+                'tamanhos': dict(sessao['tamanhos']),
+            } for id_sessao, sessao in self._sessoes.items()]
+        por_chave = {}
+        for sessao in sessoes:
+            for chave, tamanho in sessao['tamanhos'].items():
+                por_chave[chave] = por_chave.get(chave, 0) + tamanho
+        return {
+            'sessoes': sorted(sessoes, key=lambda s: s['bytes'], reverse=True),
+            'por_chave': dict(sorted(por_chave.items(), key=lambda item: item[1], reverse=True)),
+            'total': sum(s['bytes'] for s in sessoes),
+        }
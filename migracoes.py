@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrações de esquema do Sistema BRIX - Pipeline versionado aplicado na carga
+Cada migração leva os dados de uma versão de esquema para a seguinte e roda
+sobre o DataFrame inteiro (operações vetorizadas). A versão fica em
+metadata.versao_esquema no backup e no snapshot local: dados já migrados são
+carregados sem passar de novo pelo pipeline, e as telas podem contar com o
+esquema fixo (todas as COLUNAS_TRACKING, texto, sem NaN, sem duplicatas).
+O pandas só é importado quando há migração a fazer (o app importa este
+módulo antes do login).
+"""
+
+import math
+
+from dados_padrao import COLUNAS_TRACKING
+
+# Colunas com nomes antigos/errados -> nome atual
+RENOMEAR_COLUNAS = {
+    'CHEGADA CIUDAD DE LESTE PY': 'CHEGADA CIUDAD DEL ESTE PY',
+    'LIBERACAO PORTO DESTINO': 'LIBERAÇAO PORTO DESTINO',
+    'STATUS FINAL': 'STATUS_FINAL',
+}
+
+# Chave de um processo para a remoção de duplicatas
+CHAVE_DUPLICATAS = ['CLIENTE', 'CONTAINER', 'CARREGAMENTO']
+
+
+def _texto(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return ''
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%d/%m/%Y')
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+# ------------------------------------------------------------ migrações ---
+
+def _renomear_colunas(df):
+    """v1: colunas com nome errado passam para o nome atual (sem perder valores)"""
+    alterados = 0
+    for antiga, nova in RENOMEAR_COLUNAS.items():
+        if antiga not in df.columns:
+            continue
+        origem = df[antiga].fillna('')
+        if nova in df.columns:
+            vazios = df[nova].isna() | (df[nova] == '')
+            preencher = vazios & (origem != '')
+            df.loc[preencher, nova] = origem[preencher]
+            alterados += int(preencher.sum())
+            df = df.drop(columns=[antiga])
+        else:
+            alterados += int((origem != '').sum())
+            df = df.rename(columns={antiga: nova})
+    return df, alterados
+
+
+def _colunas_obrigatorias(df):
+    """v2: todas as COLUNAS_TRACKING presentes, na ordem padrão, sem NaN"""
+    faltando = [c for c in COLUNAS_TRACKING if c not in df.columns]
+    nulos = int(df.isna().any(axis=1).sum())
+    for coluna in faltando:
+        df[coluna] = ''
+    extras = [c for c in df.columns if c not in COLUNAS_TRACKING]
+    df = df[COLUNAS_TRACKING + extras].fillna('')
+    return df, (len(df) if faltando else 0) + nulos
+
+
+def _tipos(df):
+    """v3: valores como texto (datas DD/MM/AAAA), container e canal em maiúsculas"""
+    import pandas as pd
+
+    alterados = pd.Series(False, index=df.index)
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.infer_dtype(serie, skipna=False) == 'string':
+            convertida = serie.str.strip()
+        else:
+            convertida = serie.map(_texto)
+        if coluna in ('CONTAINER', 'CANAL RFB'):
+            convertida = convertida.str.upper()
+        convertida = convertida.astype(object)
+        mudou = convertida.to_numpy() != serie.astype(object).to_numpy()
+        if mudou.any():
+            alterados |= mudou
+            df[coluna] = convertida
+    return df, int(alterados.sum())
+
+
+def _duplicatas(df):
+    """v4: um registro por processo (mantém o mais completo; no empate, o mais recente)"""
+    if df.empty:
+        return df, 0
+    preenchidos = (df[COLUNAS_TRACKING] != '').sum(axis=1)
+    ordem = preenchidos.sort_values(kind='stable').index
+    manter = ~df.loc[ordem].duplicated(subset=CHAVE_DUPLICATAS, keep='last')
+    manter = manter.reindex(df.index)
+    removidos = int((~manter).sum())
+    return (df[manter].reset_index(drop=True) if removidos else df), removidos
+
+
+# (versão resultante, descrição, função)
+MIGRACOES = [
+    (1, "Renomear colunas antigas", _renomear_colunas),
+    (2, "Colunas obrigatórias e valores vazios", _colunas_obrigatorias),
+    (3, "Tipos e formatação dos valores", _tipos),
+    (4, "Remover trackings duplicados", _duplicatas),
+]
+
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
+
+
+def versao_dos_dados(dados):
+    """Versão do esquema de um backup/estado (0 = anterior ao versionamento)"""
+    if not dados:
+        return 0
+    versao = dados.get('versao_esquema', (dados.get('metadata') or {}).get('versao_esquema', 0))
+    try:
+        return int(versao)
+    except (TypeError, ValueError):
+        return 0
+
+
+def migrar_trackings(trackings, colunas=None, versao=0):
+    """DataFrame dos trackings no esquema atual + relatório [(versão, descrição, linhas alteradas)]"""
+    import pandas as pd
+
+    df = trackings.copy() if isinstance(trackings, pd.DataFrame) else pd.DataFrame(trackings, columns=colunas or None)
+    if versao >= VERSAO_ESQUEMA and all(c in df.columns for c in COLUNAS_TRACKING):
+        return df, []
+    relatorio = []
+    for destino, descricao, funcao in MIGRACOES:
+        if versao < destino:
+            df, alterados = funcao(df)
+            relatorio.append((destino, descricao, alterados))
+    return df, relatorio
+
+
+def migrar_estado(estado):
+    """Estado (clientes, usuários, trackings) no esquema atual; retorna (estado, df, relatório)"""
+    df, relatorio = migrar_trackings(estado.get('trackings') or [], estado.get('colunas'), versao_dos_dados(estado))
+    migrado = {
+        'clientes': estado.get('clientes') or {},
+        'usuarios': estado.get('usuarios') or {},
+        'trackings': df.to_dict('records'),
+        'colunas': list(df.columns),
+        'versao_esquema': VERSAO_ESQUEMA,
+    }
+    return migrado, df, relatorio
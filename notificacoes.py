@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notificações de marcos do Sistema BRIX - Resumos (digests) por e-mail
+Cada alteração de marco (datas, canal RFB, status final) é registrada como
+transição e acumulada por cliente durante uma janela configurável. Ao fim da
+janela é montado um único e-mail por destinatário com todas as mudanças dos
+seus containers. O envio roda em uma thread própria, com fila limitada e
+reaproveitamento da conexão SMTP. Um resumo que não entra na fila ou falha no
+envio volta para as pendências do destinatário e é tentado de novo na
+próxima janela.
+"""
+
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from html import escape
+from pathlib import Path
+
+from dados_padrao import DADOS_EMPRESA, MARCOS_TRANSITO
+
+# Campos cuja alteração gera notificação
+CAMPOS_NOTIFICADOS = MARCOS_TRANSITO + ['PREVISAO CHEGADA PORTO DESTINO', 'CANAL RFB', 'STATUS_FINAL']
+
+# Janela (minutos) de acúmulo das alterações de um cliente antes do envio
+JANELA_PADRAO_MINUTOS = 30
+
+ARQUIVO_PENDENTES = "notificacoes_pendentes.jsonl"
+
+
+def detectar_transicoes(anterior, novos):
+    """Lista de transições {campo, de, para} dos campos notificados que mudaram"""
+    transicoes = []
+    for campo in CAMPOS_NOTIFICADOS:
+        if campo not in novos:
+            continue
+        de, para = str(anterior.get(campo) or '').strip(), str(novos[campo] or '').strip()
+        if de != para:
+            transicoes.append({'campo': campo, 'de': de, 'para': para})
+    return transicoes
+
+
+def destinatarios(cliente, clientes_db, usuarios_db):
+    """E-mails do cliente e dos usuários ativos vinculados a ele (sem repetição)"""
+    emails = []
+    for dados in clientes_db.values():
+        if cliente in (dados.get('razao_social'), dados.get('nome_fantasia')) and dados.get('ativo', True):
+            emails.append(dados.get('email'))
+    dados_cliente = clientes_db.get(cliente)
+    if dados_cliente and dados_cliente.get('ativo', True):
+        emails.append(dados_cliente.get('email'))
+    for dados in usuarios_db.values():
+        if not dados.get('ativo') or dados.get('tipo') == 'admin':
+            continue
+        if dados.get('cliente_vinculado') == cliente or cliente in (dados.get('clientes_vinculados') or []):
+            emails.append(dados.get('email'))
+
+    unicos = {}
+    for email in emails:
+        email = str(email or '').strip()
+        if '@' in email:
+            unicos.setdefault(email.lower(), email)
+    return list(unicos.values())
+
+
+class FilaEnvioSMTP:
+    """Thread de envio com fila limitada; a conexão SMTP é mantida aberta enquanto há mensagens"""
+
+    def __init__(self, host, porta=25, usuario=None, senha=None, tls=False, tamanho_fila=100, ocioso_segundos=60):
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.tls = tls
+        self.ocioso_segundos = ocioso_segundos
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.enviados = 0
+        self.falhas = 0
+        self.conexoes = 0
+        self.ultimo_erro = None
+        self._conexao = None
+        self._thread = threading.Thread(target=self._trabalhar, name="brix-smtp", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, mensagem, timeout=1.0, ao_falhar=None):
+        """Coloca a mensagem na fila; False se a fila continuar cheia após o timeout.
+        'ao_falhar' é chamado (na thread de envio) se o envio falhar."""
+        try:
+            self.fila.put((mensagem, ao_falhar), timeout=timeout)
+            return True
+        except queue.Full:
+            self.falhas += 1
+            self.ultimo_erro = "Fila de envio cheia"
+            return False
+
+    def aguardar(self):
+        """Bloqueia até a fila esvaziar"""
+        self.fila.join()
+
+    def parar(self):
+        self.fila.put(None)
+        self._thread.join(timeout=10)
+
+    def _conectar(self):
+        conexao = smtplib.SMTP(self.host, self.porta, timeout=30)
+        if self.tls:
+            conexao.starttls()
+        if self.usuario:
+            conexao.login(self.usuario, self.senha)
+        self.conexoes += 1
+        return conexao
+
+    def _fechar(self):
+        if self._conexao is not None:
+            try:
+                self._conexao.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conexao = None
+
+    def _enviar(self, mensagem):
+        # Uma nova tentativa com conexão nova se o servidor encerrou a anterior
+        for tentativa in range(2):
+            try:
+                if self._conexao is None:
+                    self._conexao = self._conectar()
+                self._conexao.send_message(mensagem)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._conexao = None
+                if tentativa:
+                    raise
+
+    def _trabalhar(self):
+        while True:
+            try:
+                item = self.fila.get(timeout=self.ocioso_segundos)
+            except queue.Empty:
+                self._fechar()  # Ociosa: libera a conexão
+                continue
+            try:
+                if item is None:
+                    self._fechar()
+                    return
+                mensagem, ao_falhar = item
+                try:
+                    self._enviar(mensagem)
+                    self.enviados += 1
+                except (smtplib.SMTPException, OSError) as e:
+                    self.falhas += 1
+                    self.ultimo_erro = str(e)
+                    self._fechar()
+                    # Endereço recusado não adianta tentar de novo
+                    if ao_falhar and not isinstance(e, smtplib.SMTPRecipientsRefused):
+                        ao_falhar()
+            except Exception as e:
+                self.ultimo_erro = str(e)
+            finally:
+                self.fila.task_done()
+
+
+class CentralNotificacoes:
+    """Acumula transições por cliente e gera os resumos quando a janela expira"""
+
+    def __init__(self, fila, remetente, janela_minutos=JANELA_PADRAO_MINUTOS, diretorio=None, intervalo_verificacao=30):
+        self.fila = fila
+        self.remetente = remetente
+        self.janela = timedelta(minutes=janela_minutos)
+        self.intervalo_verificacao = intervalo_verificacao
+        self.caminho_pendentes = Path(diretorio) / ARQUIVO_PENDENTES if diretorio else None
+        self.resumos_enviados = 0
+        self.ultimo_erro = None
+        self._lock = threading.Lock()
+        self._pendentes = {}  # cliente -> {'desde', 'eventos', 'destinatarios'}
+        self._agendador = None
+        self._carregar_pendentes()
+        # Resumos pendentes de antes do reinício também precisam sair no fim da janela
+        if self._pendentes:
+            self._iniciar_agendador()
+
+    # Pendências ficam em disco para sobreviver a reinícios dentro da janela
+    def _carregar_pendentes(self):
+        if not self.caminho_pendentes or not self.caminho_pendentes.exists():
+            return
+        with open(self.caminho_pendentes, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    self._acumular(json.loads(linha))
+                except ValueError:
+                    continue
+
+    def _gravar_pendentes(self):
+        if not self.caminho_pendentes:
+            return
+        self.caminho_pendentes.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho_pendentes.with_suffix('.tmp')
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            for lote in self._pendentes.values():
+                for evento in lote['eventos']:
+                    arquivo.write(json.dumps(evento, ensure_ascii=False) + '\n')
+        os.replace(temporario, self.caminho_pendentes)
+
+    def _acumular(self, evento, desde=None):
+        lote = self._pendentes.setdefault(evento['cliente'], {
+            'desde': desde or datetime.fromisoformat(evento['momento']), 'eventos': [], 'destinatarios': []
+        })
+        lote['eventos'].append(evento)
+        for email in evento['destinatarios']:
+            if email not in lote['destinatarios']:
+                lote['destinatarios'].append(email)
+
+    @property
+    def pendentes(self):
+        """Quantidade de transições aguardando envio"""
+        with self._lock:
+            return sum(len(lote['eventos']) for lote in self._pendentes.values())
+
+    def registrar(self, cliente, container, transicoes, emails, usuario=None, agora=None):
+        """Registra as transições de um container (ignorado se o cliente não tiver destinatários)"""
+        if not transicoes or not emails:
+            return False
+        evento = {
+            'cliente': cliente,
+            'container': container,
+            'transicoes': transicoes,
+            'destinatarios': list(emails),
+            'usuario': usuario,
+            'momento': (agora or datetime.now()).isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            self._acumular(evento)
+            if self.caminho_pendentes:
+                self.caminho_pendentes.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.caminho_pendentes, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(json.dumps(evento, ensure_ascii=False) + '\n')
+        self._iniciar_agendador()
+        return True
+
+    def despachar(self, agora=None, forcar=False):
+        """Envia os resumos dos clientes cuja janela expirou; retorna quantos e-mails foram enfileirados"""
+        agora = agora or datetime.now()
+        with self._lock:
+            prontos = {cliente: lote for cliente, lote in self._pendentes.items()
+                       if forcar or lote['desde'] + self.janela <= agora}
+            if not prontos:
+                return 0
+            for cliente in prontos:
+                del self._pendentes[cliente]
+            self._persistir()
+
+        # Um resumo por destinatário, juntando todos os clientes que ele acompanha
+        por_destinatario = {}
+        for cliente, lote in prontos.items():
+            for evento in lote['eventos']:
+                for email in evento['destinatarios']:
+                    por_destinatario.setdefault(email, {}).setdefault(cliente, []).append(evento)
+
+        enfileirados = 0
+        for email, eventos_por_cliente in por_destinatario.items():
+            def devolver(email=email, eventos_por_cliente=eventos_por_cliente):
+                self._devolver(email, eventos_por_cliente)
+            if self.fila.enfileirar(renderizar_resumo(self.remetente, email, eventos_por_cliente), ao_falhar=devolver):
+                enfileirados += 1
+            else:
+                devolver()
+        self.resumos_enviados += enfileirados
+        return enfileirados
+
+    def _devolver(self, email, eventos_por_cliente):
+        """Resumo não enviado: os eventos voltam às pendências só para este destinatário (nova janela)"""
+        agora = datetime.now()
+        with self._lock:
+            for eventos in eventos_por_cliente.values():
+                for evento in eventos:
+                    self._acumular(dict(evento, destinatarios=[email]), desde=agora)
+            self._persistir()
+        self._iniciar_agendador()
+
+    def _persistir(self):
+        """Regrava as pendências (chamar com o lock); erro de disco não derruba o envio"""
+        try:
+            self._gravar_pendentes()
+        except OSError as e:
+            self.ultimo_erro = str(e)
+
+    def _iniciar_agendador(self):
+        if self._agendador is not None:
+            return
+        with self._lock:
+            if self._agendador is None:
+                self._agendador = threading.Thread(target=self._verificar_periodicamente, name="brix-resumos", daemon=True)
+                self._agendador.start()
+
+    def _verificar_periodicamente(self):
+        while True:
+            time.sleep(self.intervalo_verificacao)
+            try:
+                self.despachar()
+            except Exception as e:
+                self.ultimo_erro = str(e)
+
+
+def _consolidar(eventos):
+    """Transições por container, mantendo só o primeiro 'de' e o último 'para' de cada campo"""
+    containers = {}
+    for evento in eventos:
+        campos = containers.setdefault(evento['container'], {})
+        for transicao in evento['transicoes']:
+            if transicao['campo'] in campos:
+                campos[transicao['campo']]['para'] = transicao['para']
+            else:
+                campos[transicao['campo']] = dict(transicao)
+    return {c: [t for t in campos.values() if t['de'] != t['para']] for c, campos in containers.items()}
+
+
+def renderizar_resumo(remetente, destinatario, eventos_por_cliente):
+    """E-mail (texto + HTML) com as mudanças de todos os containers do destinatário"""
+    consolidado = {cliente: _consolidar(eventos) for cliente, eventos in eventos_por_cliente.items()}
+    total = sum(len(containers) for containers in consolidado.values())
+
+    mensagem = EmailMessage()
+    mensagem['Subject'] = f"🚢 {DADOS_EMPRESA['nome']} - Atualização de {total} container(s)"
+    mensagem['From'] = remetente
+    mensagem['To'] = destinatario
+
+    texto = [f"Atualizações de tracking - {DADOS_EMPRESA['nome']}", ""]
+    html = [f"<h2>🚢 Atualizações de tracking - {escape(DADOS_EMPRESA['nome'])}</h2>"]
+    for cliente, containers in consolidado.items():
+        texto.append(f"== {cliente} ==")
+        html.append(f"<h3>{escape(cliente)}</h3>")
+        for container, transicoes in containers.items():
+            if not transicoes:
+                continue
+            texto.append(f"📦 {container}")
+            html.append(f"<p><b>📦 {escape(container)}</b></p><ul>")
+            for t in transicoes:
+                de = t['de'] or '(vazio)'
+                para = t['para'] or '(vazio)'
+                texto.append(f"   {t['campo']}: {de} → {para}")
+                html.append(f"<li>{escape(t['campo'])}: {escape(de)} → <b>{escape(para)}</b></li>")
+            html.append("</ul>")
+        texto.append("")
+    rodape = f"{DADOS_EMPRESA['nome']} - {DADOS_EMPRESA['telefone']} - {DADOS_EMPRESA['email']}"
+    texto.append(rodape)
+    html.append(f"<hr><small>{escape(rodape)}</small>")
+
+    mensagem.set_content("\n".join(texto))
+    mensagem.add_alternative("\n".join(html), subtype='html')
+    return mensagem
+
+
+def criar_central_do_ambiente(diretorio=None):
+    """Central configurada pelas variáveis BRIX_SMTP_* (None se BRIX_SMTP_HOST não estiver definido)"""
+    host = os.getenv("BRIX_SMTP_HOST", "")
+    if not host:
+        return None
+    fila = FilaEnvioSMTP(
+        host,
+        int(os.getenv("BRIX_SMTP_PORTA", "25")),
+        usuario=os.getenv("BRIX_SMTP_USUARIO") or None,
+        senha=os.getenv("BRIX_SMTP_SENHA") or None,
+        tls=os.getenv("BRIX_SMTP_TLS", "").lower() in ('1', 'true', 'sim'),
+    )
+    return CentralNotificacoes(
+        fila,
+        os.getenv("BRIX_EMAIL_REMETENTE", DADOS_EMPRESA['email']),
+        janela_minutos=float(os.getenv("BRIX_JANELA_NOTIFICACAO_MIN", str(JANELA_PADRAO_MINUTOS))),
+        diretorio=diretorio,
+    )
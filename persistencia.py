@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistência local do Sistema BRIX - Snapshot + Write-Ahead Log
+Toda mutação é gravada no WAL antes de qualquer backup no GitHub, e um
+snapshot compacto é gerado periodicamente. Ao reiniciar o processo o estado
+é reconstruído localmente (snapshot via mmap + replay do WAL), sem rede.
+Leitores de outros processos (API, comandos de consulta do CLI) abrem o
+armazenamento com somente_leitura=True: a carga não mexe nos arquivos (uma
+linha incompleta no fim do WAL pode ser a escrita em andamento do app).
+Só um processo grava: o escritor trava o arquivo base.lock (fcntl) antes de
+carregar e o mantém até terminar, pois guarda o estado e o seq em memória.
+"""
+
+import copy
+import fcntl
+import gzip
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+ARQUIVO_SNAPSHOT = "snapshot.json"
+ARQUIVO_WAL = "wal.log"
+ARQUIVO_SINCRONIZACAO = "sincronizacao.json.gz"
+ARQUIVO_TRAVA = "base.lock"
+
+# Quantidade de entradas no WAL antes de compactar em um novo snapshot
+INTERVALO_SNAPSHOT = 200
+
+# Entradas recentes mantidas em memória para o feed de alterações
+ALTERACOES_RECENTES = 1000
+
+# Identidade de um tracking: o número do container se repete em outros
+# embarques e clientes
+CHAVE_TRACKING = ('CLIENTE', 'CONTAINER', 'CARREGAMENTO')
+
+
+class BaseLocalEmUso(RuntimeError):
+    """Outro processo (o app ou outro comando) está gravando na base local"""
+
+
+def _serializar(dados):
+    """Serializa em JSON compacto (UTF-8)"""
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _linha_wal(entrada):
+    """Monta linha do WAL no formato '<crc32> <json>'"""
+    conteudo = _serializar(entrada)
+    return b'%08x ' % zlib.crc32(conteudo) + conteudo + b'\n'
+
+
+def ler_wal(caminho):
+    """Lê entradas do WAL, parando na primeira linha incompleta ou corrompida"""
+    for entrada, _ in _entradas_wal(caminho):
+        yield entrada
+
+
+def _entradas_wal(caminho):
+    """(entrada, offset do fim da linha) das linhas válidas do WAL"""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return
+    with open(caminho, 'rb') as arquivo:
+        offset = 0
+        for linha in arquivo:
+            if not linha.endswith(b'\n'):
+                return  # Escrita interrompida no meio (crash)
+            crc, _, conteudo = linha.rstrip(b'\n').partition(b' ')
+            try:
+                if int(crc, 16) != zlib.crc32(conteudo):
+                    return
+                entrada = json.loads(conteudo)
+            except ValueError:
+                return
+            offset += len(linha)
+            yield entrada, offset
+
+
+def ler_snapshot(caminho):
+    """Lê o snapshot mapeando o arquivo em memória"""
+    caminho = Path(caminho)
+    if not caminho.exists() or caminho.stat().st_size == 0:
+        return None
+    with open(caminho, 'rb') as arquivo:
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            return json.loads(mapa[:])
+
+
+def estado_vazio():
+    """Estrutura de estado sem dados"""
+    return {'clientes': {}, 'usuarios': {}, 'trackings': [], 'colunas': []}
+
+
+def _registrar_colunas(estado, registro):
+    for coluna in registro:
+        if coluna not in estado['colunas']:
+            estado['colunas'].append(coluna)
+
+
+def chave_tracking(registro):
+    """(cliente, container, carregamento) de um registro de tracking"""
+    return tuple(str(registro.get(campo) or '') for campo in CHAVE_TRACKING)
+
+
+def _localizar_tracking(estado, idx, container, chave=None):
+    """Localiza tracking pelo índice, conferindo a chave (fallback: busca pela chave).
+
+    Entradas sem chave (anteriores a ela) só valem se o índice ainda apontar
+    para o mesmo container; senão são ignoradas em vez de adivinhar o processo.
+    """
+    trackings = estado['trackings']
+    valido = idx is not None and 0 <= idx < len(trackings)
+    if chave is None:
+        return idx if valido and trackings[idx].get('CONTAINER') == container else None
+    chave = tuple(chave)
+    if valido and chave_tracking(trackings[idx]) == chave:
+        return idx
+    for i, registro in enumerate(trackings):
+        if chave_tracking(registro) == chave:
+            return i
+    return None
+
+
+def _tracking_add(estado, registro):
+    estado['trackings'].append(dict(registro))
+    _registrar_colunas(estado, registro)
+
+
+def _tracking_add_lote(estado, registros):
+    for registro in registros:
+        _tracking_add(estado, registro)
+
+
+def _tracking_edit(estado, idx, container, valores, chave=None):
+    i = _localizar_tracking(estado, idx, container, chave)
+    if i is not None:
+        estado['trackings'][i].update(valores)
+        _registrar_colunas(estado, valores)
+
+
+def _tracking_edit_lote(estado, edicoes):
+    for edicao in edicoes:
+        _tracking_edit(estado, **edicao)
+
+
+def _tracking_del(estado, idx, container, chave=None):
+    i = _localizar_tracking(estado, idx, container, chave)
+    if i is not None:
+        del estado['trackings'][i]
+
+
+def _tracking_del_cliente(estado, cliente):
+    estado['trackings'] = [r for r in estado['trackings'] if r.get('CLIENTE') != cliente]
+
+
+def _tracking_renomear_cliente(estado, de, para):
+    for registro in estado['trackings']:
+        if registro.get('CLIENTE') == de:
+            registro['CLIENTE'] = para
+
+
+def _tracking_arquivar(estado, chaves):
+    arquivados = {tuple(chave) for chave in chaves}
+    estado['trackings'] = [
+        r for r in estado['trackings']
+        if (str(r.get('CLIENTE') or ''), str(r.get('CONTAINER') or ''), str(r.get('CARREGAMENTO') or '')) not in arquivados
+    ]
+
+
+def _cliente_set(estado, chave, dados):
+    estado['clientes'][chave] = dados
+
+
+def _cliente_del(estado, chave):
+    estado['clientes'].pop(chave, None)
+
+
+def _usuario_set(estado, chave, dados):
+    estado['usuarios'][chave] = dados
+
+
+def _usuario_del(estado, chave):
+    estado['usuarios'].pop(chave, None)
+
+
+# Operações aceitas no WAL
+OPERACOES = {
+    'tracking_add': _tracking_add,
+    'tracking_add_lote': _tracking_add_lote,
+    'tracking_edit': _tracking_edit,
+    'tracking_edit_lote': _tracking_edit_lote,
+    'tracking_del': _tracking_del,
+    'tracking_del_cliente': _tracking_del_cliente,
+    'tracking_renomear_cliente': _tracking_renomear_cliente,
+    'tracking_arquivar': _tracking_arquivar,
+    'cliente_set': _cliente_set,
+    'cliente_del': _cliente_del,
+    'usuario_set': _usuario_set,
+    'usuario_del': _usuario_del,
+}
+
+
+def aplicar_operacao(estado, entrada):
+    """Aplica uma entrada do WAL sobre o estado"""
+    dados = {k: v for k, v in entrada.items() if k not in ('seq', 'op', 'ts')}
+    funcao = OPERACOES.get(entrada.get('op'))
+    if funcao:
+        funcao(estado, **dados)
+
+
+def snapshot_para_estado(snapshot):
+    """Converte o snapshot colunar em estado de trabalho"""
+    colunas = snapshot['trackings']['colunas']
+    return {
+        'clientes': snapshot['clientes'],
+        'usuarios': snapshot['usuarios'],
+        'trackings': [dict(zip(colunas, linha)) for linha in snapshot['trackings']['linhas']],
+        'colunas': list(colunas),
+        'versao_esquema': snapshot.get('versao_esquema', 0),
+    }
+
+
+def estado_para_snapshot(estado, seq):
+    """Converte o estado em snapshot colunar compacto"""
+    colunas = estado['colunas']
+    return {
+        'seq': seq,
+        'data_snapshot': datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        'versao_esquema': estado.get('versao_esquema', 0),
+        'clientes': estado['clientes'],
+        'usuarios': estado['usuarios'],
+        'trackings': {
+            'colunas': colunas,
+            'linhas': [[r.get(c) for c in colunas] for r in estado['trackings']],
+        },
+    }
+
+
+class ArmazenamentoLocal:
+    """Armazenamento local durável (snapshot + WAL) compartilhado pelo processo"""
+
+    def __init__(self, diretorio, intervalo_snapshot=INTERVALO_SNAPSHOT, somente_leitura=False, feed_alteracoes=True):
+        self.diretorio = Path(diretorio)
+        self.intervalo_snapshot = intervalo_snapshot
+        self.somente_leitura = somente_leitura
+        # Sem sessões para acompanhar (CLI): entradas não ficam em memória para o feed
+        self.feed_alteracoes = feed_alteracoes
+        self.caminho_snapshot = self.diretorio / ARQUIVO_SNAPSHOT
+        self.caminho_wal = self.diretorio / ARQUIVO_WAL
+        self.caminho_sincronizacao = self.diretorio / ARQUIVO_SINCRONIZACAO
+        self._lock = threading.RLock()
+        self._estado = None
+        self._seq = 0
+        self._pendentes = 0
+        self._carregado = False
+        self._wal = None
+        self._recentes = deque(maxlen=ALTERACOES_RECENTES)
+        self._seq_substituicao = 0
+        self._sincronizacao = (None, None)  # (mtime do arquivo, registro)
+        self._trava = None
+
+    @property
+    def seq(self):
+        """Número de sequência da última mutação aplicada"""
+        with self._lock:
+            self._garantir_carregado()
+            return self._seq
+
+    def _travar(self):
+        """Trava exclusiva de escritor (mantida enquanto o processo usar o armazenamento)"""
+        if self.somente_leitura or self._trava is not None:
+            return
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        trava = open(self.diretorio / ARQUIVO_TRAVA, 'a')
+        try:
+            fcntl.flock(trava.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            trava.close()
+            raise BaseLocalEmUso(f"Base local em {self.diretorio} em uso por outro processo (app ou CLI)")
+        self._trava = trava
+
+    def _garantir_carregado(self):
+        if self._carregado:
+            return
+        self._travar()
+        snapshot = ler_snapshot(self.caminho_snapshot)
+        if snapshot:
+            self._estado = snapshot_para_estado(snapshot)
+            self._seq = snapshot['seq']
+        valido = 0
+        for entrada, valido in _entradas_wal(self.caminho_wal):
+            if entrada['seq'] <= self._seq:
+                continue
+            if self._estado is None:
+                self._estado = estado_vazio()
+            aplicar_operacao(self._estado, entrada)
+            self._seq = entrada['seq']
+            self._pendentes += 1
+            if self.feed_alteracoes:
+                self._recentes.append(entrada)
+        # Linha interrompida no fim (crash): descartada, senão as próximas
+        # entradas seriam anexadas depois dela e nunca mais relidas
+        if not self.somente_leitura and self.caminho_wal.exists() and self.caminho_wal.stat().st_size > valido:
+            with open(self.caminho_wal, 'r+b') as arquivo:
+                arquivo.truncate(valido)
+                os.fsync(arquivo.fileno())
+        self._seq_substituicao = self._seq - len(self._recentes)
+        self._carregado = True
+
+    def _exigir_escrita(self):
+        if self.somente_leitura:
+            raise RuntimeError("Armazenamento local aberto somente para leitura")
+
+    def carregar(self):
+        """Retorna cópia do estado local (com o seq correspondente), ou None se ainda não houver dados"""
+        with self._lock:
+            self._garantir_carregado()
+            if self._estado is None:
+                return None
+            return {
+                'clientes': copy.deepcopy(self._estado['clientes']),
+                'usuarios': copy.deepcopy(self._estado['usuarios']),
+                'trackings': [dict(r) for r in self._estado['trackings']],
+                'colunas': list(self._estado['colunas']),
+                'versao_esquema': self._estado.get('versao_esquema', 0),
+                'seq': self._seq,
+            }
+
+    def alteracoes_desde(self, seq):
+        """Entradas posteriores a 'seq'; None se não for possível montar o delta
+        (estado substituído depois de 'seq' ou entradas já descartadas da memória)"""
+        with self._lock:
+            self._garantir_carregado()
+            if seq >= self._seq:
+                return []
+            if seq < self._seq_substituicao:
+                return None
+            return [copy.deepcopy(e) for e in self._recentes if e['seq'] > seq]
+
+    def substituir_estado(self, clientes, usuarios, trackings, colunas=None, versao_esquema=0):
+        """Substitui todo o estado (seed, restauração ou migração) e grava novo snapshot"""
+        self._exigir_escrita()
+        with self._lock:
+            self._garantir_carregado()
+            estado = {
+                'clientes': copy.deepcopy(clientes),
+                'usuarios': copy.deepcopy(usuarios),
+                'trackings': [dict(r) for r in trackings],
+                'colunas': list(colunas or []),
+                'versao_esquema': versao_esquema,
+            }
+            for registro in estado['trackings']:
+                _registrar_colunas(estado, registro)
+            self._estado = estado
+            self._seq += 1
+            self._gravar_snapshot()
+            self._recentes.clear()
+            self._seq_substituicao = self._seq
+            return self._seq
+
+    def bloqueio(self):
+        """Trava do armazenamento: ler, mesclar e substituir sem mutações de outras sessões no meio"""
+        return self._lock
+
+    def sincronizacao(self):
+        """Última sincronização com o GitHub: {'sha', 'seq', 'base'} (None se nunca houve).
+
+        'base' é o conteúdo do GitHub no 'sha' (base da mesclagem em três vias) e
+        'seq' a versão local que ele contém; mutações posteriores ainda não foram
+        enviadas. 'sha' None: base local criada dos dados padrão e nunca enviada
+        ('base' = dados padrão). O registro é compartilhado: não alterar.
+        """
+        with self._lock:
+            try:
+                mtime = self.caminho_sincronizacao.stat().st_mtime_ns
+            except OSError:
+                return None
+            # Relido só se o arquivo mudou (o CLI também registra sincronizações)
+            if self._sincronizacao[0] != mtime:
+                with gzip.open(self.caminho_sincronizacao, 'rt', encoding='utf-8') as arquivo:
+                    self._sincronizacao = (mtime, json.load(arquivo))
+            return self._sincronizacao[1]
+
+    def registrar_sincronizacao(self, sha, base, seq=None):
+        """Registra que a versão local 'seq' (padrão: a atual) está no GitHub no 'sha' com o conteúdo 'base'"""
+        self._exigir_escrita()
+        with self._lock:
+            self._garantir_carregado()
+            registro = {'sha': sha, 'seq': self._seq if seq is None else seq, 'base': base}
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            temporario = self.caminho_sincronizacao.with_name(self.caminho_sincronizacao.name + '.tmp')
+            with gzip.open(temporario, 'wb') as arquivo:
+                arquivo.write(_serializar(registro))
+            os.replace(temporario, self.caminho_sincronizacao)
+            self._sincronizacao = (self.caminho_sincronizacao.stat().st_mtime_ns, json.loads(_serializar(registro)))
+
+    def pendente_de_backup(self):
+        """True se há dados locais que ainda não foram enviados ao GitHub"""
+        with self._lock:
+            self._garantir_carregado()
+            if self._estado is None:
+                return False
+            registro = self.sincronizacao()
+            return registro is None or registro['sha'] is None or self._seq > registro['seq']
+
+    def registrar(self, operacao, **dados):
+        """Grava a mutação no WAL (fsync) e aplica ao estado local"""
+        if operacao not in OPERACOES:
+            raise ValueError(f"Operação desconhecida: {operacao}")
+        self._exigir_escrita()
+        with self._lock:
+            self._garantir_carregado()
+            if self._estado is None:
+                self._estado = estado_vazio()
+            entrada = {'seq': self._seq + 1, 'op': operacao, 'ts': datetime.now().isoformat(timespec='seconds')}
+            entrada.update(dados)
+            self._anexar_wal(_linha_wal(entrada))
+            entrada = json.loads(_serializar(entrada))
+            aplicar_operacao(self._estado, entrada)
+            if self.feed_alteracoes:
+                self._recentes.append(entrada)
+                if len(self._recentes) == self._recentes.maxlen:
+                    self._seq_substituicao = self._recentes[0]['seq'] - 1
+            else:
+                self._seq_substituicao = entrada['seq']
+            self._seq = entrada['seq']
+            self._pendentes += 1
+            if self._pendentes >= self.intervalo_snapshot:
+                self._gravar_snapshot()
+            return self._seq
+
+    def compactar(self):
+        """Força a gravação de um snapshot e trunca o WAL"""
+        self._exigir_escrita()
+        with self._lock:
+            self._garantir_carregado()
+            if self._estado is not None:
+                self._gravar_snapshot()
+
+    def _anexar_wal(self, linha):
+        if self._wal is None:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            self._wal = open(self.caminho_wal, 'ab')
+        self._wal.write(linha)
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    def _gravar_snapshot(self):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho_snapshot.with_suffix('.tmp')
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(_serializar(estado_para_snapshot(self._estado, self._seq)))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho_snapshot)
+
+        # Entradas já cobertas pelo snapshot podem ser descartadas
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        with open(self.caminho_wal, 'wb') as arquivo:
+            os.fsync(arquivo.fileno())
+        self._pendentes = 0
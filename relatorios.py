@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relatórios mensais do Sistema BRIX - Pacotes de planilhas por cliente
+Cada cliente recebe um XLSX com as abas Ativos, Finalizados (inclusive os
+já arquivados), Canal Vermelho, Histórico Vermelho (KPIs diários) e Lead
+Times, gravado com openpyxl em modo write_only (linha a linha, memória
+constante). As planilhas são geradas em paralelo num ProcessPoolExecutor,
+fora do processo do Streamlit, e ficam em cache pelo conteúdo: o nome do
+arquivo leva o resumo dos dados do cliente, então um cliente cujos dados não
+mudaram desde o último pacote não é gerado de novo. Versões antigas da
+planilha de um cliente são apagadas quando uma nova é pedida (depois de um
+prazo, para não tirar o arquivo de um pacote ainda em download).
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+# Muda quando o layout das planilhas muda (invalida o cache)
+VERSAO_RELATORIO = 1
+
+# Processos geradores (o Streamlit continua livre para as sessões)
+PROCESSOS_RELATORIO = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Idade mínima (segundos) de uma versão antiga da planilha antes de ser apagada
+PRAZO_CACHE_ANTIGO = 3600
+
+COLUNA_STATUS = 'STATUS_FINAL'
+
+
+def nome_arquivo(cliente):
+    """Nome de arquivo seguro para o cliente ("MC CONFECCIONES" -> "mc_confecciones")"""
+    texto = unicodedata.normalize('NFKD', str(cliente))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', '_', texto).strip('_') or 'cliente'
+
+
+def _resumo(dados):
+    conteudo = json.dumps([VERSAO_RELATORIO, dados], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(conteudo.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _linhas(tabela):
+    return {'colunas': list(tabela.columns), 'linhas': tabela.astype(object).where(tabela.notna(), '').values.tolist()}
+
+
+def montar_entradas(df, arquivados=None, kpis=None, clientes=None):
+    """Entradas (serializáveis) do gerador, uma por cliente: trackings, arquivados e série diária de KPIs"""
+    if clientes is None:
+        clientes = sorted(set(df['CLIENTE'].dropna()) - {''})
+    vazio = df.iloc[0:0]
+    ativos = dict(tuple(df.groupby('CLIENTE', sort=False)))
+    historico = dict(tuple(arquivados.groupby('CLIENTE', sort=False))) if arquivados is not None and not arquivados.empty else {}
+    series = dict(tuple(kpis.groupby('cliente', sort=False))) if kpis is not None and not kpis.empty else {}
+
+    entradas = []
+    for cliente in clientes:
+        serie = series.get(cliente)
+        entradas.append({
+            'cliente': cliente,
+            'trackings': _linhas(ativos.get(cliente, vazio)),
+            'arquivados': _linhas(historico.get(cliente, vazio)),
+            'vermelho_diario': [] if serie is None else [
+                [dia.strftime('%d/%m/%Y'), int(vermelho), int(ativos_no_dia)]
+                for dia, vermelho, ativos_no_dia in serie[['dia', 'canal_vermelho', 'ativos']].itertuples(index=False)
+            ],
+        })
+    return entradas
+
+
+# ----------------------------------------------------- geração (processo filho) ---
+
+def _aba(planilha, titulo, colunas, linhas):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+
+    aba = planilha.create_sheet(titulo)
+    aba.freeze_panes = 'A2'
+    for indice, coluna in enumerate(colunas):
+        aba.column_dimensions[_letra(indice)].width = max(12, min(40, len(str(coluna)) + 4))
+    cabecalho = []
+    for coluna in colunas:
+        celula = WriteOnlyCell(aba, value=coluna)
+        celula.font = Font(bold=True, color='FFFFFF')
+        celula.fill = PatternFill('solid', fgColor='2C3E50')
+        cabecalho.append(celula)
+    aba.append(cabecalho)
+    for linha in linhas:
+        aba.append(linha)
+
+
+def _letra(indice):
+    from openpyxl.utils import get_column_letter
+    return get_column_letter(indice + 1)
+
+
+def gerar_planilha(dados, caminho):
+    """Grava o XLSX do cliente em 'caminho' (executado no processo gerador); retorna o caminho"""
+    import pandas as pd
+    from openpyxl import Workbook
+    from analise_transito import COLUNA_TOTAL, NOMES_ETAPAS, calcular_etapas
+
+    trackings = pd.DataFrame(dados['trackings']['linhas'], columns=dados['trackings']['colunas'])
+    arquivados = pd.DataFrame(dados['arquivados']['linhas'], columns=dados['arquivados']['colunas'])
+    if COLUNA_STATUS not in trackings.columns:
+        trackings[COLUNA_STATUS] = ''
+    colunas = list(trackings.columns)
+
+    encerrado = trackings[COLUNA_STATUS].fillna('') != ''
+    ativos, finalizados = trackings[~encerrado], trackings[encerrado]
+    if not arquivados.empty:
+        finalizados = pd.concat([finalizados, arquivados.reindex(columns=colunas, fill_value='')], ignore_index=True)
+    todos = pd.concat([trackings, arquivados.reindex(columns=colunas, fill_value='')], ignore_index=True)
+    vermelhos = todos[todos.get('CANAL RFB', pd.Series('', index=todos.index)) == 'VERMELHO']
+
+    planilha = Workbook(write_only=True)
+    _aba(planilha, "Ativos", colunas, ativos.values.tolist())
+    _aba(planilha, "Finalizados", colunas, finalizados.values.tolist())
+
+    etapas_vermelho = calcular_etapas(vermelhos)
+    inspecao = etapas_vermelho.get('CHEGADA PORTO DESTINO → LIBERAÇAO PORTO DESTINO')
+    colunas_vermelho = ['CONTAINER', 'CHEGADA PORTO DESTINO', 'LIBERAÇAO PORTO DESTINO', COLUNA_STATUS]
+    _aba(planilha, "Canal Vermelho", colunas_vermelho + ['DIAS ATÉ LIBERAÇÃO'], [
+        [*(linha.get(c, '') for c in colunas_vermelho), None if pd.isna(dias) else float(dias)]
+        for linha, dias in zip(vermelhos.to_dict('records'), inspecao if inspecao is not None else [])
+    ])
+    _aba(planilha, "Histórico Vermelho", ['DIA', 'CONTAINERS NO CANAL VERMELHO', 'CONTAINERS ATIVOS'],
+         dados['vermelho_diario'])
+
+    etapas = calcular_etapas(todos)
+    colunas_etapas = NOMES_ETAPAS + [COLUNA_TOTAL]
+    _aba(planilha, "Lead Times", ['CONTAINER'] + colunas_etapas, [
+        [container, *(None if pd.isna(v) else float(v) for v in valores)]
+        for container, valores in zip(todos['CONTAINER'], etapas[colunas_etapas].values.tolist())
+    ])
+
+    temporario = Path(f"{caminho}.tmp")
+    planilha.save(temporario)
+    os.replace(temporario, caminho)
+    return str(caminho)
+
+
+# --------------------------------------------------------- pool e cache ---
+
+class PacoteRelatorios:
+    """Um pedido de relatórios: cliente -> Future com o caminho do XLSX"""
+
+    def __init__(self, tarefas, criado_em=None):
+        self.tarefas = tarefas
+        self.criado_em = criado_em or datetime.now()
+        self._zip = None
+
+    @property
+    def total(self):
+        return len(self.tarefas)
+
+    @property
+    def concluidos(self):
+        return sum(1 for futuro in self.tarefas.values() if futuro.done())
+
+    @property
+    def pronto(self):
+        return self.concluidos == self.total
+
+    def erros(self):
+        """{cliente: mensagem} das planilhas que falharam"""
+        return {cliente: str(futuro.exception()) for cliente, futuro in self.tarefas.items()
+                if futuro.done() and futuro.exception() is not None}
+
+    def arquivos(self):
+        """{cliente: caminho} das planilhas prontas"""
+        return {cliente: Path(futuro.result()) for cliente, futuro in self.tarefas.items()
+                if futuro.done() and futuro.exception() is None}
+
+    def zip_bytes(self):
+        """Pacote ZIP com as planilhas prontas (montado uma vez quando tudo terminou)"""
+        if self._zip is not None:
+            return self._zip
+        memoria = io.BytesIO()
+        with zipfile.ZipFile(memoria, 'w', zipfile.ZIP_DEFLATED) as pacote:
+            for cliente, caminho in self.arquivos().items():
+                pacote.write(caminho, f"{nome_arquivo(cliente)}.xlsx")
+        if self.pronto:
+            self._zip = memoria.getvalue()
+            return self._zip
+        return memoria.getvalue()
+
+    def salvar_em(self, diretorio):
+        """Copia as planilhas prontas para o diretório; retorna quantas"""
+        diretorio = Path(diretorio)
+        diretorio.mkdir(parents=True, exist_ok=True)
+        arquivos = self.arquivos()
+        for cliente, caminho in arquivos.items():
+            shutil.copyfile(caminho, diretorio / f"{nome_arquivo(cliente)}.xlsx")
+        return len(arquivos)
+
+
+class _Concluido:
+    """Future já resolvido (planilha reaproveitada do cache)"""
+
+    def __init__(self, resultado):
+        self._resultado = resultado
+
+    def done(self):
+        return True
+
+    def exception(self):
+        return None
+
+    def result(self):
+        return self._resultado
+
+
+class GeradorRelatorios:
+    """Pool de processos geradores + cache de planilhas em disco ({cliente}-{resumo}.xlsx)"""
+
+    def __init__(self, diretorio, processos=PROCESSOS_RELATORIO):
+        self.diretorio = Path(diretorio)
+        self.processos = processos
+        self._pool = None
+        self.reaproveitados = 0
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: o processo do Streamlit tem threads, fork não é seguro
+            self._pool = ProcessPoolExecutor(max_workers=self.processos, mp_context=get_context('spawn'))
+        return self._pool
+
+    def gerar(self, entradas):
+        """Dispara a geração (sem bloquear) para as entradas de montar_entradas()"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        tarefas = {}
+        for dados in entradas:
+            cliente = dados['cliente']
+            caminho = self.diretorio / f"{nome_arquivo(cliente)}-{_resumo(dados)}.xlsx"
+            self._podar(cliente, caminho)
+            if caminho.exists():
+                self.reaproveitados += 1
+                tarefas[cliente] = _Concluido(str(caminho))
+            else:
+                tarefas[cliente] = self._executor().submit(gerar_planilha, dados, caminho)
+        return PacoteRelatorios(tarefas)
+
+    def _podar(self, cliente, atual):
+        """Apaga as versões antigas (e temporários abandonados) da planilha do cliente"""
+        limite = time.time() - PRAZO_CACHE_ANTIGO
+        for caminho in self.diretorio.glob(f"{nome_arquivo(cliente)}-*.xlsx*"):
+            if caminho == atual:
+                continue
+            try:
+                if caminho.stat().st_mtime < limite:
+                    caminho.unlink()
+            except OSError:
+                pass
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sincronização com o GitHub - Sistema BRIX
+Backup condicional (concorrência otimista): o PUT só é aceito se o arquivo no
+GitHub ainda estiver no SHA da última sincronização. Em caso de conflito o
+estado remoto é baixado e mesclado em três vias (base sincronizada x local x
+remoto) por entidade, linha e campo, e o envio é repetido.
+
+A base e o SHA da última sincronização ficam na base local (persistencia),
+junto com a versão local já enviada: o conteúdo do GitHub só substitui a base
+local quando não há mutações posteriores; se houver, as três vias são
+mescladas e o resultado fica pendente de backup.
+"""
+
+import base64
+import json
+import math
+import random
+import time
+from datetime import datetime
+
+from migracoes import VERSAO_ESQUEMA
+
+GITHUB_API_URL_PADRAO = "https://api.github.com"
+GITHUB_REPO = "fabiomadalozzo/brix-backup"
+GITHUB_FILE = "backup_brix.json"
+
+# Partições do arquivo histórico (um JSON por mês), fora do backup principal
+GITHUB_DIRETORIO_ARQUIVO = "arquivo_historico"
+
+VERSAO_BACKUP = '3.0-TOKEN-PERMANENTE'
+
+# Tentativas de envio (com mesclagem entre elas) antes de desistir
+TENTATIVAS_BACKUP = 5
+
+# Identidade de um tracking na mesclagem (a mesma do arquivo histórico e das
+# migrações: o número do container é reutilizado ao longo dos anos)
+CHAVE_TRACKING = ('CLIENTE', 'CONTAINER', 'CARREGAMENTO')
+
+_AUSENTE = object()
+
+
+class ConflitoGitHub(Exception):
+    """O arquivo no GitHub mudou desde a última sincronização (SHA diferente)"""
+
+
+class ClienteGitHub:
+    """Acesso ao arquivo de backup pela API de conteúdo do GitHub"""
+
+    def __init__(self, token, repo=GITHUB_REPO, arquivo=GITHUB_FILE, url_base=GITHUB_API_URL_PADRAO, timeout=10,
+                 orcamento=None):
+        self.url_base = url_base.rstrip('/')
+        self.url = f"{self.url_base}/repos/{repo}/contents/{arquivo}"
+        self.timeout = timeout
+        self.orcamento = orcamento  # Atualizado com os cabeçalhos X-RateLimit de cada resposta
+        self.headers = {
+            'Authorization': f'token {token}',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+
+    def _registrar(self, response):
+        if self.orcamento is not None:
+            self.orcamento.atualizar(response.headers)
+        return response
+
+    def validar_token(self):
+        """True se o token for aceito pela API, False se for recusado (401).
+
+        Outras respostas (403/429 de cota esgotada, falhas do GitHub) não dizem
+        nada sobre o token: levantam requests.HTTPError.
+        """
+        import requests
+
+        response = self._registrar(requests.get(f"{self.url_base}/user", headers=self.headers, timeout=self.timeout))
+        if response.status_code == 401:
+            return False
+        response.raise_for_status()
+        return True
+
+    def ler_se_alterado(self, etag=None):
+        """(dados, sha, etag) do backup; None se não mudou desde 'etag' (304 não gasta cota)"""
+        import requests
+
+        headers = dict(self.headers, **({'If-None-Match': etag} if etag else {}))
+        response = self._registrar(requests.get(self.url, headers=headers, timeout=self.timeout))
+        if response.status_code == 304:
+            return None
+        if response.status_code == 404:
+            return None, None, None
+        response.raise_for_status()
+        file_data = response.json()
+        conteudo = base64.b64decode(file_data['content']).decode('utf-8')
+        return json.loads(conteudo), file_data['sha'], response.headers.get('ETag')
+
+    def ler(self):
+        """Retorna (dados, sha) do backup, ou (None, None) se o arquivo não existir"""
+        dados, sha, _ = self.ler_se_alterado()
+        return dados, sha
+
+    def gravar(self, dados, sha, mensagem=None):
+        """Grava o backup se o SHA remoto ainda for 'sha'; retorna o novo SHA"""
+        import requests
+
+        json_content = json.dumps(dados, ensure_ascii=False, indent=2)
+        github_data = {
+            'message': mensagem or f'Backup BRIX - {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}',
+            'content': base64.b64encode(json_content.encode('utf-8')).decode('utf-8')
+        }
+        if sha:
+            github_data['sha'] = sha
+
+        response = self._registrar(requests.put(self.url, json=github_data, headers=self.headers, timeout=self.timeout))
+        # 409: SHA não confere / 422: arquivo já existe e nenhum SHA foi enviado
+        if response.status_code in [409, 422]:
+            raise ConflitoGitHub(f"Backup alterado por outra instância (HTTP {response.status_code})")
+        response.raise_for_status()
+        return response.json()['content']['sha']
+
+
+class ClienteArquivoGitHub:
+    """Partições do arquivo histórico no GitHub: um arquivo AAAA-MM.json por mês no diretório"""
+
+    def __init__(self, token, repo=GITHUB_REPO, diretorio=GITHUB_DIRETORIO_ARQUIVO, url_base=GITHUB_API_URL_PADRAO,
+                 timeout=10, orcamento=None):
+        self.token = token
+        self.repo = repo
+        self.diretorio = diretorio
+        self.url_base = url_base
+        self.timeout = timeout
+        self.orcamento = orcamento
+        self._listagem = ClienteGitHub(token, repo, diretorio, url_base, timeout, orcamento)
+
+    def _particao(self, nome):
+        return ClienteGitHub(self.token, self.repo, f"{self.diretorio}/{nome}.json", self.url_base, self.timeout, self.orcamento)
+
+    def listar(self):
+        """{partição: sha} das partições no GitHub"""
+        import requests
+
+        listagem = self._listagem
+        response = listagem._registrar(requests.get(listagem.url, headers=listagem.headers, timeout=self.timeout))
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        return {item['name'][:-len('.json')]: item['sha'] for item in response.json()
+                if item.get('type') == 'file' and item['name'].endswith('.json')}
+
+    def ler(self, nome):
+        """(dados, sha) da partição"""
+        return self._particao(nome).ler()
+
+    def gravar(self, nome, dados, sha):
+        """Grava a partição se o SHA remoto ainda for 'sha' (ConflitoGitHub caso contrário)"""
+        return self._particao(nome).gravar(dados, sha, f"Arquivo histórico BRIX - {nome}")
+
+
+def montar_backup(estado):
+    """Conteúdo do arquivo de backup a partir do estado (clientes, usuários, trackings)"""
+    return {
+        'clientes': estado['clientes'],
+        'usuarios': estado['usuarios'],
+        'trackings': estado['trackings'],
+        'metadata': {
+            'data_backup': datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            'versao': VERSAO_BACKUP,
+            'versao_esquema': VERSAO_ESQUEMA
+        }
+    }
+
+
+def _normalizar(valor):
+    """NaN (vindo do pandas) equivale a vazio na comparação"""
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def normalizar_estado(dados):
+    """Estado comparável: só clientes/usuários/trackings, sem NaN"""
+    if not dados:
+        return {'clientes': {}, 'usuarios': {}, 'trackings': []}
+    return {
+        'clientes': {k: dict(v) for k, v in (dados.get('clientes') or {}).items()},
+        'usuarios': {k: dict(v) for k, v in (dados.get('usuarios') or {}).items()},
+        'trackings': [{k: _normalizar(v) for k, v in r.items()} for r in dados.get('trackings') or []],
+    }
+
+
+def _indexar_trackings(trackings):
+    """Trackings por chave (CLIENTE, CONTAINER, CARREGAMENTO, ocorrência), preservando a ordem"""
+    indice = {}
+    ocorrencias = {}
+    for registro in trackings:
+        chave = tuple(str(registro.get(campo) or '') for campo in CHAVE_TRACKING)
+        n = ocorrencias.get(chave, 0)
+        ocorrencias[chave] = n + 1
+        indice[chave + (n,)] = registro
+    return indice
+
+
+def _mesclar_valor(base, local, remoto):
+    """Mesclagem em três vias de um valor; retorna (valor, houve_conflito)"""
+    if local == remoto:
+        return local, False
+    if local == base:
+        return remoto, False
+    if remoto == base:
+        return local, False
+    return local, True  # Os dois lados mudaram: vale a edição desta instância
+
+
+def _mesclar_registro(base, local, remoto, rotulo, conflitos):
+    """Mescla um registro (dict) campo a campo; _AUSENTE = registro inexistente/excluído"""
+    if local == remoto:
+        return local
+    if local == base:
+        return remoto
+    if remoto == base:
+        return local
+    if local is _AUSENTE or remoto is _AUSENTE:
+        # Excluído de um lado e alterado do outro: a alteração é preservada
+        conflitos.append(f"{rotulo} (excluído x alterado)")
+        return remoto if local is _AUSENTE else local
+
+    base = base if base is not _AUSENTE else {}
+    resultado = {}
+    for campo in list(local) + [c for c in remoto if c not in local]:
+        valor, conflito = _mesclar_valor(base.get(campo, _AUSENTE), local.get(campo, _AUSENTE), remoto.get(campo, _AUSENTE))
+        if conflito:
+            conflitos.append(f"{rotulo}.{campo}")
+        if valor is not _AUSENTE:
+            resultado[campo] = valor
+    return resultado
+
+
+def _mesclar_colecao(base, local, remoto, rotulo, conflitos):
+    """Mescla dicionários de entidades (chave -> registro), ordem local primeiro"""
+    resultado = {}
+    for chave in list(local) + [c for c in remoto if c not in local]:
+        registro = _mesclar_registro(
+            base.get(chave, _AUSENTE), local.get(chave, _AUSENTE), remoto.get(chave, _AUSENTE),
+            f"{rotulo}[{chave[1] if isinstance(chave, tuple) else chave}]", conflitos
+        )
+        if registro is not _AUSENTE:
+            resultado[chave] = registro
+    return resultado
+
+
+def mesclar(base, local, remoto):
+    """Mesclagem em três vias dos estados; retorna (estado, lista de conflitos)"""
+    base, local, remoto = normalizar_estado(base), normalizar_estado(local), normalizar_estado(remoto)
+    conflitos = []
+    estado = {
+        'clientes': _mesclar_colecao(base['clientes'], local['clientes'], remoto['clientes'], 'cliente', conflitos),
+        'usuarios': _mesclar_colecao(base['usuarios'], local['usuarios'], remoto['usuarios'], 'usuario', conflitos),
+        'trackings': list(_mesclar_colecao(
+            _indexar_trackings(base['trackings']),
+            _indexar_trackings(local['trackings']),
+            _indexar_trackings(remoto['trackings']),
+            'tracking', conflitos
+        ).values()),
+    }
+    return estado, conflitos
+
+
+def enviar_com_mesclagem(cliente, local, base, sha, tentativas=TENTATIVAS_BACKUP, espera=0.2):
+    """Envia o backup condicionado ao SHA; em conflito mescla com o remoto e tenta de novo.
+
+    Retorna (estado enviado, novo sha, conflitos). O estado enviado difere de
+    'local' quando alterações de outra instância foram incorporadas.
+    """
+    estado = normalizar_estado(local)
+    conflitos = []
+    for tentativa in range(tentativas):
+        try:
+            novo_sha = cliente.gravar(montar_backup(estado), sha)
+            return estado, novo_sha, conflitos
+        except ConflitoGitHub:
+            remoto, sha = cliente.ler()
+            if remoto is not None:
+                estado, novos_conflitos = mesclar(base, estado, remoto)
+                conflitos.extend(novos_conflitos)
+                base = remoto
+            # Espera curta e aleatória para não colidir de novo com a outra instância
+            time.sleep(espera * (2 ** tentativa) * random.uniform(0.5, 1.5))
+    raise ConflitoGitHub(f"Backup não concluído após {tentativas} tentativas")
+
+
+def integrar_remoto(armazenamento, remoto, sha, base=None, seq_base=None):
+    """Traz o conteúdo do GitHub ('remoto', no 'sha') para a base local sem perder o que não foi enviado.
+
+    base/seq_base: estado comum com o remoto e a versão local que corresponde a
+    ele (padrão: a última sincronização registrada). Sem mutações locais depois
+    de seq_base a base local é substituída; com mutações, é mesclada em três
+    vias e a mesclagem fica pendente de backup. Sem nenhuma sincronização
+    registrada a base é vazia: tudo o que existe localmente conta como mutação.
+    Retorna (estado migrado com 'seq', DataFrame dos trackings, conflitos).
+    """
+    from migracoes import migrar_estado, versao_dos_dados
+
+    with armazenamento.bloqueio():
+        if base is None:
+            registro = armazenamento.sincronizacao()
+            if registro is not None:
+                base, seq_base = registro['base'], registro['seq']
+            else:
+                base, seq_base = normalizar_estado(None), 0
+        local = armazenamento.carregar()
+        pendente = local is not None and local['seq'] > seq_base
+
+        conflitos = []
+        estado = remoto
+        if pendente:
+            mesclado, conflitos = mesclar(base, local, remoto)
+            estado = dict(mesclado, versao_esquema=min(versao_dos_dados(remoto), versao_dos_dados(local)))
+        migrado, df, _ = migrar_estado(estado)
+        seq = armazenamento.substituir_estado(
+            migrado['clientes'], migrado['usuarios'], migrado['trackings'], migrado['colunas'],
+            versao_esquema=VERSAO_ESQUEMA
+        )
+        # A mesclagem ainda não está no GitHub: registrada uma versão atrás (pendente)
+        armazenamento.registrar_sincronizacao(sha, normalizar_estado(remoto), seq - 1 if pendente else seq)
+    migrado['seq'] = seq
+    return migrado, df, conflitos
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor SMTP local (sink) - Sistema BRIX
+Aceita qualquer mensagem e a guarda em memória (e opcionalmente em arquivos
+.eml), para testar as notificações sem enviar e-mails de verdade.
+
+Uso: python smtp_falso.py [--porta 8025] [--diretorio /tmp/emails]
+     BRIX_SMTP_HOST=127.0.0.1 BRIX_SMTP_PORTA=8025 streamlit run app.py
+"""
+
+import argparse
+import email
+import socketserver
+import threading
+from email import policy
+from pathlib import Path
+
+
+class ServidorSMTPFalso:
+    """SMTP mínimo (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)"""
+
+    def __init__(self, porta=0, diretorio=None, ao_receber=None):
+        self.mensagens = []  # (remetente, destinatarios, EmailMessage)
+        self.conexoes = 0
+        self.diretorio = Path(diretorio) if diretorio else None
+        self.ao_receber = ao_receber
+        self._lock = threading.Lock()
+        self._servidor = socketserver.ThreadingTCPServer(('127.0.0.1', porta), self._criar_handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def porta(self):
+        return self._servidor.server_address[1]
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self.porta
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _guardar(self, remetente, destinatarios, dados):
+        mensagem = email.message_from_bytes(dados, policy=policy.default)
+        with self._lock:
+            self.mensagens.append((remetente, destinatarios, mensagem))
+            numero = len(self.mensagens)
+        if self.diretorio:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            (self.diretorio / f"{numero:05d}.eml").write_bytes(dados)
+        if self.ao_receber:
+            self.ao_receber(remetente, destinatarios, mensagem)
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def _responder(self, linha):
+                self.wfile.write(linha.encode('ascii') + b'\r\n')
+
+            def handle(self):
+                with servidor._lock:
+                    servidor.conexoes += 1
+                self._responder('220 brix-smtp-falso pronto')
+                remetente, destinatarios = None, []
+                while True:
+                    linha = self.rfile.readline()
+                    if not linha:
+                        return
+                    comando = linha.decode('utf-8', 'replace').strip()
+                    verbo = comando[:4].upper()
+                    if verbo == 'EHLO':
+                        self._responder('250-brix-smtp-falso')
+                        self._responder('250 8BITMIME')
+                    elif verbo == 'HELO':
+                        self._responder('250 brix-smtp-falso')
+                    elif verbo == 'MAIL':
+                        remetente, destinatarios = comando.split(':', 1)[1].strip().split(' ')[0].strip('<>'), []
+                        self._responder('250 OK')
+                    elif verbo == 'RCPT':
+                        destinatarios.append(comando.split(':', 1)[1].strip().strip('<>'))
+                        self._responder('250 OK')
+                    elif verbo == 'DATA':
+                        self._responder('354 Envie a mensagem terminando com <CRLF>.<CRLF>')
+                        partes = []
+                        while True:
+                            parte = self.rfile.readline()
+                            if not parte or parte in (b'.\r\n', b'.\n'):
+                                break
+                            partes.append(parte[1:] if parte.startswith(b'..') else parte)
+                        servidor._guardar(remetente, destinatarios, b''.join(partes))
+                        remetente, destinatarios = None, []
+                        self._responder('250 OK: mensagem recebida')
+                    elif verbo == 'RSET':
+                        remetente, destinatarios = None, []
+                        self._responder('250 OK')
+                    elif verbo == 'NOOP':
+                        self._responder('250 OK')
+                    elif verbo == 'QUIT':
+                        self._responder('221 Tchau')
+                        return
+                    else:
+                        self._responder('502 Comando nao implementado')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor SMTP local para testes das notificações")
+    parser.add_argument('--porta', type=int, default=8025, help="Porta SMTP")
+    parser.add_argument('--diretorio', help="Grava cada mensagem recebida como .eml")
+    args = parser.parse_args()
+
+    def mostrar(remetente, destinatarios, mensagem):
+        print(f"✉️ {remetente} -> {', '.join(destinatarios)}: {mensagem['Subject']}")
+        corpo = mensagem.get_body(preferencelist=('plain',))
+        if corpo:
+            print(corpo.get_content())
+
+    servidor = ServidorSMTPFalso(args.porta, args.diretorio, mostrar)
+    print(f"📭 SMTP local em 127.0.0.1:{servidor.porta} (BRIX_SMTP_HOST=127.0.0.1 BRIX_SMTP_PORTA={servidor.porta})")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Resumos por e-mail: acúmulo na janela, agrupamento por destinatário e entrega pelo smtp_falso"""
+
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from notificacoes import CentralNotificacoes, FilaEnvioSMTP, detectar_transicoes
+from smtp_falso import ServidorSMTPFalso
+
+REMETENTE = "tracking@brix.com.br"
+AGORA = datetime(2026, 10, 19, 9, 0)
+
+
+def _transicao(campo='CHEGADA PORTO DESTINO', de='', para='19/10/2026'):
+    return [{'campo': campo, 'de': de, 'para': para}]
+
+
+def _texto(mensagem):
+    return mensagem.get_body(('plain',)).get_content()
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    servidor = ServidorSMTPFalso()
+    servidor.iniciar()
+    yield servidor
+    servidor.parar()
+
+
+@pytest.fixture
+def fila(smtp):
+    fila = FilaEnvioSMTP('127.0.0.1', smtp.porta, ocioso_segundos=5)
+    yield fila
+    fila.parar()
+
+
+def _central(fila, **opcoes):
+    # Agendador parado durante o teste: o despacho é chamado explicitamente
+    return CentralNotificacoes(fila, REMETENTE, janela_minutos=30, intervalo_verificacao=3600, **opcoes)
+
+
+def test_detectar_transicoes_so_campos_notificados():
+    anterior = {'CHEGADA PORTO DESTINO': '', 'CANAL RFB': 'VERDE', 'OBSERVACAO': 'x'}
+    novos = {'CHEGADA PORTO DESTINO': '19/10/2026', 'CANAL RFB': 'VERDE', 'OBSERVACAO': 'y'}
+
+    assert detectar_transicoes(anterior, novos) == [{'campo': 'CHEGADA PORTO DESTINO', 'de': '', 'para': '19/10/2026'}]
+
+
+def test_resumo_so_sai_depois_da_janela(fila, smtp):
+    central = _central(fila)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao(), ['a@cliente.com'], agora=AGORA)
+
+    assert central.despachar(agora=AGORA + timedelta(minutes=29)) == 0
+    assert central.pendentes == 1
+    assert central.despachar(agora=AGORA + timedelta(minutes=30)) == 1
+    fila.aguardar()
+
+    assert central.pendentes == 0
+    assert len(smtp.mensagens) == 1
+
+
+def test_um_resumo_por_destinatario_com_todos_os_clientes(fila, smtp):
+    central = _central(fila)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao(), ['gestor@brix.com', 'a@cliente.com'], agora=AGORA)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao('DESCARREGAMENTO'), ['gestor@brix.com', 'a@cliente.com'],
+                      agora=AGORA)
+    central.registrar('CLIENTE B', 'MSCU7654321', _transicao(), ['gestor@brix.com'], agora=AGORA)
+
+    assert central.despachar(forcar=True) == 2
+    fila.aguardar()
+
+    por_destinatario = {destinatarios[0]: mensagem for _, destinatarios, mensagem in smtp.mensagens}
+    assert set(por_destinatario) == {'gestor@brix.com', 'a@cliente.com'}
+    gestor, cliente = _texto(por_destinatario['gestor@brix.com']), _texto(por_destinatario['a@cliente.com'])
+    assert 'CLIENTE A' in gestor and 'CLIENTE B' in gestor
+    assert 'CLIENTE B' not in cliente
+    assert 'CHEGADA PORTO DESTINO' in cliente and 'DESCARREGAMENTO' in cliente
+    # A conexão SMTP é reaproveitada entre os resumos do lote
+    assert fila.conexoes == 1
+    assert fila.enviados == 2
+
+
+def test_transicoes_do_mesmo_campo_sao_consolidadas(fila, smtp):
+    central = _central(fila)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao(de='', para='18/10/2026'), ['a@cliente.com'], agora=AGORA)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao(de='18/10/2026', para='19/10/2026'), ['a@cliente.com'],
+                      agora=AGORA)
+
+    central.despachar(forcar=True)
+    fila.aguardar()
+
+    texto = _texto(smtp.mensagens[0][2])
+    assert 'CHEGADA PORTO DESTINO: (vazio) → 19/10/2026' in texto
+    assert '18/10/2026' not in texto
+
+
+def test_falha_no_envio_devolve_o_resumo_as_pendencias(smtp):
+    fila = FilaEnvioSMTP('127.0.0.1', _porta_livre(), ocioso_segundos=5)
+    try:
+        central = _central(fila)
+        central.registrar('CLIENTE A', 'TCLU1234567', _transicao(), ['a@cliente.com'], agora=AGORA)
+
+        assert central.despachar(forcar=True) == 1
+        fila.aguardar()
+        assert fila.falhas == 1
+        assert central.pendentes == 1
+
+        # Servidor de volta: a próxima janela entrega o mesmo resumo
+        fila.porta = smtp.porta
+        assert central.despachar(forcar=True) == 1
+        fila.aguardar()
+    finally:
+        fila.parar()
+
+    assert central.pendentes == 0
+    assert [destinatarios for _, destinatarios, _ in smtp.mensagens] == [['a@cliente.com']]
+
+
+def test_fila_cheia_devolve_o_resumo_as_pendencias(smtp):
+    class FilaParada(FilaEnvioSMTP):
+        def _trabalhar(self):
+            pass
+
+    fila = FilaParada('127.0.0.1', smtp.porta, tamanho_fila=1)
+    fila.fila.put(('ocupada', None))
+    central = _central(fila)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao(), ['a@cliente.com'], agora=AGORA)
+
+    assert central.despachar(forcar=True) == 0
+    assert central.pendentes == 1
+    assert fila.ultimo_erro == "Fila de envio cheia"
+
+
+def test_pendencias_sobrevivem_ao_reinicio(fila, smtp, tmp_path):
+    central = _central(fila, diretorio=tmp_path)
+    central.registrar('CLIENTE A', 'TCLU1234567', _transicao(), ['a@cliente.com'], agora=AGORA)
+
+    reiniciada = _central(fila, diretorio=tmp_path)
+    assert reiniciada.pendentes == 1
+    assert reiniciada.despachar(agora=AGORA + timedelta(minutes=30)) == 1
+    fila.aguardar()
+
+    assert len(smtp.mensagens) == 1
+    assert _central(fila, diretorio=tmp_path).pendentes == 0
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Mesclagem em três vias e backup condicional contra o github_falso"""
+
+import pytest
+
+from github_falso import ServidorGitHubFalso
+from persistencia import ArmazenamentoLocal
+from sincronizacao import (
+    GITHUB_FILE, GITHUB_REPO, ClienteGitHub, ConflitoGitHub,
+    enviar_com_mesclagem, integrar_remoto, mesclar, montar_backup, normalizar_estado
+)
+
+
+def _tracking(container, **campos):
+    return dict({'CLIENTE': 'CLIENTE A', 'CONTAINER': container, 'CARREGAMENTO': '01/10/2026'}, **campos)
+
+
+def _estado(*trackings, clientes=None):
+    return {'clientes': clientes or {}, 'usuarios': {}, 'trackings': list(trackings)}
+
+
+def _por_container(estado):
+    return {r['CONTAINER']: r for r in estado['trackings']}
+
+
+@pytest.fixture
+def github():
+    servidor = ServidorGitHubFalso()
+    servidor.iniciar()
+    yield servidor
+    servidor.parar()
+
+
+def test_mesclar_campos_diferentes_sem_conflito():
+    base = _estado(_tracking('TCLU1234567', STATUS='EMBARCADO', OBSERVACAO=''))
+    local = _estado(_tracking('TCLU1234567', STATUS='EM TRÂNSITO', OBSERVACAO=''))
+    remoto = _estado(_tracking('TCLU1234567', STATUS='EMBARCADO', OBSERVACAO='Navio atrasado'))
+
+    estado, conflitos = mesclar(base, local, remoto)
+
+    assert conflitos == []
+    assert estado['trackings'] == [_tracking('TCLU1234567', STATUS='EM TRÂNSITO', OBSERVACAO='Navio atrasado')]
+
+
+def test_mesclar_mesmo_campo_vale_o_local_e_reporta_conflito():
+    base = _estado(_tracking('TCLU1234567', STATUS='EMBARCADO'))
+    local = _estado(_tracking('TCLU1234567', STATUS='EM TRÂNSITO'))
+    remoto = _estado(_tracking('TCLU1234567', STATUS='ENTREGUE'))
+
+    estado, conflitos = mesclar(base, local, remoto)
+
+    assert conflitos == ['tracking[TCLU1234567].STATUS']
+    assert estado['trackings'][0]['STATUS'] == 'EM TRÂNSITO'
+
+
+def test_mesclar_exclusao_contra_alteracao_preserva_a_alteracao():
+    base = _estado(_tracking('TCLU1234567', STATUS='EMBARCADO'), _tracking('MSCU7654321'))
+    local = _estado(_tracking('MSCU7654321'))
+    remoto = _estado(_tracking('TCLU1234567', STATUS='ENTREGUE'), _tracking('MSCU7654321'))
+
+    estado, conflitos = mesclar(base, local, remoto)
+
+    assert conflitos == ['tracking[TCLU1234567] (excluído x alterado)']
+    assert _por_container(estado)['TCLU1234567']['STATUS'] == 'ENTREGUE'
+
+
+def test_mesclar_container_reutilizado_em_outro_carregamento():
+    base = _estado(_tracking('TCLU1234567'))
+    local = _estado(_tracking('TCLU1234567'), _tracking('TCLU1234567', CARREGAMENTO='15/10/2026'))
+    remoto = _estado(_tracking('TCLU1234567', STATUS='ENTREGUE'))
+
+    estado, conflitos = mesclar(base, local, remoto)
+
+    assert conflitos == []
+    assert [(r['CARREGAMENTO'], r.get('STATUS')) for r in estado['trackings']] == [
+        ('01/10/2026', 'ENTREGUE'), ('15/10/2026', None)
+    ]
+
+
+def test_integrar_remoto_sem_mutacoes_substitui_a_base_local(tmp_path):
+    armazenamento = ArmazenamentoLocal(tmp_path)
+    armazenamento.substituir_estado({}, {}, [_tracking('TCLU1234567')])
+    armazenamento.registrar_sincronizacao('sha-1', normalizar_estado(armazenamento.carregar()))
+
+    remoto = _estado(_tracking('TCLU1234567', STATUS='ENTREGUE'), _tracking('MSCU7654321'))
+    migrado, _, conflitos = integrar_remoto(armazenamento, remoto, 'sha-2')
+
+    assert conflitos == []
+    assert set(_por_container(migrado)) == {'TCLU1234567', 'MSCU7654321'}
+    assert armazenamento.sincronizacao()['sha'] == 'sha-2'
+    assert not armazenamento.pendente_de_backup()
+
+
+def test_integrar_remoto_com_mutacoes_mescla_e_fica_pendente(tmp_path):
+    armazenamento = ArmazenamentoLocal(tmp_path)
+    armazenamento.substituir_estado({}, {}, [_tracking('TCLU1234567', STATUS='EMBARCADO')])
+    armazenamento.registrar_sincronizacao('sha-1', normalizar_estado(armazenamento.carregar()))
+    armazenamento.registrar('tracking_add', registro=_tracking('HLXU1111111'))
+
+    remoto = _estado(_tracking('TCLU1234567', STATUS='ENTREGUE'))
+    migrado, _, conflitos = integrar_remoto(armazenamento, remoto, 'sha-2')
+
+    assert conflitos == []
+    trackings = _por_container(migrado)
+    assert trackings['TCLU1234567']['STATUS'] == 'ENTREGUE'
+    assert 'HLXU1111111' in trackings
+    assert armazenamento.sincronizacao()['sha'] == 'sha-2'
+    assert armazenamento.pendente_de_backup()
+
+
+def test_integrar_remoto_sem_registro_mescla_contra_base_vazia(tmp_path):
+    # Base local criada antes de qualquer sincronização: nada dela pode ser descartado
+    armazenamento = ArmazenamentoLocal(tmp_path)
+    armazenamento.substituir_estado({}, {}, [_tracking('TCLU1234567', STATUS='EM TRÂNSITO')])
+    armazenamento.registrar('tracking_add', registro=_tracking('HLXU1111111'))
+    assert armazenamento.sincronizacao() is None
+
+    remoto = _estado(_tracking('TCLU1234567', STATUS='ENTREGUE'), _tracking('MSCU7654321'))
+    migrado, _, conflitos = integrar_remoto(armazenamento, remoto, 'sha-1')
+
+    assert conflitos == ['tracking[TCLU1234567].STATUS']
+    trackings = _por_container(migrado)
+    assert set(trackings) == {'TCLU1234567', 'HLXU1111111', 'MSCU7654321'}
+    assert trackings['TCLU1234567']['STATUS'] == 'EM TRÂNSITO'
+    assert armazenamento.sincronizacao()['sha'] == 'sha-1'
+    assert armazenamento.pendente_de_backup()
+
+
+def test_gravar_com_sha_desatualizado_gera_conflito(github):
+    cliente = ClienteGitHub('token', url_base=github.url)
+    sha = cliente.gravar(montar_backup(_estado()), None)
+    cliente.gravar(montar_backup(_estado(_tracking('TCLU1234567'))), sha)
+
+    with pytest.raises(ConflitoGitHub):
+        cliente.gravar(montar_backup(_estado()), sha)
+    assert github.conflitos == 1
+
+
+def test_enviar_com_mesclagem_refaz_o_envio_apos_conflito_de_sha(github):
+    semente = _estado(_tracking('TCLU1234567', STATUS='EMBARCADO'))
+    cliente = ClienteGitHub('token', url_base=github.url)
+    sha_base = cliente.gravar(montar_backup(semente), None)
+
+    # Outra instância envia antes: o SHA desta fica desatualizado
+    outra = _estado(_tracking('TCLU1234567', STATUS='EMBARCADO', OBSERVACAO='Navio atrasado'))
+    ClienteGitHub('token', url_base=github.url).gravar(montar_backup(outra), sha_base)
+
+    local = _estado(_tracking('TCLU1234567', STATUS='EM TRÂNSITO'), _tracking('HLXU1111111'))
+    estado, sha, conflitos = enviar_com_mesclagem(cliente, local, semente, sha_base, espera=0)
+
+    assert github.conflitos == 1
+    assert conflitos == []
+    final = github.conteudo(GITHUB_REPO, GITHUB_FILE)
+    assert normalizar_estado(final) == estado
+    trackings = _por_container(final)
+    assert trackings['TCLU1234567']['STATUS'] == 'EM TRÂNSITO'
+    assert trackings['TCLU1234567']['OBSERVACAO'] == 'Navio atrasado'
+    assert 'HLXU1111111' in trackings
+    assert cliente.ler()[1] == sha
+
+
+def test_enviar_com_mesclagem_desiste_apos_as_tentativas(github, monkeypatch):
+    cliente = ClienteGitHub('token', url_base=github.url)
+    sha = cliente.gravar(montar_backup(_estado()), None)
+    cliente.gravar(montar_backup(_estado(_tracking('TCLU1234567'))), sha)
+    # O remoto muda de novo a cada leitura: nenhuma tentativa chega com o SHA atual
+    ler = cliente.ler
+
+    def ler_e_alterar():
+        dados, sha_atual = ler()
+        dados['trackings'].append(_tracking(f"HLXU{len(dados['trackings']):07d}"))
+        ClienteGitHub('token', url_base=github.url).gravar(dados, sha_atual)
+        return dados, sha_atual
+    monkeypatch.setattr(cliente, 'ler', ler_e_alterar)
+
+    with pytest.raises(ConflitoGitHub):
+        enviar_com_mesclagem(cliente, _estado(), _estado(), sha, tentativas=3, espera=0)
+    assert github.conflitos == 3